@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark deduplicating backups against plain tar
+
+Generates a source tree (compressible text files plus incompressible
+binaries), then times `tar -cf`, `tar -czf`, a full backup, a no-change
+incremental backup, an incremental backup after editing a few files, and a
+restore. Throughput is source bytes per second; size is what each run added.
+
+    python scripts/bench_backup.py [--size-mb 512] [--jobs 0] [--dir /tmp]
+"""
+import argparse
+import os
+import random
+import tempfile
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+WORDS = ["deploy", "service", "request", "cache", "latency", "queue", "worker", "error"]
+
+
+def generate_tree(root: Path, size_mb: int) -> None:
+    """About size_mb of files: three quarters text, one quarter random binary"""
+    rng = random.Random(0)
+    written, n = 0, 0
+    while written < size_mb << 20:
+        directory = root / f"dir{n % 16:02d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        if n % 4 == 3:
+            size = rng.randrange(1 << 20, 8 << 20)
+            (directory / f"blob{n}.bin").write_bytes(rng.getrandbits(8 * size).to_bytes(size, "little"))
+        else:
+            lines = (f"{n} {rng.choice(WORDS)} {rng.randrange(10**9)} {rng.choice(WORDS)}\n"
+                     for _ in range(rng.randrange(20000, 120000)))
+            size = (directory / f"text{n}.log").write_text("".join(lines))
+        written += size
+        n += 1
+
+
+def du(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def timed(label: str, command: str, source_bytes: int, output: Path = None,
+          before: int = 0) -> int:
+    result = run_command(command)
+    if result.exit_code != 0:
+        raise SystemExit(f"{label} failed: {result.stderr}")
+    size = du(output) if output is not None and output.is_dir() else (
+        output.stat().st_size if output is not None else 0)
+    rate = source_bytes / 2**20 / result.duration if result.duration > 0 else 0.0
+    print(f"{label:<32} {result.duration:7.2f}s {rate:8.1f} MB/s  +{(size - before) / 2**20:8.1f} MB")
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--jobs", type=int, default=0)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        temp = Path(temp_dir)
+        source, repo = temp / "src", temp / "repo"
+        generate_tree(source, args.size_mb)
+        total = du(source)
+        print(f"source: {total / 2**20:.0f} MB in {sum(1 for _ in source.rglob('*.*'))} files, "
+              f"{os.cpu_count()} CPUs")
+        timed("tar -cf", f"tar -cf {temp / 'a.tar'} -C {source} .", total, temp / "a.tar")
+        timed("tar -czf", f"tar -czf {temp / 'a.tgz'} -C {source} .", total, temp / "a.tgz")
+        base = f"python -m craft_cli.engines.backup {source} --destination={repo} --jobs={args.jobs}"
+        size = timed("backup (full)", base, total, repo)
+        size = timed("backup (incremental, no change)", base, total, repo, size)
+        for path in sorted(source.rglob("text*.log"))[:4]:
+            with open(path, "a") as f:
+                f.write("one more line\n")
+        size = timed("backup (incremental, 4 edits)", base, total, repo, size)
+        timed("backup (--type=full again)", f"{base} --type=full", total, repo, size)
+        timed("restore", f"python -m craft_cli.engines.backup --restore=latest "
+                         f"--destination={repo} --to={temp / 'out'} --jobs={args.jobs}", total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark citation formatting with the parsed-reference cache
+
+Generates a BibTeX library of journal articles, books and conference papers,
+then formats it as a bibliography cold (no cache), warm (unchanged), after
+editing one entry and in a second style, each run as its own process, as
+craft runs it, and reports the engine's own counters.
+
+    python scripts/bench_cite.py [--entries 5000] [--dir /tmp]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+SURNAMES = ["M{\\\"u}ller", "Garc{\\'i}a", "Smith", "Nakamura", "van der Berg", "O'Neil",
+            "Kowalski", "Dubois", "Chen", "Okafor"]
+GIVEN = ["Anna", "Jos{\\'e}", "Wei", "John Ronald", "Marie-Claire", "K."]
+
+
+def entry(rng: random.Random, n: int) -> str:
+    authors = " and ".join(f"{rng.choice(GIVEN)} {rng.choice(SURNAMES)}"
+                           for _ in range(rng.randint(1, 8)))
+    title = " ".join(rng.choice(["Fast", "Robust", "Learning", "{B}ayesian", "Graphs", "of",
+                                 "Inference", "Scalable", "Systems"]) for _ in range(7))
+    year = rng.randint(1970, 2025)
+    kind = ("article", "book", "inproceedings")[n % 3]
+    fields = [f"author = {{{authors}}}", f"title = {{{title}}}", f"year = {year}"]
+    if kind == "article":
+        fields += ["journal = {Journal of Things}", f"volume = {n % 80}", f"number = {n % 12}",
+                   f"pages = {{{n % 900}--{n % 900 + 14}}}", f"doi = {{10.1000/jt.{n}}}"]
+    elif kind == "book":
+        fields += ["publisher = {Academic Press}", "address = {New York}", f"edition = {n % 5 + 1}"]
+    else:
+        fields += ["booktitle = {Proceedings of the Conference on Stuff}",
+                   "editor = {Ada Lovelace and Charles Babbage}",
+                   f"pages = {{{n % 300}--{n % 300 + 9}}}"]
+    return f"@{kind}{{ref{n},\n  " + ",\n  ".join(fields) + "\n}\n"
+
+
+def run(command: str) -> tuple:
+    result = run_command(command)
+    if result.exit_code != 0:
+        raise SystemExit(result.stderr)
+    return result.duration, result.stderr.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        bib = Path(temp_dir) / "refs.bib"
+        entries = [entry(rng, n) for n in range(args.entries)]
+        bib.write_text("\n".join(entries), encoding="utf-8")
+        print(f"library: {args.entries:,} entries, {bib.stat().st_size / 1e6:.1f} MB")
+        engine = f"python -m craft_cli.engines.cite {bib} --bibliography --output={bib}.txt"
+        cache = Path(f"{bib}.ccache")
+
+        def scenario(name, prepare, style="apa"):
+            timings = []
+            for _ in range(args.runs):
+                prepare()
+                duration, line = run(f"{engine} --style={style}")
+                timings.append(duration)
+            print(f"{name:>10} {statistics.median(timings):6.2f} s  "
+                  f"({line.split('(', 1)[1].rstrip(')')})")
+
+        scenario("cold", lambda: cache.unlink() if cache.exists() else None)
+        scenario("warm", lambda: None)
+        edits = iter(range(10 ** 6))
+
+        def edit():
+            entries[len(entries) // 2] = entries[len(entries) // 2].replace(
+                "year = ", f"note = {{edit {next(edits)}}},\n  year = ", 1)
+            bib.write_text("\n".join(entries), encoding="utf-8")
+
+        scenario("one edit", edit)
+
+        def apa_only():
+            cache.unlink()
+            run(f"{engine} --style=apa")
+
+        scenario("new style", apa_only, style="ieee")
+        print(f"cache: {cache.stat().st_size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
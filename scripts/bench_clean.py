@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark the out-of-core cleaner on synthetic inputs
+
+Generates CSV files of increasing size (every row unique, the worst case for
+deduplication) and runs dedupe + normalize under a fixed memory budget.
+Peak RSS should stay near the budget however large the input grows.
+
+    python scripts/bench_clean.py [--sizes-mb 64,256,2048] [--memory-mb 64] [--jobs 0]
+"""
+import argparse
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from bench_transform import generate_csv
+from craft_cli.engines.clean import partition_count
+from craft_cli.runner import run_command
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", default="16,64,256")
+    parser.add_argument("--memory-mb", type=int, default=64)
+    parser.add_argument("--jobs", type=int, default=0)
+    parser.add_argument("--dir", help="Scratch directory (needs about 4x the largest size)")
+    args = parser.parse_args()
+
+    print(f"{'input':>9} {'rows':>11} {'partitions':>10} {'time':>8} {'rows/s':>10} {'peak RSS':>10}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        workdir = Path(temp_dir)
+        for size_mb in (int(s) for s in args.sizes_mb.split(",") if s):
+            source = workdir / "in.csv"
+            rows = generate_csv(source, size_mb)
+            result = run_command(
+                f"python -m craft_cli.engines.clean {source} {workdir / 'out.csv'} --dedupe "
+                f"--normalize --method=zscore --jobs={args.jobs} --memory-mb={args.memory_mb} "
+                f"--tmp-dir={workdir}"
+            )
+            if result.exit_code != 0:
+                raise SystemExit(f"clean failed: {result.stderr}")
+            peak = re.search(r"peak RSS ([\d.]+) MB", result.stderr).group(1)
+            partitions = partition_count(str(source), args.jobs or os.cpu_count() or 1, args.memory_mb)
+            print(f"{os.path.getsize(source) / 2**20:7.0f}MB {rows:>11,} {partitions:>10} "
+                  f"{result.duration:7.1f}s {rows / result.duration:>10,.0f} {float(peak):8.1f}MB")
+            for path in workdir.iterdir():
+                path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark indexed log search against a linear scan
+
+Generates a synthetic application log (one entry per second, a few stack
+traces, a rare error message) and times the same queries with --no-index,
+while building the index, with the index warm, and after appending to the
+log (incremental update).
+
+    python scripts/bench_logs.py [--size-mb 512] [--dir /tmp]
+"""
+import argparse
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+LEVELS = ["INFO"] * 14 + ["DEBUG"] * 4 + ["WARN", "ERROR"]
+MESSAGES = [
+    "request handled path=/api/v1/items/{n} status=200 bytes={b}",
+    "cache miss key=user:{n} backend=redis latency_ms={b}",
+    "job finished id={n} queue=default runtime_ms={b}",
+    "connection pool stats active={b} idle={n}",
+]
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def generate_log(path: Path, size_mb: int, seconds: int = 0, mode: str = "w") -> int:
+    """Write about size_mb of log entries starting `seconds` after START"""
+    rng = random.Random(seconds)
+    target = size_mb << 20
+    written = 0
+    with open(path, mode) as f:
+        while written < target:
+            lines = []
+            for _ in range(1000):
+                stamp = (START + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+                level = rng.choice(LEVELS)
+                message = rng.choice(MESSAGES).format(n=rng.randrange(10**6), b=rng.randrange(5000))
+                if seconds % 500000 == 250000:
+                    message = "payment gateway unreachable after 3 retries"
+                lines.append(f"{stamp} {level} [worker-{rng.randrange(16)}] {message}\n")
+                if level == "ERROR":
+                    lines.append("Traceback (most recent call last):\n"
+                                 '  File "app.py", line 42, in handle\n'
+                                 "RuntimeError: upstream failed\n")
+                seconds += 1
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk)
+    return seconds
+
+
+def timed(label: str, command: str) -> None:
+    result = run_command(command)
+    if result.exit_code != 0:
+        raise SystemExit(f"{label} failed: {result.stderr}")
+    summary = result.stderr.strip().splitlines()[-1]
+    if summary.startswith("LOGS: "):
+        summary = summary[len("LOGS: "):]
+    print(f"{label:<28} {result.duration:7.2f}s  {summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        log = Path(temp_dir) / "app.log"
+        seconds = generate_log(log, args.size_mb)
+        window_start = (START + timedelta(seconds=seconds // 2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        window_end = (START + timedelta(seconds=seconds // 2 + 3600)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        queries = {
+            "rare text": '--grep="gateway unreachable"',
+            "errors in one hour": f"--level=error --since={window_start} --until={window_end}",
+        }
+        base = f"python -m craft_cli.engines.logs {log} --export=json"
+        print(f"log: {log.stat().st_size / 2**20:.0f} MB, {seconds:,} entries")
+        for name, flags in queries.items():
+            timed(f"{name} (linear scan)", f"{base} {flags} --no-index")
+        timed("rare text (build index)", f"{base} {queries['rare text']}")
+        for name, flags in queries.items():
+            timed(f"{name} (indexed)", f"{base} {flags}")
+        generate_log(log, 8, seconds, mode="a")
+        timed("rare text (after +8 MB)", f"{base} {queries['rare text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark warm zygote runs against plain subprocess execution
+
+Runs a small `python -m` tool that imports a set of modules, first as a normal
+subprocess and then through a zygote with those modules preloaded.
+
+    python scripts/bench_prefork.py [--runs 20] [--preload json,decimal,...]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from craft_cli.history import percentile
+from craft_cli.runner import run_command
+from craft_cli.zygote import run_prefork
+
+DEFAULT_PRELOAD = "asyncio,decimal,email.mime.multipart,http.client,json,logging,xml.etree.ElementTree"
+
+
+def measure(label: str, runs: int, run) -> list:
+    """Time `runs` calls of run(); the first (cold) call is reported separately"""
+    timings = []
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start)
+        if result.exit_code != 0:
+            raise SystemExit(f"{label} failed: {result.stderr}")
+    cold, warm = timings[0], sorted(timings[1:])
+    print(f"{label:<12} cold {cold * 1000:8.1f} ms   "
+          f"p50 {percentile(warm, 50) * 1000:7.1f} ms   "
+          f"p95 {percentile(warm, 95) * 1000:7.1f} ms   "
+          f"mean {statistics.mean(warm) * 1000:7.1f} ms")
+    return warm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--preload", default=DEFAULT_PRELOAD,
+                        help="Comma-separated modules the tool imports")
+    args = parser.parse_args()
+    preload = [m for m in args.preload.split(",") if m]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workdir = Path(temp_dir)
+        (workdir / "bench_tool.py").write_text(
+            "".join(f"import {module}\n" for module in preload) + "print('ok')\n"
+        )
+        command = "python -m bench_tool"
+
+        subprocess_times = measure(
+            "subprocess", args.runs, lambda: run_command(command, cwd=str(workdir))
+        )
+        zygote_times = measure(
+            "zygote", args.runs,
+            lambda: run_prefork(command, preload=preload, cwd=str(workdir),
+                                state_dir=workdir / "state", idle_timeout=5)
+        )
+
+    speedup = statistics.median(subprocess_times) / statistics.median(zygote_times)
+    print(f"\nZygote median speedup: {speedup:.1f}x over {args.runs} warm runs")
+
+
+if __name__ == "__main__":
+    main()
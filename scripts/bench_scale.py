@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark the scaling simulator's policy sweep
+
+Generates a week of per-minute request rates (a daily cycle, noise and a
+few spikes) and sweeps threshold x window x cooldown x warmup grids of
+growing size with one worker and with --jobs, reporting policies per second.
+
+    python scripts/bench_scale.py [--days 7] [--jobs 0] [--dir /tmp]
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+GRIDS = [
+    ["threshold=50:90:10", "window=1m,5m", "cooldown=0,5m"],
+    ["threshold=40:90:2", "window=1m,5m,15m", "cooldown=0,5m,15m,30m", "warmup=0,2m"],
+    ["threshold=30:95:1", "window=1m,3m,5m,10m,15m", "cooldown=0,5m,10m,15m,30m",
+     "warmup=0,1m,2m"],
+]
+
+
+def generate_metrics(path: Path, days: int) -> None:
+    rng = random.Random(0)
+    lines = ["timestamp,requests\n"]
+    for minute in range(days * 1440):
+        day = minute % 1440 / 1440
+        load = 800 + 700 * math.sin(2 * math.pi * (day - 0.3)) + rng.gauss(0, 60)
+        if rng.random() < 0.002:
+            load += rng.uniform(500, 2000)
+        lines.append(f"{1704067200 + minute * 60},{max(load, 0):.1f}\n")
+    path.write_text("".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--jobs", type=int, default=0)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        metrics = Path(temp_dir) / "requests.csv"
+        generate_metrics(metrics, args.days)
+        print(f"series: {args.days * 1440:,} samples, {os.cpu_count()} CPUs")
+        base = (f"python -m craft_cli.engines.scale {metrics} --metric=requests --capacity=250 "
+                f"--min=2 --max=30 --top=1")
+        for grid in GRIDS:
+            sweeps = " ".join(f"--sweep {axis}" for axis in grid)
+            for jobs in sorted({1, args.jobs if args.jobs > 0 else os.cpu_count() or 1}):
+                result = run_command(f"{base} {sweeps} --jobs={jobs}")
+                if result.exit_code != 0:
+                    raise SystemExit(result.stderr)
+                summary = result.stderr.strip().splitlines()[-1]
+                print(f"{result.duration:7.2f}s  {summary[len('SCALE: '):]}")
+
+
+if __name__ == "__main__":
+    main()
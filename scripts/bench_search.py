@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark corpus indexing and BM25 query latency
+
+Generates an NDJSON corpus of abstract-sized records over a Zipf-distributed
+vocabulary, builds the index, appends a batch of records and re-indexes
+incrementally, then times queries of rare, common and mixed terms (each run
+as its own process, as craft runs it) and reports the engine's own timings.
+
+    python scripts/bench_search.py [--docs 200000] [--dir /tmp]
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+from itertools import accumulate
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+VOCABULARY = 50_000
+QUERIES = {
+    "rare": ["t40000", "t31234 t45678", "t25000 t26000 t27000"],
+    "common": ["t10", "t10 t20", "t5 t15 t25 t35"],
+    "mixed": ["t10 t20000", "t3 t50 t12000 t30000", "t8 t900 t4000"],
+}
+
+
+def generate(path: Path, docs: int, seed: int, first: int = 0) -> None:
+    rng = random.Random(seed)
+    weights = list(accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+    words = [f"t{n}" for n in range(VOCABULARY)]
+    with open(path, "a", encoding="utf-8") as f:
+        for n in range(first, first + docs):
+            text = " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(60, 200)))
+            record = {"id": f"doc{n}", "title": " ".join(rng.choices(words, k=6)),
+                      "abstract": text, "year": 1990 + n % 35,
+                      "source": ("arxiv", "pubmed", "acl")[n % 3]}
+            f.write(json.dumps(record) + "\n")
+
+
+def run(command: str) -> str:
+    result = run_command(command)
+    if result.exit_code != 0:
+        raise SystemExit(result.stderr)
+    return result.stderr.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        corpus = Path(temp_dir) / "corpus"
+        corpus.mkdir()
+        papers = corpus / "papers.jsonl"
+        generate(papers, args.docs, 0)
+        print(f"corpus: {args.docs:,} documents, {papers.stat().st_size / 1e6:.0f} MB")
+        engine = f"python -m craft_cli.engines.search --corpus={corpus}"
+        print(run(engine))
+        generate(papers, args.docs // 100, 1, args.docs)
+        print(run(engine))
+        size = sum(p.stat().st_size for p in (corpus / ".craft-index").iterdir())
+        print(f"index: {size / 1e6:.0f} MB")
+        for kind, queries in QUERIES.items():
+            for query in queries:
+                for filters in ("", " --since=2015 --sources=arxiv"):
+                    lines = [run(f'{engine} --no-update "{query}"{filters}').splitlines()[-1]
+                             for _ in range(args.runs)]
+                    times = [float(line.split(" in ", 1)[1].split(" ms", 1)[0]) for line in lines]
+                    detail = lines[-1].split("(", 1)[1].rstrip(")")
+                    print(f"{kind:>6} {query!r:28} {filters.strip() or '-':30} "
+                          f"{statistics.median(times):7.1f} ms  ({detail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming transform engine on synthetic inputs
+
+Generates CSV files of increasing size, converts each to NDJSON and back in a
+separate process, and reports throughput and peak memory. Peak RSS should stay
+flat as the input grows; pass multi-GB sizes to check that at scale.
+
+    python scripts/bench_transform.py [--sizes-mb 64,512,2048] [--chunk-size 5000]
+"""
+import argparse
+import os
+import random
+import tempfile
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+
+def generate_csv(path: Path, size_mb: int, seed: int = 0) -> int:
+    """Write a CSV of about size_mb megabytes and return its row count"""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta, eta", 'theta "q"']
+    rows = 0
+    with open(path, "w", newline="") as f:
+        f.write("id,timestamp,user,amount,ratio,label,comment\n")
+        while f.tell() < target:
+            lines = []
+            for _ in range(10000):
+                rows += 1
+                comment = rng.choice(words).replace('"', '""')
+                lines.append(
+                    f'{rows},2024-01-{rows % 28 + 1:02d}T{rows % 24:02d}:00:00,user{rng.randrange(100000)},'
+                    f'{rng.uniform(0, 10000):.2f},{rng.random():.6f},{rng.choice(words[:5])},"{comment}"\n'
+                )
+            f.write("".join(lines))
+    return rows
+
+
+def run(source: Path, target: Path, chunk_size: int) -> tuple:
+    command = f"python -m craft_cli.engines.transform {source} {target} --chunk-size={chunk_size}"
+    result = run_command(command)
+    if result.exit_code != 0:
+        raise SystemExit(f"transform failed: {result.stderr}")
+    return result.duration, result.max_rss_kb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", default="16,64,256")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--dir", help="Scratch directory (needs about 3x the largest size)")
+    args = parser.parse_args()
+
+    print(f"{'input':>9} {'rows':>11} {'csv->ndjson':>22} {'ndjson->csv':>22} {'peak RSS':>10}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        workdir = Path(temp_dir)
+        for size_mb in (int(s) for s in args.sizes_mb.split(",") if s):
+            source = workdir / "in.csv"
+            rows = generate_csv(source, size_mb)
+            to_json, rss_json = run(source, workdir / "out.ndjson", args.chunk_size)
+            to_csv, rss_csv = run(workdir / "out.ndjson", workdir / "back.csv", args.chunk_size)
+            print(f"{os.path.getsize(source) / 2**20:7.0f}MB {rows:>11,} "
+                  f"{to_json:7.1f}s {rows / to_json:>9,.0f} rows/s "
+                  f"{to_csv:7.1f}s {rows / to_csv:>9,.0f} rows/s "
+                  f"{max(rss_json, rss_csv) / 1024:8.1f}MB")
+            for path in workdir.iterdir():
+                path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark term-table counting and trend scoring
+
+Generates an NDJSON corpus of abstract-sized records spread over fifteen
+years of months, over a Zipf-distributed vocabulary with a few planted
+trends (a term that takes off, one that grows steadily, one that fades).
+Counts it, appends a month of records and counts again incrementally, then
+scores emerging terms and charts a topic over each timeframe, twice (the
+first run sums and caches the closed periods, the second reads them), each
+run as its own process, as craft runs it.
+
+    python scripts/bench_trends.py [--docs 200000] [--dir /tmp]
+"""
+import argparse
+import json
+import random
+import tempfile
+from itertools import accumulate
+from pathlib import Path
+
+from craft_cli.runner import run_command
+
+VOCABULARY = 50_000
+MONTHS = 180
+
+
+def generate(path: Path, docs: int, seed: int, months: range) -> None:
+    rng = random.Random(seed)
+    weights = list(accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+    words = [f"t{n}" for n in range(VOCABULARY)]
+    with open(path, "a", encoding="utf-8") as f:
+        for n in range(docs):
+            month = rng.choice(months)
+            progress = month / MONTHS
+            text = rng.choices(words, cum_weights=weights, k=rng.randint(60, 200))
+            if rng.random() < 0.002 + max(0.0, progress - 0.8):
+                text.append("diffusion")
+            if rng.random() < 0.01 + 0.05 * progress:
+                text.append("transformer")
+            if rng.random() < 0.05 * (1 - progress):
+                text.append("svm")
+            record = {"id": f"doc{seed}-{n}", "title": " ".join(rng.choices(words, k=6)),
+                      "abstract": " ".join(text),
+                      "date": f"{2011 + month // 12}-{month % 12 + 1:02d}-15",
+                      "source": ("arxiv", "pubmed", "acl")[n % 3]}
+            f.write(json.dumps(record) + "\n")
+
+
+def run(command: str) -> str:
+    result = run_command(command)
+    if result.exit_code != 0:
+        raise SystemExit(result.stderr)
+    return result.stderr.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200_000)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        corpus = Path(temp_dir) / "corpus"
+        corpus.mkdir()
+        papers = corpus / "papers.jsonl"
+        generate(papers, args.docs, 0, range(MONTHS - 1))
+        print(f"corpus: {args.docs:,} documents, {papers.stat().st_size / 1e6:.0f} MB")
+        engine = f"python -m craft_cli.engines.trends --corpus={corpus}"
+        print(run(f"{engine} --timeframe=1y").splitlines()[0])
+        generate(papers, args.docs // MONTHS, 1, range(MONTHS - 1, MONTHS))
+        print(run(f"{engine} --timeframe=1y").splitlines()[0])
+        size = sum(p.stat().st_size for p in (corpus / ".craft-trends").iterdir())
+        print(f"tables: {size / 1e6:.0f} MB")
+        for timeframe in ("1y", "5y", "10y"):
+            for topic in ("", '"diffusion, transformer, svm"'):
+                for attempt in ("first", "again"):
+                    line = run(f"{engine} --no-update --timeframe={timeframe} {topic}")
+                    print(f"{timeframe:>4} {topic or 'emerging':30} {attempt:6} {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming validator against the cost of reading the input
+
+Generates a CSV, then reports MB/s for reading the raw bytes, for parsing
+the CSV into records, and for full validation with one and several jobs.
+Validation close to parse speed means the checks themselves are not the
+bottleneck; with enough jobs the run becomes bound by the disk.
+
+    python scripts/bench_validate.py [--size-mb 512] [--jobs 0]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from bench_transform import generate_csv
+from craft_cli.engines._io import read_chunks
+from craft_cli.engines._parallel import resolve_jobs
+from craft_cli.engines.validate import validate
+
+SCHEMA = {
+    "required": ["id", "amount"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 1},
+        "timestamp": {"type": "string", "format": "date-time"},
+        "user": {"type": "string", "pattern": r"^user\d+$"},
+        "amount": {"type": "number", "minimum": 0, "maximum": 10000},
+        "ratio": {"type": "number", "minimum": 0, "maximum": 1},
+        "label": {"enum": ["alpha", "beta", "gamma", "delta", "epsilon"]},
+        "comment": {"type": "string", "maxLength": 20}
+    }
+}
+
+
+def timed(label: str, size: int, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:7.2f}s {size / 2**20 / elapsed:8.1f} MB/s   {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--jobs", type=int, default=0)
+    parser.add_argument("--dir", help="Scratch directory")
+    args = parser.parse_args()
+    jobs = resolve_jobs(args.jobs)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        path = Path(temp_dir) / "in.csv"
+        rows = generate_csv(path, args.size_mb)
+        size = os.path.getsize(path)
+        print(f"{size / 2**20:.0f} MB, {rows:,} rows, {os.cpu_count()} CPUs\n")
+
+        def read_bytes():
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+            return ""
+        timed("read bytes", size, read_bytes)
+        timed("parse CSV", size, lambda: f"{sum(len(c) for c in read_chunks(str(path), 'csv', 10000)):,} rows")
+        for n in sorted({1, jobs}):
+            timed(f"validate ({n} jobs)", size,
+                  lambda n=n: f"{validate(str(path), 'csv', SCHEMA, jobs=n).error_count} errors")
+
+
+if __name__ == "__main__":
+    main()
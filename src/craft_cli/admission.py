@@ -0,0 +1,188 @@
+"""
+Host-wide admission control for Craft CLI
+
+Concurrency limits are enforced with a directory of lock files per key so they
+hold across independent craft processes. Each key directory contains:
+
+    queue.lock      serialises ticket allocation
+    counter         last ticket number handed out
+    waiting/<n>     one file per queued caller, flock'd by its owner
+    slot-<i>        one file per concurrent slot, flock'd while in use
+
+Callers take a ticket and only the oldest live waiter may claim a free slot,
+so admission is FIFO. Locks are released by the kernel if a process dies.
+"""
+import os
+import re
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+
+_POLL_MIN = 0.005
+_POLL_MAX = 0.05
+
+
+class AdmissionTimeout(Exception):
+    """Raised when a slot could not be acquired in time"""
+
+
+def _key_dir(lock_dir: Path, key: str) -> Path:
+    return lock_dir / re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+def _try_lock(path: Path, create: bool = True) -> Optional[int]:
+    """Open and exclusively flock a file without blocking; None if held elsewhere"""
+    try:
+        fd = os.open(str(path), os.O_RDWR | (os.O_CREAT if create else 0), 0o644)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class Slot:
+    """A held concurrency slot; release() or process exit frees it"""
+
+    def __init__(self, key: str, index: int, fd: Optional[int]):
+        self.key = key
+        self.index = index
+        self._fd = fd
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class Semaphore:
+    """A FIFO counting semaphore shared through the filesystem"""
+
+    def __init__(self, lock_dir: Path, key: str, limit: int):
+        self.key = key
+        self.limit = limit
+        self.directory = _key_dir(lock_dir, key)
+
+    def _lock_queue(self, operation: int) -> int:
+        """Open and flock queue.lock; closing the descriptor releases it"""
+        queue_fd = os.open(str(self.directory / "queue.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(queue_fd, operation)
+        except BaseException:
+            os.close(queue_fd)
+            raise
+        return queue_fd
+
+    def _take_ticket(self) -> Tuple[str, int]:
+        """Allocate the next ticket and hold its waiter file"""
+        waiting = self.directory / "waiting"
+        waiting.mkdir(parents=True, exist_ok=True)
+        queue_fd = self._lock_queue(fcntl.LOCK_EX)
+        try:
+            counter = self.directory / "counter"
+            try:
+                number = int(counter.read_text() or 0) + 1
+            except (FileNotFoundError, ValueError):
+                number = 1
+            counter.write_text(str(number))
+            ticket = f"{number:016d}"
+            fd = _try_lock(waiting / ticket)
+            if fd is None:  # pragma: no cover - tickets are unique under the queue lock
+                raise RuntimeError(f"Ticket {ticket} for {self.key} already held")
+            return ticket, fd
+        finally:
+            os.close(queue_fd)
+
+    def _is_head(self, ticket: str) -> bool:
+        """Whether no live waiter holds an older ticket (stale ones are removed)
+
+        The queue lock is held shared while scanning, so a waiter file that
+        _take_ticket has created but not yet locked is never taken for stale.
+        """
+        waiting = self.directory / "waiting"
+        queue_fd = self._lock_queue(fcntl.LOCK_SH)
+        try:
+            for name in sorted(os.listdir(waiting)):
+                if name >= ticket:
+                    return True
+                if not (waiting / name).exists():
+                    continue
+                fd = _try_lock(waiting / name, create=False)
+                if fd is None:
+                    if (waiting / name).exists():
+                        return False
+                    continue
+                # Owner died while queued
+                try:
+                    os.unlink(waiting / name)
+                except FileNotFoundError:
+                    pass
+                os.close(fd)
+            return True
+        finally:
+            os.close(queue_fd)
+
+    def _try_slot(self) -> Optional[Slot]:
+        for index in range(self.limit):
+            fd = _try_lock(self.directory / f"slot-{index}")
+            if fd is not None:
+                return Slot(self.key, index, fd)
+        return None
+
+    def acquire(self, timeout: Optional[float] = None) -> Slot:
+        """Wait in line for a free slot"""
+        if fcntl is None:
+            return Slot(self.key, 0, None)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket, ticket_fd = self._take_ticket()
+        delay = _POLL_MIN
+        try:
+            while True:
+                if self._is_head(ticket):
+                    slot = self._try_slot()
+                    if slot is not None:
+                        return slot
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise AdmissionTimeout(
+                        f"Timed out waiting for a '{self.key}' slot (limit {self.limit})"
+                    )
+                time.sleep(delay)
+                delay = min(delay * 2, _POLL_MAX)
+        finally:
+            try:
+                os.unlink(self.directory / "waiting" / ticket)
+            except FileNotFoundError:
+                pass
+            os.close(ticket_fd)
+
+
+def acquire_slots(lock_dir: Path, limits: List[Tuple[str, int]],
+                  timeout: Optional[float] = None) -> Tuple[List[Slot], float]:
+    """Acquire every (key, limit) slot in order. Returns (slots, seconds waited)."""
+    start = time.monotonic()
+    slots: List[Slot] = []
+    try:
+        for key, limit in limits:
+            remaining = None
+            if timeout is not None:
+                remaining = max(0.0, timeout - (time.monotonic() - start))
+            slots.append(Semaphore(lock_dir, key, limit).acquire(remaining))
+    except BaseException:
+        release_slots(slots)
+        raise
+    return slots, time.monotonic() - start
+
+
+def release_slots(slots: List[Slot]) -> None:
+    for slot in reversed(slots):
+        slot.release()
@@ -7,15 +7,26 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
 
+from .metrics import CONFIG_LOADS, YAML_PARSES
+from .plugins import entry_point_domains
+from .sources import DomainSource, SourceError, SourceStore
+
 
 @dataclass
 class CraftConfig:
     """Craft CLI configuration"""
     domain_paths: List[str] = field(default_factory=list)
+    domain_sources: List[Dict[str, Any]] = field(default_factory=list)
     include_builtin_domains: bool = True
+    include_plugin_domains: bool = True
     default_human_mode: bool = False
     verbose_execution: bool = False
     show_startup_checklist: bool = True
+    execute_tools: bool = False
+    state_dir: str = "~/.cache/craft"
+    concurrency: Dict[str, Any] = field(default_factory=dict)
+    history: Dict[str, Any] = field(default_factory=dict)
+    tracing: Dict[str, Any] = field(default_factory=dict)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'CraftConfig':
@@ -23,23 +34,56 @@ class CraftConfig:
         config_data = data.get('config', {})
         return cls(
             domain_paths=data.get('domain_paths', []),
+            domain_sources=data.get('domain_sources') or [],
             include_builtin_domains=data.get('include_builtin_domains', True),
+            include_plugin_domains=data.get('include_plugin_domains', True),
             default_human_mode=config_data.get('default_human_mode', False),
             verbose_execution=config_data.get('verbose_execution', False),
-            show_startup_checklist=config_data.get('show_startup_checklist', True)
+            show_startup_checklist=config_data.get('show_startup_checklist', True),
+            execute_tools=config_data.get('execute_tools', False),
+            state_dir=config_data.get('state_dir', "~/.cache/craft"),
+            concurrency=data.get('concurrency') or {},
+            history=data.get('history') or {},
+            tracing=data.get('tracing') or {}
         )
     
     def merge_with(self, other: 'CraftConfig') -> 'CraftConfig':
         """Merge this config with another, other takes precedence"""
         return CraftConfig(
             domain_paths=self.domain_paths + other.domain_paths,
+            domain_sources=_merge_sources(self.domain_sources, other.domain_sources),
             include_builtin_domains=other.include_builtin_domains,
+            include_plugin_domains=other.include_plugin_domains,
             default_human_mode=other.default_human_mode,
             verbose_execution=other.verbose_execution,
-            show_startup_checklist=other.show_startup_checklist
+            show_startup_checklist=other.show_startup_checklist,
+            execute_tools=other.execute_tools,
+            state_dir=other.state_dir,
+            concurrency=_merge_concurrency(self.concurrency, other.concurrency),
+            history={**self.history, **other.history},
+            tracing={**self.tracing, **other.tracing}
         )
 
 
+def _merge_concurrency(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge concurrency sections; override wins per tool and per category"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def _merge_sources(base: List[Dict[str, Any]],
+                   override: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge domain source lists; an override entry replaces the base entry of the same name"""
+    names = {entry.get('name') for entry in override if isinstance(entry, dict)}
+    kept = [entry for entry in base if not isinstance(entry, dict) or entry.get('name') not in names]
+    return kept + list(override)
+
+
 class ConfigManager:
     """Manages Craft CLI configuration discovery and loading"""
     
@@ -56,6 +100,7 @@ class ConfigManager:
     
     def _load_merged_config(self) -> CraftConfig:
         """Load and merge configuration from all sources"""
+        CONFIG_LOADS.inc()
         # Start with defaults
         base_config = CraftConfig()
         
@@ -78,6 +123,7 @@ class ConfigManager:
         
         try:
             with open(config_path, 'r') as f:
+                YAML_PARSES.inc(kind="config")
                 data = yaml.safe_load(f)
                 if data is None:
                     return None
@@ -105,8 +151,41 @@ class ConfigManager:
             else:
                 print(f"Warning: Domain path does not exist: {path_str}")
         
+        # Add synced domain sources (local snapshots only, never fetched here)
+        store = self.get_source_store()
+        for source in self.get_domain_sources():
+            source_path = store.domain_path(source)
+            if source_path is not None and source_path.exists():
+                paths.append(source_path)
+            else:
+                print(f"Warning: Domain source '{source.name}' is not synced; run craft --sync")
+        
         return paths
     
+    def get_plugin_domains(self) -> Dict[str, Path]:
+        """Domains registered by installed packages under the craft_cli.domains entry point"""
+        if not self.get_config().include_plugin_domains:
+            return {}
+        return entry_point_domains(self.get_state_dir() / "entry-points.json")
+    
+    def get_domain_sources(self) -> List[DomainSource]:
+        """Configured remote domain sources; invalid entries are reported and skipped"""
+        sources = []
+        for entry in self.get_config().domain_sources:
+            try:
+                sources.append(DomainSource.from_dict(entry))
+            except SourceError as e:
+                print(f"Warning: Invalid domain source: {e}")
+        return sources
+    
+    def get_source_store(self) -> SourceStore:
+        """Local content-addressed mirror of domain sources"""
+        return SourceStore(self.get_state_dir() / "sources")
+    
+    def get_state_dir(self) -> Path:
+        """Directory for craft's local state (locks, history, caches)"""
+        return Path(self.get_config().state_dir).expanduser()
+    
     def check_for_conflicts(self) -> List[Tuple[str, List[Path]]]:
         """Check for domain name conflicts across paths"""
         conflicts = []
@@ -145,7 +224,8 @@ class ConfigManager:
                 'config': {
                     'default_human_mode': False,
                     'verbose_execution': False,
-                    'show_startup_checklist': True
+                    'show_startup_checklist': True,
+                    'execute_tools': False
                 }
             }
             
@@ -2,18 +2,29 @@
 Core Craft CLI Framework functionality
 """
 import sys
-import yaml
 import subprocess
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from rich.console import Console
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
+from .admission import AdmissionTimeout, acquire_slots, release_slots
 from .config import ConfigManager
-
-console = Console()
+from .entrypoints import run_entrypoint
+from .history import HistoryStore, compute_stats, record_execution
+from .metrics import (
+    DOMAIN_LOOKUPS, EXECUTION_DURATION, QUEUE_WAIT, REQUESTS, RUNS_IN_PROGRESS
+)
+from .params import ParameterError, parse_arguments, parse_duration, template_values
+from .projection import ContextView, help_digest
+from .registry import ToolRegistry, ToolSpec
+from .rendering import StreamingTable, console, fit_to_screen
+from .runner import ExecutionResult, run_command
+from .sources import SourceError
+from .tracing import tracer
+from .zygote import run_prefork
 
 
 class CraftCLI:
@@ -22,6 +33,8 @@ class CraftCLI:
     def __init__(self):
         """Initialize Craft CLI"""
         self.config_manager = ConfigManager()
+        self.registry = ToolRegistry(self.config_manager)
+        self._configure_tracing()
         
         # Show startup checklist if enabled (skip in test environments)
         config = self.config_manager.get_config()
@@ -33,6 +46,16 @@ class CraftCLI:
         if conflicts:
             self._show_conflict_warnings(conflicts)
     
+    def _configure_tracing(self) -> None:
+        """Enable span export from .craftrc or CRAFT_TRACE_* environment variables"""
+        import os
+        settings = self.config_manager.get_config().tracing
+        tracer.configure(
+            file=os.environ.get("CRAFT_TRACE_FILE", settings.get("file")),
+            endpoint=os.environ.get("CRAFT_TRACE_ENDPOINT", settings.get("endpoint")),
+            traceparent=os.environ.get("TRACEPARENT")
+        )
+    
     def _is_test_environment(self) -> bool:
         """Check if running in a test environment"""
         import os
@@ -131,11 +154,11 @@ class CraftCLI:
     
     def _find_domain_by_name(self, domain_name: str) -> Optional[Path]:
         """Find the active domain directory by name (respects precedence)"""
-        for domain_path in self._get_domain_paths():
-            domain_dir = domain_path / domain_name
-            if domain_dir.is_dir():
-                return domain_dir
-        return None
+        with tracer.span("craft.discovery", **{"craft.domain": domain_name}) as span:
+            domain_dir = self.registry.find_domain(domain_name)
+            span.set_attribute("craft.domain.found", domain_dir is not None)
+        DOMAIN_LOOKUPS.inc(result="found" if domain_dir else "missing")
+        return domain_dir
     
     def _get_builtin_domain_names(self) -> List[str]:
         """Get list of built-in domain names"""
@@ -159,6 +182,9 @@ class CraftCLI:
                     "[bold]Usage:[/bold]\n"
                     "  craft <domain> <tool> [args]     Run a tool\n"
                     "  craft <domain>                   List domain tools\n"
+                    "  craft --validate                 Check all tool templates\n"
+                    "  craft --sync [source]            Sync remote domain sources\n"
+                    "  craft --stats [domain [tool]]    Show execution latency stats\n"
                     "  craft --help                     Show this help\n"
                     "  craft --help --noob              Show pretty human interface\n\n"
                     "[bold]Examples:[/bold]\n"
@@ -175,8 +201,17 @@ class CraftCLI:
             print("CRAFT CLI FRAMEWORK")
             print("Usage: craft <domain> <tool> [args]")
             print("       craft <domain>  (list domain tools)")
+            print("       craft --validate  (check all tool templates)")
+            print("       craft --sync [source] [--offline]  (sync remote domain sources)")
+            print("       craft --stats [domain [tool]]  (execution latency stats)")
             print("       craft --help [--noob]  (show help)")
             print("")
+            print("Context options (before the domain):")
+            print("  --fields=execution.command,result  (only emit these context fields)")
+            print("  --no-help  (omit tool help from the context)")
+            print("  --help-digest  (emit tool_config.help_digest instead of the help text)")
+            print("  craft <domain> <tool> --help --digest=<hash>  (HELP_UNCHANGED if current)")
+            print("")
             print("Examples:")
             print("  craft linting ruff check --fix")
             print("  craft coding test --coverage")
@@ -193,45 +228,38 @@ class CraftCLI:
     
     def list_domains(self, human_mode: bool = False) -> None:
         """List available domains"""
+        start = time.monotonic()
         domain_paths = self._get_domain_paths()
         if not domain_paths:
             print("ERROR: No domain paths configured")
             return
         
-        # Collect unique domains (respects precedence)
-        seen_domains = set()
-        domains_data = []
-        
-        for domain_path in domain_paths:
-            if not domain_path.exists():
-                continue
+        def domains_data() -> Iterator[Tuple[str, str, str, int]]:
+            # Registry respects precedence; tools are counted as rows are rendered
+            for domain_id, domain_dir in self.registry.domains().items():
+                # Domain name is just the directory name
+                name = domain_id.title()
+                desc = f"Tools for {domain_id}"
                 
-            for domain_dir in domain_path.iterdir():
-                if domain_dir.is_dir() and domain_dir.name not in seen_domains:
-                    seen_domains.add(domain_dir.name)
-                    
-                    # Domain name is just the directory name
-                    name = domain_dir.name.title()
-                    desc = f"Tools for {domain_dir.name}"
-                    
-                    # Count YAML files directly in domain directory
-                    tool_count = len(list(domain_dir.glob("*.yaml")))
-                    domains_data.append((domain_dir.name, name, desc, tool_count))
+                # Count YAML files directly in domain directory
+                tool_count = len(list(domain_dir.glob("*.yaml")))
+                yield domain_id, name, desc, tool_count
         
         if human_mode:
-            table = Table(title="Available Domains")
-            table.add_column("Domain", style="cyan")
-            table.add_column("Description", style="dim")
-            table.add_column("Tools", justify="right", style="green")
-            
-            for domain_id, name, desc, tool_count in domains_data:
-                table.add_row(domain_id, desc, str(tool_count))
-            
-            console.print(table)
+            table = StreamingTable("Available Domains", [
+                ("Domain", {"style": "cyan"}),
+                ("Description", {"style": "dim"}),
+                ("Tools", {"justify": "right", "style": "green"})
+            ], view="domains")
+            table.render(
+                ((domain_id, desc, str(tool_count))
+                 for domain_id, name, desc, tool_count in domains_data()),
+                start=start
+            )
         else:
             # AI-optimized output
             print("AVAILABLE DOMAINS:")
-            for domain_id, name, desc, tool_count in domains_data:
+            for domain_id, name, desc, tool_count in domains_data():
                 print(f"  {domain_id}: {tool_count} tools - {desc}")
             print("")
             print("Use: craft <domain> to list domain tools")
@@ -239,6 +267,7 @@ class CraftCLI:
     
     def list_domain_tools(self, domain: str, human_mode: bool = False) -> bool:
         """List tools in a specific domain. Returns True on success, False on error."""
+        start = time.monotonic()
         domain_dir = self._find_domain_by_name(domain)
         
         if not domain_dir:
@@ -248,38 +277,28 @@ class CraftCLI:
         # Domain name is just the directory name
         domain_name = domain.title()
         
-        tools_data = []
-        for tool_file in domain_dir.glob("*.yaml"):
-            tool_config = yaml.safe_load(tool_file.read_text())
-            name = tool_config.get("name", tool_file.stem)
-            desc = tool_config.get("description", "No description")
-            
-            # Extract first usage example from help
-            help_text = tool_config.get("help", "")
-            usage = "No usage info"
-            if "craft" in help_text:
-                lines = help_text.split("\n")
-                for line in lines:
-                    if "craft" in line and "Examples:" not in line and "Usage:" not in line:
-                        usage = line.strip()
-                        break
-            
-            tools_data.append((tool_file.stem, name, desc, usage))
+        def tools_data() -> Iterator[Tuple[str, str, str, str]]:
+            # Tools are parsed lazily so rows can be shown as soon as they are ready
+            for spec in self.registry.iter_tools(domain):
+                tool_config = spec.config
+                name = tool_config.get("name", spec.tool)
+                desc = tool_config.get("description", "No description")
+                yield spec.tool, name, desc, self._usage_line(tool_config.get("help", ""))
         
         if human_mode:
-            table = Table(title=f"{domain_name} Tools")
-            table.add_column("Tool", style="cyan")
-            table.add_column("Description", style="dim")
-            table.add_column("Usage", style="yellow")
-            
-            for tool_id, name, desc, usage in tools_data:
-                table.add_row(tool_id, desc, usage)
-            
-            console.print(table)
+            table = StreamingTable(f"{domain_name} Tools", [
+                ("Tool", {"style": "cyan"}),
+                ("Description", {"style": "dim"}),
+                ("Usage", {"style": "yellow"})
+            ], view="tools")
+            table.render(
+                ((tool_id, desc, usage) for tool_id, name, desc, usage in tools_data()),
+                start=start
+            )
         else:
             # AI-optimized output
             print(f"{domain_name.upper()} TOOLS:")
-            for tool_id, name, desc, usage in tools_data:
+            for tool_id, name, desc, usage in tools_data():
                 print(f"  {name.upper()}: {desc}")
                 if usage != "No usage info":
                     print(f"    Usage: {usage}")
@@ -289,25 +308,43 @@ class CraftCLI:
         
         return True
     
-    def show_tool_help(self, domain: str, tool: str, human_mode: bool = False) -> bool:
-        """Show help for a specific tool. Returns True on success, False on error."""
+    @staticmethod
+    def _usage_line(help_text: str) -> str:
+        """First usage example from a tool's help text"""
+        if "craft" in help_text:
+            for line in help_text.split("\n"):
+                if "craft" in line and "Examples:" not in line and "Usage:" not in line:
+                    return line.strip()
+        return "No usage info"
+    
+    def show_tool_help(self, domain: str, tool: str, human_mode: bool = False,
+                       known_digest: Optional[str] = None) -> bool:
+        """Show help for a specific tool. Returns True on success, False on error.
+        
+        If known_digest matches the current help text, only HELP_UNCHANGED is printed.
+        """
         domain_dir = self._find_domain_by_name(domain)
         
         if not domain_dir:
             print(f"ERROR: Domain '{domain}' not found")
             return False
             
-        tool_file = domain_dir / f"{tool}.yaml"
+        spec = self.registry.get_tool(domain, tool)
         
-        if not tool_file.exists():
+        if spec is None:
             print(f"ERROR: Tool '{tool}' not found in domain '{domain}'")
             return False
         
-        config = yaml.safe_load(tool_file.read_text())
+        config = spec.config
         name = config.get("name", tool)
         desc = config.get("description", "No description")
         help_text = config.get("help", "No help available")
         next_step = config.get("next_step", "")
+        digest = help_digest(config.get("help", ""))
+        
+        if known_digest is not None and known_digest == digest and not human_mode:
+            print(f"HELP_UNCHANGED: {digest}")
+            return True
         
         if human_mode:
             content = f"[bold]{name}[/bold]\n{desc}\n\n{help_text}"
@@ -330,54 +367,312 @@ class CraftCLI:
                 print("")
                 print(f"Next Step: {next_step}")
             print("")
+            print(f"HELP_DIGEST: {digest}")
             print("Add --noob flag for Rich UI panel")
         
         return True
     
-    def run_tool(self, domain: str, tool: str, args: List[str], human_mode: bool = False) -> int:
-        """Execute a domain tool"""
+    def sync_sources(self, name: Optional[str] = None, offline: bool = False,
+                     human_mode: bool = False) -> bool:
+        """Sync remote domain sources into the local store. Returns True if all succeeded."""
+        sources = self.config_manager.get_domain_sources()
+        if name is not None:
+            sources = [source for source in sources if source.name == name]
+            if not sources:
+                print(f"ERROR: Domain source '{name}' not configured")
+                return False
+        if not sources:
+            print("ERROR: No domain_sources configured in .craftrc")
+            return False
+        
+        store = self.config_manager.get_source_store()
+        rows = []
+        failed = 0
+        for source in sources:
+            try:
+                result = store.sync(source, offline=offline)
+            except (SourceError, OSError) as e:
+                failed += 1
+                rows.append((source.name, "failed", "", str(e)))
+                continue
+            status = "cached" if result.cached else "fetched"
+            rows.append((source.name, status, result.tree[:12],
+                         "changed" if result.changed else "unchanged"))
+        self.registry.invalidate()
+        
+        if human_mode:
+            table = Table(title="Domain Sources" + (" (offline)" if offline else ""))
+            table.add_column("Source", style="cyan")
+            table.add_column("Status", style="green")
+            table.add_column("Tree", style="dim")
+            table.add_column("Result")
+            for row in rows:
+                table.add_row(*row)
+            console.print(table)
+        else:
+            for source_name, status, tree, detail in rows:
+                if status == "failed":
+                    print(f"SYNC FAILED: {source_name}: {detail}")
+                else:
+                    print(f"SYNCED: {source_name} tree={tree} {status} {detail}")
+        
+        return failed == 0
+    
+    def validate_tools(self, human_mode: bool = False) -> bool:
+        """Compile every tool template across all domains. Returns True if all are valid."""
+        checked, broken = self.registry.validate()
+        
+        if human_mode:
+            if broken:
+                table = Table(title="Broken Tools")
+                table.add_column("Tool", style="cyan")
+                table.add_column("Problem", style="red")
+                
+                for spec in broken:
+                    table.add_row(f"{spec.domain}/{spec.tool}", spec.error)
+                
+                console.print(table)
+            console.print(
+                f"[bold]{checked}[/bold] tools checked, "
+                f"[{'red' if broken else 'green'}]{len(broken)} broken[/]"
+            )
+        else:
+            # AI-optimized output
+            print(f"VALIDATION: {checked} tools checked, {len(broken)} broken")
+            for spec in broken:
+                print(f"  {spec.domain}/{spec.tool}: {spec.error}")
+                print(f"    File: {spec.path}")
+        
+        return not broken
+    
+    def show_stats(self, domain: Optional[str] = None, tool: Optional[str] = None,
+                   human_mode: bool = False) -> bool:
+        """Show latency and failure statistics from the execution history"""
+        history = self._history_store()
+        if history is None:
+            print("ERROR: Execution history is disabled (history.enabled in .craftrc)")
+            return False
+        
+        stats = compute_stats(history.records(domain, tool))
+        scope = "/".join(part for part in (domain, tool) if part) or "all tools"
+        
+        if not stats:
+            print(f"No execution history for {scope}")
+            print("Tools are recorded when run with --exec (or execute_tools: true)")
+            return True
+        
+        if human_mode:
+            table = Table(title=f"Execution Stats ({scope})")
+            table.add_column("Tool", style="cyan")
+            table.add_column("Calls", justify="right")
+            table.add_column("Failed", justify="right", style="red")
+            table.add_column("p50", justify="right", style="green")
+            table.add_column("p95", justify="right", style="yellow")
+            table.add_column("p99", justify="right", style="yellow")
+            table.add_column("Total", justify="right", style="bold")
+            
+            for s in stats:
+                table.add_row(
+                    f"{s.domain}/{s.tool}", str(s.calls), f"{s.failure_rate:.1%}",
+                    f"{s.p50:.3f}s", f"{s.p95:.3f}s", f"{s.p99:.3f}s", f"{s.total:.1f}s"
+                )
+            
+            console.print(table)
+        else:
+            # AI-optimized output
+            print(f"EXECUTION STATS ({scope}):")
+            for s in stats:
+                print(
+                    f"  {s.domain}/{s.tool}: {s.calls} calls, {s.failure_rate:.1%} failed, "
+                    f"p50={s.p50:.3f}s p95={s.p95:.3f}s p99={s.p99:.3f}s total={s.total:.1f}s"
+                )
+            print("")
+            print("Sorted by total wall time")
+        
+        return True
+    
+    def run_tool(self, domain: str, tool: str, args: List[str], human_mode: bool = False,
+                 execute: Optional[bool] = None, view: Optional[ContextView] = None) -> int:
+        """Resolve a domain tool and, if execution is enabled, run it"""
+        status = self._run_tool(domain, tool, args, human_mode, execute, view)
+        REQUESTS.inc(domain=domain, tool=tool, status="ok" if status == 0 else "error")
+        return status
+    
+    def _run_tool(self, domain: str, tool: str, args: List[str], human_mode: bool,
+                  execute: Optional[bool], view: Optional[ContextView]) -> int:
         domain_dir = self._find_domain_by_name(domain)
         
         if not domain_dir:
             print(f"ERROR: Domain '{domain}' not found")
             return 1
-            
-        tool_file = domain_dir / f"{tool}.yaml"
         
-        if not tool_file.exists():
-            print(f"ERROR: Tool '{tool}' not found in domain '{domain}'")
-            return 1
+        with tracer.span("craft.resolve", **{"craft.domain": domain, "craft.tool": tool}) as span:
+            spec = self.registry.get_tool(domain, tool)
+            
+            if spec is None:
+                print(f"ERROR: Tool '{tool}' not found in domain '{domain}'")
+                span.set_error("tool not found")
+                return 1
+            
+            if spec.error:
+                print(f"ERROR: Invalid tool '{domain}/{tool}': {spec.error}")
+                span.set_error(spec.error)
+                return 1
+            
+            # Load tool configuration
+            tool_config = spec.config
+            
+            # Build command from the precompiled template
+            if spec.template is None and spec.entrypoint is None:
+                print(f"ERROR: No command defined for tool '{tool}'")
+                span.set_error("no command defined")
+                return 1
+            
+            # Parse declared parameters before anything is executed
+            try:
+                parameters = parse_arguments(spec.parameters, args)
+            except ParameterError as e:
+                print(f"ERROR: Invalid arguments for '{domain}/{tool}': {e}")
+                span.set_error(str(e))
+                return 1
+            
+            # Substitute variables
+            base_path = str(Path.cwd())  # Always use current working directory
+            args_str = " ".join(args)
+            
+            variables = template_values(parameters)
+            variables.update({
+                "base_path": base_path,
+                "args": args_str,
+                "domain": domain,
+                "tool": tool,
+                "tool_config": tool_config
+            })
+            if spec.entrypoint is not None:
+                # The entrypoint is what runs, even if a command is also declared
+                command = f"{spec.entrypoint} {args_str}".rstrip()
+            else:
+                command = spec.template.resolve(variables)
         
-        # Load tool configuration
-        tool_config = yaml.safe_load(tool_file.read_text())
+        if execute is None:
+            execute = self.config_manager.get_config().execute_tools
+        result = None
+        if execute:
+            try:
+                limits = self._concurrency_limits(spec)
+                wait_timeout = self._wait_timeout()
+            except ValueError as e:
+                print(f"ERROR: Invalid concurrency settings: {e}")
+                return 1
+            result = self._execute(spec, args, command, base_path, limits, wait_timeout)
+
+        # Display execution context
+        status = self._display_execution_context(
+            domain, tool, args, tool_config, command, base_path, human_mode,
+            parameters, result, view
+        )
+        return result.cli_exit_code if result else status
+    
+    def _execute(self, spec: ToolSpec, args: List[str], command: str, base_path: str,
+                 limits: List[Tuple[str, int]],
+                 wait_timeout: Optional[float]) -> ExecutionResult:
+        """Run a resolved tool command under its concurrency limits and resource policy"""
+        lock_dir = self.config_manager.get_state_dir() / "locks"
         
-        # Build command
-        command_template = tool_config.get("command", "")
-        if not command_template:
-            print(f"ERROR: No command defined for tool '{tool}'")
-            return 1
+        try:
+            slots, waited = acquire_slots(lock_dir, limits, wait_timeout)
+        except AdmissionTimeout as e:
+            return ExecutionResult(exit_code=75, stderr=str(e), limit_exceeded="admission")
         
-        # Substitute variables
-        base_path = str(Path.cwd())  # Always use current working directory
-        args_str = " ".join(args)
+        QUEUE_WAIT.observe(waited, domain=spec.domain, tool=spec.tool)
+        RUNS_IN_PROGRESS.inc()
+        try:
+            with tracer.span("craft.execute", **{
+                "craft.domain": spec.domain,
+                "craft.tool": spec.tool,
+                "craft.queue_wait": waited
+            }) as span:
+                env = {"TRACEPARENT": span.traceparent} if span.traceparent else None
+                if spec.entrypoint:
+                    span.set_attribute("craft.entrypoint", spec.entrypoint)
+                    result = run_entrypoint(
+                        spec.entrypoint, args, spec.resources, cwd=base_path, env=env,
+                        isolate=spec.isolate, search_path=spec.path.parent
+                    )
+                elif spec.prefork:
+                    result = run_prefork(
+                        command, spec.resources, spec.prefork.preload, cwd=base_path, env=env,
+                        state_dir=self.config_manager.get_state_dir(),
+                        idle_timeout=spec.prefork.idle_timeout
+                    )
+                else:
+                    result = run_command(command, spec.resources, cwd=base_path, env=env)
+                span.set_attribute("craft.exit_code", result.exit_code)
+                span.set_attribute("craft.cpu_seconds", result.cpu_user + result.cpu_system)
+                span.set_attribute("craft.max_rss_kb", result.max_rss_kb)
+                if result.exit_code != 0:
+                    span.set_error(result.limit_exceeded or f"exit code {result.exit_code}")
+        finally:
+            RUNS_IN_PROGRESS.dec()
+            release_slots(slots)
+        result.queue_wait = waited
+        EXECUTION_DURATION.observe(result.duration, domain=spec.domain, tool=spec.tool)
         
-        command = command_template.format(
-            base_path=base_path,
-            args=args_str,
-            domain=domain,
-            tool=tool,
-            tool_config=tool_config
-        )
-
-        # Display execution context
-        return self._display_execution_context(
-            domain, tool, args, tool_config, command, base_path, human_mode
+        history = self._history_store()
+        if history is not None:
+            record_execution(
+                history, spec.domain, spec.tool, args,
+                result.duration, result.exit_code, result.output_bytes
+            )
+        return result
+    
+    def _history_store(self) -> Optional[HistoryStore]:
+        """The execution history store, or None if disabled in .craftrc"""
+        settings = self.config_manager.get_config().history
+        if not settings.get("enabled", True):
+            return None
+        return HistoryStore(
+            self.config_manager.get_state_dir() / "history.tsv",
+            max_bytes=int(settings.get("max_bytes", 5 * 1024 * 1024)),
+            backups=int(settings.get("backups", 2))
         )
     
+    def _concurrency_limits(self, spec: ToolSpec) -> List[Tuple[str, int]]:
+        """Host-wide (key, limit) pairs for a tool, category first to keep lock order stable"""
+        concurrency = self.config_manager.get_config().concurrency
+        limits = []
+        
+        category = spec.config.get("category")
+        category_limit = _section(concurrency, "categories").get(category)
+        if category and category_limit:
+            limits.append((f"category-{category}",
+                           _limit(category_limit, f"categories.{category}")))
+        
+        name = f"{spec.domain}/{spec.tool}"
+        tool_limit = _section(concurrency, "tools").get(name, spec.concurrency)
+        if tool_limit:
+            limits.append((f"tool-{spec.domain}-{spec.tool}", _limit(tool_limit, f"tools.{name}")))
+        
+        return limits
+    
+    def _wait_timeout(self) -> Optional[float]:
+        """Seconds to wait for a concurrency slot, None to wait forever"""
+        wait_timeout = self.config_manager.get_config().concurrency.get("wait_timeout")
+        if wait_timeout is None:
+            return None
+        try:
+            return parse_duration(str(wait_timeout))
+        except ParameterError as e:
+            raise ValueError(f"wait_timeout: {e}")
+    
     def _display_execution_context(self, domain: str, tool: str, args: List[str], 
                                  tool_config: dict, command: str, base_path: str, 
-                                 human_mode: bool = False) -> int:
+                                 human_mode: bool = False,
+                                 parameters: Optional[Dict[str, Any]] = None,
+                                 result: Optional[ExecutionResult] = None,
+                                 view: Optional[ContextView] = None) -> int:
         """Display execution context in appropriate format"""
+        view = view or ContextView()
         
         # Prepare context data
         context = {
@@ -397,23 +692,28 @@ class CraftCLI:
                 "next_step": tool_config.get("next_step", "")
             },
             "resolved_command": command,
+            "parameters": parameters or {},
             "variables": {
                 "base_path": base_path,
                 "args": " ".join(args),
                 "domain": domain,
-                "tool": tool
+                "tool": tool,
+                **template_values(parameters or {})
             }
         }
+        if tool_config.get("entrypoint"):
+            context["tool_config"]["entrypoint"] = tool_config["entrypoint"]
+        if result is not None:
+            context["result"] = result.to_dict()
         
         if human_mode:
-            # Rich table display for humans
-            from rich.table import Table
-            from rich.panel import Panel
-            from rich.console import Console
-            from rich.text import Text
-            from rich.syntax import Syntax
-            
-            console = Console()
+            # Rich panels on the shared console
+            params_line = ""
+            if parameters:
+                rendered = template_values(parameters)
+                params_line = "[bold]Parameters:[/bold] " + ", ".join(
+                    f"{k}={v}" for k, v in rendered.items()
+                ) + "\n"
             
             # Main execution panel
             exec_panel = Panel(
@@ -421,6 +721,7 @@ class CraftCLI:
                     f"[bold]Domain:[/bold] {domain}\n"
                     f"[bold]Tool:[/bold] {tool}\n"
                     f"[bold]Arguments:[/bold] {' '.join(args) if args else 'None'}\n"
+                    f"{params_line}"
                     f"[bold]Base Path:[/bold] {base_path}\n"
                     f"[bold]Resolved Command:[/bold] {command}"
                 ),
@@ -443,19 +744,59 @@ class CraftCLI:
                 )
                 console.print(config_panel)
             
-            # Full help text if available
-            help_text = tool_config.get('help', '')
+            # Help text if available, cropped to one screen on a terminal
+            help_text = tool_config.get('help', '') if view.help == "full" else ''
             if help_text:
+                help_text = fit_to_screen(help_text, f"craft {domain} {tool} --help")
                 help_panel = Panel(
                     Text(help_text),
                     title="📖 Tool Help",
                     border_style="yellow"
                 )
                 console.print(help_panel)
+            
+            # Execution result and resource accounting
+            if result is not None:
+                result_text = f"Exit Code: {result.exit_code}\n"
+                if result.limit_exceeded:
+                    result_text += f"Limit Exceeded: {result.limit_exceeded}\n"
+                if result.queue_wait:
+                    result_text += f"Queue Wait: {result.queue_wait:.3f}s\n"
+                result_text += f"Duration: {result.duration:.3f}s\n"
+                result_text += f"CPU Time: {result.cpu_user + result.cpu_system:.3f}s\n"
+                result_text += f"Peak RSS: {result.max_rss_kb} KB\n"
+                result_text += f"Block I/O: {result.io_read_blocks} in / {result.io_write_blocks} out\n"
+                result_text += f"Output: {result.output_bytes} bytes"
+                if result.output_truncated:
+                    result_text += " (truncated)"
+                
+                result_panel = Panel(
+                    Text(result_text),
+                    title="📊 Result",
+                    border_style="green" if result.exit_code == 0 else "red"
+                )
+                console.print(result_panel)
+                if result.stdout:
+                    console.print(Text(result.stdout))
+                if result.stderr:
+                    console.print(Text(result.stderr, style="red"))
         else:
             # JSON format for AI agents
             import json
             print("EXECUTION_CONTEXT:")
-            print(json.dumps(context, indent=2, default=str))
+            print(json.dumps(view.apply(context), indent=2, default=str))
         
         return 0  # Success - context displayed
+
+
+def _section(concurrency: Dict[str, Any], key: str) -> Dict[str, Any]:
+    section = concurrency.get(key) or {}
+    if not isinstance(section, dict):
+        raise ValueError(f"{key} must be a mapping, got {section!r}")
+    return section
+
+
+def _limit(value: Any, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{name} must be a positive integer, got {value!r}")
+    return value
@@ -0,0 +1,7 @@
+"""
+Built-in tool engines for Craft CLI
+
+Each engine module backs one built-in domain tool and exposes
+`main(argv) -> int`, so it can run in-process through the tool's
+`entrypoint` or standalone as `python -m craft_cli.engines.<name>`.
+"""
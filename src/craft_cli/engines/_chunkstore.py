@@ -0,0 +1,222 @@
+"""
+Content-defined chunking and the chunk repository for `craft devops backup`
+
+Chunk boundaries depend only on the bytes around them, so inserting data
+near the start of a file shifts its later boundaries along with the content
+and the later chunks still deduplicate. Every byte is mapped to one bit
+(`bytes.translate`) and a chunk ends after the next occurrence of a fixed
+16-bit anchor pattern (`bytes.find`), within MIN/MAX chunk sizes. Both scans
+run in C, so chunking costs about as much as reading the data.
+
+A repository is a directory:
+
+    config.json             version, chunker settings, encryption parameters
+    chunks/ab/ab12...       one zlib-compressed chunk per content hash
+    snapshots/<id>.ndjson   one manifest line per file, directory or symlink
+
+With encryption (needs the optional `cryptography` package) chunks and
+manifest lines are sealed with AES-GCM and chunk names are keyed hashes, so
+the repository reveals neither contents nor file names.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None  # type: ignore
+
+REPO_VERSION = 1
+MIN_CHUNK = 16 << 10
+MAX_CHUNK = 512 << 10
+ANCHOR = b"1011001110001011"  # ~64 KB between anchors in random data
+PASSPHRASE_ENV = "CRAFT_BACKUP_PASSPHRASE"
+_BITS = bytes(48 + (hashlib.blake2b(bytes([i]), digest_size=1).digest()[0] & 1)
+              for i in range(256))
+_RAW, _ZLIB = b"r", b"z"
+_KEY_CHECK = b"craft-backup key check"
+
+
+class BackupError(Exception):
+    """Raised for unusable repositories, keys and snapshots"""
+
+
+def chunk_ends(data: bytes, min_size: int = MIN_CHUNK, max_size: int = MAX_CHUNK,
+               anchor: bytes = ANCHOR) -> Iterator[int]:
+    """End offsets of the content-defined chunks of `data`"""
+    bits = data.translate(_BITS)
+    pos, size = 0, len(data)
+    while pos < size:
+        if size - pos <= min_size:
+            yield size
+            return
+        limit = min(size, pos + max_size)
+        hit = bits.find(anchor, pos + min_size - len(anchor), limit - len(anchor))
+        pos = hit + len(anchor) if hit >= 0 else limit
+        yield pos
+
+
+class Repository:
+    """Content-addressed chunk store plus snapshot manifests"""
+
+    def __init__(self, root: str, key: Optional[bytes] = None) -> None:
+        self.root = root
+        self.key = key
+        self._aead = AESGCM(key[:32]) if key is not None else None
+
+    @classmethod
+    def open(cls, root: str, create: bool = False, encrypt: bool = False,
+             passphrase: Optional[str] = None) -> 'Repository':
+        """Open (or create) a repository, deriving the key of an encrypted one"""
+        config_path = os.path.join(root, "config.json")
+        if not os.path.exists(config_path):
+            if not create:
+                raise BackupError(f"no backup repository at '{root}'")
+            config: Dict[str, Any] = {"version": REPO_VERSION, "chunker": {
+                "min": MIN_CHUNK, "max": MAX_CHUNK, "anchor": ANCHOR.decode()
+            }}
+            key = None
+            if encrypt:
+                salt = os.urandom(16)
+                key = _derive_key(_passphrase(passphrase), salt)
+                config["encryption"] = {
+                    "cipher": "aes-256-gcm", "kdf": "scrypt", "salt": salt.hex(),
+                    "check": hmac.new(key, _KEY_CHECK, "sha256").hexdigest()
+                }
+            os.makedirs(os.path.join(root, "chunks"), exist_ok=True)
+            os.makedirs(os.path.join(root, "snapshots"), exist_ok=True)
+            _write_atomic(config_path, json.dumps(config, indent=2).encode())
+            return cls(root, key)
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        if config.get("version") != REPO_VERSION:
+            raise BackupError(f"unsupported repository version {config.get('version')!r}")
+        encryption = config.get("encryption")
+        if encryption is None:
+            if encrypt:
+                raise BackupError(f"repository '{root}' was created without encryption")
+            return cls(root)
+        key = _derive_key(_passphrase(passphrase), bytes.fromhex(encryption["salt"]))
+        check = hmac.new(key, _KEY_CHECK, "sha256").hexdigest()
+        if not hmac.compare_digest(check, encryption["check"]):
+            raise BackupError("wrong passphrase for this repository")
+        return cls(root, key)
+
+    @property
+    def encrypted(self) -> bool:
+        return self.key is not None
+
+    def digest(self, data: bytes) -> str:
+        """Chunk name: its BLAKE2b hash, keyed in an encrypted repository"""
+        if self.key is None:
+            return hashlib.blake2b(data, digest_size=32).hexdigest()
+        return hashlib.blake2b(data, digest_size=32, key=self.key[32:64]).hexdigest()
+
+    def chunk_path(self, digest: str) -> str:
+        return os.path.join(self.root, "chunks", digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.chunk_path(digest))
+
+    def put(self, digest: str, data: bytes, level: int = 3) -> int:
+        """Store a chunk unless present; returns the bytes written (0 if deduplicated)"""
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return 0
+        packed = zlib.compress(data, level) if level > 0 else data
+        blob = _ZLIB + packed if len(packed) < len(data) else _RAW + data
+        blob = self._seal(blob, digest.encode())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, blob)
+        return len(blob)
+
+    def get(self, digest: str) -> bytes:
+        """Read, decompress and verify one chunk"""
+        try:
+            with open(self.chunk_path(digest), "rb") as f:
+                blob = self._open_sealed(f.read(), digest.encode())
+        except FileNotFoundError:
+            raise BackupError(f"chunk {digest[:16]}... is missing from the repository")
+        data = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+        if self.digest(data) != digest:
+            raise BackupError(f"chunk {digest[:16]}... is corrupt")
+        return data
+
+    def snapshot_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.root, "snapshots", f"{snapshot_id}.ndjson")
+
+    def snapshots(self) -> List[str]:
+        """Snapshot ids, oldest first (ids start with their UTC creation time)"""
+        names = os.listdir(os.path.join(self.root, "snapshots"))
+        return sorted(name[:-len(".ndjson")] for name in names if name.endswith(".ndjson"))
+
+    def write_manifest(self, snapshot_id: str, records: Iterator[Dict[str, Any]]) -> None:
+        """Write a manifest line by line; it appears under its name only when complete"""
+        path = self.snapshot_path(snapshot_id)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            for record in records:
+                f.write(self._seal_line(json.dumps(record, separators=(",", ":")).encode()))
+        os.replace(tmp, path)
+
+    def read_manifest(self, snapshot_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream the records of a manifest without loading it whole"""
+        try:
+            f = open(self.snapshot_path(snapshot_id), "rb")
+        except FileNotFoundError:
+            raise BackupError(f"no snapshot '{snapshot_id}'")
+        with f:
+            for line in f:
+                yield json.loads(self._open_line(line))
+
+    def _seal(self, blob: bytes, context: bytes) -> bytes:
+        if self._aead is None:
+            return blob
+        nonce = os.urandom(12)
+        return nonce + self._aead.encrypt(nonce, blob, context)
+
+    def _open_sealed(self, blob: bytes, context: bytes) -> bytes:
+        if self._aead is None:
+            return blob
+        try:
+            return self._aead.decrypt(blob[:12], blob[12:], context)
+        except Exception:
+            raise BackupError("a chunk failed authentication (tampered or wrong key)")
+
+    def _seal_line(self, line: bytes) -> bytes:
+        if self._aead is None:
+            return line + b"\n"
+        return base64.b64encode(self._seal(line, b"manifest")) + b"\n"
+
+    def _open_line(self, line: bytes) -> bytes:
+        if self._aead is None:
+            return line
+        return self._open_sealed(base64.b64decode(line), b"manifest")
+
+
+def _passphrase(passphrase: Optional[str]) -> str:
+    if AESGCM is None:
+        raise BackupError("encryption needs the cryptography package "
+                          "(pip install 'craft-cli[backup]')")
+    passphrase = passphrase if passphrase is not None else os.environ.get(PASSPHRASE_ENV)
+    if not passphrase:
+        raise BackupError(f"set {PASSPHRASE_ENV} to the repository passphrase")
+    return passphrase
+
+
+def _derive_key(passphrase: str, salt: bytes) -> bytes:
+    """64 bytes: 32 for AES-GCM and 32 for keyed chunk names"""
+    return hashlib.scrypt(passphrase.encode(), salt=salt, n=1 << 15, r=8, p=1,
+                          maxmem=64 << 20, dklen=64)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
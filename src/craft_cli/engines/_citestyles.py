@@ -0,0 +1,312 @@
+"""
+Citation styles for the citation engine
+
+Each style renders a compact reference (see `_references`) to runs of text:
+a list whose even items are plain and odd items italic, e.g.
+["Knuth, D. E. (1984). Literate programming. ", "The Computer Journal", ", ",
+"27", "(2), 97–111."]. Runs are what the cache keeps; the exporters turn
+them into plain text, LaTeX or Word markup. IEEE's "[n]" label depends on
+the entry's position, so it is added when the bibliography is written.
+
+The styles follow the reference-list rules of APA 7, MLA 9, Chicago 17
+(author-date) and IEEE for the common source types.
+"""
+import re
+from typing import Any, Callable, Dict, List
+
+Reference = Dict[str, Any]
+Runs = List[str]
+
+
+class Line:
+    """Builds alternating plain/italic runs"""
+
+    def __init__(self) -> None:
+        self.runs: Runs = [""]
+
+    def text(self, value: str) -> 'Line':
+        if value:
+            if len(self.runs) % 2 == 0:
+                self.runs.append("")
+            self.runs[-1] += value
+        return self
+
+    def italic(self, value: str) -> 'Line':
+        if value:
+            if len(self.runs) % 2 == 1:
+                self.runs.append("")
+            self.runs[-1] += value
+        return self
+
+
+def _period(text: str) -> str:
+    """`text` ending in a full stop, unless it already ends in punctuation"""
+    return text if not text or text[-1] in ".?!" else text + "."
+
+
+def _ordinal(edition: str) -> str:
+    if not edition.isdigit():
+        return edition
+    number = int(edition)
+    suffix = "th" if 10 <= number % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(
+        number % 10, "th")
+    return f"{number}{suffix}"
+
+
+def _initials(given: str) -> str:
+    """"John Ronald" -> "J. R.", "Jean-Paul" -> "J.-P." """
+    words = []
+    for word in given.replace(".", ". ").split():
+        words.append("-".join(part[:1] + "." for part in word.split("-") if part))
+    return " ".join(words)
+
+
+def _join(names: List[str], conjunction: str, serial: bool = True) -> str:
+    if len(names) <= 1:
+        return "".join(names)
+    if len(names) == 2:
+        return f"{names[0]}{',' if serial and conjunction == '&' else ''} {conjunction} {names[1]}"
+    return ", ".join(names[:-1]) + f"{',' if serial else ''} {conjunction} {names[-1]}"
+
+
+def _doi_link(ref: Reference) -> str:
+    if ref.get("doi"):
+        return f"https://doi.org/{ref['doi']}"
+    return ref.get("url", "")
+
+
+# APA 7 ------------------------------------------------------------------
+
+def _apa_name(name: List[str]) -> str:
+    family, given = name
+    return f"{family}, {_initials(given)}" if given else family
+
+
+def _apa_names(names: List[List[str]]) -> str:
+    if len(names) > 20:
+        return ", ".join(map(_apa_name, names[:19])) + ", . . . " + _apa_name(names[-1])
+    return _join([_apa_name(n) for n in names], "&")
+
+
+def apa(ref: Reference) -> Runs:
+    line = Line()
+    kind, title = ref.get("type"), ref.get("title", "")
+    italic_title = kind not in ("article", "chapter", "paper")
+    authors = ref.get("authors")
+    if authors:
+        line.text(_period(_apa_names(authors)) + " ")
+    elif ref.get("editors") and kind == "book":
+        editors = ref["editors"]
+        line.text(f"{_apa_names(editors)} ({'Eds.' if len(editors) > 1 else 'Ed.'}). ")
+    elif title:
+        (line.italic if italic_title else line.text)(_period(title))
+        line.text(" ")
+        title = ""
+    line.text(f"({ref.get('year', 'n.d.')}). ")
+    if title:
+        if italic_title:
+            line.italic(title)
+            if ref.get("edition"):
+                line.text(f" ({_ordinal(ref['edition'])} ed.)")
+            if kind == "thesis":
+                line.text(f" [Doctoral dissertation, {ref.get('publisher', '')}]".replace(
+                    ", ]", "]"))
+            line.text(". " if title[-1] not in ".?!" else " ")
+        else:
+            line.text(_period(title) + " ")
+    container = ref.get("container")
+    if kind == "article" and container:
+        line.italic(container)
+        if ref.get("volume"):
+            line.text(", ").italic(ref["volume"])
+        if ref.get("issue"):
+            line.text(f"({ref['issue']})")
+        if ref.get("pages"):
+            line.text(f", {ref['pages']}")
+        line.text(". ")
+    elif kind in ("chapter", "paper") and container:
+        line.text("In ")
+        editors = ref.get("editors")
+        if editors:
+            names = _join([f"{_initials(g)} {f}".strip() for f, g in editors], "&", serial=False)
+            line.text(f"{names} ({'Eds.' if len(editors) > 1 else 'Ed.'}), ")
+        line.italic(container)
+        line.text(f" (pp. {ref['pages']}). " if ref.get("pages") else ". ")
+    elif kind == "website" and container:
+        line.text(_period(container) + " ")
+    if ref.get("publisher") and kind not in ("article", "thesis"):
+        line.text(_period(ref["publisher"]) + " ")
+    line.text(_doi_link(ref))
+    line.runs[-1] = line.runs[-1].rstrip()
+    return line.runs
+
+
+# MLA 9 ------------------------------------------------------------------
+
+def _mla_names(names: List[List[str]]) -> str:
+    first = ", ".join(part for part in names[0] if part)
+    if len(names) == 1:
+        return first
+    if len(names) == 2:
+        return f"{first}, and {' '.join(p for p in reversed(names[1]) if p)}"
+    return f"{first}, et al"
+
+
+def mla(ref: Reference) -> Runs:
+    line = Line()
+    kind, title = ref.get("type"), ref.get("title", "")
+    if ref.get("authors"):
+        line.text(_period(_mla_names(ref["authors"])) + " ")
+    if kind in ("article", "chapter", "paper", "website"):
+        line.text(f"“{_period(title)}” ")
+    elif title:
+        line.italic(title).text(". " if title[-1] not in ".?!" else " ")
+    details = []  # (text, italic) elements, separated by commas
+    container = ref.get("container")
+    if container and kind != "book":
+        details.append((container, True))
+    if ref.get("editors") and kind in ("chapter", "paper"):
+        editors = _join([f"{g} {f}".strip() for f, g in ref["editors"]], "and")
+        details.append((f"edited by {editors}", False))
+    if ref.get("edition"):
+        details.append((f"{_ordinal(ref['edition'])} ed.", False))
+    if ref.get("volume"):
+        details.append((f"vol. {ref['volume']}", False))
+    if ref.get("issue"):
+        details.append((f"no. {ref['issue']}", False))
+    if ref.get("publisher") and kind != "article":
+        details.append((ref["publisher"], False))
+    if ref.get("year"):
+        details.append((str(ref["year"]), False))
+    if ref.get("pages"):
+        pages = ref["pages"]
+        details.append((f"{'pp.' if '–' in pages or '-' in pages else 'p.'} {pages}", False))
+    for n, (text, italic) in enumerate(details):
+        if n:
+            line.text(", ")
+        (line.italic if italic else line.text)(text)
+    if details:
+        line.text(". ")
+    link = _doi_link(ref)
+    if link:
+        line.text(_period(re.sub(r"^https?://", "", link) if not ref.get("doi") else link))
+    line.runs[-1] = line.runs[-1].rstrip()
+    return line.runs
+
+
+# Chicago 17 (author-date) -----------------------------------------------
+
+def _chicago_names(names: List[List[str]]) -> str:
+    if len(names) > 10:
+        names = names[:7]
+        listed = [", ".join(p for p in names[0] if p)] + [f"{g} {f}".strip() for f, g in names[1:]]
+        return ", ".join(listed) + ", et al"
+    listed = [", ".join(p for p in names[0] if p)] + [f"{g} {f}".strip() for f, g in names[1:]]
+    return f"{listed[0]}, and {listed[1]}" if len(listed) == 2 else _join(listed, "and")
+
+
+def chicago(ref: Reference) -> Runs:
+    line = Line()
+    kind, title = ref.get("type"), ref.get("title", "")
+    quoted = kind in ("article", "chapter", "paper", "website")
+    if ref.get("authors"):
+        line.text(_period(_chicago_names(ref["authors"])) + " ")
+    elif ref.get("editors"):
+        editors = ref["editors"]
+        line.text(f"{_chicago_names(editors)}, {'eds' if len(editors) > 1 else 'ed'}. ")
+    line.text(f"{ref.get('year', 'n.d.')}. ")
+    if quoted:
+        line.text(f"“{_period(title)}” ")
+    elif title:
+        line.italic(title).text(". " if title[-1] not in ".?!" else " ")
+    container = ref.get("container")
+    if kind == "article" and container:
+        line.italic(container)
+        line.text(f" {ref['volume']}" if ref.get("volume") else "")
+        line.text(f" ({ref['issue']})" if ref.get("issue") else "")
+        line.text(f": {ref['pages']}. " if ref.get("pages") else ". ")
+    elif kind in ("chapter", "paper") and container:
+        line.text("In ").italic(container)
+        if ref.get("editors"):
+            editors = _join([f"{g} {f}".strip() for f, g in ref["editors"]], "and")
+            line.text(f", edited by {editors}")
+        line.text(f", {ref['pages']}. " if ref.get("pages") else ". ")
+    elif kind == "website" and container:
+        line.text(_period(container) + " ")
+    if ref.get("edition"):
+        line.text(f"{_ordinal(ref['edition'])} ed. ")
+    if ref.get("publisher") and kind != "article":
+        where = f"{ref['place']}: " if ref.get("place") else ""
+        line.text(_period(where + ref["publisher"]) + " ")
+    link = _doi_link(ref)
+    if link:
+        line.text(_period(link))
+    line.runs[-1] = line.runs[-1].rstrip()
+    return line.runs
+
+
+# IEEE -------------------------------------------------------------------
+
+def _ieee_names(names: List[List[str]]) -> str:
+    listed = [f"{_initials(g)} {f}".strip() for f, g in names]
+    if len(listed) > 6:
+        return f"{listed[0]} et al."
+    return _join(listed, "and")
+
+
+def ieee(ref: Reference) -> Runs:
+    line = Line()
+    kind, title = ref.get("type"), ref.get("title", "")
+    if ref.get("authors"):
+        line.text(_ieee_names(ref["authors"]) + ", ")
+    container = ref.get("container")
+    year = str(ref.get("year", ""))
+    if kind in ("article", "chapter", "paper", "website"):
+        line.text(f"“{title},” ")
+        if kind in ("chapter", "paper") and container:
+            line.text("in ")
+        line.italic(container)
+        parts = []
+        if kind in ("chapter", "paper") and ref.get("editors"):
+            parts.append(f"{_ieee_names(ref['editors'])}, "
+                         f"{'Eds' if len(ref['editors']) > 1 else 'Ed'}.")
+        if kind == "article":
+            parts += [f"vol. {ref['volume']}" if ref.get("volume") else "",
+                      f"no. {ref['issue']}" if ref.get("issue") else ""]
+        elif ref.get("publisher"):
+            parts.append(f"{ref['place']}: {ref['publisher']}" if ref.get("place")
+                         else ref["publisher"])
+        parts += [f"pp. {ref['pages']}" if ref.get("pages") and kind == "article" else "", year,
+                  f"pp. {ref['pages']}" if ref.get("pages") and kind != "article" else ""]
+        rest = ", ".join(part for part in parts if part)
+        line.text((", " if container and rest else "") + rest)
+    else:
+        line.italic(title)
+        parts = [f"{_ordinal(ref['edition'])} ed." if ref.get("edition") else ""]
+        publisher = ref.get("publisher", "")
+        if kind == "thesis":
+            parts.append(f"Ph.D. dissertation, {publisher}" if publisher else "Ph.D. dissertation")
+        elif publisher:
+            parts.append(f"{ref['place']}: {publisher}" if ref.get("place") else publisher)
+        parts.append(year)
+        line.text("".join(", " + part for part in parts if part))
+    line.text(".")
+    if ref.get("doi"):
+        line.text(f" doi: {ref['doi']}.")
+    elif ref.get("url"):
+        line.text(f" [Online]. Available: {ref['url']}")
+    return line.runs
+
+
+STYLES: Dict[str, Callable[[Reference], Runs]] = {
+    "apa": apa, "mla": mla, "chicago": chicago, "ieee": ieee
+}
+HEADINGS = {"apa": "References", "mla": "Works Cited", "chicago": "References",
+            "ieee": "References"}
+
+
+def sort_key(ref: Reference) -> tuple:
+    """Author-title order of the APA, MLA and Chicago reference lists"""
+    authors = ref.get("authors") or ref.get("editors")
+    first = authors[0][0] if authors else ref.get("title", "")
+    return (first.casefold(), ref.get("year") or 0, ref.get("title", "").casefold())
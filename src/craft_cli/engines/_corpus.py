@@ -0,0 +1,195 @@
+"""
+Document corpora for the research engines
+
+A corpus is a directory tree of papers and notes:
+
+- .txt/.md/.rst files are one document each. The title is the first line
+  (without Markdown #), the date comes from a `date:` front-matter line, a
+  YYYY-MM-DD in the file name, or else the file's mtime.
+- .json files (an object or a list of objects) and .jsonl/.ndjson files (one
+  object per line) hold records with any of: id, title, text/abstract/body/
+  content, date/published/year, source, authors.
+
+A document's source is its record's `source`, else the top-level directory
+it sits in (corpus/arxiv/... -> arxiv). Dates are YYYYMMDD integers (0 when
+unknown), so they compare and bucket cheaply.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst")
+RECORD_EXTENSIONS = (".json", ".jsonl", ".ndjson")
+TEXT_FIELDS = ("text", "abstract", "body", "content", "summary")
+DATE_FIELDS = ("date", "published", "created", "year")
+DATE_RE = re.compile(r"(?<!\d)((?:19|20)\d\d)(?:[-/.]?([01]\d)(?:[-/.]?([0-3]\d))?)?(?!\d)")
+TOKEN_RE = re.compile(r"[^\W_]+")
+APPENDABLE = (".jsonl", ".ndjson")
+TAIL_BYTES = 4096
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their "
+    "this to was were which with we our these those not can been also".split()
+)
+
+
+class CorpusError(Exception):
+    """Raised for missing corpora and unreadable documents"""
+
+
+class Document(NamedTuple):
+    path: str  # relative to the corpus root, with / separators
+    line: int  # record line in a .jsonl file (0 for whole files)
+    title: str
+    text: str
+    date: int  # YYYYMMDD, 0 if unknown
+    source: str
+    key: str  # a record's id, else path[:line]
+    authors: Optional[List[str]] = None
+    offset: int = 0  # byte offset of the record's line in a .jsonl file
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of at least two characters, without stopwords"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def parse_date(value: Any) -> int:
+    """YYYYMMDD from a year, an ISO date/timestamp or an epoch number (0 if none)"""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if 1000 <= value <= 9999:
+            return int(value) * 10000 + 101
+        if value > 10**8:
+            stamp = datetime.fromtimestamp(value, timezone.utc)
+            return stamp.year * 10000 + stamp.month * 100 + stamp.day
+        return 0
+    match = DATE_RE.search(str(value))
+    if not match:
+        return 0
+    year, month, day = match.groups()
+    month_number = int(month) if month and 1 <= int(month) <= 12 else 1
+    day_number = int(day) if day and 1 <= int(day) <= 31 else 1
+    return int(year) * 10000 + month_number * 100 + day_number
+
+
+def corpus_files(root: str) -> List[Tuple[str, os.stat_result]]:
+    """(relative path, stat) of every document file under `root`, sorted"""
+    if not os.path.isdir(root):
+        raise CorpusError(f"no corpus directory '{root}' (use --corpus)")
+    found = []
+    extensions = TEXT_EXTENSIONS + RECORD_EXTENSIONS
+    for top, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in files:
+            if name.lower().endswith(extensions) and not name.startswith("."):
+                path = os.path.join(top, name)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                found.append((rel, os.stat(path)))
+    found.sort()
+    return found
+
+
+def tail_digest(path: str, size: int) -> str:
+    """Digest of the last bytes of a file's first `size` bytes, and whether they end a line"""
+    with open(path, "rb") as f:
+        f.seek(max(size - TAIL_BYTES, 0))
+        tail = f.read(min(size, TAIL_BYTES))
+    if not tail:
+        return ""
+    complete = tail.endswith(b"\n")
+    return f"{hashlib.blake2b(tail, digest_size=8).hexdigest()}:{complete}"
+
+
+def appended(root: str, rel: str, entry: Dict[str, Any], stat: os.stat_result) -> bool:
+    """True if `rel` only grew by whole lines since `entry` (size, tail) was recorded"""
+    if not rel.lower().endswith(APPENDABLE) or stat.st_size <= entry["size"]:
+        return False
+    digest = entry.get("tail", "")
+    return digest.endswith(":True") and tail_digest(
+        os.path.join(root, *rel.split("/")), entry["size"]) == digest
+
+
+def _source_of(rel: str) -> str:
+    return rel.split("/", 1)[0] if "/" in rel else ""
+
+
+def _record(record: Dict[str, Any], rel: str, line: int, mtime_date: int,
+            offset: int = 0) -> Document:
+    text = " ".join(str(record[f]) for f in TEXT_FIELDS if record.get(f))
+    date = next((parse_date(record[f]) for f in DATE_FIELDS if record.get(f)), 0)
+    authors = record.get("authors")
+    if isinstance(authors, str):
+        authors = [a.strip() for a in re.split(r";| and ", authors) if a.strip()]
+    return Document(
+        rel, line, str(record.get("title") or "").strip(), text, date or mtime_date,
+        str(record.get("source") or _source_of(rel)),
+        str(record.get("id") or (f"{rel}:{line}" if line else rel)),
+        authors if isinstance(authors, list) else None, offset
+    )
+
+
+def read_documents(root: str, rel: str, mtime: float, start: int = 0,
+                   end: Optional[int] = None) -> Iterator[Document]:
+    """The documents stored in one corpus file
+
+    For .jsonl/.ndjson files, `start` and `end` limit reading to the lines
+    in that byte range (`start` must follow a newline), so records appended
+    since an earlier read can be picked up on their own.
+    """
+    path = os.path.join(root, *rel.split("/"))
+    mtime_date = parse_date(mtime)
+    lower = rel.lower()
+    if lower.endswith(APPENDABLE):
+        yield from _read_lines(path, rel, mtime_date, start, end)
+        return
+    with open(path, encoding="utf-8", errors="replace") as f:
+        if lower.endswith(".json"):
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise CorpusError(f"invalid JSON in '{rel}': {e}")
+            records = data if isinstance(data, list) else [data]
+            for n, record in enumerate(records, 1):
+                if isinstance(record, dict):
+                    yield _record(record, rel, n if isinstance(data, list) else 0, mtime_date)
+            return
+        text = f.read()
+    lines = text.lstrip().split("\n", 12)
+    title = lines[0].lstrip("#").strip()
+    date = 0
+    for line in lines[:12]:
+        if line.lower().startswith("date:"):
+            date = parse_date(line[5:])
+            break
+    date = date or parse_date(os.path.basename(rel)) or mtime_date
+    yield Document(rel, 0, title, text, date, _source_of(rel), rel)
+
+
+def _read_lines(path: str, rel: str, mtime_date: int, start: int,
+                end: Optional[int]) -> Iterator[Document]:
+    with open(path, "rb") as f:
+        number = 0
+        if start:
+            while f.tell() < start:
+                block = f.read(min(1 << 20, start - f.tell()))
+                if not block:
+                    break
+                number += block.count(b"\n")
+        pos = f.tell()
+        for line in f:
+            number += 1
+            offset = pos
+            pos += len(line)
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise CorpusError(f"invalid JSON on line {number} of '{rel}': {e}")
+                if isinstance(record, dict):
+                    yield _record(record, rel, number, mtime_date, offset)
+            if end is not None and pos >= end:
+                break
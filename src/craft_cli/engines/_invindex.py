@@ -0,0 +1,318 @@
+"""
+On-disk inverted index for the corpus search engine
+
+An index directory holds `manifest.json` and immutable segments. Indexing
+writes new documents into new segments (one per `flush_docs` documents), so
+adding documents never rewrites what is already indexed; the documents of a
+changed or removed file are only marked deleted in the manifest.
+
+A segment is two files:
+
+- `<name>.idx`, read through mmap. It holds the sorted term dictionary (a
+  blob of UTF-8 terms plus offsets, searched by bisection) and, per term,
+  three parallel runs of postings: local document ids in increasing order
+  (uint32), BM25 term weights tf*(k1+1)/(tf + k1*(1-b+b*dl/avgdl)) in the
+  same order (float32), and the positions of those postings by decreasing
+  weight (uint32). Then per document: its date (YYYYMMDD), source number and
+  offset into the metadata file.
+- `<name>.meta`: one JSON line per document (key, title, path, ...), read
+  only for the documents a query returns.
+
+Weights are computed with the segment's own average document length, so a
+segment is complete once written. Numbers are stored in native byte order:
+an index is a local cache of its corpus, not an exchange format.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ._corpus import Document, tokenize
+
+INDEX_VERSION = 1
+MAGIC = b"CSEG"
+K1 = 1.2
+B = 0.75
+DEFAULT_FLUSH_DOCS = 100_000
+MANIFEST = "manifest.json"
+SECTIONS = ("terms", "term_offsets", "postings", "ids", "weights", "order", "dates", "sources",
+            "meta")
+HEADER = struct.Struct("<4sIII" + "Q" * len(SECTIONS))
+SNIPPET_CHARS = 200
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class IndexFormatError(Exception):
+    """Raised for index files this version cannot read"""
+
+
+class SegmentBuilder:
+    """Accumulates documents in memory until they are written as a segment"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.lengths = array("I")
+        self.dates = array("I")
+        self.sources = array("I")
+        self.source_names: Dict[str, int] = {}
+        self.meta: List[bytes] = []
+
+    @property
+    def docs(self) -> int:
+        return len(self.lengths)
+
+    def add(self, doc: Document) -> int:
+        """Index one document; returns its local id"""
+        local = len(self.lengths)
+        tokens = tokenize(f"{doc.title}\n{doc.text}")
+        for term, tf in Counter(tokens).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("I"))
+            entry[0].append(local)
+            entry[1].append(tf)
+        self.lengths.append(len(tokens))
+        self.dates.append(doc.date)
+        self.sources.append(self.source_names.setdefault(doc.source, len(self.source_names)))
+        meta: Dict[str, Any] = {"key": doc.key, "title": doc.title, "path": doc.path}
+        if doc.line:
+            meta["line"] = doc.line
+        if doc.authors:
+            meta["authors"] = doc.authors
+        meta["snippet"] = " ".join(doc.text[:SNIPPET_CHARS * 2].split())[:SNIPPET_CHARS]
+        self.meta.append(_encode(meta).encode("utf-8") + b"\n")
+        return local
+
+    def write(self, directory: str, k1: float = K1, b: float = B) -> Dict[str, Any]:
+        """Write the segment files; returns the segment's manifest entry"""
+        docs = self.docs
+        avgdl = sum(self.lengths) / docs if docs else 0.0
+        norms = [k1 * (1 - b + b * dl / avgdl) if avgdl else k1 for dl in self.lengths]
+        terms = sorted(self.postings)
+        encoded = [term.encode("utf-8") for term in terms]
+        term_offsets = array("Q", [0])
+        postings = array("Q", [0])
+        for term, raw in zip(terms, encoded):
+            term_offsets.append(term_offsets[-1] + len(raw))
+            postings.append(postings[-1] + len(self.postings[term][0]))
+        meta_offsets = array("Q", [0])
+        for line in self.meta:
+            meta_offsets.append(meta_offsets[-1] + len(line))
+
+        def ids(out) -> None:
+            for term in terms:
+                self.postings[term][0].tofile(out)
+
+        def weights(out) -> None:
+            scale = k1 + 1
+            for term in terms:
+                doc_ids, tfs = self.postings[term]
+                run = array("f", [tf * scale / (tf + norms[d]) for d, tf in zip(doc_ids, tfs)])
+                run.tofile(out)
+                self.postings[term] = (doc_ids, run)  # the order pass sorts by weight
+
+        def order(out) -> None:
+            for term in terms:
+                run = self.postings[term][1]
+                array("I", sorted(range(len(run)), key=run.__getitem__, reverse=True)).tofile(out)
+
+        writers = {
+            "terms": lambda out: out.write(b"".join(encoded)),
+            "term_offsets": term_offsets.tofile,
+            "postings": postings.tofile,
+            "ids": ids,
+            "weights": weights,
+            "order": order,
+            "dates": self.dates.tofile,
+            "sources": self.sources.tofile,
+            "meta": meta_offsets.tofile,
+        }
+        path = os.path.join(directory, f"{self.name}.idx")
+        with open(f"{path}.tmp", "wb") as out:
+            out.write(bytes(HEADER.size))
+            starts = []
+            for section in SECTIONS:
+                out.write(bytes(-out.tell() % 8))
+                starts.append(out.tell())
+                writers[section](out)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, INDEX_VERSION, len(terms), docs, *starts))
+        with open(os.path.join(directory, f"{self.name}.meta"), "wb") as out:
+            out.writelines(self.meta)
+        os.replace(f"{path}.tmp", path)
+        names = sorted(self.source_names, key=self.source_names.__getitem__)
+        return {"name": self.name, "docs": docs, "postings": postings[-1],
+                "avgdl": round(avgdl, 3), "sources": names}
+
+
+class Segment:
+    """A written segment, memory-mapped for queries"""
+
+    def __init__(self, directory: str, entry: Dict[str, Any]) -> None:
+        self.name: str = entry["name"]
+        self.sources: List[str] = entry["sources"]
+        self._meta_path = os.path.join(directory, f"{self.name}.meta")
+        with open(os.path.join(directory, f"{self.name}.idx"), "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise IndexFormatError(f"truncated segment {self.name}")
+        magic, version, self.terms, self.docs, *starts = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != INDEX_VERSION:
+            raise IndexFormatError(f"segment {self.name} has an unknown format")
+        self._views: List[memoryview] = [memoryview(self._map)]
+        offsets = dict(zip(SECTIONS, starts))
+        self._terms_start = offsets["terms"]
+        self.term_offsets = self._view(offsets["term_offsets"], "Q", self.terms + 1)
+        self.postings = self._view(offsets["postings"], "Q", self.terms + 1)
+        total = self.postings[-1]
+        self.ids = self._view(offsets["ids"], "I", total)
+        self.weights = self._view(offsets["weights"], "f", total)
+        self.order = self._view(offsets["order"], "I", total)
+        self.dates = self._view(offsets["dates"], "I", self.docs)
+        self.source_ids = self._view(offsets["sources"], "I", self.docs)
+        self.meta_offsets = self._view(offsets["meta"], "Q", self.docs + 1)
+
+    def _view(self, start: int, fmt: str, count: int) -> memoryview:
+        view = self._views[0][start:start + count * struct.calcsize(fmt)].cast(fmt)
+        self._views.append(view)
+        return view
+
+    def lookup(self, term: str) -> Optional[Tuple[int, int]]:
+        """The [start, end) posting range of `term`, or None"""
+        key = term.encode("utf-8")
+        base, offsets = self._terms_start, self.term_offsets
+        lo, hi = 0, self.terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._map[base + offsets[mid]:base + offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.terms and self._map[base + offsets[lo]:base + offsets[lo + 1]] == key:
+            return self.postings[lo], self.postings[lo + 1]
+        return None
+
+    def weight(self, start: int, end: int, doc: int) -> float:
+        """The weight of `doc` in the postings [start, end), 0 if absent"""
+        pos = bisect_left(self.ids, doc, start, end)
+        return self.weights[pos] if pos < end and self.ids[pos] == doc else 0.0
+
+    def metadata(self, docs: Iterable[int]) -> List[Dict[str, Any]]:
+        """The stored metadata of local documents, in the given order"""
+        found = []
+        with open(self._meta_path, "rb") as f:
+            for doc in docs:
+                f.seek(self.meta_offsets[doc])
+                found.append(json.loads(f.read(self.meta_offsets[doc + 1] -
+                                               self.meta_offsets[doc])))
+        return found
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+
+
+class Manifest:
+    """Segments, indexed files and deleted documents of an index directory
+
+    `files` maps a corpus path to its indexed size, mtime_ns, a digest of its
+    last bytes (to recognise appended .jsonl files) and the `parts` it was
+    indexed into: [segment, first local id, count, byte offset of the first
+    document], oldest first.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.k1 = K1
+        self.b = B
+        self.counter = 0
+        self.segments: List[Dict[str, Any]] = []
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.deleted: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def load(cls, directory: str) -> 'Manifest':
+        """The saved manifest, or an empty one if there is none (or it is outdated)"""
+        manifest = cls(directory)
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return manifest
+        manifest.k1, manifest.b = data["k1"], data["b"]
+        manifest.counter = data["counter"]
+        manifest.segments = data["segments"]
+        manifest.files = data["files"]
+        manifest.deleted = {name: set(docs) for name, docs in data["deleted"].items()}
+        return manifest
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "counter": self.counter,
+            "segments": self.segments,
+            "files": self.files,
+            "deleted": {name: sorted(docs) for name, docs in self.deleted.items() if docs},
+        }
+        path = os.path.join(self.directory, MANIFEST)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @property
+    def docs(self) -> int:
+        """Live (not deleted) documents"""
+        return sum(s["docs"] for s in self.segments) - self.deleted_docs
+
+    @property
+    def deleted_docs(self) -> int:
+        return sum(len(docs) for docs in self.deleted.values())
+
+    def new_builder(self) -> SegmentBuilder:
+        self.counter += 1
+        return SegmentBuilder(f"seg-{self.counter:06d}")
+
+    def add_segment(self, builder: SegmentBuilder) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.segments.append(builder.write(self.directory, self.k1, self.b))
+
+    def delete_parts(self, parts: Iterable[List[Any]]) -> int:
+        """Mark the documents of file parts deleted; returns how many"""
+        total = 0
+        for name, first, count, _ in parts:
+            self.deleted.setdefault(name, set()).update(range(first, first + count))
+            total += count
+        return total
+
+    def delete_file(self, rel: str) -> int:
+        """Mark the documents indexed from `rel` deleted; returns how many"""
+        return self.delete_parts(self.files.pop(rel, {}).get("parts", ()))
+
+    def drop_empty(self) -> List[str]:
+        """Forget segments whose documents are all deleted; returns their names"""
+        empty = [s["name"] for s in self.segments
+                 if len(self.deleted.get(s["name"], ())) >= s["docs"]]
+        self.segments = [s for s in self.segments if s["name"] not in empty]
+        for name in empty:
+            self.deleted.pop(name, None)
+        return empty
+
+    def remove_files(self, names: Iterable[str]) -> None:
+        for name in names:
+            for suffix in (".idx", ".meta"):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,424 @@
+"""
+Chunked record IO shared by the data engines
+
+Readers yield lists of at most `chunk_size` records (dicts) from CSV/TSV,
+NDJSON, JSON arrays, XML and, when pyarrow is installed, Parquet. Only one
+chunk is held in memory at a time, so memory use does not grow with the input.
+Writers accept the same chunks. `-` means stdin/stdout and a `.gz` suffix is
+(de)compressed transparently.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from xml.etree import ElementTree
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None  # type: ignore
+
+
+FORMATS = ("csv", "tsv", "ndjson", "json", "xml", "parquet")
+
+Record = Dict[str, Any]
+Chunk = List[Record]
+
+_EXTENSIONS = {
+    ".csv": "csv", ".tsv": "tsv", ".ndjson": "ndjson", ".jsonl": "ndjson",
+    ".json": "json", ".xml": "xml", ".parquet": "parquet"
+}
+_BLOCK_SIZE = 1 << 16
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class DataError(Exception):
+    """Raised for unreadable input or unsupported conversions"""
+
+
+def detect_format(path: str, explicit: Optional[str] = None) -> str:
+    """Format from an explicit flag, else from the file extension"""
+    if explicit:
+        if explicit not in FORMATS:
+            raise DataError(f"unknown format '{explicit}' (expected one of: {', '.join(FORMATS)})")
+        return explicit
+    name = path[:-3] if path.endswith(".gz") else path
+    for extension, fmt in _EXTENSIONS.items():
+        if name.lower().endswith(extension):
+            return fmt
+    raise DataError(f"cannot tell the format of '{path}'; pass --from/--to")
+
+
+def open_text(path: str, mode: str = "r") -> TextIO:
+    """Open a text stream; `-` is stdin/stdout and `.gz` is compressed"""
+    if path == "-":
+        stream = sys.stdin if mode == "r" else sys.stdout
+        return stream  # type: ignore
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")  # type: ignore
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def stdout_captured() -> bool:
+    """Whether stdout is an in-memory capture (an in-process craft run), not a stream
+
+    Long-running tools must then stop on their own: their output only reaches
+    the caller when they exit.
+    """
+    try:
+        sys.stdout.fileno()
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        return True
+    return False
+
+
+def chunked(records: Iterable[Record], size: int) -> Iterator[Chunk]:
+    """Group an iterable of records into lists of at most size"""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int,
+                delimiter: Optional[str] = None) -> Iterator[Chunk]:
+    """Stream a file as chunks of records"""
+    if chunk_size < 1:
+        raise DataError("chunk size must be at least 1")
+    if fmt == "parquet":
+        yield from _read_parquet(path, chunk_size)
+        return
+    stream = open_text(path)
+    try:
+        if fmt in ("csv", "tsv"):
+            records = _read_csv(stream, delimiter or ("\t" if fmt == "tsv" else ","))
+        elif fmt in ("json", "ndjson"):
+            records = _read_json(stream)
+        elif fmt == "xml":
+            records = _read_xml(stream)
+        else:
+            raise DataError(f"cannot read format '{fmt}'")
+        yield from chunked(records, chunk_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _read_csv(stream: TextIO, delimiter: str,
+              header: Optional[List[str]] = None) -> Iterator[Record]:
+    reader = csv.reader(stream, delimiter=delimiter)
+    if header is None:
+        header = next(reader, None)
+    if header is None:
+        return
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+
+def _read_json(stream: TextIO) -> Iterator[Record]:
+    """NDJSON, or a top-level JSON array decoded one element at a time"""
+    first = stream.read(_BLOCK_SIZE)
+    stripped = first.lstrip()
+    if stripped.startswith("["):
+        yield from _read_json_array(stream, stripped[1:])
+        return
+    yield from _read_ndjson(stream, first)
+
+
+def _read_ndjson(stream: TextIO, first: str = "") -> Iterator[Record]:
+    for line_number, line in enumerate(_lines(first, stream), 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise DataError(f"invalid JSON on line {line_number}: {e}")
+
+
+def _lines(first: str, stream: TextIO) -> Iterator[str]:
+    pending = first
+    while True:
+        block = stream.read(_BLOCK_SIZE)
+        pending += block
+        lines = pending.split("\n")
+        pending = lines.pop()
+        yield from lines
+        if not block:
+            if pending:
+                yield pending
+            return
+
+
+def _read_json_array(stream: TextIO, buffer: str) -> Iterator[Record]:
+    decoder = json.JSONDecoder()
+    position = 0
+    eof = False
+    while True:
+        # Skip separators between elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+            # A value touching the end of the buffer (e.g. a number) may continue
+            if end < len(buffer) or eof:
+                yield value
+                position = end
+                continue
+        except ValueError:
+            if eof:
+                raise DataError(f"invalid JSON array near: {buffer[position:position + 40]!r}")
+        block = stream.read(_BLOCK_SIZE)
+        eof = not block
+        buffer = buffer[position:] + block
+        position = 0
+        if eof and not buffer.strip():
+            raise DataError("unterminated JSON array")
+
+
+def _read_xml(stream: TextIO) -> Iterator[Record]:
+    """Each child of the root element is a record; its children (or attributes) are fields"""
+    depth = 0
+    root = None
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if root is None:
+                root = element
+            continue
+        depth -= 1
+        if depth == 1:
+            record: Record = dict(element.attrib)
+            for child in element:
+                record[child.tag] = child.text or ""
+            if not len(element) and (element.text or "").strip():
+                record[element.tag] = element.text.strip()
+            yield record
+            root.clear()
+
+
+def splittable(path: str, fmt: str) -> bool:
+    """Whether a file can be cut into byte ranges read independently"""
+    return path != "-" and not path.endswith(".gz") and fmt in ("csv", "tsv", "ndjson")
+
+
+def plan_partitions(path: str, fmt: str, target_bytes: int,
+                    delimiter: Optional[str] = None) -> Tuple[Optional[List[str]], List[Tuple[int, int]]]:
+    """Cut a CSV/TSV/NDJSON file into byte ranges of about target_bytes
+
+    Every range starts on a record boundary. For CSV that means a newline
+    outside quotes, which is found by tracking quote parity in one C-speed
+    pass over the bytes. Returns the CSV header (None for NDJSON) and the
+    (start, end) ranges of the data rows.
+    """
+    quoted = fmt != "ndjson"
+    boundaries = []
+    target = 0 if quoted else target_bytes  # the first CSV boundary ends the header
+    offset = quotes = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            i = 0
+            while offset + len(block) > target:
+                t = max(target - offset, i)
+                newline = block.find(b"\n", t)
+                if quoted:
+                    quotes += block.count(b'"', i, newline if newline >= 0 else len(block))
+                if newline < 0:
+                    i = len(block)
+                    break
+                i = newline + 1
+                if quotes % 2 == 0:
+                    boundaries.append(offset + i)
+                    target = offset + i + target_bytes
+            if quoted:
+                quotes += block.count(b'"', i)
+            offset += len(block)
+    header = None
+    start = 0
+    if quoted:
+        if not boundaries and offset:
+            boundaries.append(offset)  # a header without a trailing newline
+        if not boundaries:
+            return None, []
+        start = boundaries.pop(0)
+        header_text = _range_text(path, 0, start).read()
+        header = next(csv.reader([header_text], delimiter=delimiter or ("\t" if fmt == "tsv" else ",")), [])
+    ranges = []
+    for end in boundaries + [offset]:
+        if end > start:
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+class _RangeReader(io.RawIOBase):
+    """Raw reader limited to one byte range of a file"""
+
+    def __init__(self, path: str, start: int, end: int):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        count = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= count
+        return count
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _range_text(path: str, start: int, end: int) -> TextIO:
+    return io.TextIOWrapper(io.BufferedReader(_RangeReader(path, start, end)),
+                            encoding="utf-8", newline="")
+
+
+def read_partition(path: str, fmt: str, start: int, end: int, chunk_size: int,
+                   header: Optional[List[str]] = None,
+                   delimiter: Optional[str] = None) -> Iterator[Chunk]:
+    """Stream one range from plan_partitions as chunks of records"""
+    with _range_text(path, start, end) as stream:
+        if fmt == "ndjson":
+            records = _read_ndjson(stream)
+        else:
+            records = _read_csv(stream, delimiter or ("\t" if fmt == "tsv" else ","), header or [])
+        yield from chunked(records, chunk_size)
+
+
+def _read_parquet(path: str, chunk_size: int) -> Iterator[Chunk]:
+    if pyarrow is None:
+        raise DataError("Parquet support needs pyarrow (pip install 'craft-cli[parquet]')")
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+def _cell(value: Any) -> Any:
+    return _encode(value) if isinstance(value, (dict, list)) else value
+
+
+class RecordWriter:
+    """Writes chunks of records in one format
+
+    A file is written under a temporary name next to it and only replaces
+    `path` once closed without an error, so the output may be the input.
+    """
+
+    def __init__(self, path: str, fmt: str, delimiter: Optional[str] = None):
+        if fmt not in ("csv", "tsv", "ndjson", "json", "parquet"):
+            raise DataError(f"cannot write format '{fmt}'")
+        if fmt == "parquet" and pyarrow is None:
+            raise DataError("Parquet support needs pyarrow (pip install 'craft-cli[parquet]')")
+        if fmt == "parquet" and path == "-":
+            raise DataError("Parquet output needs a file path")
+        self.path = path
+        self.fmt = fmt
+        # The temporary name keeps the extension, so a .gz output is still compressed
+        directory, name = os.path.split(path)
+        self._tmp = None if path == "-" else os.path.join(directory, f".tmp{os.getpid()}.{name}")
+        self.delimiter = delimiter or ("\t" if fmt == "tsv" else ",")
+        self.rows = 0
+        self._stream: Optional[TextIO] = None
+        self._csv: Optional[Any] = None
+        self._columns: List[str] = []
+        self._dropped: Set[str] = set()
+        self._parquet: Optional[Any] = None
+
+    def write(self, chunk: Chunk) -> None:
+        if not chunk:
+            return
+        if self.fmt == "parquet":
+            self._write_parquet(chunk)
+        else:
+            if self._stream is None:
+                self._stream = open_text(self._tmp or self.path, "w")
+                if self.fmt == "json":
+                    self._stream.write("[\n")
+            if self.fmt in ("csv", "tsv"):
+                self._write_csv(chunk)
+            elif self.fmt == "ndjson":
+                self._stream.write("".join([_encode(record) + "\n" for record in chunk]))
+            else:
+                prefix = ",\n" if self.rows else ""
+                self._stream.write(prefix + ",\n".join([_encode(record) for record in chunk]))
+        self.rows += len(chunk)
+
+    def _write_csv(self, chunk: Chunk) -> None:
+        if self._csv is None:
+            # Columns are fixed by the first chunk; later extra fields are dropped
+            fieldnames: Dict[str, None] = {}
+            for record in chunk:
+                fieldnames.update(dict.fromkeys(record))
+            self._columns = list(fieldnames)
+            self._csv = csv.writer(self._stream, delimiter=self.delimiter, lineterminator="\n")
+            self._csv.writerow(self._columns)
+        else:
+            extra = set(chain.from_iterable(chunk)).difference(self._columns, self._dropped)
+            for name in sorted(extra):
+                print(f"WARNING: dropping field '{name}' from {self.fmt.upper()} output: it first "
+                      f"appears after row {self.rows:,}, once the header was written "
+                      "(raise --chunk-size to include it)", file=sys.stderr)
+            self._dropped |= extra
+        columns = self._columns
+        rows = [list(map(record.get, columns)) for record in chunk]
+        # csv writes None as an empty field; only nested values need encoding
+        if {dict, list} & set(map(type, chain.from_iterable(rows))):
+            rows = [list(map(_cell, row)) for row in rows]
+        self._csv.writerows(rows)
+
+    def _write_parquet(self, chunk: Chunk) -> None:
+        if self._parquet is None:
+            table = pyarrow.Table.from_pylist(chunk)
+            self._parquet = pyarrow.parquet.ParquetWriter(self._tmp, table.schema)
+        else:
+            table = pyarrow.Table.from_pylist(chunk, schema=self._parquet.schema)
+        self._parquet.write_table(table)
+
+    def close(self, aborted: bool = False) -> None:
+        """Finish the output; an aborted write leaves `path` as it was"""
+        if self._parquet is not None:
+            self._parquet.close()
+        if self.fmt == "json" and not aborted:
+            if self._stream is None:
+                self._stream = open_text(self._tmp or self.path, "w")
+                self._stream.write("[")
+            self._stream.write("\n]\n")
+        started = self._stream is not None or self._parquet is not None
+        if self._stream is not None:
+            if self._stream is sys.stdout:
+                self._stream.flush()
+            else:
+                self._stream.close()
+        if started and self._tmp is not None:
+            if not aborted:
+                os.replace(self._tmp, self.path)
+                return
+            # A partial file would read as a complete, shorter result
+            try:
+                os.remove(self._tmp)
+            except OSError:
+                pass
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(aborted=exc_type is not None)
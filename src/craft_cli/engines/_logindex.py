@@ -0,0 +1,304 @@
+"""
+Sidecar index for the log search engine
+
+A log file is cut into blocks of about `block_bytes`, ending where a new
+timestamped entry starts, so a multi-line entry (a stack trace) never spans
+two blocks. For every block the index keeps:
+
+- its byte range, earliest and latest timestamp (the time-bucket offsets
+  that let a query seek straight to a time range); blocks without ISO
+  timestamps take theirs from web server (CLF) or syslog lines
+- a bitmask of the log levels that appear in it
+- membership in a trigram index: every trigram of every word in the block
+  maps to a bitmask of the blocks that contain it
+
+A query only reads the blocks that can match. The index is extended
+incrementally as the file grows: only the last (open) block is re-read, and
+a file that shrank or whose first bytes changed (rotation) is re-indexed.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Dict, Iterable, Iterator, List, Match, NamedTuple, Optional, Set, Tuple
+)
+
+INDEX_VERSION = 2
+DEFAULT_BLOCK_BYTES = 1 << 20
+FINGERPRINT_BYTES = 4096
+
+# An entry starts with an ISO timestamp, optionally after '[' or inside a
+# JSON line's "timestamp"/"time"/"ts" field. Other lines continue the entry.
+TIMESTAMP_RE = re.compile(
+    rb'^(?:\[|\{[^\n]{0,120}?"(?:@?timestamp|time|ts)"\s*:\s*")?'
+    rb"(\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d)([.,]\d+)?(Z|[+-]\d\d:?\d\d)?",
+    re.MULTILINE
+)
+# Web server (Common Log Format) and syslog lines have their own timestamp
+# layouts; every such line is an entry of its own.
+OTHER_TIME_RE = re.compile(
+    rb"^(?:\S+ \S+ \S+ \[(\d\d)/([A-Z][a-z]{2})/(\d{4}):(\d\d):(\d\d):(\d\d) ([+-]\d{4})\]"
+    rb"|([A-Z][a-z]{2}) ([ \d]\d) (\d\d):(\d\d):(\d\d) )",
+    re.MULTILINE
+)
+MONTHS = {name.encode(): number for number, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+LEVEL_RE = re.compile(
+    rb"\b(fatal|critical|error|err|warning|warn|info|notice|debug|trace)\b", re.IGNORECASE
+)
+LEVELS = {"error": 1, "warn": 2, "info": 4, "debug": 8}
+LEVEL_WORDS = {
+    b"fatal": "error", b"critical": "error", b"error": "error", b"err": "error",
+    b"warning": "warn", b"warn": "warn", b"info": "info", b"notice": "info",
+    b"debug": "debug", b"trace": "debug"
+}
+_WORD_TABLE = bytes(
+    c + 32 if 65 <= c <= 90 else c if chr(c).isascii() and (chr(c).isalnum() or c == 95) else 32
+    for c in range(256)
+)
+
+_times: Dict[Tuple[bytes, Optional[bytes]], float] = {}
+_other_times: Dict[Tuple[Optional[bytes], ...], Optional[float]] = {}
+
+
+class Block(NamedTuple):
+    """One indexed byte range of a log file"""
+    start: int
+    end: int
+    first: Optional[float]
+    last: Optional[float]
+    levels: int
+
+
+def level_name(word: bytes) -> str:
+    """Normalized level ('error', 'warn', 'info', 'debug') of a level word"""
+    return LEVEL_WORDS[word.lower()]
+
+
+def entry_time(base: bytes, tz: Optional[bytes]) -> float:
+    """Epoch seconds of a captured timestamp; naive times are local time"""
+    key = (base, tz)
+    cached = _times.get(key)
+    if cached is None:
+        moment = datetime(int(base[0:4]), int(base[5:7]), int(base[8:10]),
+                          int(base[11:13]), int(base[14:16]), int(base[17:19]))
+        if tz and tz != b"Z":
+            digits = tz[1:].replace(b":", b"")
+            delta = timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+            moment = moment.replace(tzinfo=timezone(-delta if tz[:1] == b"-" else delta))
+        elif tz:
+            moment = moment.replace(tzinfo=timezone.utc)
+        if len(_times) > 100000:
+            _times.clear()
+        cached = _times[key] = moment.timestamp()
+    return cached
+
+
+def other_time(match: Match, now: Optional[float] = None) -> Optional[float]:
+    """Epoch seconds of an OTHER_TIME_RE match; None if it names no real date
+
+    Syslog times are local and carry no year: they are placed in the latest
+    year that does not put them more than a day after `now`.
+    """
+    key = match.groups()
+    if now is None and key in _other_times:
+        return _other_times[key]
+    if key[0] is not None:
+        day, month, year, hour, minute, second, tz = key[:7]
+    else:
+        month, day, hour, minute, second = key[7:]
+        year = tz = None
+    moment: Optional[float] = None
+    if month in MONTHS:
+        fields = (MONTHS[month], int(day), int(hour), int(minute), int(second))
+        try:
+            if tz is not None:
+                delta = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:]))
+                moment = datetime(int(year), *fields, tzinfo=timezone(
+                    -delta if tz[:1] == b"-" else delta)).timestamp()
+            else:
+                latest = (time.time() if now is None else now) + 86400
+                current = datetime.fromtimestamp(latest).year
+                moment = datetime(current, *fields).timestamp()
+                if moment > latest:
+                    moment = datetime(current - 1, *fields).timestamp()
+        except ValueError:
+            moment = None  # 31 Apr, or 29 Feb of a common year
+    if now is None:
+        if len(_other_times) > 100000:
+            _other_times.clear()
+        _other_times[key] = moment
+    return moment
+
+
+def _words(text: bytes) -> Set[bytes]:
+    """Distinct lowercase words of `text` (runs of ASCII letters, digits and _)"""
+    return set(text.translate(_WORD_TABLE).split())
+
+
+def _fingerprint(data, size: int) -> str:
+    return f"{size}:" + hashlib.blake2b(data[:size], digest_size=8).hexdigest()
+
+
+def query_trigrams(literal: str) -> Set[bytes]:
+    """Trigrams every block containing `literal` (case-insensitively) must have
+
+    Only trigrams inside a word of the literal count, since those are inside
+    a word of the log text too. Words made only of digits are not indexed.
+    """
+    return _trigrams(_words(literal.encode("utf-8")))
+
+
+def _trigrams(words: Iterable[bytes]) -> Set[bytes]:
+    grams: Set[bytes] = set()
+    for word in words:
+        if len(word) >= 3 and not word.isdigit():
+            grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def block_end(data, pos: int, limit: int, block_bytes: int) -> int:
+    """End of the block starting at `pos`: the first entry start after block_bytes"""
+    target = pos + block_bytes
+    if target >= limit:
+        return limit
+    line = data.find(b"\n", target - 1, limit) + 1
+    if not line:
+        return limit
+    cap = min(limit, target + 4 * block_bytes)
+    entry = TIMESTAMP_RE.search(data, line, cap)
+    if entry:
+        return entry.start()
+    return data.find(b"\n", cap - 1, limit) + 1 or limit  # no timestamps: cut at a line
+
+
+def scan_blocks(data, block_bytes: int = DEFAULT_BLOCK_BYTES) -> Iterator[Block]:
+    """Unindexed blocks covering the complete lines of `data`, for linear scans"""
+    pos, limit = 0, data.rfind(b"\n") + 1
+    while pos < limit:
+        end = block_end(data, pos, limit, block_bytes)
+        yield Block(pos, end, None, None, 0)
+        pos = end
+
+
+class LogIndex:
+    """Block table and trigram bitmasks of one log file"""
+
+    def __init__(self, block_bytes: int = DEFAULT_BLOCK_BYTES) -> None:
+        self.block_bytes = block_bytes
+        self.size = 0
+        self.fingerprint = ""
+        self.blocks: List[Block] = []
+        self.trigrams: Dict[bytes, int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LogIndex']:
+        """Read a saved index; None if it is missing, unreadable or outdated"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        index = cls(data["block_bytes"])
+        index.size = data["size"]
+        index.fingerprint = data["fingerprint"]
+        index.blocks = [Block(*block) for block in data["blocks"]]
+        index.trigrams = {gram.encode("latin-1"): int(mask, 16)
+                          for gram, mask in data["trigrams"].items()}
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the index atomically next to (or on behalf of) its log file"""
+        data = {
+            "version": INDEX_VERSION,
+            "block_bytes": self.block_bytes,
+            "size": self.size,
+            "fingerprint": self.fingerprint,
+            "blocks": [list(block) for block in self.blocks],
+            "trigrams": {gram.decode("latin-1"): format(mask, "x")
+                         for gram, mask in self.trigrams.items()}
+        }
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def update(self, data) -> int:
+        """Index whatever `data` (bytes or an mmap of the log) added since last time
+
+        Returns the number of bytes (re-)read. Only complete lines are
+        indexed, so a line being written is picked up by the next update.
+        """
+        limit = data.rfind(b"\n") + 1
+        if self.size:
+            head = int(self.fingerprint.split(":", 1)[0])
+            if limit < self.size or _fingerprint(data, head) != self.fingerprint:
+                self.__init__(self.block_bytes)  # truncated or rotated: start over
+        if limit == self.size:
+            return 0
+        pos = 0
+        if self.blocks:
+            pos = self.blocks.pop().start  # the last block may have grown
+            drop = ~(1 << len(self.blocks))
+            self.trigrams = {gram: mask & drop for gram, mask in self.trigrams.items()
+                             if mask & drop}
+        start = pos
+        while pos < limit:
+            end = block_end(data, pos, limit, self.block_bytes)
+            self._add_block(data, pos, end)
+            pos = end
+        self.size = limit
+        self.fingerprint = _fingerprint(data, min(FINGERPRINT_BYTES, limit))
+        return limit - start
+
+    def _add_block(self, data, start: int, end: int) -> None:
+        text = data[start:end]
+        # ISO timestamps of one layout sort as text: parse only the extremes
+        layouts: Dict[Tuple[int, Optional[bytes]], List[bytes]] = {}
+        for base, _, tz in TIMESTAMP_RE.findall(text):
+            layouts.setdefault((base[10], tz or None), []).append(base)
+        times = []
+        for (_, tz), bases in layouts.items():
+            times += [entry_time(min(bases), tz), entry_time(max(bases), tz)]
+        if not layouts:
+            times = [moment for moment in map(other_time, OTHER_TIME_RE.finditer(text))
+                     if moment is not None]
+        words = _words(text)
+        levels = 0
+        for word in words.intersection(LEVEL_WORDS):
+            levels |= LEVELS[LEVEL_WORDS[word]]
+        bit = 1 << len(self.blocks)
+        trigrams = self.trigrams
+        for gram in _trigrams(words):
+            trigrams[gram] = trigrams.get(gram, 0) | bit
+        self.blocks.append(Block(start, end, min(times) if times else None,
+                                 max(times) if times else None, levels))
+
+    def candidates(self, since: Optional[float] = None, until: Optional[float] = None,
+                   levels: int = 0, grams: Iterable[bytes] = ()) -> List[Block]:
+        """Blocks that may hold entries in [since, until] at `levels` containing `grams`"""
+        mask = (1 << len(self.blocks)) - 1
+        for gram in grams:
+            mask &= self.trigrams.get(gram, 0)
+            if not mask:
+                return []
+        selected = []
+        for i, block in enumerate(self.blocks):
+            if not mask >> i & 1:
+                continue
+            if levels and not block.levels & levels:
+                continue
+            if since is not None or until is not None:
+                if block.first is None:
+                    continue
+                if since is not None and block.last < since:
+                    continue
+                if until is not None and block.first > until:
+                    continue
+            selected.append(block)
+        return selected
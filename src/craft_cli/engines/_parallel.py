@@ -0,0 +1,49 @@
+"""
+Process-parallel helpers shared by the data engines
+"""
+import multiprocessing
+import os
+import sys
+from collections import deque
+from typing import Callable, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+
+def resolve_jobs(jobs: int) -> int:
+    """--jobs value to a worker count; 0 or less means one per CPU"""
+    return jobs if jobs > 0 else os.cpu_count() or 1
+
+
+def ordered_map(func: Callable, items: Iterable, jobs: int) -> Iterator:
+    """map() across worker processes, in input order, with bounded read-ahead
+
+    At most 2 * jobs items are in flight, so a lazily read input is never
+    pulled into memory ahead of the workers.
+    """
+    if jobs <= 1:
+        yield from map(func, items)
+        return
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with context.Pool(jobs) as pool:
+        pending: deque = deque()
+        for item in items:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process or any finished child, in MB"""
+    if resource is None:
+        return 0.0
+    scale = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / scale
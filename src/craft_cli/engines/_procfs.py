@@ -0,0 +1,209 @@
+"""
+/proc sampling for `craft devops monitor`
+
+A Sampler keeps its /proc files open and re-reads them with pread() each
+sample, so a sample costs a handful of system calls and no path lookups.
+Counters (CPU ticks, disk sectors, network bytes) are turned into rates
+against the previous sample. The values land in a caller-supplied
+array('d') in the column order of METRICS; nothing else is built per sample.
+
+Processes matching the targets (a pid, or text found in the command line)
+are looked up again every `rescan` seconds; between lookups only their
+/proc/<pid>/stat files are read.
+"""
+import os
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+METRICS = ("cpu", "iowait", "load1", "memory", "swap", "disk_read", "disk_write",
+           "net_rx", "net_tx", "proc_cpu", "proc_rss", "proc_count")
+# cpu/iowait/memory/swap in %, disk/net in KB/s, proc_cpu in % of one core, proc_rss in MB
+GROUPS = {
+    "cpu": ("cpu", "iowait", "load1"),
+    "memory": ("memory", "swap"),
+    "disk": ("disk_read", "disk_write"),
+    "net": ("net_rx", "net_tx"),
+    "process": ("proc_cpu", "proc_rss", "proc_count"),
+}
+DEFAULT_RESCAN = 10.0
+
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_READ_BYTES = 1 << 16
+_SKIP_DISKS = (b"loop", b"ram", b"zram", b"sr", b"fd")
+
+
+class ProcessState:
+    """One watched process: an open stat file plus its last readings"""
+
+    __slots__ = ("pid", "name", "fd", "ticks", "cpu", "rss_mb")
+
+    def __init__(self, pid: int, name: str, fd: int, ticks: int) -> None:
+        self.pid = pid
+        self.name = name
+        self.fd = fd
+        self.ticks = ticks
+        self.cpu = 0.0
+        self.rss_mb = 0.0
+
+
+def _meminfo_kb(data: bytes, key: bytes) -> int:
+    start = data.find(key)
+    if start < 0:
+        return 0
+    end = data.find(b"\n", start)
+    return int(data[start + len(key):end].split()[0])
+
+
+def _proc_fields(data: bytes) -> List[bytes]:
+    """Fields of /proc/<pid>/stat after the command name, which may contain spaces"""
+    return data[data.rfind(b")") + 2:].split()
+
+
+def whole_disks(diskstats: bytes) -> List[bytes]:
+    """Disk names without their partitions (sda not sda1) and virtual devices"""
+    names = [line.split()[2] for line in diskstats.splitlines() if line.strip()]
+    names = [n for n in names if not n.startswith(_SKIP_DISKS)]
+    return [n for n in names if not any(n != other and n.startswith(other) for other in names)]
+
+
+class Sampler:
+    """Reads system-wide and per-process figures from /proc"""
+
+    def __init__(self, root: str = "/proc", targets: Sequence[str] = (),
+                 rescan: float = DEFAULT_RESCAN) -> None:
+        self.root = root
+        self.targets = [t for t in targets if t]
+        self.rescan = rescan
+        self.processes: Dict[int, ProcessState] = {}
+        self._fds = {name: os.open(os.path.join(root, *name.split("/")), os.O_RDONLY)
+                     for name in ("stat", "meminfo", "loadavg", "diskstats", "net/dev")}
+        self.disks = set(whole_disks(self._read("diskstats")))
+        self._since_scan = rescan
+        self._cpu = self._read_cpu()
+        self._disk = self._read_disk()
+        self._net = self._read_net()
+        self._own_pid = os.getpid()
+        if self.targets:
+            self.scan()
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        for state in self.processes.values():
+            os.close(state.fd)
+        self._fds, self.processes = {}, {}
+
+    def _read(self, name: str) -> bytes:
+        return os.pread(self._fds[name], _READ_BYTES, 0)
+
+    def _read_cpu(self) -> Tuple[int, int, int]:
+        data = self._read("stat")
+        fields = data[:data.find(b"\n")].split()[1:9]
+        total = sum(int(f) for f in fields)
+        idle, iowait = int(fields[3]), int(fields[4])
+        return total, total - idle - iowait, iowait
+
+    def _read_disk(self) -> Tuple[int, int]:
+        read = written = 0
+        for line in self._read("diskstats").splitlines():
+            fields = line.split()
+            if len(fields) > 9 and fields[2] in self.disks:
+                read += int(fields[5])
+                written += int(fields[9])
+        return read * 512, written * 512
+
+    def _read_net(self) -> Tuple[int, int]:
+        received = sent = 0
+        for line in self._read("net/dev").splitlines()[2:]:
+            name, _, counters = line.partition(b":")
+            if name.strip() == b"lo":
+                continue
+            fields = counters.split()
+            if len(fields) > 8:
+                received += int(fields[0])
+                sent += int(fields[8])
+        return received, sent
+
+    def scan(self) -> None:
+        """Match the targets against the running processes"""
+        self._since_scan = 0.0
+        wanted = {int(t) for t in self.targets if t.isdigit()}
+        texts = [t for t in self.targets if not t.isdigit()]
+        for entry in os.listdir(self.root):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            if pid in self.processes or pid == self._own_pid:
+                continue
+            try:
+                with open(os.path.join(self.root, entry, "cmdline"), "rb") as f:
+                    command = f.read().replace(b"\0", b" ").strip().decode("utf-8", "replace")
+                fd = os.open(os.path.join(self.root, entry, "stat"), os.O_RDONLY)
+            except OSError:
+                continue  # exited, or not ours to read
+            data = os.pread(fd, 4096, 0)
+            name = data[data.find(b"(") + 1:data.rfind(b")")].decode("utf-8", "replace")
+            if pid not in wanted and not any(t in command or t in name for t in texts):
+                os.close(fd)
+                continue
+            fields = _proc_fields(data)
+            self.processes[pid] = ProcessState(pid, name, fd, int(fields[11]) + int(fields[12]))
+
+    def _sample_processes(self, elapsed: float) -> Tuple[float, float, int]:
+        cpu = rss = 0.0
+        gone: Optional[List[int]] = None
+        for state in self.processes.values():
+            try:
+                fields = _proc_fields(os.pread(state.fd, 4096, 0))
+            except OSError:
+                fields = []
+            if not fields:  # exited
+                gone = gone or []
+                gone.append(state.pid)
+                continue
+            ticks = int(fields[11]) + int(fields[12])
+            state.cpu = (ticks - state.ticks) / _TICKS / elapsed * 100 if elapsed > 0 else 0.0
+            state.rss_mb = int(fields[21]) * _PAGE / 1048576
+            state.ticks = ticks
+            cpu += state.cpu
+            rss += state.rss_mb
+        for pid in gone or ():
+            os.close(self.processes.pop(pid).fd)
+        return cpu, rss, len(self.processes)
+
+    def sample(self, out: array, elapsed: float) -> None:
+        """Fill `out` (one slot per METRICS entry) with figures since the last call"""
+        total, busy, iowait = cpu = self._read_cpu()
+        ticks = total - self._cpu[0]
+        out[0] = (busy - self._cpu[1]) / ticks * 100 if ticks > 0 else 0.0
+        out[1] = (iowait - self._cpu[2]) / ticks * 100 if ticks > 0 else 0.0
+        self._cpu = cpu
+        out[2] = float(self._read("loadavg").split(None, 1)[0])
+        meminfo = self._read("meminfo")
+        mem_total = _meminfo_kb(meminfo, b"MemTotal:")
+        available = _meminfo_kb(meminfo, b"MemAvailable:")
+        swap_total = _meminfo_kb(meminfo, b"SwapTotal:")
+        out[3] = (mem_total - available) / mem_total * 100 if mem_total else 0.0
+        out[4] = (swap_total - _meminfo_kb(meminfo, b"SwapFree:")) / swap_total * 100 \
+            if swap_total else 0.0
+        scale = 1024 * elapsed if elapsed > 0 else 0.0
+        disk, net = self._read_disk(), self._read_net()
+        out[5] = (disk[0] - self._disk[0]) / scale if scale else 0.0
+        out[6] = (disk[1] - self._disk[1]) / scale if scale else 0.0
+        out[7] = (net[0] - self._net[0]) / scale if scale else 0.0
+        out[8] = (net[1] - self._net[1]) / scale if scale else 0.0
+        self._disk, self._net = disk, net
+        if self.targets:
+            self._since_scan += elapsed
+            if self._since_scan >= self.rescan:
+                self.scan()
+            out[9], out[10], out[11] = self._sample_processes(elapsed)
+        else:
+            out[9] = out[10] = out[11] = 0.0
+
+    def process_rows(self) -> Iterable[Dict[str, object]]:
+        """Latest per-process figures, busiest first"""
+        for state in sorted(self.processes.values(), key=lambda s: -s.cpu):
+            yield {"pid": state.pid, "name": state.name, "cpu": round(state.cpu, 2),
+                   "rss_mb": round(state.rss_mb, 1)}
@@ -0,0 +1,338 @@
+"""
+Reference parsing for the citation engine
+
+BibTeX files are cut into entries at lines starting with `@` without being
+parsed, so each entry can be hashed on its raw text and parsed only when
+that text is new. CSL-JSON items are hashed on their canonical JSON. Both
+parse into the same compact reference, a dict holding only what the styles
+use:
+
+    key, type, title, authors, editors, year, container, volume, issue,
+    pages, publisher, place, edition, doi, url
+
+Names are [family, given] pairs (given is "" for organisations) and the
+type is one of TYPES. LaTeX markup in BibTeX values is decoded to Unicode.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Any, Dict, Iterator, List, Match, Optional, Tuple
+
+TYPES = ("article", "book", "chapter", "paper", "thesis", "report", "website", "misc")
+BIBTEX_TYPES = {
+    "article": "article", "book": "book", "booklet": "book", "inbook": "chapter",
+    "incollection": "chapter", "inproceedings": "paper", "conference": "paper",
+    "phdthesis": "thesis", "mastersthesis": "thesis", "thesis": "thesis",
+    "techreport": "report", "report": "report", "online": "website", "electronic": "website",
+    "www": "website", "webpage": "website",
+}
+CSL_TYPES = {
+    "article": "article", "article-journal": "article", "article-magazine": "article",
+    "article-newspaper": "article", "book": "book", "chapter": "chapter",
+    "paper-conference": "paper", "thesis": "thesis", "report": "report", "webpage": "website",
+    "post": "website", "post-weblog": "website",
+}
+MONTHS = {m: str(n) for n, m in enumerate(
+    "jan feb mar apr may jun jul aug sep oct nov dec".split(), 1)}
+ACCENTS = {
+    '"': "\u0308", "'": "\u0301", "`": "\u0300", "^": "\u0302", "~": "\u0303", "=": "\u0304",
+    ".": "\u0307", "u": "\u0306", "v": "\u030c", "H": "\u030b", "c": "\u0327", "k": "\u0328",
+    "r": "\u030a",
+}
+SYMBOLS = {
+    "ss": "ß", "o": "ø", "O": "Ø", "ae": "æ", "AE": "Æ", "oe": "œ", "OE": "Œ", "aa": "å",
+    "AA": "Å", "l": "ł", "L": "Ł", "i": "ı", "&": "&", "%": "%", "$": "$", "_": "_", "#": "#",
+    " ": " ",
+    "textendash": "–", "textemdash": "—", "textquoteright": "’", "textquoteleft": "‘",
+    "textquotedblleft": "“", "textquotedblright": "”", "ldots": "…", "dots": "…",
+    "TeX": "TeX", "LaTeX": "LaTeX", "LaTeXe": "LaTeX2ε", "BibTeX": "BibTeX", "XeTeX": "XeTeX",
+    "copyright": "©", "textregistered": "®", "texttrademark": "™", "S": "§", "P": "¶",
+    "pounds": "£", "euro": "€", "textdegree": "°", "textbackslash": "\\",
+    "alpha": "α", "beta": "β", "gamma": "γ", "delta": "δ", "epsilon": "ε", "lambda": "λ",
+    "mu": "μ", "pi": "π", "sigma": "σ", "tau": "τ", "phi": "φ", "omega": "ω",
+}
+# Commands that only format their argument: dropped, their argument is kept.
+# Any other unknown command keeps its name, so no title text goes missing.
+FORMATTING = frozenset(
+    "emph textit textbf textsc textrm texttt textsf textsl textup textmd textnormal "
+    "textsuperscript textsubscript mathrm mathit mathbf mathsf mathtt mathcal ensuremath "
+    "it bf em sc rm tt sf sl up mbox hbox relax protect xspace url nocase noopsort".split())
+ENTRY_START = re.compile(r"^[ \t]*@", re.MULTILINE)
+_ENTRY_HEAD = re.compile(r"@\s*(\w+)\s*[{(]\s*")
+_FIELD_NAME = re.compile(r"\s*,?\s*([^\s=,{}\"#]+)\s*=\s*")
+_SYMBOL_ACCENT = re.compile(r"\\([\"'`^~=.])\s*(?:\{\s*)?(\\?[A-Za-z])(?:\s*\})?")
+_LETTER_ACCENT = re.compile(r"\\([uvHckr])(?:\s*\{\s*(\\?[A-Za-z])\s*\}|\s+([A-Za-z]))")
+_COMMAND = re.compile(r"\\(?:([A-Za-z]+)\s*|([&%$_# ]))")
+_BARE_VALUE = re.compile(r"[^\s,#})]+")
+_CONCAT = re.compile(r"\s*#\s*")
+
+Reference = Dict[str, Any]
+
+
+class ReferenceFileError(Exception):
+    """Raised for unreadable reference files"""
+
+
+def digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def split_bibtex(text: str) -> Iterator[str]:
+    """The raw text of each @-entry, in file order"""
+    starts = [m.end() - 1 for m in ENTRY_START.finditer(text)]
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        yield text[start:end].strip()
+
+
+def entry_kind(raw: str) -> str:
+    """The lowercased @type of a raw BibTeX entry"""
+    match = _ENTRY_HEAD.match(raw)
+    return match.group(1).lower() if match else ""
+
+
+def parse_fields(raw: str, macros: Dict[str, str]) -> Tuple[str, str, Dict[str, str]]:
+    """(type, key, fields) of a raw BibTeX entry; @string entries have no key"""
+    head = _ENTRY_HEAD.match(raw)
+    if not head:
+        raise ReferenceFileError(f"not a BibTeX entry: {raw[:40]!r}")
+    kind, pos = head.group(1).lower(), head.end()
+    key = ""
+    if kind != "string":
+        comma = raw.find(",", pos)
+        if comma < 0:
+            return kind, raw[pos:].strip(" \n})"), {}
+        key, pos = raw[pos:comma].strip(), comma
+    fields: Dict[str, str] = {}
+    while True:
+        match = _FIELD_NAME.match(raw, pos)
+        if not match:
+            break
+        name, pos = match.group(1).lower(), match.end()
+        value, pos = _value(raw, pos, macros)
+        fields[name] = value
+    return kind, key, fields
+
+
+def _value(raw: str, pos: int, macros: Dict[str, str]) -> Tuple[str, int]:
+    """A field value (pieces joined with #) starting at `pos`"""
+    pieces = []
+    while pos < len(raw):
+        char = raw[pos]
+        if char == "{" or char == '"':
+            end = _closing(raw, pos)
+            pieces.append(raw[pos + 1:end])
+            pos = end + 1
+        else:
+            match = _BARE_VALUE.match(raw, pos)
+            if not match:
+                break
+            word = match.group(0)
+            pieces.append(macros.get(word.lower(), MONTHS.get(word.lower(), word)))
+            pos = match.end()
+        hash_sign = _CONCAT.match(raw, pos)
+        if not hash_sign:
+            break
+        pos = hash_sign.end()
+    return "".join(pieces), pos
+
+
+def _closing(raw: str, pos: int) -> int:
+    """Position of the brace or quote closing the one at `pos`"""
+    depth = 0
+    quote = raw[pos] == '"'
+    n = pos + 1 if quote else pos
+    while n < len(raw):
+        char = raw[n]
+        if char == "\\":
+            n += 1  # an escaped brace or quote does not count
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0 and not quote:
+                return n
+        elif char == '"' and quote and depth == 0:
+            return n
+        n += 1
+    raise ReferenceFileError(f"unbalanced braces in {raw[:40]!r}")
+
+
+def decode_latex(text: str) -> str:
+    """Unicode text from a BibTeX value (accents, dashes, braces, commands)"""
+    if "\\" in text:
+        text = _SYMBOL_ACCENT.sub(lambda m: _accent(m.group(1), m.group(2)), text)
+        text = _LETTER_ACCENT.sub(lambda m: _accent(m.group(1), m.group(2) or m.group(3)), text)
+        text = _COMMAND.sub(_command, text)
+    text = text.replace("---", "—").replace("--", "–").replace("~", " ")
+    return " ".join(text.replace("{", "").replace("}", "").split())
+
+
+def _command(match: Match) -> str:
+    name = match.group(1) or match.group(2)
+    if name in SYMBOLS:
+        return SYMBOLS[name]
+    return "" if name in FORMATTING else name
+
+
+def _accent(mark: str, letter: str) -> str:
+    base = "i" if letter == "\\i" else "j" if letter == "\\j" else letter.lstrip("\\")
+    return unicodedata.normalize("NFC", base + ACCENTS[mark])
+
+
+def split_names(value: str) -> List[str]:
+    """Names of a BibTeX author/editor list ("A and B"), ignoring braced 'and's"""
+    names, depth, start = [], 0, 0
+    lower = value.lower()
+    n = 0
+    while n < len(value):
+        char = value[n]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif depth == 0 and char.isspace() and lower.startswith("and", n + 1) and \
+                n + 4 < len(value) and value[n + 4].isspace():
+            names.append(value[start:n])
+            start = n = n + 5
+            continue
+        n += 1
+    names.append(value[start:])
+    return [name.strip() for name in names if name.strip()]
+
+
+def parse_name(name: str) -> List[str]:
+    """[family, given] of one BibTeX name ("Last, First", "First von Last", {Org})"""
+    if name.startswith("{") and name.endswith("}") and _closing(name, 0) == len(name) - 1:
+        return [decode_latex(name), ""]
+    parts = _top_level_split(name, ",")
+    if len(parts) > 1:
+        family = f"{parts[0]}, {parts[1]}" if len(parts) > 2 else parts[0]  # "Last, Jr, First"
+        return [decode_latex(family), decode_latex(parts[-1])]
+    words = _top_level_split(name, " ")
+    if len(words) == 1:
+        return [decode_latex(words[0]), ""]
+    first = len(words) - 1
+    while first > 0 and words[first - 1][:1].islower():
+        first -= 1  # "von", "van der", "de la" belong to the family name
+    return [decode_latex(" ".join(words[first:])), decode_latex(" ".join(words[:first]))]
+
+
+def _top_level_split(text: str, separator: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for n, char in enumerate(text):
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:n])
+            start = n + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _clean(value: Reference) -> Reference:
+    return {name: field for name, field in value.items() if field not in (None, "", [])}
+
+
+def _year(value: Any) -> Optional[int]:
+    match = re.search(r"\d{4}", str(value or ""))
+    return int(match.group(0)) if match else None
+
+
+def from_bibtex(raw: str, macros: Dict[str, str]) -> Optional[Reference]:
+    """The compact reference of a raw BibTeX entry (None for @string/@comment/...)"""
+    kind, key, fields = parse_fields(raw, macros)
+    if kind in ("string", "comment", "preamble"):
+        return None
+    get = fields.get
+    kind = BIBTEX_TYPES.get(kind, "misc")
+    if kind == "misc" and get("url") and not get("publisher"):
+        kind = "website"
+    doi = get("doi", "")
+    return _clean({
+        "key": key,
+        "type": kind,
+        "title": decode_latex(get("title", "")),
+        "authors": [parse_name(n) for n in split_names(get("author", ""))],
+        "editors": [parse_name(n) for n in split_names(get("editor", ""))],
+        "year": _year(get("year") or get("date")),
+        "container": decode_latex(get("journal") or get("journaltitle") or get("booktitle") or
+                                  ("" if kind != "website" else get("howpublished", ""))),
+        "volume": decode_latex(get("volume", "")),
+        "issue": decode_latex(get("number") or get("issue") or ""),
+        "pages": decode_latex(get("pages", "")),
+        "publisher": decode_latex(get("publisher") or get("school") or get("institution") or
+                                  get("organization") or ""),
+        "place": decode_latex(get("address") or get("location") or ""),
+        "edition": decode_latex(get("edition", "")),
+        "doi": re.sub(r"^https?://(dx\.)?doi\.org/", "", doi.strip()),
+        "url": get("url", "").strip(),
+    })
+
+
+def from_csl(item: Dict[str, Any]) -> Reference:
+    """The compact reference of a CSL-JSON item"""
+    def names(role: str) -> List[List[str]]:
+        found = []
+        for name in item.get(role) or ():
+            if isinstance(name, dict):
+                family = name.get("family") or name.get("literal") or ""
+                particle = name.get("non-dropping-particle")
+                found.append([f"{particle} {family}" if particle else family,
+                              name.get("given", "")])
+        return found
+
+    issued = item.get("issued") or {}
+    parts = issued.get("date-parts") if isinstance(issued, dict) else None
+    year = parts[0][0] if parts and parts[0] else (issued.get("raw") if isinstance(
+        issued, dict) else issued)
+    get = item.get
+    return _clean({
+        "key": str(get("id", "")),
+        "type": CSL_TYPES.get(str(get("type", "")), "misc"),
+        "title": str(get("title", "")),
+        "authors": names("author"),
+        "editors": names("editor"),
+        "year": _year(year),
+        "container": str(get("container-title", "")),
+        "volume": str(get("volume", "")),
+        "issue": str(get("issue", "")),
+        "pages": str(get("page", "")).replace("-", "–"),
+        "publisher": str(get("publisher", "")),
+        "place": str(get("publisher-place", "")),
+        "edition": str(get("edition", "")),
+        "doi": str(get("DOI", "")),
+        "url": str(get("URL", "")),
+    })
+
+
+def read_entries(path: str) -> Tuple[str, List[Tuple[str, Any]], Dict[str, str]]:
+    """("bibtex"|"csl", [(hash, raw entry or CSL item)], @string macros) of a file
+
+    A BibTeX entry's hash covers the file's @string macros too, so editing a
+    macro re-parses the entries that might use it.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        text = f.read()
+    if text.lstrip()[:1] in ("[", "{"):
+        try:
+            items = json.loads(text)
+        except ValueError as e:
+            raise ReferenceFileError(f"invalid CSL-JSON in '{path}': {e}")
+        items = items if isinstance(items, list) else [items]
+        return "csl", [(digest(json.dumps(item, sort_keys=True)), item)
+                       for item in items if isinstance(item, dict)], {}
+    raws = list(split_bibtex(text))
+    strings = [raw for raw in raws if entry_kind(raw) == "string"]
+    macros: Dict[str, str] = {}
+    broken = set()
+    for raw in strings:
+        try:
+            macros.update(parse_fields(raw, macros)[2])
+        except ReferenceFileError:
+            broken.add(raw)  # listed with the entries, to be reported when parsed
+    salt = digest("\n".join(strings)) if strings else ""
+    return "bibtex", [(digest(salt + raw), raw) for raw in raws if raw in broken or
+                      entry_kind(raw) not in ("string", "comment", "preamble", "")], macros
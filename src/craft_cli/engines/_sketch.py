@@ -0,0 +1,349 @@
+"""
+Mergeable column sketches for the data engines
+
+Every sketch here can be built from one batch of values and merged with a
+sketch of another batch. Merging is deterministic, so profiling a file's
+partitions in any number of processes and merging the results in partition
+order gives exactly the same numbers as a sequential run.
+
+- Moments: count, min, max, mean and M2 merged with Chan's parallel formula
+- LogHistogram: exact value counts while there are few distinct values,
+  then relative-error log buckets (quantiles and histograms)
+- HyperLogLog: approximate distinct counts with a stable hash
+"""
+import hashlib
+import json
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_encode = json.JSONEncoder(ensure_ascii=False, sort_keys=True).encode
+_NUMBER_START = frozenset("0123456789+-.")
+
+
+class Moments:
+    """Count, extremes, mean and sum of squared deviations of numbers"""
+
+    __slots__ = ("count", "min", "max", "mean", "m2")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def of(cls, values: Sequence[float]) -> 'Moments':
+        """Moments of one batch, computed in two exact-summation passes"""
+        moments = cls()
+        if values:
+            moments.count = len(values)
+            moments.min = min(values)
+            moments.max = max(values)
+            moments.mean = math.fsum(values) / len(values)
+            mean = moments.mean
+            moments.m2 = math.fsum([(v - mean) * (v - mean) for v in values])
+        return moments
+
+    def merge(self, other: 'Moments') -> None:
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.min, self.max = other.count, other.min, other.max
+            self.mean, self.m2 = other.mean, other.m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)  # type: ignore
+        self.max = max(self.max, other.max)  # type: ignore
+
+    @property
+    def stddev(self) -> float:
+        """Population standard deviation"""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+class LogHistogram:
+    """Counts of values in buckets whose width grows with magnitude
+
+    A value v > 0 falls into bucket ceil(log(v) / log(gamma)), so any value
+    reconstructed from its bucket is within `relative_accuracy` of the
+    original. Merging adds bucket counts.
+
+    Until there are more than EXACT_VALUES distinct values their counts are
+    kept too, and quantiles and histograms are exact. Whether that limit is
+    passed depends only on the set of values added, not on how they were
+    split into batches.
+    """
+
+    EXACT_VALUES = 4096
+
+    __slots__ = ("relative_accuracy", "_log_gamma", "positive", "negative", "zeros", "exact")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.positive: Counter = Counter()
+        self.negative: Counter = Counter()
+        self.zeros = 0
+        self.exact: Optional[Counter] = Counter()
+
+    def add_batch(self, values: Iterable[float]) -> None:
+        log, ceil, log_gamma = math.log, math.ceil, self._log_gamma
+        if self.exact is not None:
+            values = list(values)
+            self._add_exact(Counter(values))
+        positive, negative = [], []
+        for v in values:
+            if v > 0:
+                positive.append(v)
+            elif v < 0:
+                negative.append(-v)
+            else:
+                self.zeros += 1
+        self.positive.update([ceil(log(v) / log_gamma) for v in positive])
+        self.negative.update([ceil(log(v) / log_gamma) for v in negative])
+
+    def merge(self, other: 'LogHistogram') -> None:
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zeros += other.zeros
+        if other.exact is None:
+            self.exact = None
+        else:
+            self._add_exact(other.exact)
+
+    def _add_exact(self, counts: Counter) -> None:
+        if self.exact is not None:
+            self.exact.update(counts)
+            if len(self.exact) > self.EXACT_VALUES:
+                self.exact = None
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether quantile() and histogram() use the values themselves"""
+        return self.exact is not None
+
+    def _value(self, key: int) -> float:
+        """Representative value of a positive bucket"""
+        gamma = math.exp(self._log_gamma)
+        return 2 * gamma ** key / (gamma + 1)
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """(representative value, count) in ascending value order"""
+        if self.exact is not None:
+            return sorted(self.exact.items())
+        ordered = [(-self._value(k), c) for k, c in sorted(self.negative.items(), reverse=True)]
+        if self.zeros:
+            ordered.append((0.0, self.zeros))
+        ordered.extend((self._value(k), c) for k, c in sorted(self.positive.items()))
+        return ordered
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = sum(self.positive.values()) + sum(self.negative.values()) + self.zeros
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for value, count in self.buckets():
+            seen += count
+            if seen > rank:
+                return value
+        return None
+
+    def histogram(self, low: float, high: float, bins: int) -> List[int]:
+        """Counts in `bins` equal-width bins over [low, high]"""
+        counts = [0] * bins
+        width = (high - low) / bins if high > low else 0.0
+        for value, count in self.buckets():
+            index = int((min(max(value, low), high) - low) / width) if width else 0
+            counts[min(index, bins - 1)] += count
+        return counts
+
+
+class HyperLogLog:
+    """Approximate distinct count with 2**precision one-byte registers"""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add_batch(self, values: Iterable[str]) -> None:
+        """Add string values; duplicates within the batch are hashed once"""
+        registers, blake2b, from_bytes = self.registers, hashlib.blake2b, int.from_bytes
+        width = 64 - self.precision
+        mask = (1 << width) - 1
+        for value in set(values):
+            # blake2b rather than hash(): str hashes differ between processes
+            h = from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+            index, rest = h >> width, h & mask
+            rank = width - rest.bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / math.fsum([2.0 ** -r for r in self.registers])
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class ColumnSketch:
+    """Everything the profiler tracks about one column
+
+    Values are strings or JSON scalars; None and "" are nulls and are not
+    stored (nulls are derived from the table's row count). Numbers, and
+    strings that parse as finite floats, feed the numeric sketches; all
+    non-null values feed the distinct count and string-length extremes.
+
+    Distinct values are kept exactly until there are more than
+    EXACT_DISTINCT of them and only then hashed into a HyperLogLog. HLL
+    registers depend only on the set of values added, so building one
+    late gives the same registers as building it from the start.
+    """
+
+    EXACT_DISTINCT = 1024
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.numeric = Moments()
+        self.histogram = LogHistogram()
+        self.distinct: Optional[HyperLogLog] = None
+        self.exact: Optional[set] = set()
+        self.min_length: Optional[int] = None
+        self.max_length: Optional[int] = None
+
+    @classmethod
+    def of(cls, values: List[Any]) -> 'ColumnSketch':
+        """Sketch of one batch of a column's values"""
+        sketch = cls()
+        present = [v for v in values if v is not None and v != ""]
+        if not present:
+            return sketch
+        texts = present if set(map(type, present)) == {str} else list(map(_text, present))
+        sketch.count = len(texts)
+        numbers = finite_numbers(present)
+        sketch.numeric = Moments.of(numbers)
+        sketch.histogram.add_batch(numbers)
+        sketch._add_distinct(set(texts))
+        lengths = list(map(len, texts))
+        sketch.min_length, sketch.max_length = min(lengths), max(lengths)
+        return sketch
+
+    def merge(self, other: 'ColumnSketch') -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self.numeric.merge(other.numeric)
+        self.histogram.merge(other.histogram)
+        if other.exact is not None:
+            self._add_distinct(other.exact)
+        else:
+            if self.exact is not None:
+                self.distinct = HyperLogLog()
+                self.distinct.add_batch(self.exact)
+                self.exact = None
+            self.distinct.merge(other.distinct)  # type: ignore
+        self.min_length = _pick(min, self.min_length, other.min_length)
+        self.max_length = _pick(max, self.max_length, other.max_length)
+
+    def _add_distinct(self, values: set) -> None:
+        if self.exact is not None:
+            self.exact |= values
+            if len(self.exact) <= self.EXACT_DISTINCT:
+                return
+            values, self.exact = self.exact, None
+            self.distinct = HyperLogLog()
+        self.distinct.add_batch(values)  # type: ignore
+
+    @property
+    def kind(self) -> str:
+        if not self.count:
+            return "empty"
+        return "numeric" if self.numeric.count == self.count else "string"
+
+    def distinct_count(self) -> Tuple[int, bool]:
+        """(distinct values, whether the count is exact)"""
+        if self.exact is not None:
+            return len(self.exact), True
+        return self.distinct.estimate(), False  # type: ignore
+
+
+class TableSketch:
+    """Row count plus a ColumnSketch per column, in first-seen column order"""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.columns: Dict[str, ColumnSketch] = {}
+
+    @classmethod
+    def of(cls, records: List[Dict[str, Any]]) -> 'TableSketch':
+        """Sketch of one batch of records, computed column by column"""
+        table = cls()
+        table.rows = len(records)
+        names: Dict[str, None] = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+        for name in names:
+            table.columns[name] = ColumnSketch.of([record.get(name) for record in records])
+        return table
+
+    def merge(self, other: 'TableSketch') -> None:
+        self.rows += other.rows
+        for name, sketch in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(sketch)
+            else:
+                self.columns[name] = sketch
+
+
+def _pick(func, a, b):
+    if a is None:
+        return b
+    return a if b is None else func(a, b)
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return _encode(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def finite_numbers(values: List[Any]) -> List[float]:
+    """Finite numeric values of a batch; strings are parsed, bools are not numbers"""
+    if bool not in set(map(type, values)):
+        try:
+            # Whole-batch conversion runs in C; fall back per value on the first failure
+            return list(filter(math.isfinite, map(float, values)))
+        except (TypeError, ValueError):
+            pass
+    numbers = []
+    for value in values:
+        if isinstance(value, str):
+            if value[0] not in _NUMBER_START:
+                continue
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        if math.isfinite(number):
+            numbers.append(number)
+    return numbers
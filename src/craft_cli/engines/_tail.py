@@ -0,0 +1,287 @@
+"""
+Tailing and line parsing for `craft devops logs --follow`
+
+- Watchers wake the follow loop when a watched directory changes: inotify
+  (through ctypes, Linux only) or plain polling everywhere else.
+- A Tailer follows one path across rotation (the path now names another
+  file) and truncation (copytruncate), assembling complete entries: a line
+  that starts a record plus its continuation lines.
+- parse_entry() understands JSON lines, ISO-timestamped lines, the Common/
+  Combined Log Format of web servers and classic syslog lines.
+
+Memory is bounded: a tailer reads at most `read_bytes` per turn and an
+entry longer than `max_entry_bytes` is cut short.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import re
+import select
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from ._logindex import LEVEL_RE, LEVEL_WORDS, TIMESTAMP_RE, level_name
+
+DEFAULT_READ_BYTES = 64 << 10
+DEFAULT_MAX_ENTRY_BYTES = 64 << 10
+POLL_INTERVAL = 0.25
+
+CLF_RE = re.compile(
+    rb'^(\S+) (\S+) (\S+) \[([^\]]+)\] "([^"]*)" (\d{3}) (\S+)(?: "([^"]*)" "([^"]*)")?'
+)
+SYSLOG_RE = re.compile(
+    rb"^([A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (\S+) ([^:\[\s]+)(?:\[(\d+)\])?: ?(.*)"
+)
+_JSON_TIME_KEYS = ("timestamp", "@timestamp", "time", "ts")
+_JSON_LEVEL_KEYS = ("level", "severity", "lvl", "levelname")
+_JSON_MESSAGE_KEYS = ("message", "msg")
+
+_IN_MODIFY, _IN_ATTRIB, _IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+_IN_MOVED_FROM, _IN_MOVED_TO, _IN_CREATE, _IN_DELETE = 0x40, 0x80, 0x100, 0x200
+_IN_NONBLOCK, _IN_CLOEXEC = 0o4000, 0o2000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE)
+
+
+class PollWatcher:
+    """Wakes up every POLL_INTERVAL seconds; works on any platform"""
+
+    kind = "poll"
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(max(0.0, min(timeout, POLL_INTERVAL)))
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Wakes up as soon as anything changes in the watched directories"""
+
+    kind = "inotify"
+
+    def __init__(self, directories: List[str]) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK) < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed", directory)
+
+    def wait(self, timeout: float) -> None:
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if ready:
+            self._drain()
+
+    def _drain(self) -> None:
+        """Discard queued events; the tailers stat their files themselves"""
+        while True:
+            try:
+                if not os.read(self.fd, 65536):
+                    return
+            except BlockingIOError:
+                return
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(paths: List[str], use_inotify: bool = True):
+    """An inotify watcher on the paths' directories, or a poller if unavailable"""
+    if use_inotify and sys.platform.startswith("linux"):
+        directories = sorted({os.path.dirname(os.path.abspath(p)) for p in paths})
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+    return PollWatcher()
+
+
+def entry_kind(line: bytes) -> Optional[str]:
+    """Layout of a line that begins a record: json, iso, clf or syslog
+
+    None means the line continues the previous record (or stands alone).
+    """
+    if line[:1] == b"{":
+        return "json"
+    if TIMESTAMP_RE.match(line):
+        return "iso"
+    if CLF_RE.match(line):
+        return "clf"
+    if SYSLOG_RE.match(line):
+        return "syslog"
+    return None
+
+
+def parse_entry(raw: bytes, kind: Optional[str] = None) -> Tuple[
+        Optional[str], Optional[str], str, Optional[Dict[str, Any]]]:
+    """(timestamp, level, message, fields) of one entry's text
+
+    JSON lines yield their own fields; web server and syslog lines yield the
+    parts of their fixed layout. The level of a request is taken from its
+    HTTP status.
+    """
+    first_line = raw.split(b"\n", 1)[0]
+    kind = kind or entry_kind(first_line)
+    text = raw.decode("utf-8", "replace").rstrip("\r\n")
+    if kind == "iso":
+        match = TIMESTAMP_RE.match(first_line)
+        word = LEVEL_RE.search(first_line, match.end())
+        return (first_line[match.start(1):match.end()].decode("ascii"),
+                level_name(word.group(1)) if word else None, text, None)
+    if kind == "json":
+        try:
+            record = json.loads(text.split("\n", 1)[0])
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            stamp = next((record[k] for k in _JSON_TIME_KEYS if k in record), None)
+            level = next((record[k] for k in _JSON_LEVEL_KEYS if k in record), None)
+            message = next((record[k] for k in _JSON_MESSAGE_KEYS if k in record), text)
+            if isinstance(level, str):
+                level = LEVEL_WORDS.get(level.lower().encode(), level.lower())
+            return (None if stamp is None else str(stamp),
+                    level if isinstance(level, str) else None, str(message), record)
+    match = CLF_RE.match(first_line) if kind in ("clf", None) else None
+    if match:
+        remote, _, user, stamp, request, status, size, referer, agent = (
+            part.decode("utf-8", "replace") if part is not None else None
+            for part in match.groups()
+        )
+        try:
+            stamp = datetime.strptime(stamp, "%d/%b/%Y:%H:%M:%S %z").isoformat()
+        except ValueError:
+            pass
+        code = int(status)
+        fields: Dict[str, Any] = {"remote": remote, "user": None if user == "-" else user,
+                                  "request": request, "status": code,
+                                  "bytes": int(size) if size.isdigit() else None}
+        if agent is not None:
+            fields.update(referer=referer, agent=agent)
+        level = "error" if code >= 500 else "warn" if code >= 400 else "info"
+        return stamp, level, text, fields
+    match = SYSLOG_RE.match(first_line) if kind in ("syslog", None) else None
+    if match:
+        stamp, host, program, pid, message = (
+            part.decode("utf-8", "replace") if part is not None else None
+            for part in match.groups()
+        )
+        word = LEVEL_RE.search(match.group(5))
+        fields = {"host": host, "program": program, "pid": int(pid) if pid else None}
+        return stamp, level_name(word.group(1)) if word else None, text, fields
+    word = LEVEL_RE.search(first_line)
+    return None, level_name(word.group(1)) if word else None, text, None
+
+
+class Tailer:
+    """Follows one log path and hands out complete entries as they are written"""
+
+    def __init__(self, path: str, from_start: bool = False,
+                 max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES) -> None:
+        self.path = path
+        self.max_entry_bytes = max_entry_bytes
+        self.file = None
+        self.identity: Optional[Tuple[int, int]] = None
+        self.position = 0
+        self.partial = b""
+        self.entry: List[bytes] = []
+        self.entry_offset = 0
+        self.entry_bytes = 0
+        self.entry_kind: Optional[str] = None
+        self.last_data = time.monotonic()
+        self.rotations = 0
+        self.truncated = 0
+        self._open(from_start)
+
+    def _open(self, from_start: bool) -> None:
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            self.file, self.identity, self.position = None, None, 0
+            return
+        st = os.fstat(self.file.fileno())
+        self.identity = (st.st_dev, st.st_ino)
+        self.position = 0 if from_start else self.file.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.entry or self.partial)
+
+    def read(self, max_bytes: int = DEFAULT_READ_BYTES) -> List[Tuple[int, bytes, Optional[str]]]:
+        """Complete entries among at most `max_bytes` of new data
+
+        Each is (offset, text, kind); see entry_kind().
+        """
+        entries: List[Tuple[int, bytes, Optional[str]]] = []
+        data = self.file.read(max_bytes) if self.file is not None else b""
+        if not data:
+            if not self._reopen_if_replaced():
+                return entries
+            if self.entry:
+                entries.append(self._take())  # the old file's last entry is complete
+            data = self.file.read(max_bytes) if self.file is not None else b""
+            if not data:
+                return entries
+        start = self.position - len(self.partial)
+        self.position += len(data)
+        self.last_data = time.monotonic()
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        if len(self.partial) > self.max_entry_bytes:
+            lines.append(self.partial)  # an endless line: hand it over in pieces
+            self.partial = b""
+        for line in lines:
+            size = len(line) + 1
+            kind = entry_kind(line)
+            if kind is not None or self.entry_kind is None:
+                if self.entry:
+                    entries.append(self._take())
+                self.entry_offset, self.entry_kind = start, kind
+                self.entry, self.entry_bytes = [line[:self.max_entry_bytes]], size
+            elif self.entry_bytes + size <= self.max_entry_bytes:
+                self.entry.append(line)
+                self.entry_bytes += size
+            start += size
+        if self.entry and self.entry_kind is None:
+            entries.append(self._take())
+        return entries
+
+    def flush(self, idle: float = 0.0) -> List[Tuple[int, bytes, Optional[str]]]:
+        """Hand over the pending entry once no data arrived for `idle` seconds"""
+        if not self.entry or time.monotonic() - self.last_data < idle:
+            return []
+        return [self._take()]
+
+    def _take(self) -> Tuple[int, bytes, Optional[str]]:
+        entry = (self.entry_offset, b"\n".join(self.entry), self.entry_kind)
+        self.entry, self.entry_bytes, self.entry_kind = [], 0, None
+        return entry
+
+    def _reopen_if_replaced(self) -> bool:
+        """After EOF: follow a rotated path to its new file, or a truncated file to 0"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (st.st_dev, st.st_ino) != self.identity:
+            self.close()
+            self._open(from_start=True)
+            self.rotations += 1
+        elif st.st_size < self.position:
+            self.file.seek(0)
+            self.position = 0
+            self.truncated += 1
+        else:
+            return False
+        self.partial = b""
+        return True
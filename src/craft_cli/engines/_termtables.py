@@ -0,0 +1,258 @@
+"""
+Time-bucketed term tables for the trends engine
+
+A table directory holds `manifest.json`, the vocabulary (`terms.txt`, one
+term per line; a term's id is its line number) and table files:
+
+- one file per calendar month (`m<YYYYMM>-<version>.tt`), with a sparse
+  table per source: the number of documents of that source dated in the
+  month, and for every term the number of those documents containing it
+  (parallel uint32 runs of term ids and counts);
+- cached period tables (`p<version>.tt`): the months of a quarter or year
+  (or one month), summed over the sources a query selects.
+
+Month tables are rewritten, under a new version, whenever documents are
+added to or recounted for their month. A period table records the versions
+of the month tables it was summed from and is reused while they match, so
+a different timeframe or interval never touches the corpus and only closed
+periods (those before the newest month) are written at all. Numbers are
+stored in native byte order: the tables are a local cache of a corpus, not
+an exchange format.
+"""
+import json
+import os
+import struct
+from array import array
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+TABLES_VERSION = 1
+MAGIC = b"CTRM"
+MANIFEST = "manifest.json"
+VOCABULARY = "terms.txt"
+HEADER = struct.Struct("<4sII")
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+Table = Tuple[int, array, array]  # documents, term ids, document counts
+
+
+class TableFormatError(Exception):
+    """Raised for table files this version cannot read"""
+
+
+def write_tables(path: str, tables: Dict[str, Tuple[int, Dict[int, int]]]) -> None:
+    """Write {name: (documents, {term id: count})} to `path`"""
+    runs = [(name, docs, array("I", counts.keys()), array("I", counts.values()))
+            for name, (docs, counts) in tables.items()]
+    header = _encode([[name, docs, len(ids)] for name, docs, ids, _ in runs]).encode("utf-8")
+    header += b" " * (-len(header) % 4)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, TABLES_VERSION, len(header)))
+        f.write(header)
+        for _, _, ids, counts in runs:
+            f.write(ids.tobytes())
+            f.write(counts.tobytes())
+    os.replace(tmp, path)
+
+
+def read_tables(path: str) -> Dict[str, Table]:
+    """{name: (documents, term ids, counts)} from a table file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise TableFormatError(f"truncated table file '{path}'")
+    magic, version, size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != TABLES_VERSION:
+        raise TableFormatError(f"'{path}' is not a version {TABLES_VERSION} term table")
+    tables, pos = {}, HEADER.size + size
+    for name, docs, length in json.loads(data[HEADER.size:pos]):
+        ids, counts = array("I"), array("I")
+        ids.frombytes(data[pos:pos + 4 * length])
+        counts.frombytes(data[pos + 4 * length:pos + 8 * length])
+        if len(counts) != length:
+            raise TableFormatError(f"truncated table file '{path}'")
+        tables[name] = (docs, ids, counts)
+        pos += 8 * length
+    return tables
+
+
+def _add(total: Dict[int, int], ids: Iterable[int], counts: Iterable[int]) -> None:
+    get = total.get
+    for term, count in zip(ids, counts):
+        total[term] = get(term, 0) + count
+
+
+class TermTables:
+    """The manifest of a table directory, and access to its tables"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.counter = 0
+        self.terms: List[str] = []
+        self.saved_terms = 0
+        self.files: Dict[str, Dict[str, Any]] = {}  # rel -> size, mtime, tail, months
+        self.months: Dict[int, Dict[str, Any]] = {}  # YYYYMM -> version, docs per source
+        self.periods: Dict[str, Dict[str, Any]] = {}  # key -> versions, docs, file
+        self.stale: List[str] = []  # table files to remove once the manifest is saved
+        self.changed = False
+        self._ids: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def load(cls, directory: str) -> 'TermTables':
+        """The saved tables, or empty ones if there are none (or they are outdated)"""
+        tables = cls(directory)
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or data.get("version") != TABLES_VERSION:
+                return tables
+            with open(os.path.join(directory, VOCABULARY), encoding="utf-8") as f:
+                terms = f.read().split("\n")[:data["terms"]]
+        except (OSError, ValueError):
+            return tables
+        if len(terms) < data["terms"]:
+            return tables
+        tables.counter = data["counter"]
+        tables.terms, tables.saved_terms = terms, len(terms)
+        tables.files = data["files"]
+        tables.months = {int(month): entry for month, entry in data["months"].items()}
+        tables.periods = data["periods"]
+        return tables
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if len(self.terms) != self.saved_terms:
+            path = os.path.join(self.directory, VOCABULARY)
+            tmp = f"{path}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("\n".join(self.terms))
+            os.replace(tmp, path)
+            self.saved_terms = len(self.terms)
+        data = {
+            "version": TABLES_VERSION,
+            "counter": self.counter,
+            "terms": len(self.terms),
+            "files": self.files,
+            "months": {str(month): entry for month, entry in sorted(self.months.items())},
+            "periods": self.periods,
+        }
+        path = os.path.join(self.directory, MANIFEST)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        self.changed = False
+
+    def remove_stale(self) -> None:
+        for name in self.stale:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        self.stale = []
+
+    def reset(self) -> None:
+        """Forget every table, to count the corpus from scratch"""
+        self.stale += [self.month_file(month) for month in self.months]
+        self.stale += [entry["file"] for entry in self.periods.values()]
+        self.terms, self.saved_terms, self._ids = [], -1, None  # -1: rewrite the vocabulary
+        self.files, self.months, self.periods = {}, {}, {}
+        self.changed = True
+
+    @property
+    def ids(self) -> Dict[str, int]:
+        """Term -> id"""
+        if self._ids is None:
+            self._ids = {term: n for n, term in enumerate(self.terms)}
+        return self._ids
+
+    @property
+    def newest(self) -> int:
+        """The latest month (YYYYMM) with documents, 0 if there is none"""
+        return max(self.months, default=0)
+
+    def sources(self, month: int) -> Dict[str, int]:
+        """Documents per source in `month`"""
+        entry = self.months.get(month)
+        return entry["docs"] if entry else {}
+
+    def month_file(self, month: int) -> str:
+        return f"m{month}-{self.months[month]['version']}.tt"
+
+    def month_tables(self, month: int) -> Dict[str, Table]:
+        if month not in self.months:
+            return {}
+        return read_tables(os.path.join(self.directory, self.month_file(month)))
+
+    def drop_months(self, months: Iterable[int]) -> None:
+        """Forget the tables of `months`, whose documents are about to be recounted"""
+        for month in months:
+            if month in self.months:
+                self.stale.append(self.month_file(month))
+                del self.months[month]
+                self.changed = True
+
+    def add_counts(self, counts: Dict[Tuple[int, str], Counter],
+                   docs: Dict[Tuple[int, str], int]) -> None:
+        """Add (month, source) -> {term: documents} counts into the month tables"""
+        ids, terms = self.ids, self.terms
+        by_month: Dict[int, List[str]] = {}
+        for month, source in counts:
+            by_month.setdefault(month, []).append(source)
+        os.makedirs(self.directory, exist_ok=True)
+        for month, sources in sorted(by_month.items()):
+            tables = {name: (n, dict(zip(term_ids, term_counts)))
+                      for name, (n, term_ids, term_counts) in self.month_tables(month).items()}
+            for source in sources:
+                n, total = tables.get(source, (0, {}))
+                counter = counts[month, source]
+                for term in sorted(counter.keys() - ids.keys()):
+                    ids[term] = len(terms)
+                    terms.append(term)
+                term_ids = map(ids.__getitem__, counter)
+                if total:
+                    _add(total, term_ids, counter.values())
+                else:
+                    total = dict(zip(term_ids, counter.values()))
+                tables[source] = (n + docs[month, source], total)
+            if month in self.months:
+                self.stale.append(self.month_file(month))
+            self.counter += 1
+            self.months[month] = {"version": self.counter,
+                                  "docs": {name: n for name, (n, _) in sorted(tables.items())}}
+            write_tables(os.path.join(self.directory, self.month_file(month)), tables)
+        self.changed = True
+
+    def period_table(self, key: str, months: List[int], wanted: Callable[[str], bool],
+                     cache: bool) -> Tuple[int, Dict[int, int], bool]:
+        """(documents, {term id: count}, from cache) summed over `months` and wanted sources
+
+        With `cache`, the sum is kept under `key` until a month table changes.
+        """
+        versions = [self.months[month]["version"] for month in months if month in self.months]
+        entry = self.periods.get(key)
+        if entry and entry["versions"] == versions:
+            docs, ids, counts = read_tables(os.path.join(self.directory, entry["file"]))[key]
+            return docs, dict(zip(ids, counts)), True
+        docs, total = 0, {}
+        for month in months:
+            if not any(map(wanted, self.sources(month))):
+                continue
+            for source, (n, ids, counts) in self.month_tables(month).items():
+                if wanted(source):
+                    docs += n
+                    if total:
+                        _add(total, ids, counts)
+                    else:
+                        total = dict(zip(ids, counts))
+        if cache:
+            if entry:
+                self.stale.append(entry["file"])
+            self.counter += 1
+            name = f"p{self.counter}.tt"
+            os.makedirs(self.directory, exist_ok=True)
+            write_tables(os.path.join(self.directory, name), {key: (docs, total)})
+            self.periods[key] = {"versions": versions, "docs": docs, "file": name}
+            self.changed = True
+        return docs, total, False
@@ -0,0 +1,116 @@
+"""
+SVG charts for the trends engine
+
+Two self-contained pictures, written as SVG text so they need no plotting
+library: a line chart of term rates (documents per 1,000) over periods, with
+burst periods marked, and a network of terms whose rates move together.
+`html_page` wraps either in a page with the numbers as a table.
+"""
+import math
+from html import escape
+from typing import List, Sequence, Tuple
+
+PALETTE = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2",
+           "#17becf", "#7f7f7f", "#bcbd22")
+WIDTH, HEIGHT = 860, 440
+FONT = 'font-family="Helvetica, Arial, sans-serif"'
+
+
+def _svg(body: List[str], title: str, height: int = HEIGHT) -> str:
+    return "\n".join([
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{height}" '
+        f'viewBox="0 0 {WIDTH} {height}" {FONT} font-size="12">',
+        f'<rect width="{WIDTH}" height="{height}" fill="white"/>',
+        f'<text x="{WIDTH // 2}" y="22" text-anchor="middle" font-size="15">{escape(title)}</text>',
+        *body, "</svg>", ""])
+
+
+def _tick(value: float) -> str:
+    return f"{value:.0f}" if value >= 10 else f"{value:.1f}" if value >= 1 else f"{value:.2f}"
+
+
+def line_chart(title: str, labels: Sequence[str],
+               series: Sequence[Tuple[str, Sequence[float], Sequence[bool]]]) -> str:
+    """Lines of (name, rate per period, burst per period)"""
+    left, right, top, bottom = 60, 170, 40, 60
+    plot_w, plot_h = WIDTH - left - right, HEIGHT - top - bottom
+    peak = max((max(rates, default=0.0) for _, rates, _ in series), default=0.0) or 1.0
+    step = plot_w / max(len(labels) - 1, 1)
+
+    def point(n: int, rate: float) -> Tuple[float, float]:
+        return left + n * step, top + plot_h * (1 - rate / peak)
+
+    body = [f'<line x1="{left}" y1="{top + plot_h}" x2="{left + plot_w}" y2="{top + plot_h}" '
+            'stroke="#444"/>',
+            f'<line x1="{left}" y1="{top}" x2="{left}" y2="{top + plot_h}" stroke="#444"/>',
+            f'<text x="16" y="{top + plot_h // 2}" transform="rotate(-90 16 {top + plot_h // 2})"'
+            ' text-anchor="middle">documents per 1,000</text>']
+    for n in range(5):
+        value = peak * n / 4
+        _, y = point(0, value)
+        body.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_w}" y2="{y:.1f}" '
+                    'stroke="#eee"/>')
+        body.append(f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end">{_tick(value)}</text>')
+    every = max(1, math.ceil(len(labels) / 12))
+    for n, label in enumerate(labels):
+        if n % every == 0 or n == len(labels) - 1:
+            x, _ = point(n, 0)
+            body.append(f'<text x="{x:.1f}" y="{top + plot_h + 18}" text-anchor="end" '
+                        f'transform="rotate(-35 {x:.1f} {top + plot_h + 18})">'
+                        f'{escape(label)}</text>')
+    for k, (name, rates, bursts) in enumerate(series):
+        color = PALETTE[k % len(PALETTE)]
+        points = " ".join("%.1f,%.1f" % point(n, rate) for n, rate in enumerate(rates))
+        body.append(f'<polyline points="{points}" fill="none" stroke="{color}" '
+                    'stroke-width="2"/>')
+        for n, (rate, burst) in enumerate(zip(rates, bursts)):
+            if burst:
+                x, y = point(n, rate)
+                body.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4" fill="{color}">'
+                            f'<title>{escape(name)}: burst in {escape(labels[n])}</title>'
+                            '</circle>')
+        y = top + 10 + 18 * k
+        body.append(f'<line x1="{WIDTH - right + 16}" y1="{y}" x2="{WIDTH - right + 36}" '
+                    f'y2="{y}" stroke="{color}" stroke-width="2"/>')
+        body.append(f'<text x="{WIDTH - right + 42}" y="{y + 4}">{escape(name)}</text>')
+    return _svg(body, title)
+
+
+def network(title: str, nodes: Sequence[Tuple[str, int]],
+            edges: Sequence[Tuple[int, int, float]]) -> str:
+    """Nodes of (name, documents) on a circle; edges of (node, node, correlation)"""
+    cx, cy, radius = WIDTH / 2, HEIGHT / 2 + 12, min(WIDTH, HEIGHT) / 2 - 70
+    largest = max((docs for _, docs in nodes), default=1) or 1
+    places = [(cx + radius * math.cos(2 * math.pi * n / len(nodes) - math.pi / 2),
+               cy + radius * math.sin(2 * math.pi * n / len(nodes) - math.pi / 2))
+              for n in range(len(nodes))]
+    body = []
+    for a, b, r in edges:
+        (x1, y1), (x2, y2) = places[a], places[b]
+        body.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+                    f'stroke="#888" stroke-opacity="{0.3 + 0.7 * max(r, 0):.2f}" '
+                    f'stroke-width="{1 + 4 * max(r, 0):.1f}"><title>{escape(nodes[a][0])} – '
+                    f'{escape(nodes[b][0])}: r = {r:.2f}</title></line>')
+    for n, ((name, docs), (x, y)) in enumerate(zip(nodes, places)):
+        size = 6 + 18 * math.sqrt(docs / largest)
+        anchor = "start" if x >= cx else "end"
+        offset = size + 4 if x >= cx else -size - 4
+        body.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{size:.1f}" '
+                    f'fill="{PALETTE[n % len(PALETTE)]}" fill-opacity="0.85">'
+                    f'<title>{escape(name)}: {docs:,} documents</title></circle>')
+        body.append(f'<text x="{x + offset:.1f}" y="{y + 4:.1f}" text-anchor="{anchor}">'
+                    f'{escape(name)}</text>')
+    return _svg(body, title)
+
+
+def html_page(title: str, svg: str, headers: Sequence[str], rows: Sequence[Sequence]) -> str:
+    """A page with the picture and its numbers"""
+    head = "".join(f"<th>{escape(str(h))}</th>" for h in headers)
+    body = "\n".join("<tr>" + "".join(f"<td>{escape(str(cell))}</td>" for cell in row) + "</tr>"
+                     for row in rows)
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{escape(title)}"
+            "</title>\n<style>body{font-family:Helvetica,Arial,sans-serif;margin:2em}"
+            "table{border-collapse:collapse;margin-top:1em}td,th{padding:2px 10px;"
+            "text-align:right;border-bottom:1px solid #ddd}td:first-child,th:first-child"
+            "{text-align:left}</style></head><body>\n"
+            f"{svg}<table>\n<tr>{head}</tr>\n{body}\n</table>\n</body></html>\n")
@@ -0,0 +1,362 @@
+"""
+Citation formatting for `craft research cite`
+
+Formats the entries of BibTeX (.bib) and CSL-JSON files in APA, MLA,
+Chicago (author-date) or IEEE style, one reference per line or, with
+--bibliography, as a sorted (IEEE: numbered) reference list in plain text,
+LaTeX or Word (.docx).
+
+Each reference file gets a sidecar cache (`<file>.ccache`): per entry,
+keyed by a hash of the entry's raw text, the compact parsed reference (see
+`_references`) and its rendering in each style used so far (see
+`_citestyles`). Regenerating a bibliography only parses and renders the
+entries that were added or edited since the last run; everything else is
+read back from the cache. Misses are formatted in batches across --jobs
+worker processes.
+
+    python -m craft_cli.engines.cite refs.bib --style=apa --bibliography --output=references.txt
+    python -m craft_cli.engines.cite library.json --style=ieee --bibliography --export=latex
+    python -m craft_cli.engines.cite refs.bib --keys=knuth84,vaswani2017 --style=mla
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import zipfile
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from xml.sax.saxutils import escape
+
+from ._citestyles import HEADINGS, STYLES, Runs, sort_key
+from ._parallel import ordered_map, resolve_jobs
+from ._references import (
+    TYPES, Reference, ReferenceFileError, from_bibtex, from_csl, read_entries
+)
+
+CACHE_SUFFIX = ".ccache"
+CACHE_VERSION = 2
+EXPORTS = ("txt", "latex", "docx")
+BATCH_ENTRIES = 250
+_LATEX_SPECIALS = {
+    "\\": r"\textbackslash{}", "&": r"\&", "%": r"\%", "$": r"\$", "#": r"\#", "_": r"\_",
+    "{": r"\{", "}": r"\}", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}",
+}
+_LATEX_TABLE = str.maketrans(_LATEX_SPECIALS)
+
+
+class CiteError(Exception):
+    """Raised for missing reference files and invalid options"""
+
+
+class CiteStats:
+    """Where each formatted entry came from"""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.entries = 0
+        self.parsed = 0
+        self.skipped = 0
+        self.rendered = 0
+        self.cached = 0
+
+
+class CiteCache:
+    """Parsed references and their renderings, keyed by entry hash
+
+    `entries` maps a hash to [reference, {style: runs}].
+    """
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.entries: Dict[str, List[Any]] = {}
+        self.keep: Set[str] = set()  # the hashes in the file right now
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'CiteCache':
+        """The saved cache, or an empty one if it is missing, unreadable or outdated"""
+        cache = cls(path)
+        if path is None:
+            return cache
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            cache.entries = data["entries"]
+        return cache
+
+    def save(self) -> None:
+        """Write the cache, without entries that are no longer in the file"""
+        stale = set(self.entries) - self.keep
+        if self.path is None or not (self.dirty or stale):
+            return
+        for digest in stale:
+            del self.entries[digest]
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": self.entries}, f,
+                          ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"WARNING: could not save cache {self.path}: {e.strerror or e}",
+                  file=sys.stderr)
+
+
+class Entry(NamedTuple):
+    """One reference and the cache that holds it"""
+    cache: CiteCache
+    digest: str
+    ref: Reference
+
+
+def cache_path(path: str, cache_dir: Optional[str] = None) -> str:
+    """Sidecar cache location: next to the file, or a per-path name in `cache_dir`"""
+    if cache_dir is None:
+        return path + CACHE_SUFFIX
+    digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=6).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.basename(path)}-{digest}{CACHE_SUFFIX}")
+
+
+def _parse_batch(task: Tuple[str, Dict[str, str], List[Tuple[str, Any]]]):
+    """[(hash, reference or None, error or None)] of a batch of raw entries"""
+    kind, macros, items = task
+    if kind == "csl":
+        return [(digest, from_csl(item), None) for digest, item in items]
+    parsed = []
+    for digest, raw in items:
+        try:
+            parsed.append((digest, from_bibtex(raw, macros), None))
+        except ReferenceFileError as e:
+            parsed.append((digest, None, str(e)))
+    return parsed
+
+
+def _render_batch(task: Tuple[str, List[Reference]]) -> List[Runs]:
+    style, refs = task
+    return [STYLES[style](ref) for ref in refs]
+
+
+def _batches(items: List[Any]) -> List[List[Any]]:
+    return [items[n:n + BATCH_ENTRIES] for n in range(0, len(items), BATCH_ENTRIES)]
+
+
+def parse_file(path: str, cache: CiteCache, jobs: int = 1,
+               stats: Optional[CiteStats] = None) -> List[Entry]:
+    """The entries of a reference file in file order, parsing only uncached ones
+
+    Malformed entries are skipped with a warning (and never cached, so they
+    are reported again until they are fixed).
+    """
+    stats = stats or CiteStats()
+    kind, raw_entries, macros = read_entries(path)
+    missing = [(digest, raw) for digest, raw in raw_entries if digest not in cache.entries]
+    batches = [(kind, macros, batch) for batch in _batches(missing)]
+    skipped = set()
+    for parsed in ordered_map(_parse_batch, batches, jobs if len(batches) > 1 else 1):
+        for digest, ref, error in parsed:
+            if error is None:
+                cache.entries[digest] = [ref, {}]
+            else:
+                print(f"WARNING: skipping an entry of '{path}': {error}", file=sys.stderr)
+                skipped.add(digest)
+    cache.dirty = cache.dirty or len(missing) > len(skipped)
+    stats.files += 1
+    stats.entries += len(raw_entries)
+    stats.parsed += len(missing) - len(skipped)
+    stats.skipped += len(skipped)
+    raw_entries = [(digest, raw) for digest, raw in raw_entries if digest not in skipped]
+    cache.keep = {digest for digest, _ in raw_entries}
+    return [Entry(cache, digest, cache.entries[digest][0]) for digest, _ in raw_entries]
+
+
+def render(entries: List[Entry], style: str, jobs: int = 1,
+           stats: Optional[CiteStats] = None) -> List[Runs]:
+    """The runs of each entry in `style`, rendering only uncached ones"""
+    stats = stats or CiteStats()
+    missing = [entry for entry in entries if style not in entry.cache.entries[entry.digest][1]]
+    batches = _batches(missing)
+    tasks = [(style, [entry.ref for entry in batch]) for batch in batches]
+    for batch, rendered in zip(batches, ordered_map(_render_batch, tasks,
+                                                    jobs if len(tasks) > 1 else 1)):
+        for entry, runs in zip(batch, rendered):
+            entry.cache.entries[entry.digest][1][style] = runs
+            entry.cache.dirty = True
+    stats.rendered += len(missing)
+    stats.cached += len(entries) - len(missing)
+    return [entry.cache.entries[entry.digest][1][style] for entry in entries]
+
+
+def select(entries: List[Entry], types: Optional[List[str]] = None,
+           keys: Optional[List[str]] = None) -> List[Entry]:
+    """Entries of the given types and/or keys (in the order of `keys`, if given)"""
+    if types:
+        entries = [entry for entry in entries if entry.ref.get("type") in types]
+    if keys:
+        by_key = {entry.ref.get("key"): entry for entry in entries}
+        unknown = [key for key in keys if key not in by_key]
+        if unknown:
+            raise CiteError(f"no entry with key '{unknown[0]}'")
+        entries = [by_key[key] for key in keys]
+    return entries
+
+
+def bibliography(entries: List[Entry], style: str) -> List[Entry]:
+    """A reference list: one entry per key, sorted by author (IEEE: first appearance)"""
+    seen: Set[str] = set()
+    unique = []
+    for entry in entries:
+        key = entry.ref.get("key", "")
+        if key not in seen or not key:
+            seen.add(key)
+            unique.append(entry)
+    return unique if style == "ieee" else sorted(unique, key=lambda entry: sort_key(entry.ref))
+
+
+def _labels(count: int, style: str) -> List[str]:
+    return [f"[{n}] " for n in range(1, count + 1)] if style == "ieee" else [""] * count
+
+
+def _latex(runs: Runs) -> str:
+    return "".join(f"\\textit{{{text.translate(_LATEX_TABLE)}}}" if n % 2 else
+                   text.translate(_LATEX_TABLE) for n, text in enumerate(runs) if text)
+
+
+def render_text(entries: List[Tuple[Reference, Runs]], style: str, export: str,
+                heading: bool) -> Iterator[str]:
+    """Lines of a plain-text or LaTeX reference list"""
+    labels = _labels(len(entries), style)
+    if export == "latex":
+        if heading:
+            yield f"\\begin{{thebibliography}}{{{len(entries)}}}"
+            for ref, runs in entries:
+                yield f"\\bibitem{{{ref.get('key', '')}}} {_latex(runs)}"
+            yield "\\end{thebibliography}"
+        else:
+            yield from (label + _latex(runs) for label, (_, runs) in zip(labels, entries))
+        return
+    if heading:
+        yield HEADINGS[style]
+        yield ""
+    for label, (_, runs) in zip(labels, entries):
+        yield label + "".join(runs)
+
+
+def write_docx(path: str, entries: List[Tuple[Reference, Runs]], style: str,
+               heading: bool) -> None:
+    """A minimal Word document: one paragraph per reference, with hanging indents"""
+    def run(text: str, italic: bool = False, bold: bool = False) -> str:
+        props = ("<w:b/>" if bold else "") + ("<w:i/>" if italic else "")
+        props = f"<w:rPr>{props}</w:rPr>" if props else ""
+        return f'<w:r>{props}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+
+    indent = '<w:pPr><w:ind w:left="720" w:hanging="720"/></w:pPr>'
+    paragraphs = [f"<w:p>{run(HEADINGS[style], bold=True)}</w:p>"] if heading else []
+    for label, (_, runs) in zip(_labels(len(entries), style), entries):
+        body = run(label) if label else ""
+        body += "".join(run(text, n % 2 == 1) for n, text in enumerate(runs) if text)
+        paragraphs.append(f"<w:p>{indent}{body}</w:p>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{''.join(paragraphs)}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>'
+    )
+    relationships = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships/officeDocument" Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", content_types)
+        docx.writestr("_rels/.rels", relationships)
+        docx.writestr("word/document.xml", document)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft research cite", description="Format BibTeX/CSL-JSON references"
+    )
+    parser.add_argument("sources", nargs="+", help="BibTeX (.bib) or CSL-JSON files")
+    parser.add_argument("--style", choices=sorted(STYLES), default="apa", help="Citation style")
+    parser.add_argument("--type", help=f"Comma-separated source types: {', '.join(TYPES)}")
+    parser.add_argument("--keys", help="Comma-separated entry keys to format, in this order")
+    parser.add_argument("--export", choices=EXPORTS, default="txt", help="Output format")
+    parser.add_argument("--bibliography", action="store_true",
+                        help="Write a sorted, headed reference list (one entry per key)")
+    parser.add_argument("--output", help="Write here instead of stdout (required for docx)")
+    parser.add_argument("--cache-dir", help="Keep caches here instead of next to the files")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="Parse and render every entry")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = one per CPU)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    stats = CiteStats()
+    try:
+        types = [t.strip() for t in args.type.split(",") if t.strip()] if args.type else None
+        unknown = set(types or ()) - set(TYPES)
+        if unknown:
+            raise CiteError(f"unknown type '{sorted(unknown)[0]}' (use {', '.join(TYPES)})")
+        keys = [k.strip() for k in args.keys.split(",") if k.strip()] if args.keys else None
+        if args.export == "docx" and not args.output:
+            raise CiteError("--export=docx writes a file: give it an --output")
+        for source in args.sources:
+            if "://" in source:
+                raise CiteError(f"cannot fetch '{source}': export the reference as BibTeX "
+                                "or CSL-JSON and pass the file")
+        if args.cache_dir and args.use_cache:
+            os.makedirs(args.cache_dir, exist_ok=True)
+        jobs = resolve_jobs(args.jobs)
+        caches, entries = [], []
+        for source in args.sources:
+            caches.append(CiteCache.load(cache_path(source, args.cache_dir)
+                                         if args.use_cache else None))
+            entries += parse_file(source, caches[-1], jobs, stats)
+        entries = select(entries, types, keys)
+        if args.bibliography:
+            entries = bibliography(entries, args.style)
+        formatted = list(zip([entry.ref for entry in entries],
+                             render(entries, args.style, jobs, stats)))
+        for cache in caches:
+            cache.save()
+        if args.export == "docx":
+            write_docx(args.output, formatted, args.style, args.bibliography)
+        else:
+            text = "".join(line + "\n" for line in render_text(
+                formatted, args.style, args.export, args.bibliography))
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(text)
+            else:
+                sys.stdout.write(text)
+    except (CiteError, ReferenceFileError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename}", file=sys.stderr)
+        return 1
+    print(f"CITE: {len(formatted):,} of {stats.entries:,} entries from {stats.files} files in "
+          f"{time.perf_counter() - start:.2f}s ({stats.parsed:,} parsed, {stats.rendered:,} "
+          f"rendered, {stats.cached:,} from cache"
+          f"{f', {stats.skipped:,} skipped' if stats.skipped else ''})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Out-of-core cleaning for `craft data clean`
+
+Works on inputs larger than memory:
+
+1. Stream the input once. Drop rows with nulls (--remove-nulls). Spill each
+   row, tagged with its position, to one of N partition files on disk,
+   chosen by a hash of its dedupe key, so duplicates always meet in the same
+   partition. The key is the whole row (fields compared in order) or the
+   --columns values.
+2. Process the partitions in parallel (--jobs). Each worker drops repeated
+   keys, keeping the first occurrence, and accumulates per-column min/max
+   and mean/std of what it keeps. Only one partition's key digests are ever
+   in memory.
+3. Merge the partitions back into input order with a k-way merge. The
+   column statistics from step 2 are used to normalize numeric columns
+   (--normalize) while writing.
+
+Peak memory therefore depends on the partition size, not the input size;
+the partition count grows with the input to stay within --memory-mb.
+
+    python -m craft_cli.engines.clean big.csv clean.csv --dedupe --normalize --method=zscore --jobs=4
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ._io import DataError, FORMATS, RecordWriter, chunked, detect_format, read_chunks
+from ._parallel import ordered_map, peak_rss_mb, resolve_jobs
+from ._sketch import Moments, finite_numbers
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_MEMORY_MB = 256
+NORMALIZE_METHODS = ("minmax", "zscore")
+MAX_PARTITIONS = 512
+STREAM_PARTITIONS = 64
+# Rough resident cost of one kept key digest in a worker's set
+_BYTES_PER_KEY = 120
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft data clean", description="Remove nulls and duplicates and normalize numeric columns"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="Input file (- for stdin)")
+    parser.add_argument("output", nargs="?", default="-", help="Output file (- for stdout)")
+    parser.add_argument("--remove-nulls", action="store_true", help="Drop rows with empty values")
+    parser.add_argument("--dedupe", action="store_true", help="Drop repeated rows, keeping the first")
+    parser.add_argument("--normalize", action="store_true", help="Rescale numeric columns")
+    parser.add_argument("--method", choices=NORMALIZE_METHODS, default="minmax",
+                        help="Normalization: minmax to [0, 1] or zscore")
+    parser.add_argument("--columns", help="Comma-separated columns checked by --remove-nulls, "
+                                          "compared by --dedupe and rescaled by --normalize")
+    parser.add_argument("--from", dest="from_format", choices=FORMATS, help="Input format")
+    parser.add_argument("--to", dest="to_format", choices=FORMATS, help="Output format")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (0 = one per CPU)")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB,
+                        help="Memory budget shared by the workers")
+    parser.add_argument("--partitions", type=int, help="Spill partitions (default: from input size)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Records per batch")
+    parser.add_argument("--tmp-dir", help="Directory for spill files")
+    parser.add_argument("--delimiter", help="CSV field delimiter for input and output")
+    return parser
+
+
+def partition_count(input_path: str, jobs: int, memory_mb: int) -> int:
+    """Enough partitions that each worker's key set fits its share of the budget"""
+    try:
+        size = os.path.getsize(input_path)
+    except OSError:
+        return max(jobs, STREAM_PARTITIONS)
+    if input_path.endswith(".gz"):
+        size *= 5
+    # A row is at least ~20 bytes of input; each kept key costs _BYTES_PER_KEY
+    keys_per_worker = max((memory_mb << 20) // jobs // _BYTES_PER_KEY, 1)
+    needed = math.ceil(size / 20 / keys_per_worker)
+    return max(jobs, min(needed, MAX_PARTITIONS))
+
+
+class CleanStats:
+    """Row counts reported at the end of a run"""
+
+    def __init__(self) -> None:
+        self.rows_in = 0
+        self.null_rows = 0
+        self.duplicates = 0
+        self.rows_out = 0
+
+
+def _has_null(record: Dict[str, Any], columns: Optional[List[str]]) -> bool:
+    values = record.values() if columns is None else [record.get(c) for c in columns]
+    return any(v is None or v == "" for v in values)
+
+
+def _key_digest(text: str, record: Dict[str, Any], columns: Optional[List[str]]) -> str:
+    """Dedupe key: the encoded row itself, or just the --columns values"""
+    key = text if columns is None else _encode([record.get(c) for c in columns])
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def spill(records: Iterator[List[Dict[str, Any]]], spill_dir: Path, partitions: int,
+          remove_nulls: bool, dedupe: bool, columns: Optional[List[str]],
+          stats: CleanStats) -> List[Path]:
+    """Pass 1: filter and hash-partition records to spill files
+
+    Each line is `position<TAB>key digest<TAB>record as JSON` (JSON never
+    contains a raw tab). Without --dedupe the partitions are filled chunk by
+    chunk in turn.
+    """
+    paths = [spill_dir / f"part-{i:04d}" for i in range(partitions)]
+    files = [open(path, "w", encoding="utf-8") for path in paths]
+    try:
+        position = 0
+        for number, chunk in enumerate(records):
+            stats.rows_in += len(chunk)
+            lines: List[List[str]] = [[] for _ in files]
+            for record in chunk:
+                position += 1
+                if remove_nulls and _has_null(record, columns):
+                    stats.null_rows += 1
+                    continue
+                text = _encode(record)
+                if dedupe:
+                    digest = _key_digest(text, record, columns)
+                    target = int(digest[:15], 16) % partitions
+                else:
+                    digest, target = "", number % partitions
+                lines[target].append(f"{position}\t{digest}\t{text}\n")
+            for f, part in zip(files, lines):
+                if part:
+                    f.write("".join(part))
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def clean_partition(task: tuple) -> Tuple[int, Dict[str, Moments], Dict[str, int]]:
+    """Pass 2 (in a worker): dedupe one partition and collect column statistics
+
+    Kept rows are copied to `<partition>.out` as `position<TAB>record`
+    without re-encoding them. Returns the duplicate count, numeric moments
+    per column and the non-null count per column.
+    """
+    path, dedupe, normalize_columns, chunk_size = task
+    seen = set()
+    duplicates = 0
+    moments: Dict[str, Moments] = {}
+    present: Dict[str, int] = {}
+    with open(path, encoding="utf-8") as spilled, \
+            open(f"{path}.out", "w", encoding="utf-8") as out:
+        for lines in chunked(spilled, chunk_size):
+            kept = []
+            for line in lines:
+                position, digest, text = line.split("\t", 2)
+                if dedupe:
+                    if digest in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(digest)
+                kept.append((position, text))
+            out.write("".join(f"{p}\t{t}" for p, t in kept))
+            if normalize_columns is not None:
+                _accumulate([json.loads(t) for _, t in kept], normalize_columns, moments, present)
+    os.unlink(path)
+    return duplicates, moments, present
+
+
+def _cleaned(path: Path) -> Iterator[Tuple[int, str]]:
+    with open(f"{path}.out", encoding="utf-8") as f:
+        for line in f:
+            position, text = line.split("\t", 1)
+            yield int(position), text
+
+
+def _accumulate(records: List[Dict[str, Any]], columns: List[str],
+                moments: Dict[str, Moments], present: Dict[str, int]) -> None:
+    names = columns or list(dict.fromkeys(k for r in records for k in r))
+    for name in names:
+        values = [r.get(name) for r in records]
+        values = [v for v in values if v is not None and v != ""]
+        if not values:
+            continue
+        present[name] = present.get(name, 0) + len(values)
+        moments.setdefault(name, Moments()).merge(Moments.of(finite_numbers(values)))
+
+
+class Normalizer:
+    """Rescales the columns whose every non-null value is numeric"""
+
+    def __init__(self, method: str, moments: Dict[str, Moments], present: Dict[str, int]):
+        self.method = method
+        self.columns = {name: m for name, m in moments.items()
+                        if m.count and m.count == present.get(name)}
+
+    def apply(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        for name, m in self.columns.items():
+            value = record.get(name)
+            if value is None or value == "":
+                continue
+            x = float(value)
+            if self.method == "zscore":
+                scale = m.stddev
+                record[name] = (x - m.mean) / scale if scale else 0.0
+            else:
+                span = m.max - m.min  # type: ignore
+                record[name] = (x - m.min) / span if span else 0.0  # type: ignore
+        return record
+
+
+def clean(input_path: str, output_path: str, from_format: Optional[str] = None,
+          to_format: Optional[str] = None, remove_nulls: bool = False, dedupe: bool = False,
+          normalize: Optional[str] = None, columns: Optional[List[str]] = None, jobs: int = 1,
+          memory_mb: int = DEFAULT_MEMORY_MB, partitions: Optional[int] = None,
+          chunk_size: int = DEFAULT_CHUNK_SIZE, tmp_dir: Optional[str] = None,
+          delimiter: Optional[str] = None) -> CleanStats:
+    """Clean input into output and return the row counts"""
+    if partitions is not None and partitions < 1:
+        raise DataError("--partitions must be at least 1")
+    source = detect_format(input_path, from_format) if input_path != "-" or from_format else "ndjson"
+    target = detect_format(output_path, to_format) if output_path != "-" or to_format else "ndjson"
+    stats = CleanStats()
+    records = read_chunks(input_path, source, chunk_size, delimiter)
+
+    with RecordWriter(output_path, target, delimiter) as writer:
+        if not dedupe and not normalize:
+            # Nothing needs a second look at the data: a single streaming pass
+            for chunk in records:
+                stats.rows_in += len(chunk)
+                if remove_nulls:
+                    kept = [r for r in chunk if not _has_null(r, columns)]
+                    stats.null_rows += len(chunk) - len(kept)
+                    chunk = kept
+                writer.write(chunk)
+            stats.rows_out = writer.rows
+            return stats
+
+        count = partitions or partition_count(input_path, jobs, memory_mb)
+        with tempfile.TemporaryDirectory(prefix="craft-clean-", dir=tmp_dir) as spill_dir:
+            paths = spill(records, Path(spill_dir), count, remove_nulls, dedupe, columns, stats)
+            tasks = [(path, dedupe, (columns or []) if normalize else None, chunk_size) for path in paths]
+            moments: Dict[str, Moments] = {}
+            present: Dict[str, int] = {}
+            # Merged in partition order, so the statistics do not depend on --jobs
+            for duplicates, part_moments, part_present in ordered_map(clean_partition, tasks, jobs):
+                stats.duplicates += duplicates
+                for name, m in part_moments.items():
+                    moments.setdefault(name, Moments()).merge(m)
+                for name, n in part_present.items():
+                    present[name] = present.get(name, 0) + n
+            normalizer = Normalizer(normalize, moments, present) if normalize else None
+
+            # Partitions are each in input order; a k-way merge restores the whole order
+            streams = [_cleaned(path) for path in paths]
+            merged = (json.loads(text) for _, text in heapq.merge(*streams))
+            for chunk in chunked(merged, chunk_size):
+                if normalizer is not None:
+                    chunk = [normalizer.apply(record) for record in chunk]
+                writer.write(chunk)
+    stats.rows_out = writer.rows
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    jobs = resolve_jobs(args.jobs)
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
+    start = time.perf_counter()
+    try:
+        stats = clean(args.input, args.output, args.from_format, args.to_format,
+                      args.remove_nulls, args.dedupe, args.method if args.normalize else None,
+                      columns, jobs,
+                      args.memory_mb, args.partitions, args.chunk_size, args.tmp_dir,
+                      args.delimiter)
+    except DataError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename or args.input}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    rate = stats.rows_in / elapsed if elapsed > 0 else 0.0
+    print(f"CLEAN: {stats.rows_in} rows in, {stats.rows_out} out "
+          f"({stats.null_rows} with nulls, {stats.duplicates} duplicates) in {elapsed:.2f}s "
+          f"({rate:,.0f} rows/s, {jobs} jobs, peak RSS {peak_rss_mb():.1f} MB)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
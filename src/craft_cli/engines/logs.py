@@ -0,0 +1,509 @@
+"""
+Indexed log search and live tailing for `craft devops logs`
+
+Each log file gets a sidecar index (`<file>.cidx`, see `_logindex`) with
+per-block time ranges, level bitmasks and a trigram index. A query updates
+the index with whatever was appended since the last run, keeps only the
+blocks whose time range, levels and trigrams can match, and reads just those
+through mmap. Matching entries (a timestamped line plus its continuation
+lines) stream out as text, NDJSON or CSV.
+
+With --follow the files are tailed instead (see `_tail`): new entries are
+parsed, filtered by --level/--grep in this process and written as they
+arrive. Each file is read at most `--read-kb` at a time and output is
+written with blocking writes, so a slow consumer holds back reading rather
+than growing a buffer: unread data simply waits in the log file.
+
+    python -m craft_cli.engines.logs api --level=error --since=24h --export=json
+    python -m craft_cli.engines.logs api web --follow --level=error --grep=timeout
+"""
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Pattern, Set
+
+from ..params import ParameterError, parse_duration
+from ._io import stdout_captured
+from ._logindex import (
+    DEFAULT_BLOCK_BYTES, LEVEL_RE, LEVEL_WORDS, LEVELS, OTHER_TIME_RE, TIMESTAMP_RE, Block,
+    LogIndex, entry_time, level_name, other_time, query_trigrams, scan_blocks
+)
+from ._tail import (
+    DEFAULT_MAX_ENTRY_BYTES, DEFAULT_READ_BYTES, POLL_INTERVAL, Tailer, make_watcher,
+    parse_entry
+)
+
+DEFAULT_LOG_DIR = "logs"
+INDEX_SUFFIX = ".cidx"
+EXPORTS = ("text", "json", "csv")
+_SKIPPED_SUFFIXES = (".gz", ".bz2", ".xz", ".zst", ".zip")
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+_TIME_ARG_RE = re.compile(
+    r"(\d{4}-\d\d-\d\d)(?:[T ](\d\d:\d\d)(:\d\d)?(?:[.,]\d+)?)?(Z|[+-]\d\d:?\d\d)?"
+)
+
+
+class LogError(Exception):
+    """Raised for missing log files and invalid queries"""
+
+
+class Entry(NamedTuple):
+    """One matching log entry"""
+    file: str
+    offset: int
+    timestamp: Optional[str]
+    level: Optional[str]
+    message: str
+    fields: Optional[Dict[str, Any]] = None
+
+
+class LogQuery:
+    """Filters of a search; `grep` is a case-insensitive literal unless `regex`"""
+
+    def __init__(self, levels: Optional[List[str]] = None, since: Optional[float] = None,
+                 until: Optional[float] = None, grep: Optional[str] = None,
+                 regex: bool = False) -> None:
+        unknown = set(levels or ()) - set(LEVELS)
+        if unknown:
+            raise LogError(f"unknown level {sorted(unknown)[0]!r} "
+                           f"(use {', '.join(LEVELS)})")
+        self.levels: Set[str] = set(levels or ())
+        self.level_mask = sum(LEVELS[name] for name in self.levels)
+        self.since = since
+        self.until = until
+        self.pattern: Optional[Pattern[bytes]] = None
+        self.literal: Optional[bytes] = None
+        self.folded: Optional[str] = None
+        self.grams: Set[bytes] = set()
+        self.level_pattern: Optional[Pattern[bytes]] = None
+        if grep and regex:
+            try:
+                self.pattern = re.compile(grep.encode("utf-8"), re.IGNORECASE)
+            except re.error as e:
+                raise LogError(f"invalid --grep pattern: {e}")
+        elif grep and not grep.isascii():
+            self.folded = grep.casefold()  # bytes.lower() only knows ASCII letters
+            self.grams = query_trigrams(grep)
+        elif grep:
+            self.literal = grep.encode("utf-8").lower()
+            self.grams = query_trigrams(grep)
+        elif self.levels:
+            words = sorted(word for word, name in LEVEL_WORDS.items() if name in self.levels)
+            self.level_pattern = re.compile(rb"\b(?:" + b"|".join(words) + rb")\b")
+
+    def in_range(self, moment: Optional[float]) -> bool:
+        if moment is None:
+            return False
+        if self.since is not None and moment < self.since:
+            return False
+        return self.until is None or moment <= self.until
+
+    def matches(self, text: bytes) -> bool:
+        """Whether one entry's text satisfies --grep"""
+        if self.literal is not None:
+            return self.literal in text.lower()
+        if self.folded is not None:
+            return self.folded in text.decode("utf-8", "replace").casefold()
+        return self.pattern is None or self.pattern.search(text) is not None
+
+    def hits(self, data, block: Block) -> Optional[List[int]]:
+        """Offsets in a block worth checking, or None to check every entry
+
+        A literal is found with bytes.find in a lowercased copy of the block,
+        which is much faster than a case-insensitive regex. Level filters
+        without --grep jump to the requested level words the same way. A
+        non-ASCII literal is compared with the casefolded text of each line.
+        """
+        if self.pattern is not None and self.literal is None:
+            return [hit.start() for hit in self.pattern.finditer(data, block.start, block.end)]
+        if self.folded is not None:
+            found, pos = [], block.start
+            for line in data[block.start:block.end].split(b"\n"):
+                if self.folded in line.decode("utf-8", "replace").casefold():
+                    found.append(pos)
+                pos += len(line) + 1
+            return found
+        if self.literal is None and self.level_pattern is None:
+            return None
+        text = data[block.start:block.end].lower()
+        if self.literal is not None:
+            found, pos = [], text.find(self.literal)
+            while pos >= 0:
+                found.append(block.start + pos)
+                pos = text.find(self.literal, pos + 1)
+            return found
+        return [block.start + hit.start() for hit in self.level_pattern.finditer(text)]
+
+
+class SearchStats:
+    """Bytes and blocks touched by a search, reported at the end of a run"""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.matches = 0
+        self.total_bytes = 0
+        self.read_bytes = 0
+        self.indexed_bytes = 0
+        self.blocks = 0
+        self.total_blocks = 0
+        self.rotations = 0
+
+
+def parse_time(value: str, now: Optional[float] = None, end: bool = False) -> float:
+    """--since/--until value to epoch seconds: a duration ago or an ISO timestamp
+
+    Seconds may be left out, and the time of day too. With `end` (--until)
+    a bare date stands for the whole day: the result is its last second.
+    """
+    match = _TIME_ARG_RE.fullmatch(value.strip())
+    if match:
+        date, clock, seconds, tz = match.groups()
+        base = f"{date}T{clock or '00:00'}{seconds or ':00'}".encode("ascii")
+        moment = entry_time(base, tz.encode("ascii") if tz else None)
+        return moment + 86399 if end and clock is None else moment
+    try:
+        ago = parse_duration(value)
+    except ParameterError:
+        raise LogError(f"invalid time {value!r} (use e.g. 30m, 24h, 7d, 2024-01-31, "
+                       f"2024-01-31T12:00 or 2024-01-31T12:00:00Z)")
+    return (time.time() if now is None else now) - ago
+
+
+def _log_files(directory: str, prefix: str = "") -> List[str]:
+    names = []
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith(prefix) or INDEX_SUFFIX in name or name.endswith(_SKIPPED_SUFFIXES):
+            continue
+        if name.endswith(".log") or ".log." in name:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                names.append(path)
+    return names
+
+
+def resolve_files(targets: List[str], log_dir: str = DEFAULT_LOG_DIR) -> List[str]:
+    """Log files for each target: a file, a directory, or a service name in `log_dir`"""
+    if not targets:
+        if not os.path.isdir(log_dir):
+            raise LogError(f"no log directory '{log_dir}' (pass log files or use --log-dir)")
+        targets = [log_dir]
+    files: List[str] = []
+    for target in targets:
+        if os.path.isfile(target):
+            found = [target]
+        elif os.path.isdir(target):
+            found = _log_files(target)
+        else:
+            found = []
+            if os.path.isdir(os.path.join(log_dir, target)):
+                found = _log_files(os.path.join(log_dir, target))
+            if not found and os.path.isdir(log_dir):
+                found = _log_files(log_dir, target)
+        if not found:
+            raise LogError(f"no log files found for '{target}' (looked in '{log_dir}')")
+        files.extend(path for path in found if path not in files)
+    return files
+
+
+def index_path(path: str, index_dir: Optional[str] = None) -> str:
+    """Sidecar index location: next to the log, or a per-path name in `index_dir`"""
+    if index_dir is None:
+        return path + INDEX_SUFFIX
+    digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=6).hexdigest()
+    return os.path.join(index_dir, f"{os.path.basename(path)}-{digest}{INDEX_SUFFIX}")
+
+
+def load_index(path: str, data, index_dir: Optional[str] = None,
+               block_bytes: int = DEFAULT_BLOCK_BYTES, rebuild: bool = False):
+    """Open the sidecar index of `path` and bring it up to date with `data`
+
+    Returns (index, bytes indexed by this call). An index that cannot be
+    saved is still used for this query.
+    """
+    location = index_path(path, index_dir)
+    index = None if rebuild else LogIndex.load(location)
+    if index is None or index.block_bytes != block_bytes:
+        index = LogIndex(block_bytes)
+    indexed = index.update(data)
+    if indexed:
+        try:
+            if index_dir is not None:
+                os.makedirs(index_dir, exist_ok=True)
+            index.save(location)
+        except OSError as e:
+            print(f"WARNING: could not save index {location}: {e.strerror or e}", file=sys.stderr)
+    return index, indexed
+
+
+def search_block(path: str, data, block: Block, query: LogQuery) -> Iterator[Entry]:
+    """Matching entries of one block, in file order"""
+    hits = query.hits(data, block)
+    if hits == []:
+        return
+    starts, stamps = [], []
+    for match in TIMESTAMP_RE.finditer(data, block.start, block.end):
+        starts.append(match.start())
+        stamps.append(match)
+    if hits is None:
+        loose = _loose_lines(data, block.start, starts[0] if starts else block.end)
+        offsets = list(loose) + starts
+    else:
+        offsets = []
+        for hit in hits:
+            i = bisect_right(starts, hit) - 1
+            offset = starts[i] if i >= 0 else data.rfind(b"\n", block.start, hit) + 1
+            offset = max(offset, block.start)
+            if not offsets or offsets[-1] != offset:
+                offsets.append(offset)
+    timed = query.since is not None or query.until is not None
+    inside = (block.first is not None and (query.since is None or block.first >= query.since)
+              and (query.until is None or block.last <= query.until))
+    for offset in offsets:
+        i = bisect_right(starts, offset) - 1
+        if i >= 0 and starts[i] == offset:
+            end = starts[i + 1] if i + 1 < len(starts) else block.end
+            stamp = stamps[i]
+            moment: Optional[float] = (entry_time(stamp.group(1), stamp.group(3))
+                                       if timed and not inside else None)
+            timestamp: Optional[str] = data[stamp.start(1):stamp.end()].decode("ascii")
+        else:
+            end = data.find(b"\n", offset, block.end) + 1 or block.end
+            moment = timestamp = None
+            stamp = OTHER_TIME_RE.match(data, offset, end)
+            if stamp:
+                moment = other_time(stamp)
+                first, last = (1, 7) if stamp.group(1) else (8, 12)
+                timestamp = data[stamp.start(first):stamp.end(last)].decode("ascii")
+        first_line = data.find(b"\n", offset, end)
+        word = LEVEL_RE.search(data, offset, first_line if first_line >= 0 else end)
+        level = level_name(word.group(1)) if word else None
+        if query.levels and level not in query.levels:
+            continue
+        if timed and not (inside and timestamp) and not query.in_range(moment):
+            continue
+        message = data[offset:end].decode("utf-8", "replace").rstrip("\r\n")
+        yield Entry(path, offset, timestamp, level, message)
+
+
+def _loose_lines(data, start: int, end: int) -> Iterator[int]:
+    """Line offsets before a block's first timestamped entry"""
+    while start < end:
+        yield start
+        start = data.find(b"\n", start, end) + 1 or end
+
+
+def search(files: List[str], query: LogQuery, index_dir: Optional[str] = None,
+           use_index: bool = True, rebuild: bool = False,
+           block_bytes: int = DEFAULT_BLOCK_BYTES,
+           stats: Optional[SearchStats] = None) -> Iterator[Entry]:
+    """Stream the entries of `files` that match `query`, file by file"""
+    stats = stats if stats is not None else SearchStats()
+    for path in files:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            stats.files += 1
+            stats.total_bytes += size
+            if not size:
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if use_index:
+                    index, indexed = load_index(path, data, index_dir, block_bytes, rebuild)
+                    stats.indexed_bytes += indexed
+                    blocks = index.candidates(query.since, query.until, query.level_mask,
+                                              query.grams)
+                    stats.total_blocks += len(index.blocks)
+                    timed = query.since is not None or query.until is not None
+                    if timed and all(block.first is None for block in index.blocks):
+                        print(f"WARNING: no timestamps found in '{path}', "
+                              f"so --since/--until skip all of it", file=sys.stderr)
+                else:
+                    blocks = list(scan_blocks(data, block_bytes))
+                    stats.total_blocks += len(blocks)
+                stats.blocks += len(blocks)
+                for block in blocks:
+                    stats.read_bytes += block.end - block.start
+                    for entry in search_block(path, data, block, query):
+                        stats.matches += 1
+                        yield entry
+
+
+def follow(files: List[str], query: LogQuery, stop_after: Optional[float] = None,
+           from_start: bool = False, read_bytes: int = DEFAULT_READ_BYTES,
+           max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES, use_inotify: bool = True,
+           stats: Optional[SearchStats] = None,
+           idle: Optional[Callable[[], None]] = None) -> Iterator[Entry]:
+    """Stream new entries of `files` that pass --level/--grep, until stop_after seconds
+
+    Files are read round-robin, `read_bytes` at a time, so one busy log
+    cannot starve the others. A pending multi-line entry is handed out once
+    its file has been quiet for a moment. `idle` is called before waiting
+    for more data (to flush the output).
+    """
+    stats = stats if stats is not None else SearchStats()
+    tailers = [Tailer(path, from_start, max_entry_bytes) for path in files]
+    watcher = make_watcher(files, use_inotify)
+    deadline = None if stop_after is None else time.monotonic() + stop_after
+    stats.files = len(files)
+    try:
+        while True:
+            busy = False
+            finished = deadline is not None and time.monotonic() >= deadline
+            for tailer in tailers:
+                before = tailer.position
+                ready = tailer.read(read_bytes)
+                busy = busy or tailer.position - before >= read_bytes
+                ready += tailer.flush(0.0 if finished else POLL_INTERVAL / 2)
+                for offset, raw, kind in ready:
+                    stats.read_bytes += len(raw) + 1
+                    if not query.matches(raw):
+                        continue
+                    timestamp, level, message, fields = parse_entry(raw, kind)
+                    if query.levels and level not in query.levels:
+                        continue
+                    stats.matches += 1
+                    yield Entry(tailer.path, offset, timestamp, level, message, fields)
+            if finished:
+                return
+            if not busy:
+                if idle is not None:
+                    idle()
+                pending = any(tailer.pending for tailer in tailers)
+                timeout = POLL_INTERVAL / 2 if pending else 1.0
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+                watcher.wait(timeout)
+    finally:
+        stats.rotations = sum(tailer.rotations + tailer.truncated for tailer in tailers)
+        watcher.close()
+        for tailer in tailers:
+            tailer.close()
+
+
+def write_entries(entries: Iterator[Entry], export: str, limit: Optional[int] = None,
+                  prefix: bool = False, out=None) -> int:
+    """Print entries as text, NDJSON or CSV; returns how many were written"""
+    out = out if out is not None else sys.stdout
+    writer = None
+    if export == "csv":
+        writer = csv.writer(out)
+        writer.writerow(Entry._fields[:5])
+    count = 0
+    for entry in entries:
+        if limit is not None and count >= limit:
+            break
+        if writer is not None:
+            writer.writerow(entry[:5])
+        elif export == "json":
+            record = entry._asdict()
+            if entry.fields is None:
+                del record["fields"]
+            out.write(_encode(record) + "\n")
+        else:
+            out.write(f"{entry.file}:{entry.message}\n" if prefix else entry.message + "\n")
+        count += 1
+        if limit is not None and count >= limit:
+            break
+    return count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft devops logs", description="Search log files through a sidecar index"
+    )
+    parser.add_argument("targets", nargs="*",
+                        help="Service names, log files or directories (default: --log-dir)")
+    parser.add_argument("--level", help="Comma-separated levels: error,warn,info,debug")
+    parser.add_argument("--since", help="Start of the time range: 30m, 24h, 7d or a timestamp")
+    parser.add_argument("--until", help="End of the time range: a duration ago or a timestamp")
+    parser.add_argument("--grep", help="Text to search for (case-insensitive)")
+    parser.add_argument("--regex", action="store_true", help="Treat --grep as a regular expression")
+    parser.add_argument("--export", choices=EXPORTS, default="text", help="Output format")
+    parser.add_argument("--limit", type=int, help="Stop after this many matches")
+    parser.add_argument("--log-dir", default=DEFAULT_LOG_DIR,
+                        help="Where service logs live")
+    parser.add_argument("--index-dir", help="Keep indexes here instead of next to the logs")
+    parser.add_argument("--block-kb", type=int, default=DEFAULT_BLOCK_BYTES >> 10,
+                        help="Indexed block size")
+    parser.add_argument("--no-index", dest="use_index", action="store_false",
+                        help="Scan the files linearly")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild indexes from scratch")
+    parser.add_argument("--follow", action="store_true",
+                        help="Tail the files and stream new matching entries")
+    parser.add_argument("--from-start", action="store_true",
+                        help="With --follow, start at the beginning of each file")
+    parser.add_argument("--stop-after", help="With --follow, stop after this long (e.g. 30s)")
+    parser.add_argument("--read-kb", type=int, default=DEFAULT_READ_BYTES >> 10,
+                        help="With --follow, bytes read per file per turn")
+    parser.add_argument("--max-entry-kb", type=int, default=DEFAULT_MAX_ENTRY_BYTES >> 10,
+                        help="With --follow, longest entry kept (longer ones are cut)")
+    parser.add_argument("--poll", action="store_true",
+                        help="With --follow, poll instead of using inotify")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    stats = SearchStats()
+    try:
+        levels = [lv.strip() for lv in args.level.split(",") if lv.strip()] if args.level else None
+        if args.follow and (args.since or args.until):
+            raise LogError("--since/--until search existing entries; they cannot be "
+                           "combined with --follow")
+        if args.follow and args.stop_after is None and args.limit is None and stdout_captured():
+            raise LogError("output is collected until the tool exits: give --follow a "
+                           "--stop-after or --limit")
+        query = LogQuery(
+            levels,
+            parse_time(args.since) if args.since else None,
+            parse_time(args.until, end=True) if args.until else None,
+            args.grep, args.regex
+        )
+        files = resolve_files(args.targets, args.log_dir)
+        if args.follow:
+            stop_after = _duration(args.stop_after) if args.stop_after else None
+            entries = follow(files, query, stop_after, args.from_start,
+                             max(args.read_kb, 1) << 10, max(args.max_entry_kb, 1) << 10,
+                             not args.poll, stats, idle=sys.stdout.flush)
+        else:
+            entries = search(files, query, args.index_dir, args.use_index, args.reindex,
+                             max(args.block_kb, 1) << 10, stats)
+        try:
+            written = write_entries(entries, args.export, args.limit, prefix=len(files) > 1)
+        except KeyboardInterrupt:
+            written = stats.matches
+        entries.close()
+    except LogError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    mb = 1 << 20
+    if args.follow:
+        print(f"FOLLOW: {written} matches in {elapsed:.2f}s; read {stats.read_bytes / mb:.1f} MB "
+              f"from {stats.files} files ({stats.rotations} rotations)", file=sys.stderr)
+        return 0
+    print(f"LOGS: {written} matches in {elapsed:.2f}s; read {stats.read_bytes / mb:.1f} of "
+          f"{stats.total_bytes / mb:.1f} MB ({stats.blocks} of {stats.total_blocks} blocks, "
+          f"{stats.files} files), indexed {stats.indexed_bytes / mb:.1f} MB", file=sys.stderr)
+    return 0
+
+
+def _duration(value: str) -> float:
+    try:
+        return parse_duration(value)
+    except ParameterError as e:
+        raise LogError(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
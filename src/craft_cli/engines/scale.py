@@ -0,0 +1,463 @@
+"""
+Scaling policy simulator for `craft devops scale`
+
+Replays a recorded metric time series (CSV/NDJSON/..., one row per sample)
+through a target-tracking scaling policy and reports what it would have
+done: the replica timeline, replica-hours and cost, and an estimate of the
+latency the service would have seen.
+
+The policy is the one Kubernetes' HorizontalPodAutoscaler uses:
+
+    desired  = ceil(mean demand over --window / --threshold), within --min/--max
+    replicas = max(desired over the last --cooldown)    (scale down slowly)
+    ready    = replicas started at least --warmup ago
+
+Demand is measured in replicas' worth of load: `value / --capacity` for a
+rate metric such as requests/s, or `value% x recorded replicas` for a
+utilization metric such as cpu (the `replicas` column, else
+--recorded-replicas). Because desired replicas depend only on demand, each
+stage is a whole-series transform -- a prefix-sum moving mean, a monotonic-
+deque moving max, a time shift -- computed once and shared by every policy
+that needs it. Latency is estimated per sample as an M/M/1 queue:
+service time / (1 - utilization), capped when a replica is saturated.
+
+--sweep replays every combination of the listed values, grouped by window
+across --jobs worker processes, and ranks the policies by cost among those
+meeting the --slo.
+
+    python -m craft_cli.engines.scale metrics.csv --metric=cpu --min=2 --max=20 --threshold=70
+    python -m craft_cli.engines.scale rps.ndjson --metric=requests --capacity=250 \\
+        --sweep threshold=50:90:5 --sweep window=1m,5m --sweep cooldown=0,5m,15m --jobs=4
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime, timezone
+from itertools import accumulate, compress, product
+from operator import mul, ne, truediv
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..params import ParameterError, parse_duration
+from ._io import DataError, FORMATS, RecordWriter, detect_format, read_chunks
+from ._parallel import ordered_map, resolve_jobs
+
+TIME_COLUMNS = ("timestamp", "time", "ts", "date")
+SWEEP_KEYS = ("threshold", "window", "cooldown", "warmup")
+EXPORTS = ("text", "json", "csv")
+SATURATED = 0.95  # utilization beyond which the M/M/1 estimate is capped
+POLICIES_PER_TASK = 64
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class ScaleError(Exception):
+    """Raised for unusable metric files and options"""
+
+
+class Policy(NamedTuple):
+    threshold: float  # target utilization, %
+    window: float  # seconds of demand averaged before deciding
+    cooldown: float  # seconds a higher replica count is kept before scaling down
+    warmup: float  # seconds before a new replica takes load
+
+
+class Series:
+    """A metric series as parallel arrays of sample times and demand"""
+
+    def __init__(self, times: Sequence[float], values: Sequence[float],
+                 demand: Sequence[float]) -> None:
+        self.times = array("d", times)
+        self.values = array("d", values)
+        self.demand = array("d", demand)
+        # Each sample stands for the time until the next one (the last: the median step)
+        steps = [b - a for a, b in zip(self.times, self.times[1:])]
+        last = sorted(steps)[len(steps) // 2] if steps else 60.0
+        self.steps = array("d", steps + [last])
+        self.hours = sum(self.steps) / 3600
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def starts(self, seconds: float) -> List[int]:
+        """For each sample, the first sample inside the trailing window of `seconds`
+
+        A window always holds at least the sample itself.
+        """
+        times = self.times
+        out, j = [], 0
+        for i, t in enumerate(times):
+            while j < i and times[j] <= t - seconds:
+                j += 1
+            out.append(j)
+        return out
+
+    def moving_mean(self, seconds: float) -> List[float]:
+        """Mean demand over the trailing window (prefix sums: O(n) for any window)"""
+        prefix = list(accumulate(self.demand, initial=0.0))
+        return [(prefix[i + 1] - prefix[j]) / (i + 1 - j)
+                for i, j in enumerate(self.starts(seconds))]
+
+    def lagged(self, seconds: float) -> List[int]:
+        """For each sample, 1 + the last sample at least `seconds` earlier (0 if none)"""
+        times = self.times
+        return [bisect_right(times, t - seconds) for t in times]
+
+
+def moving_max(values: Sequence[int], starts: Sequence[int]) -> List[int]:
+    """Maximum over each trailing window (starts[i]..i)
+
+    Works on runs of equal values: the maximum can only change where a run
+    begins or where one drops out of the window, so a monotonic deque of
+    runs is consulted at those points only and the output is filled in
+    between. Replica counts change far less often than they are sampled.
+    """
+    n = len(values)
+    firsts = [0] + list(compress(range(1, n), map(ne, values, values[1:])))
+    ends = firsts[1:] + [n]
+    exits = (bisect_left(starts, end) for end in ends)
+    events = sorted(set(firsts).union(e for e in exits if e < n))
+    window: deque = deque()  # runs whose values decrease from the left
+    out: List[int] = []
+    entered = 0
+    for position, i in enumerate(events):
+        while entered < len(firsts) and firsts[entered] <= i:
+            value = values[firsts[entered]]
+            while window and values[firsts[window[-1]]] <= value:
+                window.pop()
+            window.append(entered)
+            entered += 1
+        while ends[window[0]] <= starts[i]:
+            window.popleft()
+        following = events[position + 1] if position + 1 < len(events) else n
+        out += [values[firsts[window[0]]]] * (following - i)
+    return out
+
+
+class Simulator:
+    """Runs policies over one series, caching the stages policies share"""
+
+    def __init__(self, series: Series, min_replicas: int = 1, max_replicas: int = 10,
+                 service_time: float = 0.05, slo: float = 0.2,
+                 cost_per_hour: float = 0.0, max_violation: float = 1.0) -> None:
+        if not 1 <= min_replicas <= max_replicas:
+            raise ScaleError("need 1 <= --min <= --max")
+        self.series = series
+        self.min = min_replicas
+        self.max = max_replicas
+        self.service_time = service_time
+        self.slo = slo
+        self.cost_per_hour = cost_per_hour
+        self.max_violation = max_violation
+        self._means: Dict[float, List[float]] = {}
+        self._starts: Dict[float, List[int]] = {}
+        self._lags: Dict[float, List[int]] = {}
+        self._running: Optional[Tuple[Tuple[float, ...], List[int]]] = None
+
+    def _cached(self, cache: Dict, key: float, compute) -> Any:
+        if key not in cache:
+            cache[key] = compute(key)
+        return cache[key]
+
+    def replicas(self, policy: Policy) -> Tuple[List[int], List[int]]:
+        """(replicas running, replicas ready) at every sample"""
+        if policy.threshold <= 0:
+            raise ScaleError("--threshold must be positive")
+        key = policy[:3]
+        if self._running is None or self._running[0] != key:
+            means = self._cached(self._means, policy.window, self.series.moving_mean)
+            scale, low, high = 100 / policy.threshold, self.min, self.max
+            desired = [math.ceil(m * scale - 1e-9) for m in means]
+            desired = [low if d < low else high if d > high else d for d in desired]
+            running = desired if policy.cooldown <= 0 else moving_max(
+                desired, self._cached(self._starts, policy.cooldown, self.series.starts))
+            self._running = key, running  # sweeps vary warmup fastest: reuse it
+        running = self._running[1]
+        if policy.warmup <= 0:
+            return running, running
+        # What ran `warmup` ago is ready now; before the series began, the first count ran
+        padded = [running[0]] + running
+        earlier = map(padded.__getitem__,
+                      self._cached(self._lags, policy.warmup, self.series.lagged))
+        return running, list(map(min, running, earlier))
+
+    def utilization(self, ready: Sequence[int]) -> List[float]:
+        """Load per ready replica at every sample (1.0 = saturated)"""
+        return list(map(truediv, self.series.demand, ready))
+
+    def latency(self, utilization: float) -> float:
+        """M/M/1 mean response time (s) of a replica at this utilization"""
+        if utilization >= SATURATED:
+            return self.service_time / (1 - SATURATED)
+        return self.service_time / (1 - utilization)
+
+    def run(self, policy: Policy) -> Dict[str, Any]:
+        """Summary figures of one policy
+
+        Latency rises with utilization, so SLO misses and latency percentiles
+        are read off the utilization series without computing every latency.
+        """
+        running, ready = self.replicas(policy)
+        utilization = self.utilization(ready)
+        steps = self.series.steps
+        hours = self.series.hours or 1.0
+        replica_hours = sum(map(mul, running, steps)) / 3600
+        slo_utilization = 1 - self.service_time / self.slo if self.slo > 0 else 0.0
+        if self.latency(SATURATED) <= self.slo:
+            missed = 0.0  # even a saturated replica meets it
+        else:
+            missed = sum(compress(steps, map(slo_utilization.__lt__, utilization))) / 3600
+        saturated = sum(compress(steps, map((1.0).__le__, utilization))) / 3600
+        ordered = sorted(utilization)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        return {
+            "threshold": policy.threshold,
+            "window": policy.window,
+            "cooldown": policy.cooldown,
+            "warmup": policy.warmup,
+            "replica_hours": round(replica_hours, 2),
+            "cost": round(replica_hours * self.cost_per_hour, 2),
+            "mean_replicas": round(replica_hours / hours, 2),
+            "peak_replicas": max(running),
+            "scale_events": sum(map(ne, running, running[1:])),
+            "p50_latency_ms": round(self.latency(ordered[len(ordered) // 2]) * 1000, 1),
+            "p95_latency_ms": round(self.latency(p95) * 1000, 1),
+            "slo_violation_pct": round(missed / hours * 100, 2),
+            "saturated_pct": round(saturated / hours * 100, 2),
+        }
+
+    def timeline(self, policy: Policy) -> Iterator[Dict[str, Any]]:
+        """Per-sample records of one policy"""
+        running, ready = self.replicas(policy)
+        utilization = self.utilization(ready)
+        series = self.series
+        for i in range(len(series)):
+            yield {
+                "time": _iso(series.times[i]),
+                "value": series.values[i],
+                "demand": round(series.demand[i], 3),
+                "replicas": running[i],
+                "ready": ready[i],
+                "utilization_pct": round(utilization[i] * 100, 1),
+                "latency_ms": round(self.latency(utilization[i]) * 1000, 1),
+            }
+
+
+def _time_value(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    stamp = datetime.fromisoformat(text.replace("Z", "+00:00").replace(" ", "T", 1))
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.timestamp()
+
+
+def _iso(seconds: float) -> str:
+    stamp = datetime.fromtimestamp(seconds, timezone.utc)
+    return stamp.isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def load_series(path: str, metric: str, fmt: Optional[str] = None,
+                time_column: Optional[str] = None, capacity: Optional[float] = None,
+                recorded_replicas: float = 1.0) -> Series:
+    """Read the metric column of a file into a Series sorted by time"""
+    rows: List[Tuple[float, float, float]] = []
+    fmt = detect_format(path, fmt) if path != "-" else (fmt or "csv")
+    columns_checked = False
+    for chunk in read_chunks(path, fmt, 10000):
+        if not columns_checked:
+            first = chunk[0]
+            time_column = time_column or next((c for c in TIME_COLUMNS if c in first), None)
+            if time_column is None or time_column not in first:
+                raise ScaleError(f"no time column in '{path}' (looked for "
+                                 f"{time_column or ', '.join(TIME_COLUMNS)}; use --time-column)")
+            if metric not in first:
+                raise ScaleError(f"no '{metric}' column in '{path}' "
+                                 f"(columns: {', '.join(map(str, first))})")
+            columns_checked = True
+        for record in chunk:
+            raw = record.get(metric)
+            if raw in (None, ""):
+                continue
+            try:
+                stamp, value = _time_value(record[time_column]), float(raw)
+                replicas = float(record.get("replicas") or recorded_replicas)
+            except (TypeError, ValueError) as e:
+                raise ScaleError(f"bad '{metric}' sample in '{path}': {e}")
+            demand = value / capacity if capacity else value / 100 * replicas
+            rows.append((stamp, value, demand))
+    if not rows:
+        raise ScaleError(f"no '{metric}' samples in '{path}'")
+    rows.sort()
+    times, values, demand = zip(*rows)
+    return Series(times, values, demand)
+
+
+def _simulate(task: Tuple[Simulator, List[Policy]]) -> List[Dict[str, Any]]:
+    simulator, policies = task
+    return [simulator.run(policy) for policy in policies]
+
+
+def sweep(simulator: Simulator, policies: Sequence[Policy], jobs: int = 1) -> List[Dict[str, Any]]:
+    """Run every policy, grouped so one worker computes each moving mean once
+
+    Results are ranked: policies within the SLO by cost (replica-hours), then
+    the rest by how often they violated it.
+    """
+    by_window: Dict[float, List[Policy]] = {}
+    for policy in policies:
+        by_window.setdefault(policy.window, []).append(policy)
+    per_task = max(1, min(POLICIES_PER_TASK, -(-len(policies) // max(1, jobs))))
+    tasks = ((simulator, group[i:i + per_task]) for group in by_window.values()
+             for i in range(0, len(group), per_task))
+    results = [row for rows in ordered_map(_simulate, tasks, jobs) for row in rows]
+
+    def rank(row: Dict[str, Any]) -> Tuple:
+        missed = row["slo_violation_pct"]
+        if missed > simulator.max_violation:
+            return 1, missed, row["replica_hours"]
+        return 0, row["replica_hours"], row["p95_latency_ms"]
+
+    results.sort(key=rank)
+    return results
+
+
+def parse_sweep(values: Sequence[str], base: Policy) -> List[Policy]:
+    """Policies for every combination of `key=a,b,c` / `key=start:stop:step` values"""
+    axes: Dict[str, List[float]] = {key: [getattr(base, key)] for key in SWEEP_KEYS}
+    for spec in values:
+        key, _, listed = spec.partition("=")
+        key = key.strip().lstrip("-")
+        if key not in SWEEP_KEYS or not listed:
+            raise ScaleError(f"invalid --sweep '{spec}' (use e.g. threshold=50:90:5 or "
+                             f"window=1m,5m; keys: {', '.join(SWEEP_KEYS)})")
+        parse = float if key == "threshold" else _seconds
+        try:
+            if ":" in listed:
+                start, stop, step = (parse(part) for part in listed.split(":"))
+                if step <= 0:
+                    raise ValueError("step must be positive")
+                count = int(math.floor((stop - start) / step + 1e-9)) + 1
+                axes[key] = [round(start + n * step, 9) for n in range(max(count, 0))]
+            else:
+                axes[key] = [parse(part) for part in listed.split(",") if part.strip()]
+        except (ScaleError, ValueError) as e:
+            raise ScaleError(f"invalid --sweep '{spec}': {e}")
+    return [Policy(*combo) for combo in product(*(axes[key] for key in SWEEP_KEYS))]
+
+
+def _seconds(value: str) -> float:
+    try:
+        return parse_duration(value)
+    except ParameterError as e:
+        raise ScaleError(str(e))
+
+
+def _span(seconds: float) -> str:
+    for unit, size in (("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{seconds:g}s"
+
+
+def write_results(results: List[Dict[str, Any]], export: str, out=None) -> None:
+    out = out or sys.stdout
+    if export == "json":
+        out.write("".join(_encode(row) + "\n" for row in results))
+        return
+    if export == "csv":
+        out.write(",".join(results[0]) + "\n")
+        out.write("".join(",".join(map(str, row.values())) + "\n" for row in results))
+        return
+    header = (f"{'threshold':>9} {'window':>6} {'cooldown':>8} {'warmup':>6} {'repl-h':>9} "
+              f"{'cost':>9} {'mean':>6} {'peak':>4} {'events':>6} {'p95 ms':>8} {'slo miss':>8}")
+    out.write(header + "\n")
+    for row in results:
+        out.write(f"{row['threshold']:>8g}% {_span(row['window']):>6} "
+                  f"{_span(row['cooldown']):>8} {_span(row['warmup']):>6} "
+                  f"{row['replica_hours']:>9.1f} {row['cost']:>9.2f} {row['mean_replicas']:>6.1f} "
+                  f"{row['peak_replicas']:>4} {row['scale_events']:>6} "
+                  f"{row['p95_latency_ms']:>8.1f} {row['slo_violation_pct']:>7.2f}%\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft devops scale",
+        description="Replay recorded metrics through a scaling policy before deploying it"
+    )
+    parser.add_argument("input", help="Metrics file (CSV, NDJSON, ...; - for stdin)")
+    parser.add_argument("--from", dest="from_format", choices=FORMATS, help="Input format")
+    parser.add_argument("--metric", default="cpu", help="Column to scale on (default: cpu)")
+    parser.add_argument("--time-column", help="Timestamp column (ISO or epoch seconds)")
+    parser.add_argument("--capacity", type=float,
+                        help="Load one replica handles, for rate metrics such as requests/s")
+    parser.add_argument("--recorded-replicas", type=float, default=1.0,
+                        help="Replicas behind a utilization metric without a replicas column")
+    parser.add_argument("--min", type=int, default=1, help="Minimum replicas")
+    parser.add_argument("--max", type=int, default=10, help="Maximum replicas")
+    parser.add_argument("--threshold", type=float, default=80.0, help="Target utilization %%")
+    parser.add_argument("--window", default="1m", help="Demand averaging window")
+    parser.add_argument("--cooldown", default="5m", help="Scale-down stabilization window")
+    parser.add_argument("--warmup", default="0", help="Time before a new replica takes load")
+    parser.add_argument("--service-time", default="50ms", help="Latency of an idle replica")
+    parser.add_argument("--slo", default="200ms", help="Latency objective")
+    parser.add_argument("--max-violation", type=float, default=1.0,
+                        help="%% of time a policy may miss the SLO and still rank by cost")
+    parser.add_argument("--cost", type=float, default=0.0, help="Cost of one replica-hour")
+    parser.add_argument("--sweep", action="append", default=[], metavar="KEY=VALUES",
+                        help="Sweep threshold, window, cooldown or warmup (repeatable)")
+    parser.add_argument("--top", type=int, default=10, help="Sweep results to show (0 = all)")
+    parser.add_argument("--timeline", metavar="PATH",
+                        help="Write the per-sample replica timeline (csv/ndjson; - for stdout)")
+    parser.add_argument("--export", choices=EXPORTS, default="text", help="Result format")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = one per CPU)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    jobs = resolve_jobs(args.jobs)
+    start = time.perf_counter()
+    try:
+        base = Policy(args.threshold, _seconds(args.window), _seconds(args.cooldown),
+                      _seconds(args.warmup))
+        policies = parse_sweep(args.sweep, base)
+        if args.timeline and len(policies) > 1:
+            raise ScaleError("--timeline needs a single policy, not a --sweep")
+        series = load_series(args.input, args.metric, args.from_format, args.time_column,
+                             args.capacity, args.recorded_replicas)
+        simulator = Simulator(series, args.min, args.max, _seconds(args.service_time),
+                              _seconds(args.slo), args.cost, args.max_violation)
+        results = sweep(simulator, policies, jobs)
+        if args.timeline:
+            fmt = "ndjson" if args.timeline == "-" else detect_format(args.timeline)
+            writer = RecordWriter(args.timeline, fmt)
+            rows = list(simulator.timeline(policies[0]))
+            writer.write(rows)
+            writer.close()
+        if args.timeline != "-":
+            write_results(results[:args.top] if args.top > 0 else results, args.export)
+    except (ScaleError, DataError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename or args.input}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    rate = len(policies) / elapsed if elapsed > 0 else 0.0
+    print(f"SCALE: {len(policies)} {'policy' if len(policies) == 1 else 'policies'} over "
+          f"{len(series)} samples ({series.hours:.1f} h) in {elapsed:.2f}s "
+          f"({rate:,.0f} policies/s, {jobs} jobs)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Local corpus search for `craft research search`
+
+Ranks the documents of a corpus directory (papers, notes, abstracts; see
+`_corpus`) by BM25 against a query, through an inverted index kept in
+`<corpus>/.craft-index` (see `_invindex`). Each search first brings the
+index up to date: new files, and records appended to .jsonl files, are
+indexed into a new segment; the old documents of changed or removed files
+are marked deleted. Small segments are merged once there are more than
+MAX_SEGMENTS, and the index is rebuilt when a quarter of it is deleted.
+
+Queries are answered exactly with the Threshold Algorithm: each query term's
+postings are read in decreasing weight order (sorted access), every new
+document is scored by looking up its weight for the other terms (random
+access, a bisection in document order), and reading stops as soon as the
+k-th best score reaches the best score an unseen document could still get.
+--since/--until/--sources are checked as documents are seen, so filters
+never need a pass over the corpus either.
+
+    python -m craft_cli.engines.search "transformer attention" --since=2021 --limit=20
+    python -m craft_cli.engines.search "protein folding" --sources=arxiv --export=bib
+"""
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from ._corpus import (
+    APPENDABLE, CorpusError, appended, corpus_files, read_documents, tail_digest, tokenize
+)
+from ._invindex import (
+    DEFAULT_FLUSH_DOCS, MANIFEST, IndexFormatError, Manifest, Segment, SegmentBuilder
+)
+
+DEFAULT_CORPUS = "corpus"
+INDEX_DIR = ".craft-index"
+EXPORTS = ("text", "json", "csv", "bib", "ris")
+MAX_SEGMENTS = 8
+_DATE_BOUND = re.compile(r"^(\d{4})(?:-(\d\d)(?:-(\d\d))?)?$")
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class SearchError(Exception):
+    """Raised for invalid queries and filters"""
+
+
+class Hit(NamedTuple):
+    score: float
+    date: int
+    source: str
+    meta: Dict[str, Any]
+
+
+class SearchStats:
+    """What an indexing run and a query touched"""
+
+    def __init__(self) -> None:
+        self.indexed_docs = 0
+        self.indexed_files = 0
+        self.deleted_docs = 0
+        self.rebuilt = False
+        self.index_seconds = 0.0
+        self.segments = 0
+        self.docs = 0
+        self.postings = 0
+        self.candidates = 0
+        self.query_seconds = 0.0
+
+
+def parse_bound(value: str, end: bool = False) -> int:
+    """YYYYMMDD from a year, year-month or date; `end` rounds up to the period's end"""
+    match = _DATE_BOUND.match(value.strip())
+    if not match:
+        raise SearchError(f"invalid date '{value}' (use 2023, 2023-05 or 2023-05-01)")
+    year, month, day = match.groups()
+    if day:
+        return int(f"{year}{month}{day}")
+    if month:
+        return int(f"{year}{month}{31 if end else 1:02d}")
+    return int(year) * 10000 + (1231 if end else 101)
+
+
+def update_index(manifest: Manifest, root: str, flush_docs: int = DEFAULT_FLUSH_DOCS,
+                 rebuild: bool = False, stats: Optional[SearchStats] = None) -> None:
+    """Bring the index in line with the corpus under `root`"""
+    stats = stats or SearchStats()
+    started = time.perf_counter()
+    files = corpus_files(root)
+    if manifest.segments and (rebuild or manifest.deleted_docs * 4 > manifest.docs):
+        stale = [s["name"] for s in manifest.segments]
+        manifest.segments, manifest.files, manifest.deleted = [], {}, {}
+        manifest.remove_files(stale)
+        stats.rebuilt = True
+    merging = _merge_victims(manifest)
+    builder: Optional[SegmentBuilder] = None
+    present: Set[str] = set()
+    for rel, stat in files:
+        present.add(rel)
+        entry = manifest.files.get(rel)
+        parts = entry["parts"] if entry else []
+        moved = next((n for n, part in enumerate(parts) if part[0] in merging), len(parts))
+        if moved < len(parts) and not rel.lower().endswith(APPENDABLE):
+            moved = 0  # only line files can be re-read from a part's offset
+        unchanged = entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns
+        if unchanged and moved == len(parts):
+            continue
+        path = os.path.join(root, *rel.split("/"))
+        if entry and (unchanged or appended(root, rel, entry, stat)):
+            # re-read only what was appended, plus any parts in merged segments
+            start = parts[moved][3] if moved < len(parts) else entry["size"]
+            stats.deleted_docs += manifest.delete_parts(parts[moved:])
+            parts = parts[:moved]
+        else:
+            start, parts = 0, []
+            stats.deleted_docs += manifest.delete_file(rel)
+        for doc in read_documents(root, rel, stat.st_mtime, start, stat.st_size):
+            if builder is None:
+                builder = manifest.new_builder()
+            local = builder.add(doc)
+            if parts and parts[-1][0] == builder.name and parts[-1][1] + parts[-1][2] == local:
+                parts[-1][2] += 1
+            else:
+                parts.append([builder.name, local, 1, doc.offset])
+            stats.indexed_docs += 1
+            if builder.docs >= flush_docs:
+                manifest.add_segment(builder)
+                builder = None
+        manifest.files[rel] = {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+                               "tail": tail_digest(path, stat.st_size), "parts": parts}
+        stats.indexed_files += 1
+    for rel in sorted(set(manifest.files) - present):
+        stats.deleted_docs += manifest.delete_file(rel)
+    if builder is not None:
+        manifest.add_segment(builder)
+    dropped = manifest.drop_empty()
+    if stats.indexed_files or stats.deleted_docs or stats.rebuilt or not os.path.exists(
+            os.path.join(manifest.directory, MANIFEST)):
+        manifest.save()
+    manifest.remove_files(dropped)
+    stats.index_seconds = time.perf_counter() - started
+
+
+def _merge_victims(manifest: Manifest) -> Set[str]:
+    """Segments to merge: those after the largest, once there are too many
+
+    Indexing appends small segments after a large one. Re-reading the
+    documents of the small ones is cheap, leaves them fully deleted (so they
+    are dropped) and puts those documents into a single new segment.
+    """
+    if len(manifest.segments) <= MAX_SEGMENTS:
+        return set()
+    sizes = [s["docs"] for s in manifest.segments]
+    victims = {s["name"] for s in manifest.segments[sizes.index(max(sizes)) + 1:]}
+    return victims if len(victims) > 1 else {s["name"] for s in manifest.segments}
+
+
+def search(manifest: Manifest, query: str, limit: int = 10, since: int = 0, until: int = 0,
+           sources: Optional[List[str]] = None,
+           stats: Optional[SearchStats] = None) -> List[Hit]:
+    """The `limit` best documents for `query` by BM25, best first"""
+    stats = stats or SearchStats()
+    started = time.perf_counter()
+    terms = sorted(set(tokenize(query)))
+    segments = [Segment(manifest.directory, entry) for entry in manifest.segments]
+    try:
+        stats.segments = len(segments)
+        stats.docs = manifest.docs
+        ranges = [[seg.lookup(term) for term in terms] for seg in segments]
+        idf = []
+        for n in range(len(terms)):
+            df = sum(r[n][1] - r[n][0] for r in ranges if r[n])
+            idf.append(math.log(1 + (stats.docs - df + 0.5) / (df + 0.5)) if df else 0.0)
+        heap: List[Tuple[float, int, int, int]] = []
+        for number, (seg, seg_ranges) in enumerate(zip(segments, ranges)):
+            lists = [[idf[n], r[0], r[1], r[0]] for n, r in enumerate(seg_ranges) if r and idf[n]]
+            if lists:
+                _threshold_top(seg, number, lists, heap, limit, since, until, sources,
+                               manifest.deleted.get(seg.name, set()), stats)
+        hits = []
+        for score, _, number, doc in sorted(heap, reverse=True):
+            seg = segments[number]
+            meta, = seg.metadata([doc])
+            hits.append(Hit(score, seg.dates[doc], seg.sources[seg.source_ids[doc]], meta))
+    finally:
+        for seg in segments:
+            seg.close()
+    stats.query_seconds = time.perf_counter() - started
+    return hits
+
+
+def _threshold_top(seg: Segment, number: int, lists: List[List[Any]], heap: List[Any],
+                   limit: int, since: int, until: int, sources: Optional[List[str]],
+                   deleted: Set[int], stats: SearchStats) -> None:
+    """Threshold Algorithm over one segment's [idf, start, end, next] lists
+
+    `heap` holds the best (score, tiebreak, segment, doc) found so far,
+    across segments, so later segments stop as soon as they cannot beat it.
+    """
+    ids, weights, order, dates = seg.ids, seg.weights, seg.order, seg.dates
+    wanted = None
+    if sources is not None:
+        wanted = {n for n, name in enumerate(seg.sources) if name in sources}
+        if not wanted:
+            return
+    seen: Set[int] = set()
+    while True:
+        best, bound, frontier = None, 0.0, 0.0
+        for entry in lists:
+            idf, start, end, pos = entry
+            if pos < end:
+                value = idf * weights[start + order[pos]]
+                bound += value
+                if value > frontier:
+                    best, frontier = entry, value
+        if best is None or (len(heap) >= limit and heap[0][0] >= bound):
+            return
+        doc = ids[best[1] + order[best[3]]]
+        best[3] += 1
+        stats.postings += 1
+        if doc in seen:
+            continue
+        seen.add(doc)
+        if doc in deleted or (since and dates[doc] < since) or (until and dates[doc] > until):
+            continue
+        if wanted is not None and seg.source_ids[doc] not in wanted:
+            continue
+        stats.candidates += 1
+        score = 0.0
+        for entry in lists:
+            if entry is best:
+                score += frontier
+            else:
+                score += entry[0] * seg.weight(entry[1], entry[2], doc)
+                stats.postings += 1
+        item = (score, -(number << 32 | doc), number, doc)
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+
+def _date_text(date: int) -> str:
+    return f"{date // 10000:04d}-{date // 100 % 100:02d}-{date % 100:02d}" if date else ""
+
+
+def _location(meta: Dict[str, Any]) -> str:
+    return f"{meta['path']}:{meta['line']}" if meta.get("line") else meta["path"]
+
+
+def _bib_key(meta: Dict[str, Any]) -> str:
+    return re.sub(r"[^\w:.-]", "_", meta["key"])
+
+
+def write_hits(hits: List[Hit], export: str, out=None) -> None:
+    out = out or sys.stdout
+    if export == "json":
+        for rank, hit in enumerate(hits, 1):
+            record = {"rank": rank, "score": round(hit.score, 4), "date": _date_text(hit.date),
+                      "source": hit.source, **hit.meta}
+            out.write(_encode(record) + "\n")
+    elif export == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(["rank", "score", "date", "source", "key", "title", "path", "line"])
+        for rank, hit in enumerate(hits, 1):
+            writer.writerow([rank, round(hit.score, 4), _date_text(hit.date), hit.source,
+                             hit.meta["key"], hit.meta["title"], hit.meta["path"],
+                             hit.meta.get("line", "")])
+    elif export == "bib":
+        for hit in hits:
+            fields = [("title", hit.meta["title"])]
+            if hit.meta.get("authors"):
+                fields.append(("author", " and ".join(hit.meta["authors"])))
+            if hit.date:
+                fields.append(("year", str(hit.date // 10000)))
+            if hit.source:
+                fields.append(("howpublished", hit.source))
+            fields.append(("note", _location(hit.meta)))
+            body = ",\n".join(f"  {name} = {{{value}}}" for name, value in fields)
+            out.write(f"@misc{{{_bib_key(hit.meta)},\n{body}\n}}\n\n")
+    elif export == "ris":
+        for hit in hits:
+            lines = ["TY  - GEN", f"ID  - {hit.meta['key']}", f"TI  - {hit.meta['title']}"]
+            lines += [f"AU  - {author}" for author in hit.meta.get("authors") or ()]
+            if hit.date:
+                lines += [f"PY  - {hit.date // 10000}",
+                          f"DA  - {_date_text(hit.date).replace('-', '/')}"]
+            if hit.source:
+                lines.append(f"DB  - {hit.source}")
+            lines += [f"N1  - {_location(hit.meta)}", "ER  - "]
+            out.write("\n".join(lines) + "\n\n")
+    else:
+        for rank, hit in enumerate(hits, 1):
+            label = f" [{hit.source}]" if hit.source else ""
+            out.write(f"{rank:>3}. {hit.score:6.2f}  {_date_text(hit.date) or '----------'}"
+                      f"{label}  {hit.meta['title'] or _location(hit.meta)}\n")
+            out.write(f"     {_location(hit.meta)}")
+            out.write(f"  {hit.meta['snippet']}\n" if hit.meta.get("snippet") else "\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft research search", description="Search a local corpus by relevance (BM25)"
+    )
+    parser.add_argument("query", nargs="*", help="Search terms (none: only update the index)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS,
+                        help="Directory of documents (.txt, .md, .json, .jsonl, ...)")
+    parser.add_argument("--index-dir", help=f"Where the index lives (default: <corpus>/{INDEX_DIR})")
+    parser.add_argument("--since", help="Earliest date: 2023, 2023-05 or 2023-05-01")
+    parser.add_argument("--until", help="Latest date, in the same forms")
+    parser.add_argument("--sources", help="Comma-separated sources (record field or subdirectory)")
+    parser.add_argument("--limit", type=int, default=10, help="Number of results")
+    parser.add_argument("--export", choices=EXPORTS, default="text", help="Output format")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the index from scratch")
+    parser.add_argument("--no-update", dest="update", action="store_false",
+                        help="Query the index as it is, without checking the corpus for changes")
+    parser.add_argument("--flush-docs", type=int, default=DEFAULT_FLUSH_DOCS,
+                        help="Documents per segment written while indexing")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    stats = SearchStats()
+    query = " ".join(args.query)
+    try:
+        since = parse_bound(args.since) if args.since else 0
+        until = parse_bound(args.until, end=True) if args.until else 0
+        sources = [s.strip() for s in args.sources.split(",") if s.strip()] \
+            if args.sources else None
+        if args.limit < 1:
+            raise SearchError("--limit must be at least 1")
+        if query and not tokenize(query):
+            raise SearchError(f"no searchable words in '{query}'")
+        manifest = Manifest.load(args.index_dir or os.path.join(args.corpus, INDEX_DIR))
+        if args.update or args.reindex:
+            update_index(manifest, args.corpus, max(args.flush_docs, 1), args.reindex, stats)
+        elif not manifest.segments and not os.path.isdir(manifest.directory):
+            raise SearchError(f"no index in '{manifest.directory}' (run without --no-update)")
+        hits = search(manifest, query, args.limit, since, until, sources, stats) if query else []
+        write_hits(hits, args.export)
+    except (SearchError, CorpusError, IndexFormatError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename}", file=sys.stderr)
+        return 1
+    if args.update or args.reindex:
+        action = "rebuilt" if stats.rebuilt else "indexed"
+        print(f"INDEX: {action} {stats.indexed_docs:,} documents from {stats.indexed_files} "
+              f"files in {stats.index_seconds:.2f}s ({len(manifest.segments)} segments, "
+              f"{manifest.docs:,} documents, {stats.deleted_docs:,} deleted)", file=sys.stderr)
+    if query:
+        print(f"SEARCH: {len(hits)} results in "
+              f"{stats.query_seconds * 1000:.1f} ms ({stats.postings:,} postings read, "
+              f"{stats.candidates:,} candidates scored, {stats.segments} segments)",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
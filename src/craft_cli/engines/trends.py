@@ -0,0 +1,568 @@
+"""
+Research trends for `craft research trends`
+
+Counts, per calendar month and source, how many documents of a corpus
+directory (see `_corpus`) contain each term, in tables kept in
+`<corpus>/.craft-trends` (see `_termtables`). Each run first brings the
+tables up to date in one streaming pass over what changed: new files, and
+records appended to .jsonl files, are counted into their months; the months
+a changed or removed file had documents in are recounted from the files
+with documents in them.
+
+The timeframe is then cut into periods (months, quarters or years) ending
+with the newest month, and every term is scored in whole-column passes, one
+per period, over the period tables:
+
+- growth: the yearly growth of its share of documents, from a least-squares
+  fit of the log share against time;
+- burst: how far its share in the recent quarter of the timeframe lies
+  above its share before, in standard errors of a two-proportion test (a
+  z-score, so terms seen in a handful of documents do not rank as bursts).
+
+Without a topic, the terms with the highest burst scores are listed as
+emerging. A topic charts its own words instead, marking the periods in which
+each burst. The network view links terms whose shares rise and fall
+together (and, for a topic, adds the terms that follow it most closely).
+
+    python -m craft_cli.engines.trends --timeframe=5y --fields=arxiv --limit=30
+    python -m craft_cli.engines.trends "diffusion, transformer" --timeframe=10y --export=svg
+"""
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter
+from itertools import compress, repeat
+from operator import add, ge, mul
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from ._corpus import CorpusError, appended, corpus_files, read_documents, tail_digest, tokenize
+from ._termtables import TableFormatError, TermTables
+from ._trendplots import html_page, line_chart, network
+
+DEFAULT_CORPUS = "corpus"
+TABLES_DIR = ".craft-trends"
+EXPORTS = ("text", "json", "csv", "svg", "html")
+VISUALIZATIONS = ("chart", "network")
+INTERVALS = {"month": 1, "quarter": 3, "year": 12}
+DEFAULT_FLUSH_DOCS = 50_000
+BURST_Z = 3.0
+NETWORK_R = 0.7
+CHART_LINES = 8
+SPARKS = "▁▂▃▄▅▆▇█"
+_TIMEFRAME = re.compile(r"^(\d+)\s*([my])$")
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class TrendsError(Exception):
+    """Raised for invalid timeframes, topics and empty selections"""
+
+
+class Trend(NamedTuple):
+    term: str
+    counts: List[int]  # documents containing the term, per period
+    docs: int  # documents containing the term in the timeframe
+    share: float  # per 1,000 documents of the recent periods
+    growth: float  # % per year
+    burst: float  # z-score of the recent periods
+    bursts: List[bool]  # per period
+    since: str  # first period of the burst the timeframe ends in
+
+
+class Report(NamedTuple):
+    title: str
+    interval: str
+    labels: List[str]
+    docs: List[int]  # documents per period
+    recent: int  # number of recent periods
+    terms: List[Trend]
+    links: List[Tuple[int, int, float]]  # (term, term, correlation)
+
+
+class TrendStats:
+    """What a table update and an analysis touched"""
+
+    def __init__(self) -> None:
+        self.counted_docs = 0
+        self.counted_files = 0
+        self.removed_files = 0
+        self.recounted_months = 0
+        self.undated_docs = 0
+        self.rebuilt = False
+        self.update_seconds = 0.0
+        self.terms = 0
+        self.periods = 0
+        self.cached_periods = 0
+        self.analyze_seconds = 0.0
+
+
+def parse_timeframe(value: str) -> int:
+    """Months in a timeframe such as 1y, 5y or 18m"""
+    match = _TIMEFRAME.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise TrendsError(f"invalid timeframe '{value}' (use 1y, 5y, 10y or months, e.g. 18m)")
+    return int(match.group(1)) * (12 if match.group(2) == "y" else 1)
+
+
+def choose_interval(months: int, interval: str = "auto") -> str:
+    """Months up to two years, quarters up to six, years beyond"""
+    if interval != "auto":
+        return interval
+    return "month" if months <= 24 else "quarter" if months <= 72 else "year"
+
+
+def _matcher(fields: Optional[List[str]]) -> Callable[[str], bool]:
+    """Source filter: a field matches itself and its dotted subfields (cs matches cs.CL)"""
+    if not fields:
+        return lambda source: True
+    prefixes = tuple(f"{field}." for field in fields)
+    wanted = set(fields)
+    return lambda source: source in wanted or source.startswith(prefixes)
+
+
+def _month_index(month: int) -> int:
+    return month // 100 * 12 + month % 100 - 1
+
+
+def _month_of(index: int) -> int:
+    return index // 12 * 100 + index % 12 + 1
+
+
+def _label(period: int, interval: str) -> str:
+    month = _month_of(period * INTERVALS[interval])
+    year = month // 100
+    if interval == "year":
+        return str(year)
+    if interval == "quarter":
+        return f"{year}-Q{(month % 100 + 2) // 3}"
+    return f"{year}-{month % 100:02d}"
+
+
+def update_tables(tables: TermTables, root: str, flush_docs: int = DEFAULT_FLUSH_DOCS,
+                  rebuild: bool = False, stats: Optional[TrendStats] = None) -> None:
+    """Bring the term tables in line with the corpus under `root`"""
+    stats = stats or TrendStats()
+    started = time.perf_counter()
+    files = corpus_files(root)
+    if rebuild and (tables.files or tables.months):
+        tables.reset()
+        stats.rebuilt = True
+    starts: Dict[str, int] = {}  # where the new data of a changed file starts
+    dirty: Set[int] = set()  # months to recount
+    for rel, stat in files:
+        entry = tables.files.get(rel)
+        if entry is None:
+            starts[rel] = 0
+        elif entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            continue
+        elif appended(root, rel, entry, stat):
+            starts[rel] = entry["size"]
+        else:
+            starts[rel] = 0
+            dirty.update(entry["months"])
+    for rel in sorted(set(tables.files) - {rel for rel, _ in files}):
+        dirty.update(tables.files.pop(rel)["months"])
+        stats.removed_files += 1
+        tables.changed = True
+    tables.drop_months(dirty)
+    stats.recounted_months = len(dirty)
+    counts: Dict[Tuple[int, str], Counter] = {}
+    docs: Dict[Tuple[int, str], int] = Counter()
+    buffered = 0
+    for rel, stat in files:
+        entry = tables.files.get(rel)
+        recount = entry is not None and not dirty.isdisjoint(entry["months"])
+        start = starts.get(rel, stat.st_size)
+        if start == stat.st_size and not recount:
+            continue
+        months = set(entry["months"]) if entry and start else set()
+        for doc in read_documents(root, rel, stat.st_mtime, 0 if recount else start,
+                                  stat.st_size):
+            month = doc.date // 100
+            if doc.offset < start and month not in dirty:
+                continue  # counted before
+            if not month:
+                stats.undated_docs += 1
+                continue
+            key = (month, doc.source)
+            counter = counts.get(key)
+            if counter is None:
+                counter = counts[key] = Counter()
+            counter.update(set(tokenize(f"{doc.title}\n{doc.text}")))
+            docs[key] += 1
+            months.add(month)
+            stats.counted_docs += 1
+            buffered += 1
+            if buffered >= flush_docs:
+                tables.add_counts(counts, docs)
+                counts, docs, buffered = {}, Counter(), 0
+        path = os.path.join(root, *rel.split("/"))
+        tables.files[rel] = {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+                             "tail": tail_digest(path, stat.st_size), "months": sorted(months)}
+        tables.changed = True
+        stats.counted_files += 1
+    if buffered:
+        tables.add_counts(counts, docs)
+    stats.update_seconds = time.perf_counter() - started
+
+
+def _sum_columns(columns: Sequence[List[int]], length: int) -> List[int]:
+    total = [0] * length
+    for column in columns:
+        total = list(map(add, total, column))
+    return total
+
+
+def _scores(columns: List[List[int]], docs: List[int], recent: int,
+            per_year: float) -> Tuple[List[float], List[float], List[int]]:
+    """(growth % per year, burst z-score, recent documents) of every term
+
+    `columns[p][t]` is the number of documents of period p containing term t.
+    """
+    terms = len(columns[0])
+    used = [p for p, n in enumerate(docs) if n]
+    growth = [0.0] * terms
+    if len(used) > 1:
+        mean = sum(used) / len(used)
+        sxx = sum((p - mean) ** 2 for p in used)
+        slope, offset = [0.0] * terms, 0.0
+        for p in used:
+            weight = (p - mean) / sxx
+            offset += weight * math.log(docs[p] + 1)
+            logs = map(math.log, map(add, columns[p], repeat(0.5)))
+            slope = list(map(add, slope, map(mul, logs, repeat(weight))))
+        growth = [math.expm1(min((s - offset) * per_year, 20.0)) * 100 for s in slope]
+    recent_docs, earlier_docs = sum(docs[-recent:]), sum(docs[:-recent])
+    recent_counts = _sum_columns(columns[-recent:], terms)
+    burst = [_z(count, recent_docs, earlier, earlier_docs) for count, earlier in
+             zip(recent_counts, _sum_columns(columns[:-recent], terms))]
+    return growth, burst, recent_counts
+
+
+def _z(count: int, docs: int, before: int, docs_before: int) -> float:
+    """Two-proportion z-score of count/docs against before/docs_before"""
+    pooled = (count + before) / (docs + docs_before)
+    error = math.sqrt(pooled * (1 - pooled) * (1 / docs + 1 / docs_before))
+    return (count / docs - before / docs_before) / error if error else 0.0
+
+
+def _bursts(counts: List[int], docs: List[int]) -> List[bool]:
+    """Periods whose share is BURST_Z standard errors above the share in all earlier ones"""
+    flags, seen, seen_docs = [], 0, 0
+    for count, n in zip(counts, docs):
+        flags.append(bool(n and seen_docs) and _z(count, n, seen, seen_docs) >= BURST_Z)
+        seen += count
+        seen_docs += n
+    return flags
+
+
+def _shares(counts: List[int], docs: List[int]) -> List[float]:
+    return [1000 * count / n if n else 0.0 for count, n in zip(counts, docs)]
+
+
+def _pearson(a: List[float], b: List[float]) -> float:
+    mean_a, mean_b = sum(a) / len(a), sum(b) / len(b)
+    cross = sum((x - mean_a) * (y - mean_b) for x, y in zip(a, b))
+    spread = math.sqrt(sum((x - mean_a) ** 2 for x in a) * sum((y - mean_b) ** 2 for y in b))
+    return cross / spread if spread > 1e-12 else 0.0
+
+
+def _related(columns: List[List[int]], docs: List[int], target: List[float]) -> List[float]:
+    """Correlation of every term's share series with `target`, over non-empty periods"""
+    terms = len(columns[0])
+    used = [p for p, n in enumerate(docs) if n]
+    mean = sum(target[p] for p in used) / len(used)
+    spread = sum((target[p] - mean) ** 2 for p in used)
+    cross, sums, squares = [0.0] * terms, [0.0] * terms, [0.0] * terms
+    for p in used:
+        shares = list(map(mul, columns[p], repeat(1000 / docs[p])))
+        cross = list(map(add, cross, map(mul, shares, repeat(target[p] - mean))))
+        sums = list(map(add, sums, shares))
+        squares = list(map(add, squares, map(mul, shares, shares)))
+    correlations = []
+    for c, s, q in zip(cross, sums, squares):
+        variance = q - s * s / len(used)
+        correlations.append(c / math.sqrt(spread * variance) if spread and variance > 1e-12
+                            else 0.0)
+    return correlations
+
+
+def _links(trends: List[Trend], docs: List[int]) -> List[Tuple[int, int, float]]:
+    used = [p for p, n in enumerate(docs) if n]
+    shares = [[share for p, share in enumerate(_shares(t.counts, docs)) if p in used]
+              for t in trends]
+    links = []
+    for a in range(len(trends)):
+        for b in range(a + 1, len(trends)):
+            r = _pearson(shares[a], shares[b])
+            if r >= NETWORK_R:
+                links.append((a, b, r))
+    return links
+
+
+def analyze(tables: TermTables, months: int, interval: str, fields: Optional[List[str]] = None,
+            topics: Optional[List[str]] = None, limit: int = 20, min_docs: int = 10,
+            related: bool = False, stats: Optional[TrendStats] = None) -> Report:
+    """Score the terms of the `months` up to the newest month with documents
+
+    Without `topics`, the `limit` terms with the highest burst scores (and at
+    least `min_docs` documents); with them, their words, plus with `related`
+    the `limit` terms whose shares correlate most with theirs.
+    """
+    stats = stats or TrendStats()
+    started = time.perf_counter()
+    wanted = _matcher(fields)
+    newest = max((month for month in tables.months if any(map(wanted, tables.sources(month)))),
+                 default=0)
+    if not newest:
+        raise TrendsError("no dated documents" + (f" from {', '.join(fields)}" if fields else ""))
+    size = INTERVALS[interval]
+    last, open_period = _month_index(newest) // size, _month_index(tables.newest) // size
+    fields_key = ",".join(sorted(fields)) if fields else "*"
+    labels, docs, tables_by_period = [], [], []
+    for period in range(last - max(2, -(-months // size)) + 1, last + 1):
+        labels.append(_label(period, interval))
+        span = [_month_of(period * size + n) for n in range(size)]
+        n, counts, cached = tables.period_table(f"{interval} {labels[-1]} {fields_key}", span,
+                                                wanted, cache=period < open_period)
+        docs.append(n)
+        tables_by_period.append(counts)
+        stats.cached_periods += cached
+    stats.periods = len(labels)
+    recent = max(1, len(labels) // 4)
+    if not sum(docs[:-recent]):
+        raise TrendsError(f"no documents before {labels[-recent]}: use a longer --timeframe")
+
+    words: List[str] = []
+    for topic in topics or ():
+        words += [word for word in tokenize(topic) if word not in words]
+    if topics and not words:
+        raise TrendsError(f"no trackable words in '{', '.join(topics)}'")
+    for word in words:
+        if word not in tables.ids:
+            raise TrendsError(f"'{word}' does not occur in the corpus")
+    # a term missing from the recent periods cannot be emerging
+    pool = tables_by_period if words else tables_by_period[-recent:]
+    ids = list(set().union(*pool)) if related or not words else []
+    columns = [list(map(table.get, ids, repeat(0))) for table in tables_by_period]
+    if ids:
+        keep = list(map(ge, map(sum, zip(*columns)), repeat(min_docs)))
+        ids = list(compress(ids, keep))
+        columns = [list(compress(column, keep)) for column in columns]
+    stats.terms = len(ids)
+    if words:
+        topic_ids = [tables.ids[word] for word in words]
+        topic_columns = [list(map(table.get, topic_ids, repeat(0)))
+                         for table in tables_by_period]
+        best: List[int] = []
+        if related and ids:
+            target = _shares([sum(column) for column in topic_columns], docs)
+            correlation = _related(columns, docs, target)
+            best = heapq.nlargest(limit, (n for n in range(len(ids)) if ids[n] not in topic_ids),
+                                  key=correlation.__getitem__)
+        ids = topic_ids + [ids[n] for n in best]
+        columns = [topic + [column[n] for n in best]
+                   for topic, column in zip(topic_columns, columns)]
+        selected = list(range(len(ids)))
+        stats.terms += len(topic_ids)
+    if not ids:
+        raise TrendsError(f"no term occurs in {min_docs} documents (lower --min-docs)")
+    growth, burst, recent_counts = _scores(columns, docs, recent, 12 / size)
+    if not words:
+        selected = [n for n in heapq.nlargest(limit, range(len(ids)), key=burst.__getitem__)
+                    if burst[n] > 0]
+    recent_docs = sum(docs[-recent:])
+    trends = []
+    for n in selected:
+        counts = [column[n] for column in columns]
+        flags = _bursts(counts, docs)
+        since = ""
+        for period in range(len(flags) - 1, -1, -1):
+            if not flags[period]:
+                break
+            since = labels[period]
+        trends.append(Trend(tables.terms[ids[n]], counts, sum(counts),
+                            1000 * recent_counts[n] / recent_docs, growth[n], burst[n],
+                            flags, since))
+    title = ", ".join(topics) if topics else "Emerging terms"
+    links = _links(trends, docs) if related else []
+    stats.analyze_seconds = time.perf_counter() - started
+    return Report(f"{title}, {labels[0]} to {labels[-1]}", interval, labels, docs, recent,
+                  trends, links)
+
+
+def _spark(shares: List[float]) -> str:
+    peak = max(shares, default=0.0)
+    if not peak:
+        return SPARKS[0] * len(shares)
+    return "".join(SPARKS[min(int(share / peak * len(SPARKS)), len(SPARKS) - 1)]
+                   for share in shares)
+
+
+def _record(report: Report, trend: Trend) -> Dict[str, Any]:
+    return {"term": trend.term, "docs": trend.docs, "share": round(trend.share, 3),
+            "growth": round(trend.growth, 1), "burst": round(trend.burst, 2),
+            "since": trend.since, "counts": trend.counts,
+            "bursts": [label for label, flag in zip(report.labels, trend.bursts) if flag]}
+
+
+def _rows(report: Report) -> List[List[Any]]:
+    return [[trend.term, f"{trend.docs:,}", f"{trend.share:.1f}", f"{trend.growth:+.0f}%",
+             f"{trend.burst:.1f}", trend.since or "-"] for trend in report.terms]
+
+
+def write_report(report: Report, export: str = "text", visualization: str = "chart",
+                 topic: bool = False, out=None) -> None:
+    out = out or sys.stdout
+    names = [trend.term for trend in report.terms]
+    if export == "json":
+        data = {"title": report.title, "interval": report.interval,
+                "periods": [{"period": label, "docs": n}
+                            for label, n in zip(report.labels, report.docs)],
+                "recent": report.labels[-report.recent:],
+                "terms": [_record(report, trend) for trend in report.terms]}
+        if visualization == "network":
+            data["links"] = [{"source": names[a], "target": names[b], "r": round(r, 3)}
+                             for a, b, r in report.links]
+        out.write(_encode(data) + "\n")
+    elif export == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        if visualization == "network":
+            writer.writerow(["source", "target", "r"])
+            writer.writerows([names[a], names[b], round(r, 3)] for a, b, r in report.links)
+            return
+        writer.writerow(["term", "period", "docs", "period_docs", "per_1000", "burst"])
+        for trend in report.terms:
+            for label, count, n, flag in zip(report.labels, trend.counts, report.docs,
+                                             trend.bursts):
+                writer.writerow([trend.term, label, count, n,
+                                 round(1000 * count / n, 3) if n else 0, int(flag)])
+    elif export in ("svg", "html"):
+        if visualization == "network":
+            svg = network(report.title, [(t.term, t.docs) for t in report.terms], report.links)
+        else:
+            svg = line_chart(report.title, report.labels,
+                             [(t.term, _shares(t.counts, report.docs), t.bursts)
+                              for t in report.terms[:CHART_LINES]])
+        if export == "svg":
+            out.write(svg)
+        else:
+            out.write(html_page(report.title, svg, ["term", "documents", "per 1,000 recent",
+                                                    "growth/year", "burst", "since"],
+                                _rows(report)))
+    elif visualization == "network":
+        out.write(f"{report.title}: {len(names)} terms, {len(report.links)} links "
+                  f"(r >= {NETWORK_R})\n")
+        width = max(map(len, names), default=4)
+        for a, b, r in sorted(report.links, key=lambda link: -link[2]):
+            out.write(f"  {names[a]:<{width}}  --  {names[b]:<{width}}  {r:.2f}\n")
+    elif topic:
+        out.write(f"{report.title} ({len(report.labels)} {report.interval}s)\n")
+        width = max(12, *map(len, names))
+        out.write(f"{'period':<8} {'docs':>9}" + "".join(
+            f"  {name:>{width}} {'per 1k':>7} " for name in names).rstrip() + "\n")
+        for p, (label, n) in enumerate(zip(report.labels, report.docs)):
+            cells = "".join(
+                f"  {t.counts[p]:>{width},} {1000 * t.counts[p] / n if n else 0:>7.1f}"
+                f"{'*' if t.bursts[p] else ' '}" for t in report.terms)
+            out.write(f"{label:<8} {n:>9,}{cells}".rstrip() + "\n")
+        out.write(f"(* burst: {BURST_Z:g}+ standard errors above the earlier share)\n")
+        for trend in report.terms:
+            since = f" since {trend.since}" if trend.since else ""
+            out.write(f"{trend.term}: {trend.growth:+.0f}% a year, burst {trend.burst:.1f}"
+                      f"{since}\n")
+    else:
+        recent = report.labels[-report.recent]
+        out.write(f"{report.title}: {len(report.labels)} {report.interval}s, "
+                  f"{sum(report.docs):,} documents (recent: {recent} on)\n")
+        width = max(12, *map(len, names)) if names else 12
+        out.write(f"{'#':>3}  {'term':<{width}} {'docs':>9} {'per 1k':>7} {'growth':>8} "
+                  f"{'burst':>7}  {'since':<8} trend\n")
+        for rank, trend in enumerate(report.terms, 1):
+            out.write(f"{rank:>3}  {trend.term:<{width}} {trend.docs:>9,} {trend.share:>7.1f} "
+                      f"{trend.growth:>+7.0f}% {trend.burst:>7.1f}  {trend.since or '-':<8} "
+                      f"{_spark(_shares(trend.counts, report.docs))}\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft research trends", description="Track research trends and emerging topics"
+    )
+    parser.add_argument("topic", nargs="*",
+                        help="Comma-separated topics to chart (none: list emerging terms)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS,
+                        help="Directory of documents (.txt, .md, .json, .jsonl, ...)")
+    parser.add_argument("--cache-dir",
+                        help=f"Where the term tables live (default: <corpus>/{TABLES_DIR})")
+    parser.add_argument("--timeframe", default="5y", help="Analysis window: 1y, 5y, 10y, 18m")
+    parser.add_argument("--interval", choices=("auto",) + tuple(INTERVALS), default="auto",
+                        help="Period length (auto: months up to 2y, quarters up to 6y)")
+    parser.add_argument("--fields", help="Comma-separated sources (record field or subdirectory)")
+    parser.add_argument("--visualization", choices=VISUALIZATIONS, default="chart",
+                        help="Rates over time, or a network of terms that move together")
+    parser.add_argument("--export", choices=EXPORTS, default="text", help="Output format")
+    parser.add_argument("--output", help="Write here instead of stdout")
+    parser.add_argument("--limit", type=int, default=20, help="Number of terms")
+    parser.add_argument("--min-docs", type=int, default=10,
+                        help="Ignore terms in fewer documents of the timeframe")
+    parser.add_argument("--rebuild", action="store_true", help="Recount the corpus from scratch")
+    parser.add_argument("--no-update", dest="update", action="store_false",
+                        help="Use the tables as they are, without checking the corpus for changes")
+    parser.add_argument("--flush-docs", type=int, default=DEFAULT_FLUSH_DOCS,
+                        help="Documents counted in memory before the tables are updated")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    stats = TrendStats()
+    topics = [t.strip() for t in " ".join(args.topic).split(",") if t.strip()]
+    try:
+        months = parse_timeframe(args.timeframe)
+        interval = choose_interval(months, args.interval)
+        fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+        if args.limit < 1:
+            raise TrendsError("--limit must be at least 1")
+        tables = TermTables.load(args.cache_dir or os.path.join(args.corpus, TABLES_DIR))
+        if args.update or args.rebuild:
+            update_tables(tables, args.corpus, max(args.flush_docs, 1), args.rebuild, stats)
+        elif not tables.months:
+            raise TrendsError(f"no term tables in '{tables.directory}' (run without --no-update)")
+        if tables.changed:
+            tables.save()
+            tables.remove_stale()
+        report = analyze(tables, months, interval, fields, topics, args.limit,
+                         max(args.min_docs, 1), args.visualization == "network", stats)
+        if tables.changed:
+            tables.save()
+            tables.remove_stale()
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as f:
+                write_report(report, args.export, args.visualization, bool(topics), f)
+        else:
+            write_report(report, args.export, args.visualization, bool(topics))
+    except (TrendsError, CorpusError, TableFormatError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename}", file=sys.stderr)
+        return 1
+    if args.update or args.rebuild:
+        action = "recounted" if stats.rebuilt else "counted"
+        print(f"TABLES: {action} {stats.counted_docs:,} documents from {stats.counted_files} "
+              f"files in {stats.update_seconds:.2f}s ({stats.recounted_months} months "
+              f"recounted, {len(tables.months)} months, {len(tables.terms):,} terms)",
+              file=sys.stderr)
+    print(f"TRENDS: scored {stats.terms:,} terms over {stats.periods} {interval}s in "
+          f"{stats.analyze_seconds * 1000:.0f} ms ({stats.cached_periods} periods from cache)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
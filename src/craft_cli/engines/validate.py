@@ -0,0 +1,574 @@
+"""
+Streaming schema validation for `craft data validate`
+
+A JSON-Schema-like document is compiled once into a list of checks per
+column. Rows are then validated a batch at a time. Each check first tests
+the whole batch column with C-level builtins (map(int), set inclusion,
+min/max); only a batch that fails is scanned value by value to find the
+offending rows. Valid data, the common case, never goes through a
+per-value Python loop.
+
+Supported keywords: type, enum, const, minimum, maximum, exclusiveMinimum,
+exclusiveMaximum, minLength, maxLength, pattern, format (date, date-time,
+email), plus top-level required and additionalProperties. Null and empty
+values only fail `required`; every other keyword skips them.
+
+    python -m craft_cli.engines.validate data.csv schema.json --jobs=4 --strict
+"""
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from ._io import (
+    DataError, FORMATS, detect_format, plan_partitions, read_chunks, read_partition,
+    splittable
+)
+from ._parallel import ordered_map, resolve_jobs
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_PARTITION_MB = 64
+DEFAULT_SAMPLES = 5
+TYPES = ("string", "integer", "number", "boolean", "null")
+
+_BOOLEANS = {"true": True, "false": False, "True": True, "False": False, "1": True, "0": False}
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class SchemaError(DataError):
+    """Raised for schemas that cannot be compiled"""
+
+
+def load_schema(path: str) -> Dict[str, Any]:
+    """Read a JSON or YAML schema file"""
+    try:
+        text = Path(path).read_text()
+    except OSError as e:
+        raise SchemaError(f"cannot read schema '{path}': {e.strerror or e}")
+    try:
+        data = json.loads(text) if path.endswith(".json") else yaml.safe_load(text)
+    except (ValueError, yaml.YAMLError) as e:
+        raise SchemaError(f"invalid schema '{path}': {e}")
+    if not isinstance(data, dict):
+        raise SchemaError(f"schema '{path}' must be a mapping")
+    return data
+
+
+def merge_rules(schema: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a rules file to a schema
+
+    Rules are either a schema of their own or a plain mapping of column name
+    to keywords; either way their column keywords override the schema's.
+    """
+    merged = dict(schema)
+    properties = {name: dict(spec) for name, spec in schema.get("properties", {}).items()}
+    if "properties" in rules or "required" in rules:
+        columns = rules.get("properties", {})
+        merged["required"] = list(dict.fromkeys(schema.get("required", []) + rules.get("required", [])))
+        if "additionalProperties" in rules:
+            merged["additionalProperties"] = rules["additionalProperties"]
+    else:
+        columns = rules
+    for name, spec in columns.items():
+        if not isinstance(spec, dict):
+            raise SchemaError(f"rules for column '{name}' must be a mapping")
+        properties.setdefault(name, {}).update(spec)
+    merged["properties"] = properties
+    return merged
+
+
+# Type coercion: CSV values arrive as strings, JSON values with their own types
+
+def _as_integer(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    return int(value)
+
+
+def _as_number(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError
+    return float(value)
+
+
+def _as_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return _BOOLEANS[value]
+
+
+def _as_string(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError
+    return value
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "integer": _as_integer, "number": _as_number, "boolean": _as_boolean, "string": _as_string
+}
+
+_FORMATS: Dict[str, Callable[[str], Any]] = {
+    "date": date.fromisoformat,
+    "date-time": lambda v: datetime.fromisoformat(v[:-1] + "+00:00" if v.endswith("Z") else v),
+    "email": lambda v: _EMAIL.match(v) or _fail()
+}
+
+# Builtins that accept the common spelling of each format without a Python call
+_FAST_FORMATS: Dict[str, Callable[[str], Any]] = {
+    "date": date.fromisoformat, "date-time": datetime.fromisoformat, "email": _EMAIL.match
+}
+
+
+def _fail() -> None:
+    raise ValueError
+
+
+def _convert_all(kind: str, values: List[Any], cache: Dict[str, Any]) -> List[Any]:
+    """Convert a whole column, in C when the value types allow it
+
+    Results (and failures) are kept in the batch's cache so a column's type
+    and bound checks convert it only once.
+    """
+    if kind not in cache:
+        try:
+            cache[kind] = _convert_column(kind, values)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            cache[kind] = e
+    result = cache[kind]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def _convert_column(kind: str, values: List[Any]) -> List[Any]:
+    types = set(map(type, values))
+    if kind == "number" and bool not in types:
+        return list(map(float, values))
+    if kind == "integer" and types <= {str, int}:
+        return list(map(int, values))
+    if kind == "string":
+        if types - {str}:
+            raise ValueError
+        return values
+    if kind == "boolean" and types == {str}:
+        if not set(values) <= _BOOLEANS.keys():
+            raise ValueError
+        return values
+    return list(map(_CONVERTERS[kind], values))
+
+
+def _converts(convert: Callable[[Any], Any]) -> Callable[[Any], bool]:
+    def check(value: Any) -> bool:
+        try:
+            convert(value)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return False
+        return True
+    return check
+
+
+class Check:
+    """One compiled keyword of one column
+
+    `batch(values, cache)` is True when every value passes and must not
+    loop in Python; `value(v)` tests a single value and is only used to locate
+    failures in a batch that did not pass.
+    """
+
+    __slots__ = ("column", "keyword", "batch", "value")
+
+    def __init__(self, column: str, keyword: str,
+                 batch: Callable[[List[Any], Dict[str, Any]], bool],
+                 value: Callable[[Any], bool]):
+        self.column = column
+        self.keyword = keyword
+        self.batch = batch
+        self.value = value
+
+
+def _batch_from(value_check: Callable[[Any], bool]) -> Callable[[List[Any], Dict[str, Any]], bool]:
+    return lambda values, cache: all(map(value_check, values))
+
+
+def _compile_type(column: str, spec: Any) -> Optional[Check]:
+    types = [spec] if isinstance(spec, str) else list(spec)
+    unknown = [t for t in types if t not in TYPES]
+    if unknown:
+        raise SchemaError(f"column '{column}': unknown type {unknown[0]!r}")
+    types = [t for t in types if t != "null"]  # nulls are never type-checked
+    if not types:
+        return None
+    if len(types) == 1:
+        kind = types[0]
+
+        def batch(values: List[Any], cache: Dict[str, Any]) -> bool:
+            try:
+                _convert_all(kind, values, cache)
+            except (ValueError, TypeError, KeyError, AttributeError):
+                return False
+            return True
+        return Check(column, "type", batch, _converts(_CONVERTERS[kind]))
+    checks = [_converts(_CONVERTERS[t]) for t in types]
+    value = lambda v: any(check(v) for check in checks)  # noqa: E731
+    return Check(column, "type", _batch_from(value), value)
+
+
+def _numbers_or_none(values: List[Any], cache: Dict[str, Any]) -> Optional[List[float]]:
+    try:
+        return _convert_all("number", values, cache)
+    except (ValueError, TypeError):
+        return None
+
+
+def _compile_bound(column: str, keyword: str, limit: Any) -> Check:
+    if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+        raise SchemaError(f"column '{column}': {keyword} must be a number")
+    compare = {
+        "minimum": lambda x: x >= limit, "maximum": lambda x: x <= limit,
+        "exclusiveMinimum": lambda x: x > limit, "exclusiveMaximum": lambda x: x < limit
+    }[keyword]
+    extreme = min if keyword in ("minimum", "exclusiveMinimum") else max
+
+    def value(v: Any) -> bool:
+        try:
+            x = _as_number(v)
+        except (ValueError, TypeError):
+            return True  # not a number: reported by `type`, not by the bound
+        return math.isnan(x) or compare(x)
+
+    def batch(values: List[Any], cache: Dict[str, Any]) -> bool:
+        numbers = _numbers_or_none(values, cache)
+        if numbers is None or any(map(math.isnan, numbers)):
+            return all(map(value, values))
+        return compare(extreme(numbers))
+    return Check(column, keyword, batch, value)
+
+
+def _compile_length(column: str, keyword: str, limit: Any) -> Check:
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+        raise SchemaError(f"column '{column}': {keyword} must be a non-negative integer")
+    if keyword == "minLength":
+        value = lambda v: not isinstance(v, str) or len(v) >= limit  # noqa: E731
+    else:
+        value = lambda v: not isinstance(v, str) or len(v) <= limit  # noqa: E731
+
+    def batch(values: List[Any], cache: Dict[str, Any]) -> bool:
+        if set(map(type, values)) != {str}:
+            return all(map(value, values))
+        lengths = list(map(len, values))
+        return min(lengths) >= limit if keyword == "minLength" else max(lengths) <= limit
+    return Check(column, keyword, batch, value)
+
+
+def _compile_enum(column: str, keyword: str, allowed: Any) -> Check:
+    if keyword == "const":
+        allowed = [allowed]
+    if not isinstance(allowed, list) or not allowed:
+        raise SchemaError(f"column '{column}': enum must be a non-empty list")
+    def key(v: Any) -> str:
+        return v if isinstance(v, str) else json.dumps(v, sort_keys=True)
+
+    # CSV cells are strings, so `enum: [1, 2]` also accepts "1" and "2"; string
+    # members only match themselves, never their JSON-quoted form
+    members = set(map(key, allowed))
+    value = lambda v: key(v) in members  # noqa: E731
+
+    def batch(values: List[Any], cache: Dict[str, Any]) -> bool:
+        if set(map(type, values)) == {str}:
+            return set(values) <= members
+        return all(map(value, values))
+    return Check(column, keyword, batch, value)
+
+
+def _compile_pattern(column: str, pattern: Any) -> Check:
+    try:
+        search = re.compile(pattern).search
+    except (re.error, TypeError) as e:
+        raise SchemaError(f"column '{column}': invalid pattern {pattern!r}: {e}")
+    value = lambda v: not isinstance(v, str) or search(v) is not None  # noqa: E731
+
+    def batch(values: List[Any], cache: Dict[str, Any]) -> bool:
+        if set(map(type, values)) == {str}:
+            return all(map(search, values))
+        return all(map(value, values))
+    return Check(column, "pattern", batch, value)
+
+
+def _compile_format(column: str, name: Any) -> Check:
+    parse = _FORMATS.get(name)
+    if parse is None:
+        raise SchemaError(f"column '{column}': unsupported format {name!r} "
+                          f"(expected one of: {', '.join(_FORMATS)})")
+    parses = _converts(parse)
+    value = lambda v: not isinstance(v, str) or parses(v)  # noqa: E731
+
+    fast = _FAST_FORMATS.get(name, parse)
+
+    def batch(values: List[Any], cache: Dict[str, Any]) -> bool:
+        try:
+            return all(map(fast, values))
+        except (ValueError, TypeError, AttributeError):
+            return all(map(value, values))
+    return Check(column, "format", batch, value)
+
+
+_IGNORED = {"title", "description", "default", "examples", "$comment", "nullable"}
+
+
+def compile_column(column: str, spec: Dict[str, Any]) -> List[Check]:
+    """Checks for one column, cheapest first"""
+    if not isinstance(spec, dict):
+        raise SchemaError(f"column '{column}': schema must be a mapping")
+    checks: List[Check] = []
+    for keyword, argument in spec.items():
+        if keyword == "type":
+            check = _compile_type(column, argument)
+            if check is not None:
+                checks.append(check)
+        elif keyword in ("enum", "const"):
+            checks.append(_compile_enum(column, keyword, argument))
+        elif keyword in ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"):
+            checks.append(_compile_bound(column, keyword, argument))
+        elif keyword in ("minLength", "maxLength"):
+            checks.append(_compile_length(column, keyword, argument))
+        elif keyword == "pattern":
+            checks.append(_compile_pattern(column, argument))
+        elif keyword == "format":
+            checks.append(_compile_format(column, argument))
+        elif keyword not in _IGNORED:
+            raise SchemaError(f"column '{column}': unsupported keyword '{keyword}'")
+    order = ("type", "enum", "const", "minLength", "maxLength", "minimum", "maximum",
+             "exclusiveMinimum", "exclusiveMaximum", "format", "pattern")
+    return sorted(checks, key=lambda c: order.index(c.keyword))
+
+
+class CompiledSchema:
+    """A schema turned into per-column checks, ready to run on batches"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        properties = schema.get("properties", {})
+        if not isinstance(properties, dict):
+            raise SchemaError("'properties' must be a mapping")
+        self.columns = {name: compile_column(name, spec) for name, spec in properties.items()}
+        self.required = list(schema.get("required", []))
+        unknown = [name for name in self.required if not isinstance(name, str)]
+        if unknown:
+            raise SchemaError(f"'required' entries must be column names, got {unknown[0]!r}")
+        self.closed = schema.get("additionalProperties", True) is False
+
+    def validate(self, records: List[Dict[str, Any]], strict: bool = False
+                 ) -> List[Tuple[str, str, int, Any]]:
+        """(column, keyword, row index, value) for each failure in a batch
+
+        With strict, only the first failing row's first failure is returned.
+        """
+        failures: List[Tuple[str, str, int, Any]] = []
+        for name in self.required:
+            values = _column(records, name)
+            if None in values or "" in values:
+                failures.extend((name, "required", i, v) for i, v in enumerate(values)
+                                if v is None or v == "")
+        for name, checks in self.columns.items():
+            if not checks:
+                continue
+            column = _column(records, name)
+            has_nulls = None in column or "" in column
+            values = [v for v in column if v is not None and v != ""] if has_nulls else column
+            if not values:
+                continue
+            present: Optional[List[Tuple[int, Any]]] = None
+            failed_rows = set()
+            cache: Dict[str, Any] = {}
+            for check in checks:
+                if check.batch(values, cache):
+                    continue
+                if present is None:
+                    present = [(i, v) for i, v in enumerate(column) if v is not None and v != ""]
+                for i, v in present:
+                    if i not in failed_rows and not check.value(v):
+                        failed_rows.add(i)  # one failure per value: type errors mask bounds
+                        failures.append((name, check.keyword, i, v))
+        if self.closed:
+            allowed = set(self.columns)
+            for i, record in enumerate(records):
+                for name in record.keys() - allowed:
+                    failures.append((name, "additionalProperties", i, record[name]))
+        if strict and failures:
+            return [min(failures, key=lambda f: f[2])]
+        return failures
+
+
+def _column(records: List[Dict[str, Any]], name: str) -> List[Any]:
+    return list(map(dict.get, records, repeat(name)))
+
+
+@lru_cache(maxsize=4)
+def _compiled(schema_json: str) -> CompiledSchema:
+    return CompiledSchema(json.loads(schema_json))
+
+
+class ValidationReport:
+    """Row count plus error counts and sample rows per (column, keyword)"""
+
+    def __init__(self, samples: int = DEFAULT_SAMPLES):
+        self.samples = samples
+        self.rows = 0
+        self.stopped = False
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.examples: Dict[Tuple[str, str], List[Tuple[int, Any]]] = {}
+
+    def add(self, failures: List[Tuple[str, str, int, Any]], offset: int) -> None:
+        for column, keyword, row, value in failures:
+            key = (column, keyword)
+            self.errors[key] = self.errors.get(key, 0) + 1
+            examples = self.examples.setdefault(key, [])
+            if len(examples) < self.samples:
+                examples.append((offset + row + 1, value))
+
+    def merge(self, other: 'ValidationReport') -> None:
+        """Append a later part of the file"""
+        for key, count in other.errors.items():
+            self.errors[key] = self.errors.get(key, 0) + count
+            examples = self.examples.setdefault(key, [])
+            room = self.samples - len(examples)
+            examples.extend((self.rows + row, value) for row, value in other.examples[key][:room])
+        self.rows += other.rows
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    def to_dict(self, path: str) -> Dict[str, Any]:
+        return {
+            "file": path,
+            "valid": not self.errors,
+            "rows": self.rows,
+            "stopped_early": self.stopped,
+            "errors": self.error_count,
+            "failures": [
+                {"column": column, "keyword": keyword, "count": count,
+                 "samples": [{"row": row, "value": value} for row, value in self.examples[(column, keyword)]]}
+                for (column, keyword), count in self.errors.items()
+            ]
+        }
+
+
+def validate_records(task: tuple) -> ValidationReport:
+    """Validate one chunk or byte range (runs in a worker process)"""
+    schema_json, strict, samples, source = task
+    schema = _compiled(schema_json)
+    report = ValidationReport(samples)
+    chunks = read_partition(*source) if isinstance(source, tuple) else [source]
+    for chunk in chunks:
+        failures = schema.validate(chunk, strict)
+        report.add(failures, report.rows)
+        report.rows += len(chunk)
+        if strict and failures:
+            break
+    return report
+
+
+def validate(path: str, fmt: str, schema: Dict[str, Any], jobs: int = 1, strict: bool = False,
+             chunk_size: int = DEFAULT_CHUNK_SIZE,
+             partition_bytes: int = DEFAULT_PARTITION_MB << 20, samples: int = DEFAULT_SAMPLES,
+             delimiter: Optional[str] = None) -> ValidationReport:
+    """Validate a file against a schema, in parallel by byte range or chunk"""
+    if chunk_size < 1:
+        raise DataError("chunk size must be at least 1")
+    schema_json = json.dumps(schema, sort_keys=True)
+    _compiled(schema_json)  # fail on a bad schema before reading any data
+    if splittable(path, fmt):
+        header, ranges = plan_partitions(path, fmt, partition_bytes, delimiter)
+        sources: Any = ((path, fmt, start, end, chunk_size, header, delimiter) for start, end in ranges)
+    else:
+        sources = read_chunks(path, fmt, chunk_size, delimiter)
+    tasks = ((schema_json, strict, samples, source) for source in sources)
+    report = ValidationReport(samples)
+    results = ordered_map(validate_records, tasks, jobs)
+    try:
+        for part in results:
+            report.merge(part)
+            if strict and part.errors:
+                report.stopped = True
+                break
+    finally:
+        results.close()
+    return report
+
+
+def format_text(data: Dict[str, Any]) -> str:
+    if data["valid"]:
+        return f"VALID: {data['file']} rows={data['rows']}"
+    stopped = " (stopped at first error)" if data["stopped_early"] else ""
+    lines = [f"INVALID: {data['file']} rows={data['rows']} errors={data['errors']}{stopped}"]
+    for failure in data["failures"]:
+        samples = ", ".join(f"row {s['row']}: {s['value']!r}" for s in failure["samples"])
+        lines.append(f"  {failure['column']}.{failure['keyword']}: {failure['count']} rows (e.g. {samples})")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="craft data validate", description="Validate a dataset against a schema and rules"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="Input file (- for stdin)")
+    parser.add_argument("schema_file", nargs="?", metavar="schema", help="Schema file (JSON or YAML)")
+    parser.add_argument("--schema", help="Schema file (JSON or YAML)")
+    parser.add_argument("--rules", help="Column rules file (YAML or JSON)")
+    parser.add_argument("--strict", action="store_true", help="Stop at the first error")
+    parser.add_argument("--format", choices=("text", "json"), default="text", help="Report format")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                        help="Example rows kept per failing rule")
+    parser.add_argument("--from", dest="from_format", choices=FORMATS, help="Input format")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (0 = one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Records per batch")
+    parser.add_argument("--partition-mb", type=int, default=DEFAULT_PARTITION_MB,
+                        help="Bytes of input per parallel task")
+    parser.add_argument("--delimiter", help="CSV field delimiter")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    jobs = resolve_jobs(args.jobs)
+    schema_path = args.schema or args.schema_file
+    start = time.perf_counter()
+    try:
+        if not schema_path and not args.rules:
+            raise SchemaError("nothing to validate against; pass a schema file or --rules")
+        schema = load_schema(schema_path) if schema_path else {}
+        if args.rules:
+            schema = merge_rules(schema, load_schema(args.rules))
+        fmt = detect_format(args.input, args.from_format) if args.input != "-" or args.from_format else "ndjson"
+        report = validate(args.input, fmt, schema, jobs, args.strict, args.chunk_size,
+                          args.partition_mb << 20, max(args.samples, 0), args.delimiter)
+    except DataError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"ERROR: {e.strerror or e}: {e.filename or args.input}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+    data = report.to_dict(args.input)
+    print(json.dumps(data, indent=2, default=str) if args.format == "json" else format_text(data))
+    rate = report.rows / elapsed if elapsed > 0 else 0.0
+    print(f"VALIDATE: {report.rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s, {jobs} jobs)",
+          file=sys.stderr)
+    return 0 if data["valid"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
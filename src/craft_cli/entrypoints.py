@@ -0,0 +1,206 @@
+"""
+In-process Python tools for Craft CLI
+
+A tool YAML may name a Python callable instead of a shell command:
+
+    entrypoint: "mypkg.tools:main"
+
+The callable receives the tool's argument list and returns an exit code
+(None means 0). By default it runs inside the craft process with stdout and
+stderr captured, so no interpreter is started per call. With `isolate: true`,
+or when the tool declares a timeout, CPU or memory limit, the call runs in a
+forked child instead so crashes and limits cannot take craft down with it.
+
+Modules are imported once per process; the tool's domain directory is on the
+import path so a domain can ship its helpers next to its YAML files.
+"""
+import importlib
+import io
+import os
+import re
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .runner import ExecutionResult, ResourcePolicy, rlimit_preexec, supervise
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+
+ENTRYPOINT_RE = re.compile(r"^[A-Za-z_][\w.]*:[A-Za-z_][\w.]*$")
+
+ToolFunction = Callable[[List[str]], Optional[int]]
+
+
+class EntrypointError(ValueError):
+    """Raised for malformed or unloadable entrypoints"""
+
+
+def parse_entrypoint(value: object) -> str:
+    """Validate a `module:function` reference"""
+    if not isinstance(value, str) or not ENTRYPOINT_RE.match(value):
+        raise EntrypointError(f"entrypoint must look like 'module:function', got {value!r}")
+    return value
+
+
+def load_entrypoint(entrypoint: str, search_path: Optional[Path] = None) -> ToolFunction:
+    """Import the module and return the named callable"""
+    module_name, attribute = parse_entrypoint(entrypoint).split(":", 1)
+    if search_path is not None and str(search_path) not in sys.path:
+        sys.path.append(str(search_path))
+    try:
+        target = importlib.import_module(module_name)
+        for part in attribute.split("."):
+            target = getattr(target, part)
+    except Exception as e:
+        raise EntrypointError(f"cannot load entrypoint '{entrypoint}': {type(e).__name__}: {e}")
+    if not callable(target):
+        raise EntrypointError(f"entrypoint '{entrypoint}' is not callable")
+    return target
+
+
+def call_tool_function(func: ToolFunction, argv: List[str]) -> int:
+    """Call a tool function and turn its outcome into an exit code"""
+    try:
+        code = func(list(argv))
+    except SystemExit as e:
+        code = e.code
+        if isinstance(code, str):
+            print(code, file=sys.stderr)
+            return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    if code is None:
+        return 0
+    return code if isinstance(code, int) else 1
+
+
+def needs_isolation(policy: ResourcePolicy) -> bool:
+    """Limits that can only be enforced on a separate process"""
+    return any(v is not None for v in (policy.timeout, policy.cpu_seconds, policy.max_rss_mb))
+
+
+def run_in_process(func: ToolFunction, argv: List[str],
+                   policy: Optional[ResourcePolicy] = None, cwd: Optional[str] = None,
+                   env: Optional[Dict[str, str]] = None) -> ExecutionResult:
+    """Call a tool function in this process with its output captured
+
+    CPU time and block I/O are the process's usage during the call. Peak RSS
+    cannot be told apart from craft's own, so `max_rss_kb` is how much the
+    call raised the process's peak (0 if it stayed below an earlier peak).
+    """
+    policy = policy or ResourcePolicy()
+    stdout, stderr = io.StringIO(), io.StringIO()
+    saved_env = {key: os.environ.get(key) for key in (env or {})}
+    saved_cwd = os.getcwd() if cwd else None
+    usage_before = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    start = time.monotonic()
+    try:
+        os.environ.update(env or {})
+        if cwd:
+            os.chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_code = call_tool_function(func, argv)
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        if saved_cwd:
+            os.chdir(saved_cwd)
+    duration = time.monotonic() - start
+
+    result = ExecutionResult(exit_code=exit_code, duration=duration)
+    if usage_before is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        result.cpu_user = usage.ru_utime - usage_before.ru_utime
+        result.cpu_system = usage.ru_stime - usage_before.ru_stime
+        # ru_maxrss is craft's lifetime peak: report how far the call raised it
+        result.max_rss_kb = max(0, _rss_kb(usage) - _rss_kb(usage_before))
+        result.io_read_blocks = usage.ru_inblock - usage_before.ru_inblock
+        result.io_write_blocks = usage.ru_oublock - usage_before.ru_oublock
+
+    out, err = stdout.getvalue().encode(), stderr.getvalue().encode()
+    limit = policy.max_output_bytes
+    if limit is not None and len(out) + len(err) > limit:
+        out = out[:limit]
+        err = err[:limit - len(out)]
+        result.output_truncated = True
+        result.limit_exceeded = "output"
+    result.stdout = out.decode(errors="replace")
+    result.stderr = err.decode(errors="replace")
+    result.output_bytes = len(out) + len(err)
+    return result
+
+
+def _rss_kb(usage) -> int:
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+
+def run_forked(func: ToolFunction, argv: List[str],
+               policy: Optional[ResourcePolicy] = None, cwd: Optional[str] = None,
+               env: Optional[Dict[str, str]] = None) -> ExecutionResult:
+    """Call a tool function in a forked child under the resource policy"""
+    policy = policy or ResourcePolicy()
+    out_read, out_write = os.pipe()
+    err_read, err_write = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        code = 1
+        try:
+            os.setsid()
+            os.close(out_read)
+            os.close(err_read)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(out_write, 1)
+            os.dup2(err_write, 2)
+            sys.stdin = open(0, "r", closefd=False)
+            sys.stdout = open(1, "w", closefd=False)
+            sys.stderr = open(2, "w", closefd=False)
+            if cwd:
+                os.chdir(cwd)
+            os.environ.update(env or {})
+            preexec = rlimit_preexec(policy)
+            if preexec is not None:
+                preexec()
+            code = call_tool_function(func, argv)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code & 0xFF)
+
+    os.close(out_write)
+    os.close(err_write)
+    return supervise(pid, os.fdopen(out_read, "rb"), os.fdopen(err_read, "rb"), policy, start)
+
+
+def run_entrypoint(entrypoint: str, argv: List[str], policy: Optional[ResourcePolicy] = None,
+                   cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                   isolate: bool = False,
+                   search_path: Optional[Path] = None) -> ExecutionResult:
+    """Load and run a Python tool, forking only when isolation is needed"""
+    policy = policy or ResourcePolicy()
+    start = time.monotonic()
+    try:
+        func = load_entrypoint(entrypoint, search_path)
+    except EntrypointError as e:
+        return ExecutionResult(exit_code=1, stderr=f"{e}\n", duration=time.monotonic() - start)
+    if isolate or needs_isolation(policy):
+        return run_forked(func, argv, policy, cwd, env)
+    return run_in_process(func, argv, policy, cwd, env)
@@ -0,0 +1,203 @@
+"""
+Execution history for Craft CLI
+
+Every executed tool run is appended as one tab-separated line:
+
+    start  duration  exit_code  output_bytes  args_hash  domain  tool
+
+The file is rotated by size (history.tsv -> history.tsv.1 -> ...), and
+statistics are computed over the current file and its rotated backups.
+"""
+import hashlib
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 2
+
+
+def hash_args(args: List[str]) -> str:
+    """Short stable hash of a tool's argument list"""
+    return hashlib.sha1("\0".join(args).encode()).hexdigest()[:12]
+
+
+@dataclass
+class HistoryRecord:
+    """One executed tool run"""
+    domain: str
+    tool: str
+    args_hash: str
+    start: float
+    duration: float
+    exit_code: int
+    output_bytes: int
+
+    def to_line(self) -> str:
+        return (
+            f"{self.start:.3f}\t{self.duration:.6f}\t{self.exit_code}\t"
+            f"{self.output_bytes}\t{self.args_hash}\t{self.domain}\t{self.tool}\n"
+        )
+
+    @classmethod
+    def from_line(cls, line: str) -> Optional['HistoryRecord']:
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) != 7:
+            return None
+        try:
+            return cls(
+                domain=fields[5],
+                tool=fields[6],
+                args_hash=fields[4],
+                start=float(fields[0]),
+                duration=float(fields[1]),
+                exit_code=int(fields[2]),
+                output_bytes=int(fields[3])
+            )
+        except ValueError:
+            return None
+
+
+class HistoryStore:
+    """Append-only, size-rotated execution log"""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backups: int = DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def append(self, record: HistoryRecord) -> None:
+        """Append a record with a single O_APPEND write, rotating if the file is full"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, record.to_line().encode())
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        lock_fd = os.open(str(self.path) + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            # Another process may have rotated while we waited for the lock
+            try:
+                if self.path.stat().st_size < self.max_bytes:
+                    return
+            except FileNotFoundError:
+                return
+            if self.backups <= 0:
+                self.path.unlink()
+                return
+            for index in range(self.backups - 1, 0, -1):
+                older = self._backup(index)
+                if older.exists():
+                    os.replace(older, self._backup(index + 1))
+            os.replace(self.path, self._backup(1))
+        finally:
+            os.close(lock_fd)
+
+    def _backup(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def records(self, domain: Optional[str] = None,
+                tool: Optional[str] = None) -> Iterator[HistoryRecord]:
+        """Yield stored records, oldest first, optionally filtered"""
+        files = [self._backup(i) for i in range(self.backups, 0, -1)] + [self.path]
+        for path in files:
+            try:
+                handle = open(path, "r")
+            except FileNotFoundError:
+                continue
+            with handle:
+                for line in handle:
+                    record = HistoryRecord.from_line(line)
+                    if record is None:
+                        continue
+                    if domain is not None and record.domain != domain:
+                        continue
+                    if tool is not None and record.tool != tool:
+                        continue
+                    yield record
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class ToolStats:
+    """Aggregated latency and failure statistics for one tool"""
+    domain: str
+    tool: str
+    calls: int
+    failures: int
+    p50: float
+    p95: float
+    p99: float
+    total: float
+    last_run: float
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.calls if self.calls else 0.0
+
+
+def compute_stats(records: Iterator[HistoryRecord]) -> List[ToolStats]:
+    """Group records per tool; sorted by total wall time, largest first"""
+    grouped: Dict[Tuple[str, str], List[HistoryRecord]] = {}
+    for record in records:
+        grouped.setdefault((record.domain, record.tool), []).append(record)
+
+    stats = []
+    for (domain, tool), runs in grouped.items():
+        durations = sorted(r.duration for r in runs)
+        stats.append(ToolStats(
+            domain=domain,
+            tool=tool,
+            calls=len(runs),
+            failures=sum(1 for r in runs if r.exit_code != 0),
+            p50=percentile(durations, 50),
+            p95=percentile(durations, 95),
+            p99=percentile(durations, 99),
+            total=sum(durations),
+            last_run=max(r.start for r in runs)
+        ))
+    stats.sort(key=lambda s: s.total, reverse=True)
+    return stats
+
+
+def record_execution(store: HistoryStore, domain: str, tool: str, args: List[str],
+                     duration: float, exit_code: int, output_bytes: int) -> None:
+    """Append a run to the store; history problems never fail the tool run"""
+    record = HistoryRecord(
+        domain=domain,
+        tool=tool,
+        args_hash=hash_args(args),
+        start=time.time() - duration,
+        duration=duration,
+        exit_code=exit_code,
+        output_bytes=output_bytes
+    )
+    try:
+        store.append(record)
+    except OSError as e:
+        print(f"Warning: Failed to record execution history: {e}", file=sys.stderr)
@@ -1,53 +1,184 @@
 """
 Main entry point for Craft CLI Framework
 """
+import os
+import shlex
 import sys
+from typing import List
 from .core import CraftCLI
+from .metrics import metrics
+from .projection import ContextView, ProjectionError, parse_fields
+from .tracing import tracer
 
 
 def main() -> int:
     """Main CLI entry point"""
     cli = CraftCLI()
     
+    # Check for --metrics flag before the tool's own args (dump counters when
+    # done), so tools keep their own --metrics options
+    tool_args = _tool_args_start(sys.argv)
+    dump_metrics = "--metrics" in sys.argv[:tool_args]
+    if dump_metrics:
+        sys.argv = [arg for n, arg in enumerate(sys.argv)
+                    if arg != "--metrics" or n >= tool_args]
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        status = run_batch(cli, sys.argv[2:])
+    else:
+        with tracer.span("craft.main") as span:
+            status = _dispatch(cli, list(sys.argv), span)
+            span.set_attribute("craft.exit_code", status)
+    
+    if dump_metrics:
+        sys.stderr.write(metrics.render())
+    return status
+
+
+def _tool_args_start(argv: List[str]) -> int:
+    """Index of the first argument after the domain and tool names"""
+    names = [n for n, arg in enumerate(argv[1:], 1) if not arg.startswith("-")]
+    return names[1] + 1 if len(names) > 1 else len(argv)
+
+
+def run_batch(cli: CraftCLI, options: List[str]) -> int:
+    """Run one craft command per stdin line in this process (warm registry cache)"""
+    for option in options:
+        if option.startswith("--metrics-port="):
+            value = option.split("=", 1)[1]
+            if not value.isdigit() or not 0 < int(value) < 65536:
+                print(f"ERROR: Invalid --metrics-port '{value}' (expected a port number)")
+                return 2
+            port = int(value)
+            try:
+                metrics.serve(port)
+            except OSError as e:
+                print(f"ERROR: Cannot serve metrics on port {port}: {e.strerror or e}")
+                return 2
+            print(f"METRICS: serving on http://127.0.0.1:{port}/metrics")
+        elif option not in ("--noob", "--exec"):
+            print(f"ERROR: Unknown batch option '{option}'")
+            return 2
+    defaults = [option for option in options if option in ("--noob", "--exec")]
+    
+    failures = 0
+    for line_number, line in enumerate(sys.stdin, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            print(f"ERROR: Line {line_number}: {e}")
+            failures += 1
+            continue
+        
+        with tracer.span("craft.main", **{"craft.batch.line": line_number}) as span:
+            status = _dispatch(cli, ["craft"] + words + defaults, span)
+            span.set_attribute("craft.exit_code", status)
+        print(f"BATCH_STATUS: line={line_number} exit={status}")
+        sys.stdout.flush()
+        if status != 0:
+            failures += 1
+    
+    return 0 if failures == 0 else 1
+
+
+def _dispatch(cli: CraftCLI, argv: List[str], span) -> int:
+    """Route an argv list to the matching CraftCLI command"""
     # Check for version flag
-    if len(sys.argv) > 1 and sys.argv[1] in ["--version", "-v"]:
+    if len(argv) > 1 and argv[1] in ["--version", "-v"]:
+        span.set_attribute("craft.command", "version")
         cli.show_version()
         return 0
     
     # Check for --noob flag anywhere in args
-    human_mode = "--noob" in sys.argv
+    human_mode = "--noob" in argv
     if human_mode:
-        sys.argv = [arg for arg in sys.argv if arg != "--noob"]
+        argv = [arg for arg in argv if arg != "--noob"]
+    
+    # Check for --exec flag anywhere in args (run the tool, not just resolve it)
+    execute = True if "--exec" in argv else None
+    if execute:
+        argv = [arg for arg in argv if arg != "--exec"]
+    
+    # Context output options are only read before the domain, so tools keep
+    # their own --fields style options
+    view = ContextView()
+    while len(argv) > 1 and (argv[1].startswith("--fields=") or
+                             argv[1] in ("--no-help", "--help-digest")):
+        option = argv.pop(1)
+        if option == "--no-help":
+            view.help = "none"
+        elif option == "--help-digest":
+            view.help = "digest"
+        else:
+            try:
+                view.fields = parse_fields(option.split("=", 1)[1])
+            except ProjectionError as e:
+                print(f"ERROR: {e}")
+                return 2
     
-    if len(sys.argv) == 1 or sys.argv[1] == "--help":
+    if len(argv) == 1 or argv[1] == "--help":
+        span.set_attribute("craft.command", "help")
         cli.show_help(human_mode)
         return 0
     
-    if sys.argv[1] == "--domains":
+    if argv[1] == "--domains":
+        span.set_attribute("craft.command", "domains")
         cli.list_domains(human_mode)
         return 0
     
-    if len(sys.argv) == 2:
+    if argv[1] == "--validate":
+        span.set_attribute("craft.command", "validate")
+        success = cli.validate_tools(human_mode)
+        return 0 if success else 1
+    
+    if argv[1] == "--sync":
+        span.set_attribute("craft.command", "sync")
+        offline = "--offline" in argv or os.environ.get("CRAFT_OFFLINE") == "1"
+        names = [arg for arg in argv[2:] if arg != "--offline"]
+        success = cli.sync_sources(names[0] if names else None, offline, human_mode)
+        return 0 if success else 1
+    
+    if argv[1] == "--stats":
+        span.set_attribute("craft.command", "stats")
+        domain = argv[2] if len(argv) > 2 else None
+        tool = argv[3] if len(argv) > 3 else None
+        success = cli.show_stats(domain, tool, human_mode)
+        return 0 if success else 1
+    
+    if len(argv) == 2:
         # craft <domain> - list domain tools
-        success = cli.list_domain_tools(sys.argv[1], human_mode)
+        span.set_attribute("craft.command", "list_tools")
+        success = cli.list_domain_tools(argv[1], human_mode)
         return 0 if success else 1
     
-    if len(sys.argv) >= 3:
-        domain = sys.argv[1]
-        tool = sys.argv[2]
+    if len(argv) >= 3:
+        domain = argv[1]
+        tool = argv[2]
+        span.set_attribute("craft.domain", domain)
+        span.set_attribute("craft.tool", tool)
         
         # Check for help flag
-        if len(sys.argv) > 3 and sys.argv[3] in ["--help", "-h"]:
-            cli.show_tool_help(domain, tool, human_mode)
+        if len(argv) > 3 and argv[3] in ["--help", "-h"]:
+            span.set_attribute("craft.command", "tool_help")
+            known_digest = None
+            for arg in argv[4:]:
+                if arg.startswith("--digest="):
+                    known_digest = arg.split("=", 1)[1]
+            cli.show_tool_help(domain, tool, human_mode, known_digest)
             return 0  # Help should always return success, even for non-existent tools
         
         # Run the tool
-        args = sys.argv[3:] if len(sys.argv) > 3 else []
-        return cli.run_tool(domain, tool, args, human_mode)
+        span.set_attribute("craft.command", "run_tool")
+        args = argv[3:] if len(argv) > 3 else []
+        return cli.run_tool(domain, tool, args, human_mode, execute, view)
     
+    span.set_attribute("craft.command", "help")
     cli.show_help(human_mode)
     return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
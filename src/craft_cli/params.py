@@ -0,0 +1,186 @@
+"""
+Typed tool parameters for Craft CLI
+
+Tools can declare the options they accept in their YAML:
+
+    parameters:
+      chunk-size:
+        type: int
+        default: 1000
+      level:
+        choices: [error, warn, info, debug]
+
+Declared options are parsed and validated before anything is executed.
+Undeclared arguments are passed through untouched.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+PARAMETER_TYPES = ("string", "int", "float", "bool", "duration", "list")
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d|w)?\s*$")
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+class ParameterError(ValueError):
+    """Raised when a parameter declaration or value is invalid"""
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration like '30s', '5m', '1h' or '7d' into seconds"""
+    match = _DURATION_RE.match(str(value))
+    if not match:
+        raise ParameterError(f"invalid duration {value!r} (use e.g. 30s, 5m, 1h, 7d)")
+    number, unit = match.groups()
+    return float(number) * _DURATION_UNITS[unit or "s"]
+
+
+@dataclass
+class ToolParameter:
+    """A single declared tool option"""
+    name: str
+    type: str = "string"
+    default: Any = None
+    choices: Optional[List[Any]] = None
+    required: bool = False
+    help: str = ""
+    variable: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.variable = self.name.replace("-", "_")
+        if not self.variable.isidentifier():
+            raise ParameterError(f"invalid parameter name {self.name!r}")
+        if self.type not in PARAMETER_TYPES:
+            raise ParameterError(
+                f"parameter --{self.name} has unknown type {self.type!r} "
+                f"(supported: {', '.join(PARAMETER_TYPES)})"
+            )
+        if self.choices is not None:
+            self.choices = [self._convert_item(str(c)) for c in self.choices]
+        if self.default is not None:
+            self.default = self.convert(self.default)
+
+    @classmethod
+    def from_dict(cls, name: str, data: Optional[Dict[str, Any]]) -> 'ToolParameter':
+        """Create a parameter from its YAML declaration"""
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ParameterError(f"parameter --{name} must be a mapping")
+        return cls(
+            name=name,
+            type=data.get("type", "string"),
+            default=data.get("default"),
+            choices=data.get("choices"),
+            required=data.get("required", False),
+            help=data.get("help", "")
+        )
+
+    def _convert_item(self, raw: str) -> Any:
+        """Convert a single raw string to this parameter's scalar type"""
+        try:
+            if self.type == "int":
+                return int(raw)
+            if self.type == "float":
+                return float(raw)
+        except ValueError:
+            raise ParameterError(f"--{self.name} expects {self.type}, got {raw!r}")
+        if self.type == "duration":
+            try:
+                return parse_duration(raw)
+            except ParameterError as e:
+                raise ParameterError(f"--{self.name}: {e}")
+        if self.type == "bool":
+            lowered = raw.lower()
+            if lowered in _TRUE:
+                return True
+            if lowered in _FALSE:
+                return False
+            raise ParameterError(f"--{self.name} expects a boolean, got {raw!r}")
+        return raw
+
+    def convert(self, raw: Any) -> Any:
+        """Convert and validate a raw value"""
+        if self.type == "bool" and isinstance(raw, bool):
+            return raw
+        if self.type == "list":
+            items = raw if isinstance(raw, list) else str(raw).split(",")
+            values = [str(item).strip() for item in items if str(item).strip()]
+            for item in values:
+                self._check_choice(item)
+            return values
+        value = self._convert_item(str(raw))
+        self._check_choice(value)
+        return value
+
+    def _check_choice(self, value: Any) -> None:
+        if self.choices is not None and value not in self.choices:
+            allowed = ",".join(str(c) for c in self.choices)
+            raise ParameterError(f"--{self.name} must be one of {allowed}, got {value!r}")
+
+
+def load_parameters(data: Any) -> Dict[str, ToolParameter]:
+    """Build parameter declarations from the `parameters` block of a tool YAML"""
+    if not data:
+        return {}
+    if not isinstance(data, dict):
+        raise ParameterError("'parameters' must be a mapping of option name to declaration")
+    params = {}
+    for name, declaration in data.items():
+        param = ToolParameter.from_dict(str(name), declaration)
+        params[param.name] = param
+    return params
+
+
+def parse_arguments(parameters: Dict[str, ToolParameter], argv: List[str]) -> Dict[str, Any]:
+    """Parse declared options out of argv. Returns values keyed by variable name."""
+    values: Dict[str, Any] = {}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        i += 1
+        if arg == "--":
+            break
+        if not arg.startswith("--"):
+            continue
+        name, has_value, raw = arg[2:].partition("=")
+        param = parameters.get(name)
+        if param is None:
+            continue
+        if not has_value:
+            if param.type == "bool":
+                raw = "true"
+            elif i < len(argv) and not argv[i].startswith("--"):
+                raw = argv[i]
+                i += 1
+            else:
+                raise ParameterError(f"--{name} requires a value")
+        values[param.variable] = param.convert(raw)
+
+    for param in parameters.values():
+        if param.variable in values:
+            continue
+        if param.required:
+            raise ParameterError(f"missing required option --{param.name}")
+        values[param.variable] = param.default
+    return values
+
+
+def template_values(values: Dict[str, Any]) -> Dict[str, str]:
+    """Render parsed values as strings for command template substitution"""
+    rendered = {}
+    for key, value in values.items():
+        if value is None:
+            rendered[key] = ""
+        elif isinstance(value, bool):
+            rendered[key] = "true" if value else "false"
+        elif isinstance(value, list):
+            rendered[key] = ",".join(str(v) for v in value)
+        elif isinstance(value, float) and value.is_integer():
+            rendered[key] = str(int(value))
+        else:
+            rendered[key] = str(value)
+    return rendered
@@ -0,0 +1,111 @@
+"""
+Domains shipped as Python packages for Craft CLI
+
+A package registers domains under the `craft_cli.domains` entry-point group.
+The entry-point name is the domain name and its value is the package that
+holds the tool YAML files:
+
+    [project.entry-points."craft_cli.domains"]
+    security = "acme_craft.domains.security"
+
+Packages are never imported: their directories are located from the
+distribution metadata. Because scanning installed distributions is not free,
+the result is cached on disk and keyed by the modification times of the
+sys.path entries, which change whenever packages are installed or removed.
+"""
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from importlib import metadata
+except ImportError:  # pragma: no cover - Python < 3.8
+    metadata = None  # type: ignore
+
+
+ENTRY_POINT_GROUP = "craft_cli.domains"
+
+
+def path_fingerprint(paths: Optional[List[str]] = None) -> str:
+    """Hash of the import path and the mtimes of its directories"""
+    digest = hashlib.sha1()
+    for entry in sys.path if paths is None else paths:
+        try:
+            mtime = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            mtime = 0
+        digest.update(f"{entry}\0{mtime}\n".encode())
+    return digest.hexdigest()
+
+
+def _locate_package(dist, value: str) -> Optional[Path]:
+    """Directory of the package an entry point names, without importing it"""
+    module = value.split(":", 1)[0].strip()
+    if not module:
+        return None
+    located = Path(str(dist.locate_file(Path(*module.split(".")))))
+    if located.is_dir():
+        return located
+    # Editable installs keep their code outside the distribution's location.
+    # Ask the import finders for the top-level package only (this does not
+    # execute any package code) and walk down to the domain package.
+    top, *rest = module.split(".")
+    for finder in sys.meta_path:
+        find_spec = getattr(finder, "find_spec", None)
+        if find_spec is None:
+            continue
+        try:
+            spec = find_spec(top, None)
+        except (ImportError, ValueError):
+            continue
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for location in spec.submodule_search_locations:
+            candidate = Path(location, *rest)
+            if candidate.is_dir():
+                return candidate
+    return None
+
+
+def scan_entry_point_domains() -> Dict[str, Path]:
+    """Read every installed distribution's craft_cli.domains entry points"""
+    domains: Dict[str, Path] = {}
+    if metadata is None:
+        return domains
+    for dist in metadata.distributions():
+        for entry_point in dist.entry_points:
+            if entry_point.group != ENTRY_POINT_GROUP or entry_point.name in domains:
+                continue
+            directory = _locate_package(dist, entry_point.value)
+            if directory is not None and directory.is_dir():
+                domains[entry_point.name] = directory
+    return domains
+
+
+def entry_point_domains(cache_file: Optional[Path] = None) -> Dict[str, Path]:
+    """Entry-point domains by name, served from the disk cache while sys.path is unchanged"""
+    fingerprint = path_fingerprint()
+    if cache_file is not None:
+        try:
+            cached = json.loads(cache_file.read_text())
+            if cached.get("fingerprint") == fingerprint:
+                return {name: Path(path) for name, path in cached["domains"].items()}
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    domains = scan_entry_point_domains()
+    if cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+            temp.write_text(json.dumps({
+                "fingerprint": fingerprint,
+                "domains": {name: str(path) for name, path in domains.items()}
+            }))
+            os.replace(str(temp), str(cache_file))
+        except OSError:
+            pass
+    return domains
@@ -0,0 +1,80 @@
+"""
+Projection of the JSON execution context for Craft CLI
+
+Agents that call the same tool in a loop rarely need the full context every
+time. `--fields` keeps only selected (dotted) paths, `--no-help` drops the
+tool's help text and `--help-digest` replaces it with a short hash that can
+be compared against `craft <domain> <tool> --help --digest=<hash>`.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+CONTEXT_FIELDS = (
+    "execution", "tool_config", "resolved_command", "parameters", "variables", "result"
+)
+
+HELP_MODES = ("full", "none", "digest")
+
+
+class ProjectionError(ValueError):
+    """Raised for invalid --fields selections"""
+
+
+def help_digest(text: str) -> str:
+    """Short content hash of a tool's help text"""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def parse_fields(value: str) -> List[str]:
+    """Split a --fields value into dotted paths, checking their top-level key"""
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    if not fields:
+        raise ProjectionError("--fields needs at least one field")
+    for field in fields:
+        root = field.split(".", 1)[0]
+        if root not in CONTEXT_FIELDS:
+            raise ProjectionError(
+                f"unknown field '{field}' (expected one of: {', '.join(CONTEXT_FIELDS)})"
+            )
+    return fields
+
+
+@dataclass
+class ContextView:
+    """Which parts of the execution context to emit"""
+    fields: Optional[List[str]] = None
+    help: str = "full"
+
+    def apply(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the projected context; the input is left untouched"""
+        tool_config = context.get("tool_config")
+        if self.help != "full" and isinstance(tool_config, dict):
+            tool_config = dict(tool_config)
+            help_text = tool_config.pop("help", "")
+            if self.help == "digest":
+                tool_config["help_digest"] = help_digest(help_text)
+            context = {**context, "tool_config": tool_config}
+
+        if self.fields is None:
+            return context
+        projected: Dict[str, Any] = {}
+        for field in self.fields:
+            _copy_path(context, projected, field.split("."))
+        return projected
+
+
+def _copy_path(source: Dict[str, Any], target: Dict[str, Any], path: List[str]) -> None:
+    """Copy source[path] into target, creating intermediate dicts; missing paths are skipped"""
+    key = path[0]
+    if not isinstance(source, dict) or key not in source:
+        return
+    if len(path) == 1:
+        target[key] = source[key]
+        return
+    child = target.setdefault(key, {})
+    if isinstance(child, dict):
+        _copy_path(source[key], child, path[1:])
+        if not child:
+            del target[key]
@@ -0,0 +1,176 @@
+"""
+Tool registry for Craft CLI
+
+Loads tool YAML files once per process and keeps the parsed configuration
+together with the compiled command template.
+"""
+import yaml
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import ConfigManager
+from .entrypoints import EntrypointError, parse_entrypoint
+from .metrics import REGISTRY_CACHE, YAML_PARSES
+from .params import ParameterError, ToolParameter, load_parameters
+from .runner import ResourcePolicy
+from .templates import BUILTIN_VARIABLES, CommandTemplate, TemplateError
+from .zygote import PreforkPolicy
+
+
+@dataclass
+class ToolSpec:
+    """Parsed tool definition"""
+    domain: str
+    tool: str
+    path: Path
+    config: Dict[str, Any] = field(default_factory=dict)
+    parameters: Dict[str, ToolParameter] = field(default_factory=dict)
+    resources: ResourcePolicy = field(default_factory=ResourcePolicy)
+    concurrency: Optional[int] = None
+    entrypoint: Optional[str] = None
+    isolate: bool = False
+    prefork: Optional[PreforkPolicy] = None
+    template: Optional[CommandTemplate] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_file(cls, domain: str, tool_file: Path) -> 'ToolSpec':
+        """Load a tool YAML file and compile its command template"""
+        spec = cls(domain=domain, tool=tool_file.stem, path=tool_file)
+        try:
+            YAML_PARSES.inc(kind="tool")
+            data = yaml.safe_load(tool_file.read_text())
+        except (yaml.YAMLError, IOError) as e:
+            spec.error = f"Invalid tool file: {e}"
+            return spec
+        if not isinstance(data, dict):
+            spec.error = "Invalid tool file: expected a mapping"
+            return spec
+        spec.config = data
+
+        try:
+            spec.parameters = load_parameters(data.get("parameters"))
+        except ParameterError as e:
+            spec.error = f"Invalid parameters: {e}"
+            return spec
+        reserved = [p.name for p in spec.parameters.values() if p.variable in BUILTIN_VARIABLES]
+        if reserved:
+            spec.error = f"Invalid parameters: --{reserved[0]} shadows a built-in variable"
+            return spec
+
+        try:
+            spec.resources = ResourcePolicy.from_dict(data.get("resources"))
+        except ValueError as e:
+            spec.error = f"Invalid resources: {e}"
+            return spec
+
+        concurrency = data.get("concurrency")
+        if concurrency is not None:
+            if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+                spec.error = f"Invalid concurrency: expected a positive integer, got {concurrency!r}"
+                return spec
+            spec.concurrency = concurrency
+
+        if data.get("entrypoint") is not None:
+            try:
+                spec.entrypoint = parse_entrypoint(data["entrypoint"])
+            except EntrypointError as e:
+                spec.error = f"Invalid entrypoint: {e}"
+                return spec
+        isolate = data.get("isolate", False)
+        if not isinstance(isolate, bool):
+            spec.error = f"Invalid isolate: expected true or false, got {isolate!r}"
+            return spec
+        spec.isolate = isolate
+
+        try:
+            spec.prefork = PreforkPolicy.from_value(data.get("prefork"))
+        except ValueError as e:
+            spec.error = f"Invalid prefork: {e}"
+            return spec
+
+        command = data.get("command", "")
+        if command:
+            try:
+                spec.template = CommandTemplate(str(command), spec.variables())
+            except TemplateError as e:
+                spec.error = str(e)
+        return spec
+
+    def variables(self) -> List[str]:
+        """Template variables this tool may reference"""
+        return list(BUILTIN_VARIABLES) + [p.variable for p in self.parameters.values()]
+
+
+class ToolRegistry:
+    """Caches domain lookups and parsed tool specs for a CraftCLI instance"""
+
+    def __init__(self, config_manager: ConfigManager):
+        self.config_manager = config_manager
+        self._domains: Optional[Dict[str, Path]] = None
+        self._tools: Dict[Tuple[str, str], Optional[ToolSpec]] = {}
+
+    def domains(self) -> Dict[str, Path]:
+        """Active domain directories by name (respects precedence)"""
+        if self._domains is None:
+            REGISTRY_CACHE.inc(cache="domains", result="miss")
+            domains: Dict[str, Path] = {}
+            for domain_path in self.config_manager.get_domain_paths():
+                if not domain_path.exists():
+                    continue
+                for domain_dir in sorted(domain_path.iterdir()):
+                    if domain_dir.is_dir() and domain_dir.name not in domains:
+                        domains[domain_dir.name] = domain_dir
+            # Packaged domains never shadow directory-based ones
+            for name, domain_dir in self.config_manager.get_plugin_domains().items():
+                domains.setdefault(name, domain_dir)
+            self._domains = domains
+        else:
+            REGISTRY_CACHE.inc(cache="domains", result="hit")
+        return self._domains
+
+    def invalidate(self) -> None:
+        """Forget cached domains and tools (e.g. after domain sources were synced)"""
+        self._domains = None
+        self._tools.clear()
+
+    def find_domain(self, domain: str) -> Optional[Path]:
+        """Find the active domain directory by name"""
+        return self.domains().get(domain)
+
+    def get_tool(self, domain: str, tool: str) -> Optional[ToolSpec]:
+        """Return the parsed tool spec, or None if the domain or tool is missing"""
+        key = (domain, tool)
+        if key in self._tools:
+            REGISTRY_CACHE.inc(cache="tools", result="hit")
+        else:
+            REGISTRY_CACHE.inc(cache="tools", result="miss")
+            domain_dir = self.find_domain(domain)
+            tool_file = domain_dir / f"{tool}.yaml" if domain_dir else None
+            if tool_file is None or not tool_file.exists():
+                self._tools[key] = None
+            else:
+                self._tools[key] = ToolSpec.from_file(domain, tool_file)
+        return self._tools[key]
+
+    def iter_tools(self, domain: str) -> Iterator[ToolSpec]:
+        """Yield every tool spec in a domain"""
+        domain_dir = self.find_domain(domain)
+        if not domain_dir:
+            return
+        for tool_file in sorted(domain_dir.glob("*.yaml")):
+            spec = self.get_tool(domain, tool_file.stem)
+            if spec is not None:
+                yield spec
+
+    def validate(self) -> Tuple[int, List[ToolSpec]]:
+        """Load every tool in every domain; return (tools checked, broken specs)"""
+        checked = 0
+        broken = []
+        for domain in self.domains():
+            for spec in self.iter_tools(domain):
+                checked += 1
+                if spec.error:
+                    broken.append(spec)
+        return checked, broken
@@ -0,0 +1,118 @@
+"""
+Incremental Rich rendering for Craft CLI
+
+Human-mode listings are printed a page at a time as rows are produced, so the
+first rows appear before the whole domain has been discovered and parsed.
+Every page is a borderless table with the column widths fixed by the first
+page, which keeps consecutive pages aligned.
+"""
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from rich import box
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+from .metrics import RENDER_FIRST_ROW
+
+console = Console()
+
+# Rows per page when output is not a terminal
+DEFAULT_PAGE_SIZE = 200
+
+# Lines kept free for the title, header and prompt when paging to a terminal
+_SCREEN_MARGIN = 5
+
+# Padding and divider between two columns of a borderless table
+_COLUMN_GAP = 3
+
+
+def page_size(target: Optional[Console] = None) -> int:
+    """Rows per page: one screenful on a terminal, a fixed batch otherwise"""
+    target = target or console
+    if target.is_terminal:
+        return max(target.height - _SCREEN_MARGIN, 10)
+    return DEFAULT_PAGE_SIZE
+
+
+def fit_to_screen(text: str, more_hint: str, target: Optional[Console] = None) -> str:
+    """Keep only the lines of text that fit on the terminal"""
+    target = target or console
+    if not target.is_terminal:
+        return text
+    lines = text.rstrip("\n").split("\n")
+    visible = max(target.height - _SCREEN_MARGIN, 5)
+    if len(lines) <= visible:
+        return text
+    hidden = len(lines) - visible + 1
+    return "\n".join(lines[:visible - 1] + [f"... {hidden} more lines, see: {more_hint}"])
+
+
+class StreamingTable:
+    """A table printed page by page from an iterable of rows"""
+
+    def __init__(self, title: str, columns: Sequence[Tuple[str, dict]], view: str,
+                 target: Optional[Console] = None, rows_per_page: Optional[int] = None):
+        self.title = title
+        self.columns = columns
+        self.view = view
+        self.console = target or console
+        self.rows_per_page = rows_per_page or page_size(self.console)
+        self.first_row_seconds: Optional[float] = None
+
+    def _page(self, rows: List[Sequence[str]], widths: List[int], first: bool) -> Table:
+        table = Table(
+            title=self.title if first else None,
+            show_header=first,
+            box=box.SIMPLE_HEAD,
+            pad_edge=False,
+            show_edge=False
+        )
+        for (header, options), width in zip(self.columns, widths):
+            table.add_column(header, width=width, overflow="fold", **options)
+        for row in rows:
+            # Cells are plain text: "[parquet]" is not Rich markup
+            table.add_row(*map(escape, row))
+        return table
+
+    def _measure(self, rows: List[Sequence[str]]) -> List[int]:
+        """Widths of the longest cells, the widest shrunk until the table fits the console"""
+        widths = [len(header) for header, _ in self.columns]
+        for row in rows:
+            for index, cell in enumerate(row):
+                widths[index] = max(widths[index], len(cell))
+        budget = self.console.width - _COLUMN_GAP * (len(widths) - 1)
+        while sum(widths) > budget:
+            widest = max(range(len(widths)), key=widths.__getitem__)
+            if widths[widest] <= 1:
+                break
+            widths[widest] -= 1  # long cells fold onto more lines
+        return widths
+
+    def render(self, rows: Iterable[Sequence[str]], start: Optional[float] = None) -> int:
+        """Print rows as they arrive; returns the number of rows printed"""
+        start = time.monotonic() if start is None else start
+        widths: Optional[List[int]] = None
+        page: List[Sequence[str]] = []
+        count = 0
+
+        def flush() -> None:
+            nonlocal widths
+            first = widths is None
+            if first:
+                widths = self._measure(page)
+            self.console.print(self._page(page, widths, first))
+            if first:
+                self.first_row_seconds = time.monotonic() - start
+                RENDER_FIRST_ROW.observe(self.first_row_seconds, view=self.view)
+            page.clear()
+
+        for row in rows:
+            page.append(row)
+            count += 1
+            if len(page) >= self.rows_per_page:
+                flush()
+        if page or widths is None:
+            flush()
+        return count
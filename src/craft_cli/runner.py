@@ -0,0 +1,223 @@
+"""
+Tool execution with resource limits for Craft CLI
+
+Commands run in their own session with POSIX rlimits applied to the child.
+Peak RSS, CPU time and block I/O are read from the child's rusage.
+"""
+import os
+import signal
+import sys
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .params import parse_duration
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+
+_READ_SIZE = 65536
+
+
+@dataclass
+class ResourcePolicy:
+    """Per-tool resource limits declared under `resources:` in the tool YAML"""
+    timeout: Optional[float] = None
+    cpu_seconds: Optional[int] = None
+    max_rss_mb: Optional[int] = None
+    max_output_bytes: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ResourcePolicy':
+        """Create a policy from YAML; timeout accepts durations like '10m'"""
+        if not data:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError("'resources' must be a mapping")
+        unknown = set(data) - {"timeout", "cpu_seconds", "max_rss_mb", "max_output_bytes"}
+        if unknown:
+            raise ValueError(f"unknown resource limit(s): {', '.join(sorted(unknown))}")
+
+        timeout = data.get("timeout")
+        return cls(
+            timeout=parse_duration(str(timeout)) if timeout is not None else None,
+            cpu_seconds=_positive_int(data, "cpu_seconds"),
+            max_rss_mb=_positive_int(data, "max_rss_mb"),
+            max_output_bytes=_positive_int(data, "max_output_bytes")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+def _positive_int(data: Dict[str, Any], key: str) -> Optional[int]:
+    value = data.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"{key} must be a positive integer, got {value!r}")
+    return value
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome and resource accounting of one tool run"""
+    exit_code: int
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    cpu_user: float = 0.0
+    cpu_system: float = 0.0
+    max_rss_kb: int = 0
+    io_read_blocks: int = 0
+    io_write_blocks: int = 0
+    output_bytes: int = 0
+    output_truncated: bool = False
+    limit_exceeded: Optional[str] = None
+    signal: Optional[int] = None
+    queue_wait: float = 0.0
+
+    @property
+    def cli_exit_code(self) -> int:
+        """Exit status suitable for returning from the craft process"""
+        if self.limit_exceeded == "timeout":
+            return 124
+        if self.signal is not None:
+            return 128 + self.signal
+        return self.exit_code
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["cpu_seconds"] = round(self.cpu_user + self.cpu_system, 6)
+        data["duration"] = round(self.duration, 6)
+        data["queue_wait"] = round(self.queue_wait, 6)
+        return data
+
+
+def rlimit_preexec(policy: ResourcePolicy):
+    """Build a preexec_fn that applies rlimits inside the child"""
+    if resource is None:
+        return None
+
+    def preexec() -> None:
+        if policy.cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (policy.cpu_seconds, policy.cpu_seconds + 1))
+        if policy.max_rss_mb:
+            # RLIMIT_RSS is not enforced on Linux, so cap the address space instead
+            limit = policy.max_rss_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return preexec
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _killed_by(result: ExecutionResult, signum: int) -> bool:
+    """Whether the child (or the command under its shell) died from a signal"""
+    return result.signal == signum or result.exit_code == 128 + signum
+
+
+def run_command(command: str, policy: Optional[ResourcePolicy] = None,
+                cwd: Optional[str] = None,
+                env: Optional[Dict[str, str]] = None) -> ExecutionResult:
+    """Run a shell command under a resource policy and collect its accounting"""
+    policy = policy or ResourcePolicy()
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        env={**os.environ, **env} if env else None,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        preexec_fn=rlimit_preexec(policy),
+        start_new_session=True
+    )
+    result = supervise(proc.pid, proc.stdout, proc.stderr, policy, start)
+    proc.returncode = result.exit_code
+    return result
+
+
+def supervise(pid: int, stdout, stderr, policy: ResourcePolicy, start: float,
+              wait: Optional[Callable[[], Tuple[int, Any]]] = None) -> ExecutionResult:
+    """Collect the output and rusage of a process that leads its own process group
+
+    Enforces the output cap and wall timeout by killing the group, then reaps
+    the child with wait4, or with `wait` (returning (status, rusage)) when the
+    process was started by someone else.
+    """
+    state = {"bytes": 0, "truncated": False}
+    lock = threading.Lock()
+    buffers: Dict[str, List[bytes]] = {"stdout": [], "stderr": []}
+
+    def drain(stream, key: str) -> None:
+        for chunk in iter(lambda: stream.read1(_READ_SIZE), b""):
+            with lock:
+                if state["truncated"]:
+                    continue
+                limit = policy.max_output_bytes
+                if limit is not None and state["bytes"] + len(chunk) > limit:
+                    chunk = chunk[:limit - state["bytes"]]
+                    state["truncated"] = True
+                    _kill_group(pid)
+                state["bytes"] += len(chunk)
+                buffers[key].append(chunk)
+        stream.close()
+
+    readers = [
+        threading.Thread(target=drain, args=(stdout, "stdout"), daemon=True),
+        threading.Thread(target=drain, args=(stderr, "stderr"), daemon=True)
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    for reader in readers:
+        remaining = None
+        if policy.timeout is not None:
+            remaining = max(0.0, policy.timeout - (time.monotonic() - start))
+        reader.join(remaining)
+        if reader.is_alive():
+            timed_out = True
+            _kill_group(pid)
+            reader.join()
+
+    if wait is None:
+        _, status, usage = os.wait4(pid, 0)
+    else:
+        status, usage = wait()
+    duration = time.monotonic() - start
+
+    result = ExecutionResult(
+        exit_code=os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status),
+        stdout=b"".join(buffers["stdout"]).decode(errors="replace"),
+        stderr=b"".join(buffers["stderr"]).decode(errors="replace"),
+        duration=duration,
+        cpu_user=usage.ru_utime,
+        cpu_system=usage.ru_stime,
+        max_rss_kb=usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss,
+        io_read_blocks=usage.ru_inblock,
+        io_write_blocks=usage.ru_oublock,
+        output_bytes=state["bytes"],
+        output_truncated=state["truncated"],
+        signal=os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+    )
+
+    if timed_out:
+        result.limit_exceeded = "timeout"
+    elif state["truncated"]:
+        result.limit_exceeded = "output"
+    elif policy.cpu_seconds and _killed_by(result, signal.SIGXCPU):
+        result.limit_exceeded = "cpu"
+    return result
@@ -0,0 +1,355 @@
+"""
+Remote domain sources for Craft CLI
+
+Shared domain libraries can be listed under `domain_sources:` in `.craftrc` as
+git repositories or archives. `craft --sync` fetches them into a local store
+under `state_dir/sources`:
+
+    objects/ab/cdef...      file contents keyed by sha256 (shared by all versions)
+    snapshots/<tree>/       immutable directory trees hard-linked from objects
+    current/<name>          symlink to the active snapshot, swapped atomically
+    state.json              synced versions and what each source points at
+
+Discovery only ever reads `current/<name>`, so it never touches the network.
+Offline syncs can only activate versions that are already in the store.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+import urllib.request
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+
+SOURCE_KINDS = ("git", "archive")
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+_FETCH_TIMEOUT = 60
+
+
+class SourceError(Exception):
+    """Raised when a domain source cannot be parsed, fetched or activated"""
+
+
+@dataclass
+class DomainSource:
+    """One entry of `domain_sources:` in .craftrc"""
+    name: str
+    kind: str
+    url: str
+    ref: Optional[str] = None
+    path: str = ""
+    sha256: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> 'DomainSource':
+        """Create a source from YAML; exactly one of `git:` or `archive:` is required"""
+        if not isinstance(data, dict):
+            raise SourceError(f"domain source must be a mapping, got {data!r}")
+        name = data.get("name")
+        if not isinstance(name, str) or not _NAME_RE.match(name):
+            raise SourceError(f"domain source needs a simple 'name', got {name!r}")
+        kinds = [kind for kind in SOURCE_KINDS if data.get(kind)]
+        if len(kinds) != 1:
+            raise SourceError(f"domain source '{name}' needs exactly one of: git, archive")
+        unknown = set(data) - {"name", "git", "archive", "ref", "path", "sha256"}
+        if unknown:
+            raise SourceError(
+                f"domain source '{name}' has unknown key(s): {', '.join(sorted(unknown))}"
+            )
+
+        path = str(data.get("path") or "")
+        if Path(path).is_absolute() or ".." in Path(path).parts:
+            raise SourceError(f"domain source '{name}' path must be relative: {path!r}")
+        return cls(
+            name=name,
+            kind=kinds[0],
+            url=str(data[kinds[0]]),
+            ref=str(data["ref"]) if data.get("ref") is not None else None,
+            path=path,
+            sha256=str(data["sha256"]).lower() if data.get("sha256") else None
+        )
+
+    @property
+    def version(self) -> str:
+        """Identity of the requested version, used to find it in the store"""
+        return f"{self.kind}:{self.url}@{self.ref or ''}"
+
+
+@dataclass
+class SyncResult:
+    """Outcome of syncing one source"""
+    name: str
+    tree: str
+    changed: bool
+    cached: bool
+    revision: Optional[str] = None
+
+
+class SourceStore:
+    """Content-addressed local mirror of domain sources"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.objects = root / "objects"
+        self.snapshots = root / "snapshots"
+        self.current = root / "current"
+        self.state_file = root / "state.json"
+
+    def domain_path(self, source: DomainSource) -> Optional[Path]:
+        """Directory of the active snapshot's domains, or None if never synced"""
+        link = self.current / source.name
+        if not link.exists():
+            return None
+        # Resolve once so a concurrent swap cannot mix versions within a process
+        return (link.resolve() / source.path) if source.path else link.resolve()
+
+    def sync(self, source: DomainSource, offline: bool = False) -> SyncResult:
+        """Bring a source's requested version into the store and make it current"""
+        for directory in (self.objects, self.snapshots, self.current):
+            directory.mkdir(parents=True, exist_ok=True)
+        with self._lock():
+            state = self._read_state()
+            previous = state["sources"].get(source.name, {}).get("tree")
+            tree = state["index"].get(source.version)
+            revision = state["revisions"].get(source.version)
+            cached = tree is not None and (self.snapshots / tree).is_dir()
+
+            # Branches and unpinned archives may move, so only cached
+            # versions are reused without asking the remote
+            if offline:
+                if not cached:
+                    raise SourceError(
+                        f"'{source.name}' ({source.version}) is not in the local store; "
+                        f"run craft --sync without offline mode first"
+                    )
+            elif not cached or not self._is_pinned(source):
+                with tempfile.TemporaryDirectory(dir=str(self.root)) as work:
+                    checkout = Path(work) / "checkout"
+                    checkout.mkdir()
+                    revision = self._fetch(source, checkout, Path(work))
+                    tree = self._materialize(self._ingest(checkout))
+                state["index"][source.version] = tree
+                if revision:
+                    state["revisions"][source.version] = revision
+                cached = False
+
+            self._activate(source.name, tree)
+            state["sources"][source.name] = {
+                "version": source.version,
+                "tree": tree,
+                "revision": revision,
+                "synced_at": time.time()
+            }
+            self._write_state(state)
+        return SyncResult(source.name, tree, tree != previous, cached, revision)
+
+    @staticmethod
+    def _is_pinned(source: DomainSource) -> bool:
+        """Whether the requested version can never change upstream"""
+        if source.kind == "archive":
+            return source.sha256 is not None
+        return bool(source.ref and re.fullmatch(r"[0-9a-f]{40}", source.ref))
+
+    # Fetching
+
+    def _fetch(self, source: DomainSource, checkout: Path, work: Path) -> Optional[str]:
+        if source.kind == "git":
+            return self._fetch_git(source, checkout)
+        self._fetch_archive(source, checkout, work)
+        return source.sha256
+
+    def _fetch_git(self, source: DomainSource, checkout: Path) -> str:
+        def git(*args: str) -> str:
+            try:
+                completed = subprocess.run(
+                    ["git", *args], cwd=str(checkout), capture_output=True,
+                    text=True, timeout=_FETCH_TIMEOUT
+                )
+            except (OSError, subprocess.TimeoutExpired) as e:
+                raise SourceError(f"git {args[0]} failed for '{source.name}': {e}")
+            if completed.returncode != 0:
+                raise SourceError(
+                    f"git {args[0]} failed for '{source.name}': {completed.stderr.strip()}"
+                )
+            return completed.stdout.strip()
+
+        git("init", "-q")
+        git("fetch", "-q", "--depth", "1", source.url, source.ref or "HEAD")
+        git("checkout", "-q", "FETCH_HEAD")
+        return git("rev-parse", "HEAD")
+
+    def _fetch_archive(self, source: DomainSource, checkout: Path, work: Path) -> None:
+        url = source.url if "://" in source.url else Path(source.url).expanduser().resolve().as_uri()
+        archive = work / "archive"
+        digest = hashlib.sha256()
+        try:
+            with urllib.request.urlopen(url, timeout=_FETCH_TIMEOUT) as response, \
+                    open(archive, "wb") as f:
+                for chunk in iter(lambda: response.read(io.DEFAULT_BUFFER_SIZE * 16), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+        except (OSError, ValueError) as e:
+            raise SourceError(f"Failed to download '{source.name}' from {source.url}: {e}")
+
+        if source.sha256 and digest.hexdigest() != source.sha256:
+            raise SourceError(
+                f"Checksum mismatch for '{source.name}': expected {source.sha256}, "
+                f"got {digest.hexdigest()}"
+            )
+        try:
+            if zipfile.is_zipfile(archive):
+                _extract_zip(archive, checkout)
+            else:
+                _extract_tar(archive, checkout)
+        except (tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+            raise SourceError(f"Failed to unpack '{source.name}': {e}")
+
+    # Content-addressed storage
+
+    def _ingest(self, checkout: Path) -> List[Tuple[str, str, str]]:
+        """Store every regular file; returns sorted (relpath, mode, sha256) entries"""
+        entries = []
+        for path in _walk_files(checkout):
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            mode = "x" if os.access(str(path), os.X_OK) else "f"
+            target = self._object_path(digest, mode)
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                fd, temp = tempfile.mkstemp(dir=str(target.parent))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(temp, 0o555 if mode == "x" else 0o444)
+                os.replace(temp, target)
+            entries.append((path.relative_to(checkout).as_posix(), mode, digest))
+        entries.sort()
+        return entries
+
+    def _object_path(self, digest: str, mode: str) -> Path:
+        suffix = "-x" if mode == "x" else ""
+        return self.objects / digest[:2] / f"{digest[2:]}{suffix}"
+
+    def _materialize(self, entries: List[Tuple[str, str, str]]) -> str:
+        """Build (or reuse) the snapshot directory for a tree; returns its hash"""
+        manifest = "".join(f"{mode} {digest} {relpath}\n" for relpath, mode, digest in entries)
+        tree = hashlib.sha256(manifest.encode()).hexdigest()
+        snapshot = self.snapshots / tree
+        if snapshot.is_dir():
+            return tree
+
+        temp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=str(self.snapshots)))
+        for relpath, mode, digest in entries:
+            target = temp / relpath
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(str(self._object_path(digest, mode)), str(target))
+            except OSError:
+                shutil.copy2(str(self._object_path(digest, mode)), str(target))
+        (temp / ".craft-tree").write_text(manifest)
+        try:
+            os.rename(str(temp), str(snapshot))
+        except OSError:
+            # Another process built the same tree first
+            shutil.rmtree(str(temp), ignore_errors=True)
+        return tree
+
+    def _activate(self, name: str, tree: str) -> None:
+        """Point current/<name> at a snapshot with an atomic rename"""
+        temp = self.current / f".{name}.{os.getpid()}.tmp"
+        if temp.is_symlink():
+            temp.unlink()
+        os.symlink(os.path.join("..", "snapshots", tree), str(temp))
+        os.replace(str(temp), str(self.current / name))
+
+    # State
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        """Serialise syncs of this store across processes"""
+        fd = os.open(str(self.root / "sync.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (FileNotFoundError, ValueError):
+            state = {}
+        for key in ("index", "revisions", "sources"):
+            state.setdefault(key, {})
+        return state
+
+    def _write_state(self, state: Dict[str, Any]) -> None:
+        temp = self.state_file.with_name(f".state.{os.getpid()}.tmp")
+        temp.write_text(json.dumps(state, indent=2, sort_keys=True))
+        os.replace(str(temp), str(self.state_file))
+
+
+def _walk_files(root: Path) -> Iterator[Path]:
+    """Regular files under root, skipping VCS metadata and symlinks"""
+    for directory, dirnames, filenames in os.walk(str(root)):
+        dirnames[:] = sorted(d for d in dirnames if d != ".git")
+        for filename in sorted(filenames):
+            path = Path(directory) / filename
+            if path.is_file() and not path.is_symlink():
+                yield path
+
+
+def _safe_target(dest: Path, name: str) -> Optional[Path]:
+    """Resolve an archive member under dest, or None if it would escape it"""
+    parts = Path(name).parts
+    if not parts or Path(name).is_absolute() or ".." in parts:
+        return None
+    return dest.joinpath(*parts)
+
+
+def _extract_tar(archive: Path, dest: Path) -> None:
+    with tarfile.open(str(archive)) as tar:
+        for member in tar:
+            target = _safe_target(dest, member.name)
+            if target is None:
+                raise SourceError(f"Refusing unsafe archive member: {member.name}")
+            if member.isdir():
+                target.mkdir(parents=True, exist_ok=True)
+            elif member.isfile():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with tar.extractfile(member) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                if member.mode & 0o111:
+                    os.chmod(str(target), 0o755)
+
+
+def _extract_zip(archive: Path, dest: Path) -> None:
+    with zipfile.ZipFile(str(archive)) as zf:
+        for info in zf.infolist():
+            target = _safe_target(dest, info.filename)
+            if target is None:
+                raise SourceError(f"Refusing unsafe archive member: {info.filename}")
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with zf.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            if (info.external_attr >> 16) & 0o111:
+                os.chmod(str(target), 0o755)
@@ -0,0 +1,91 @@
+"""
+Command template compilation for Craft CLI
+"""
+import re
+import string
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Variables every command template may reference
+BUILTIN_VARIABLES = ("base_path", "args", "domain", "tool", "tool_config")
+
+_FIELD_BASE = re.compile(r"[^.\[]*")
+_FORMATTER = string.Formatter()
+
+
+class TemplateError(ValueError):
+    """Raised when a command template cannot be compiled"""
+
+
+class CommandTemplate:
+    """A command template parsed once into literal and variable segments"""
+
+    def __init__(self, source: str, variables: Iterable[str] = BUILTIN_VARIABLES):
+        self.source = source
+        self.allowed = frozenset(variables)
+        # (literal, variable, field with any [key]/.attr lookups, conversion, format_spec)
+        self.segments: List[Tuple[str, Optional[str], str, Optional[str], str]] = []
+        self.placeholders: List[str] = []
+        self._compile()
+
+    def _compile(self) -> None:
+        """Split the template into (literal, variable, field, conversion, format_spec) tuples"""
+        try:
+            parsed = list(string.Formatter().parse(self.source))
+        except ValueError as e:
+            raise TemplateError(f"Malformed template {self.source!r}: {e}") from e
+
+        unknown = []
+        for literal, field_name, format_spec, conversion in parsed:
+            if field_name is None:
+                self.segments.append((literal, None, "", None, ""))
+                continue
+            # A named variable, optionally with lookups such as {tool_config[name]}
+            variable = _FIELD_BASE.match(field_name).group(0)
+            if not variable.isidentifier():
+                raise TemplateError(
+                    f"Unsupported placeholder {{{field_name}}} in {self.source!r}"
+                )
+            if variable not in self.allowed:
+                unknown.append(field_name)
+            if format_spec and "{" in format_spec:
+                raise TemplateError(
+                    f"Nested placeholders are not supported in {self.source!r}"
+                )
+            if variable not in self.placeholders:
+                self.placeholders.append(variable)
+            self.segments.append((literal, variable, field_name, conversion, format_spec or ""))
+
+        if unknown:
+            supported = ", ".join(sorted(self.allowed))
+            raise TemplateError(
+                f"Unknown placeholder(s) {', '.join('{' + u + '}' for u in unknown)} "
+                f"in {self.source!r} (supported: {supported})"
+            )
+
+    def resolve(self, values: Dict[str, Any]) -> str:
+        """Join literal segments with the substituted variable values"""
+        parts = []
+        for literal, variable, field_name, conversion, format_spec in self.segments:
+            parts.append(literal)
+            if variable is None:
+                continue
+            if field_name == variable:
+                value = values.get(variable, "")
+            else:
+                try:
+                    value = _FORMATTER.get_field(field_name, (), values)[0]
+                except (LookupError, AttributeError, TypeError):
+                    value = ""
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            if format_spec:
+                parts.append(format(value, format_spec))
+            else:
+                parts.append(value if isinstance(value, str) else str(value))
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"CommandTemplate({self.source!r})"
@@ -0,0 +1,246 @@
+"""
+OpenTelemetry-compatible tracing for Craft CLI
+
+Spans are exported as OTLP-JSON, either appended to a file (one
+ExportTraceServiceRequest per line) or POSTed to a local collector's
+/v1/traces endpoint. The parent trace context is read from the W3C
+TRACEPARENT environment variable and passed on to executed tools.
+
+Finished spans are put on a queue and serialised by a background thread in
+batches, so instrumented code only pays for a clock read and a queue put.
+Tracing is disabled (and free) unless a file or endpoint is configured.
+"""
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_BATCH_SIZE = 256
+_FLUSH_INTERVAL = 1.0
+_SHUTDOWN_TIMEOUT = 2.0
+
+STATUS_ERROR = 2
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Dict[str, str]]:
+    """Parse a W3C traceparent header value"""
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return {"trace_id": match.group(1), "span_id": match.group(2), "flags": match.group(3)}
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """A single timed operation"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = 0
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.status_message:
+            data["status"]["message"] = self.status_message
+        return data
+
+
+class _NoopSpan:
+    """Span stand-in used while tracing is disabled"""
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans and exports them in batches from a background thread"""
+
+    def __init__(self) -> None:
+        self.file: Optional[str] = None
+        self.endpoint: Optional[str] = None
+        self.parent: Optional[Dict[str, str]] = None
+        self.resource: Dict[str, Any] = {"service.name": "craft"}
+        self._local = threading.local()
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file or self.endpoint)
+
+    def configure(self, file: Optional[str] = None, endpoint: Optional[str] = None,
+                  traceparent: Optional[str] = None) -> None:
+        """Set export targets and the inherited trace context"""
+        self.file = os.path.expanduser(file) if file else None
+        self.endpoint = endpoint or None
+        self.parent = parse_traceparent(traceparent)
+
+    def current_span(self) -> Any:
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else _NOOP_SPAN
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Time a block as a span nested under the current one"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if stack:
+            trace_id, parent_id = stack[-1].trace_id, stack[-1].span_id
+        elif self.parent:
+            trace_id, parent_id = self.parent["trace_id"], self.parent["span_id"]
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+
+        span = Span(name, trace_id, parent_id, dict(attributes))
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            stack.pop()
+            span.end_ns = time.time_ns()
+            self._submit(span)
+
+    def _submit(self, span: Span) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="craft-span-exporter", daemon=True
+                    )
+                    self._worker.start()
+                    if not self._atexit_registered:
+                        atexit.register(self.flush)
+                        self._atexit_registered = True
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._export(batch)
+                batch, deadline = [], None
+                continue
+            if item is None:
+                if batch:
+                    self._export(batch)
+                return
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + _FLUSH_INTERVAL
+            if len(batch) >= _BATCH_SIZE:
+                self._export(batch)
+                batch, deadline = [], None
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        from . import __version__
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [_attribute(k, v) for k, v in self.resource.items()]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "craft_cli", "version": __version__},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+    def _export(self, spans: List[Span]) -> None:
+        body = json.dumps(self._payload(spans), separators=(",", ":"))
+        try:
+            if self.file:
+                os.makedirs(os.path.dirname(self.file) or ".", exist_ok=True)
+                with open(self.file, "a") as f:
+                    f.write(body + "\n")
+            if self.endpoint:
+                request = urllib.request.Request(
+                    self.endpoint, data=body.encode(),
+                    headers={"Content-Type": "application/json"}, method="POST"
+                )
+                urllib.request.urlopen(request, timeout=_SHUTDOWN_TIMEOUT).close()
+        except (OSError, ValueError) as e:
+            print(f"Warning: Failed to export trace spans: {e}", file=sys.stderr)
+
+    def flush(self) -> None:
+        """Export everything queued so far and stop the worker"""
+        worker = self._worker
+        if worker is None:
+            return
+        self._queue.put(None)
+        worker.join(_SHUTDOWN_TIMEOUT)
+        self._worker = None
+
+
+tracer = Tracer()
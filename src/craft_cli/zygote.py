@@ -0,0 +1,446 @@
+"""
+Pre-forked warm interpreters for Python tool commands
+
+Tools whose command is `python -m module ...` or `python script.py ...` can opt
+in with a `prefork:` block in their YAML. Craft then hands the run to a zygote:
+a long-lived interpreter that has already imported the configured modules and
+forks one child per run, so heavy imports are paid once per zygote instead of
+once per call.
+
+    prefork:
+      preload: [json, decimal]   # imported once in the zygote
+      idle_timeout: 10m          # zygote exits after this long without work
+
+One zygote runs per (interpreter, preload set), listening on a unix socket in
+`state_dir/zygotes`. The client passes its stdin/stdout/stderr pipes over the
+socket (SCM_RIGHTS), so output is collected exactly like a subprocess run;
+the zygote reports the child's pid and later its exit status and rusage.
+The zygote is single-threaded, which keeps fork() safe.
+
+If no zygote can be reached or started, the command runs as a normal
+subprocess.
+"""
+import array
+import hashlib
+import json
+import os
+import re
+import runpy
+import selectors
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from .params import parse_duration
+from .runner import ExecutionResult, ResourcePolicy, rlimit_preexec, run_command, supervise
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+_START_TIMEOUT = 10.0
+_HEADER_SIZE = 8
+_SHELL_CHARS = set("|&;<>()$`*?[]{}~#\n")
+_RUSAGE_FIELDS = ("ru_utime", "ru_stime", "ru_maxrss", "ru_inblock", "ru_oublock")
+
+
+class ZygoteUnavailable(Exception):
+    """Raised when no zygote can serve a run"""
+
+
+@dataclass
+class PreforkPolicy:
+    """Per-tool zygote settings declared under `prefork:` in the tool YAML"""
+    preload: List[str] = field(default_factory=list)
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT
+
+    @classmethod
+    def from_value(cls, value: Any) -> Optional['PreforkPolicy']:
+        """`prefork: true` or a mapping with `preload` and `idle_timeout`"""
+        if value is None or value is False:
+            return None
+        if value is True:
+            return cls()
+        if not isinstance(value, dict):
+            raise ValueError("'prefork' must be true or a mapping")
+        unknown = set(value) - {"preload", "idle_timeout"}
+        if unknown:
+            raise ValueError(f"unknown prefork option(s): {', '.join(sorted(unknown))}")
+        preload = value.get("preload") or []
+        if not isinstance(preload, list) or not all(
+            isinstance(m, str) and re.fullmatch(r"[A-Za-z_][\w.]*", m) for m in preload
+        ):
+            raise ValueError("prefork preload must be a list of module names")
+        idle_timeout = value.get("idle_timeout")
+        return cls(
+            preload=preload,
+            idle_timeout=parse_duration(str(idle_timeout)) if idle_timeout is not None
+            else DEFAULT_IDLE_TIMEOUT
+        )
+
+
+def parse_python_command(command: str) -> Optional[Tuple[str, str, List[str]]]:
+    """Split `python -m mod args` / `python script.py args` into (kind, target, argv)
+
+    Returns None for anything that needs a shell (pipes, redirects, variables)
+    or is not a plain Python invocation.
+    """
+    # Anything the shell would interpret keeps running through the shell
+    if set(command) & _SHELL_CHARS:
+        return None
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        return None
+    if len(words) < 2:
+        return None
+    if not os.path.basename(words[0]).startswith("python"):
+        return None
+    if words[1] == "-m":
+        if len(words) < 3:
+            return None
+        return "module", words[2], words[3:]
+    if words[1].startswith("-"):
+        return None
+    return "script", words[1], words[2:]
+
+
+def zygote_socket(state_dir: Path, preload: List[str]) -> Path:
+    """Socket path of the zygote for this interpreter and preload set"""
+    from . import __version__
+    key = "\0".join([sys.executable, __version__] + sorted(preload))
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return state_dir / "zygotes" / f"{digest}.sock"
+
+
+# Wire format: 8-byte big-endian length, then a JSON document
+
+
+def _send_message(sock: socket.socket, message: Dict[str, Any],
+                  fds: Optional[List[int]] = None) -> None:
+    body = json.dumps(message).encode()
+    header = len(body).to_bytes(_HEADER_SIZE, "big")
+    if fds:
+        sock.sendmsg([header], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+    else:
+        sock.sendall(header)
+    sock.sendall(body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("zygote connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock: socket.socket, max_fds: int = 0) -> Tuple[Dict[str, Any], List[int]]:
+    fds = array.array("i")
+    if max_fds:
+        header, ancdata, _, _ = sock.recvmsg(
+            _HEADER_SIZE, socket.CMSG_LEN(max_fds * fds.itemsize)
+        )
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+        if not header:
+            raise ConnectionError("zygote connection closed")
+        header += _recv_exact(sock, _HEADER_SIZE - len(header))
+    else:
+        header = _recv_exact(sock, _HEADER_SIZE)
+    body = _recv_exact(sock, int.from_bytes(header, "big"))
+    return json.loads(body), list(fds)
+
+
+# Client side
+
+
+def _connect(path: Path) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def connect_or_start(state_dir: Path, preload: List[str],
+                     idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> socket.socket:
+    """Connect to the matching zygote, starting one if none is running"""
+    path = zygote_socket(state_dir, preload)
+    try:
+        return _connect(path)
+    except OSError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(str(path) + ".log", "ab") as log:
+        # The launcher forks the zygote into the background and exits at once
+        subprocess.run(
+            [sys.executable, "-c", "import sys; from craft_cli.zygote import main; main(sys.argv[1:])",
+             str(path), str(idle_timeout), *preload],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=log,
+            start_new_session=True, close_fds=True, timeout=_START_TIMEOUT
+        )
+    deadline = time.monotonic() + _START_TIMEOUT
+    delay = 0.005
+    while time.monotonic() < deadline:
+        try:
+            return _connect(path)
+        except OSError:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+    raise ZygoteUnavailable(f"zygote did not start at {path}")
+
+
+def run_prefork(command: str, policy: Optional[ResourcePolicy] = None,
+                preload: Optional[List[str]] = None, cwd: Optional[str] = None,
+                env: Optional[Dict[str, str]] = None, state_dir: Optional[Path] = None,
+                idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> ExecutionResult:
+    """Run a Python command in a child of a warm zygote; falls back to a subprocess"""
+    policy = policy or ResourcePolicy()
+    parsed = parse_python_command(command)
+    if parsed is None or state_dir is None or fcntl is None:
+        return run_command(command, policy, cwd=cwd, env=env)
+    kind, target, argv = parsed
+
+    start = time.monotonic()
+    try:
+        sock = connect_or_start(state_dir, list(preload or []), idle_timeout)
+    except (OSError, subprocess.SubprocessError, ZygoteUnavailable):
+        return run_command(command, policy, cwd=cwd, env=env)
+
+    out_read, out_write = os.pipe()
+    err_read, err_write = os.pipe()
+    stdin = os.open(os.devnull, os.O_RDONLY)
+    request = {
+        "kind": kind,
+        "target": target,
+        "argv": argv,
+        "cwd": cwd or os.getcwd(),
+        "env": {**os.environ, **(env or {})},
+        "cpu_seconds": policy.cpu_seconds,
+        "max_rss_mb": policy.max_rss_mb
+    }
+    try:
+        _send_message(sock, request, [stdin, out_write, err_write])
+    except OSError:
+        for fd in (out_read, out_write, err_read, err_write, stdin):
+            os.close(fd)
+        sock.close()
+        return run_command(command, policy, cwd=cwd, env=env)
+    for fd in (out_write, err_write, stdin):
+        os.close(fd)
+    try:
+        reply, _ = _recv_message(sock)
+    except (OSError, ValueError) as e:
+        # The request may already have started, so it is not retried
+        for fd in (out_read, err_read):
+            os.close(fd)
+        sock.close()
+        return ExecutionResult(exit_code=1, stderr=f"zygote failed: {e}\n",
+                               duration=time.monotonic() - start)
+
+    def wait() -> Tuple[int, Any]:
+        try:
+            done, _ = _recv_message(sock)
+        finally:
+            sock.close()
+        return done["status"], SimpleNamespace(**done["rusage"])
+
+    return supervise(reply["pid"], os.fdopen(out_read, "rb"), os.fdopen(err_read, "rb"),
+                     policy, start, wait)
+
+
+# Zygote side
+
+
+def _run_child(request: Dict[str, Any], fds: List[int]) -> int:  # pragma: no cover - child
+    """Body of a forked child: adopt the client's stdio and run the target"""
+    os.setsid()
+    for target_fd, fd in enumerate(fds[:3]):
+        os.dup2(fd, target_fd)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    preexec = rlimit_preexec(ResourcePolicy(
+        cpu_seconds=request.get("cpu_seconds"), max_rss_mb=request.get("max_rss_mb")
+    ))
+    if preexec is not None:
+        preexec()
+
+    target = request["target"]
+    try:
+        if request["kind"] == "module":
+            sys.argv = [target] + request["argv"]
+            sys.path[0] = request["cwd"]
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+        else:
+            script = os.path.join(request["cwd"], target)
+            sys.argv = [target] + request["argv"]
+            sys.path[0] = os.path.dirname(os.path.abspath(script))
+            runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    return code
+
+
+def serve(path: Path, preload: List[str], idle_timeout: float) -> None:
+    """Zygote main loop: preload modules, then fork a child per request"""
+    lock_fd = os.open(str(path) + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return  # another zygote for this key is starting or running
+
+    for module in preload:
+        try:
+            __import__(module)
+        except Exception:
+            # Still serve: the tool will import the module itself, only slower
+            print(f"zygote: failed to preload {module}", file=sys.stderr)
+            traceback.print_exc()
+
+    if path.exists():
+        path.unlink()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    os.chmod(str(path), 0o600)
+    listener.listen(64)
+
+    # Wake the selector whenever a child exits
+    wake_read, wake_write = os.pipe()
+    os.set_blocking(wake_write, False)
+    os.set_blocking(wake_read, False)
+    signal.set_wakeup_fd(wake_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, "accept")
+    selector.register(wake_read, selectors.EVENT_READ, "reap")
+    children: Dict[int, socket.socket] = {}
+    last_activity = time.monotonic()
+
+    try:
+        while children or time.monotonic() - last_activity < idle_timeout:
+            for key, _ in selector.select(timeout=1.0):
+                if key.data == "accept":
+                    last_activity = time.monotonic()
+                    _accept(listener, children, [listener.fileno(), wake_read, wake_write, lock_fd])
+                else:
+                    try:
+                        while os.read(wake_read, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+            _reap(children)
+            if children:
+                last_activity = time.monotonic()
+    finally:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        listener.close()
+
+
+def _accept(listener: socket.socket, children: Dict[int, socket.socket],
+            private_fds: List[int]) -> None:
+    conn, _ = listener.accept()
+    conn.settimeout(5.0)
+    fds: List[int] = []
+    try:
+        request, fds = _recv_message(conn, max_fds=3)
+        if len(fds) != 3:
+            raise ValueError("expected stdin, stdout and stderr descriptors")
+    except (OSError, ValueError):
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+        return
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            for fd in private_fds + [conn.fileno()] + [c.fileno() for c in children.values()]:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            code = _run_child(request, fds)
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code & 0xFF)
+
+    for fd in fds:
+        os.close(fd)
+    try:
+        _send_message(conn, {"pid": pid})
+    except OSError:
+        pass
+    children[pid] = conn
+
+
+def _reap(children: Dict[int, socket.socket]) -> None:
+    while children:
+        try:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            _send_message(conn, {
+                "status": status,
+                "rusage": {name: getattr(usage, name) for name in _RUSAGE_FIELDS}
+            })
+        except OSError:
+            pass
+        conn.close()
+
+
+def main(argv: List[str]) -> None:
+    """Zygote launcher: `<socket> <idle_timeout> [preload...]`, detaches and returns"""
+    if os.fork() == 0:
+        serve(Path(argv[0]), argv[2:], float(argv[1]))
+    os._exit(0)
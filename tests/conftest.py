@@ -122,6 +122,34 @@ def broken_project():
         yield temp_path
 
 
+@pytest.fixture
+def craft_project(tmp_path, monkeypatch):
+    """Create an isolated project with a .craftrc pointing at a custom domains dir"""
+    home = tmp_path / "home"
+    home.mkdir()
+    project = tmp_path / "project"
+    domains_dir = project / "domains"
+    domains_dir.mkdir(parents=True)
+    
+    (project / ".craftrc").write_text(yaml.dump({
+        "domain_paths": [str(domains_dir)],
+        "include_builtin_domains": False,
+        "config": {"show_startup_checklist": False}
+    }))
+    
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.chdir(project)
+    yield domains_dir
+
+
+def write_tool(domains_dir, domain, tool, **tool_config):
+    """Write a tool YAML file into a domain directory"""
+    domain_dir = domains_dir / domain
+    domain_dir.mkdir(exist_ok=True)
+    (domain_dir / f"{tool}.yaml").write_text(yaml.dump(tool_config))
+    return domain_dir / f"{tool}.yaml"
+
+
 # Pytest configuration
 def pytest_configure(config):
     """Configure pytest with custom markers"""
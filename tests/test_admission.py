@@ -0,0 +1,168 @@
+"""
+Test suite for host-wide admission control
+"""
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+import yaml
+from craft_cli.admission import AdmissionTimeout, Semaphore, acquire_slots, release_slots
+from craft_cli.core import CraftCLI
+from conftest import write_tool
+
+
+HOLDER = """
+import sys, time
+from pathlib import Path
+from craft_cli.admission import Semaphore
+slot = Semaphore(Path(sys.argv[1]), "key", 1).acquire()
+with open(sys.argv[2], "a") as f:
+    f.write(sys.argv[3] + "\\n")
+time.sleep(float(sys.argv[4]))
+slot.release()
+"""
+
+
+class TestSemaphore:
+    """Test cases for the filesystem semaphore"""
+    
+    def test_limit(self, tmp_path):
+        """Test no more than `limit` slots are handed out"""
+        sem = Semaphore(tmp_path, "tool-a", 2)
+        first = sem.acquire()
+        second = sem.acquire()
+        assert {first.index, second.index} == {0, 1}
+        
+        with pytest.raises(AdmissionTimeout):
+            sem.acquire(timeout=0.05)
+        
+        first.release()
+        third = sem.acquire(timeout=1)
+        assert third.index == first.index
+        second.release()
+        third.release()
+    
+    def test_waiter_files_cleaned_up(self, tmp_path):
+        """Test queued tickets are removed after acquiring or timing out"""
+        sem = Semaphore(tmp_path, "tool-a", 1)
+        slot = sem.acquire()
+        with pytest.raises(AdmissionTimeout):
+            sem.acquire(timeout=0.02)
+        slot.release()
+        assert list((sem.directory / "waiting").iterdir()) == []
+    
+    def test_fifo_across_processes(self, tmp_path):
+        """Test waiting processes are admitted in arrival order"""
+        log = tmp_path / "order.log"
+        holder = Semaphore(tmp_path, "key", 1).acquire()
+        
+        procs = []
+        for name in ["a", "b", "c"]:
+            procs.append(subprocess.Popen(
+                [sys.executable, "-c", HOLDER, str(tmp_path), str(log), name, "0.05"]
+            ))
+            # Wait until this process has queued before starting the next one
+            waiting = tmp_path / "key" / "waiting"
+            deadline = time.monotonic() + 10
+            while len(list(waiting.iterdir())) < len(procs) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        
+        holder.release()
+        for proc in procs:
+            assert proc.wait(timeout=20) == 0
+        assert log.read_text().split() == ["a", "b", "c"]
+    
+    def test_acquire_slots_reports_wait(self, tmp_path):
+        """Test acquire_slots takes every key and measures the wait"""
+        slots, waited = acquire_slots(tmp_path, [("category-x", 1), ("tool-y", 1)])
+        assert [s.key for s in slots] == ["category-x", "tool-y"]
+        assert waited >= 0
+        
+        with pytest.raises(AdmissionTimeout):
+            acquire_slots(tmp_path, [("category-z", 1), ("tool-y", 1)], timeout=0.05)
+        # The category slot taken before the timeout was released again
+        z_slots, _ = acquire_slots(tmp_path, [("category-z", 1)], timeout=0.05)
+        release_slots(z_slots + slots)
+    
+    def test_new_ticket_not_taken_for_stale(self, tmp_path):
+        """Test a waiter file created but not yet locked is left alone"""
+        sem = Semaphore(tmp_path, "key", 1)
+        waiting = sem.directory / "waiting"
+        waiting.mkdir(parents=True)
+        # _take_ticket holds the queue lock between creating and locking its file
+        queue_fd = os.open(str(sem.directory / "queue.lock"), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(queue_fd, fcntl.LOCK_EX)
+        ticket = waiting / f"{1:016d}"
+        ticket_fd = os.open(str(ticket), os.O_RDWR | os.O_CREAT)
+        heads = []
+        scan = threading.Thread(target=lambda: heads.append(sem._is_head(f"{2:016d}")))
+        scan.start()
+        time.sleep(0.05)
+        fcntl.flock(ticket_fd, fcntl.LOCK_EX)
+        os.close(queue_fd)
+        scan.join(timeout=5)
+        assert heads == [False] and ticket.exists()
+        os.close(ticket_fd)
+        assert sem._is_head(f"{2:016d}") and not ticket.exists()
+
+
+class TestToolAdmission:
+    """Test cases for concurrency limits on tool execution"""
+    
+    def test_limits_from_yaml_and_craftrc(self, craft_project):
+        """Test tool YAML limits are overridden by .craftrc"""
+        write_tool(craft_project, "coding", "test", command="true", category="testing", concurrency=3)
+        rc = craft_project.parent / ".craftrc"
+        data = yaml.safe_load(rc.read_text())
+        data["concurrency"] = {"categories": {"testing": 4}, "tools": {"coding/test": 2}}
+        rc.write_text(yaml.dump(data))
+        
+        cli = CraftCLI()
+        spec = cli.registry.get_tool("coding", "test")
+        assert cli._concurrency_limits(spec) == [("category-testing", 4), ("tool-coding-test", 2)]
+    
+    def test_wait_time_reported(self, craft_project, capsys):
+        """Test queue wait appears in the JSON result"""
+        write_tool(craft_project, "coding", "test", command="true", concurrency=1)
+        assert CraftCLI().run_tool("coding", "test", [], execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert "queue_wait" in context["result"]
+    
+    def test_wait_timeout(self, craft_project, capsys):
+        """Test a caller that cannot get a slot in time fails with EX_TEMPFAIL"""
+        write_tool(craft_project, "coding", "test", command="true", concurrency=1)
+        rc = craft_project.parent / ".craftrc"
+        data = yaml.safe_load(rc.read_text())
+        data["concurrency"] = {"wait_timeout": "50ms"}
+        rc.write_text(yaml.dump(data))
+        
+        cli = CraftCLI()
+        lock_dir = cli.config_manager.get_state_dir() / "locks"
+        held = Semaphore(lock_dir, "tool-coding-test", 1).acquire()
+        try:
+            assert cli.run_tool("coding", "test", [], execute=True) == 75
+        finally:
+            held.release()
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert context["result"]["limit_exceeded"] == "admission"
+    
+    @pytest.mark.parametrize("concurrency, message", [
+        ({"wait_timeout": "soon"}, "wait_timeout: invalid duration 'soon'"),
+        ({"tools": {"coding/test": "many"}}, "tools.coding/test must be a positive integer"),
+        ({"categories": {"testing": 0.5}}, "categories.testing must be a positive integer"),
+        ({"tools": ["coding/test"]}, "tools must be a mapping"),
+    ])
+    def test_invalid_settings(self, craft_project, capsys, concurrency, message):
+        """Test bad .craftrc concurrency values are reported, not raised"""
+        write_tool(craft_project, "coding", "test", command="true", category="testing")
+        rc = craft_project.parent / ".craftrc"
+        data = yaml.safe_load(rc.read_text())
+        data["concurrency"] = concurrency
+        rc.write_text(yaml.dump(data))
+        
+        assert CraftCLI().run_tool("coding", "test", [], execute=True) == 1
+        assert f"ERROR: Invalid concurrency settings: {message}" in capsys.readouterr().out
@@ -0,0 +1,180 @@
+"""
+Test suite for the single-pass data profiler and its sketches
+"""
+import csv
+import json
+import random
+import shutil
+import statistics
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._io import plan_partitions, read_chunks, read_partition
+from craft_cli.engines._sketch import ColumnSketch, HyperLogLog, LogHistogram, Moments
+from craft_cli.engines.analyze import format_text, main, profile, report
+
+BUILTIN_DATA = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "data"
+
+
+def write_dataset(path, rows=3000, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "amount", "user", "note"])
+        for i in range(rows):
+            writer.writerow([
+                i,
+                f"{rng.gauss(100, 15):.3f}" if i % 10 else "",
+                f"user{rng.randrange(300)}",
+                'two\nlines, "quoted"' if i % 7 == 0 else "plain"
+            ])
+    return path
+
+
+class TestSketches:
+    """Test cases for the mergeable sketches"""
+
+    def test_moments_merge_matches_direct(self):
+        """Test Chan's merge agrees with statistics over the whole data"""
+        rng = random.Random(1)
+        values = [rng.uniform(-50, 50) for _ in range(1000)]
+        merged = Moments()
+        for i in range(0, 1000, 137):
+            merged.merge(Moments.of(values[i:i + 137]))
+        assert merged.count == 1000
+        assert merged.min == min(values) and merged.max == max(values)
+        assert merged.mean == pytest.approx(statistics.fmean(values), rel=1e-12)
+        assert merged.stddev == pytest.approx(statistics.pstdev(values), rel=1e-12)
+
+    def test_hyperloglog_accuracy_and_merge(self):
+        """Test the estimate is within a few percent and merging is a union"""
+        a, b = HyperLogLog(), HyperLogLog()
+        a.add_batch(str(i) for i in range(0, 30000))
+        b.add_batch(str(i) for i in range(20000, 50000))
+        a.merge(b)
+        assert abs(a.estimate() - 50000) / 50000 < 0.05
+        single = HyperLogLog()
+        single.add_batch(str(i) for i in range(50000))
+        assert single.registers == a.registers
+
+    def test_log_histogram_quantiles(self):
+        """Test quantiles are within the relative accuracy"""
+        histogram = LogHistogram(relative_accuracy=0.01)
+        histogram.add_batch([i / 10 for i in range(-1000, 10001)])
+        assert not histogram.is_exact
+        assert histogram.quantile(0.5) == pytest.approx(450, rel=0.02)
+        assert histogram.quantile(0.0) == pytest.approx(-100, rel=0.02)
+        assert sum(histogram.histogram(-100, 1000, 11)) == 11001
+
+    def test_log_histogram_exact_while_few_values(self):
+        """Test few distinct values give exact bins, however the batches were split"""
+        merged = LogHistogram()
+        for start in range(0, 1000, 300):
+            part = LogHistogram()
+            part.add_batch(float(i) for i in range(start, min(start + 300, 1000)))
+            merged.merge(part)
+        assert merged.is_exact
+        assert merged.histogram(0, 999, 10) == [100] * 10
+        assert merged.quantile(0.5) == 499.0
+        merged.add_batch(i + 0.5 for i in range(LogHistogram.EXACT_VALUES))
+        assert not merged.is_exact
+
+    def test_column_kinds_and_distinct(self):
+        """Test numeric detection, nulls and the switch from exact to approximate distinct"""
+        numeric = ColumnSketch.of(["1", "2.5", "", None, "-3"])
+        assert (numeric.kind, numeric.count, numeric.numeric.count) == ("numeric", 3, 3)
+        mixed = ColumnSketch.of(["1", "n/a", True, {"k": 1}])
+        assert mixed.kind == "string" and mixed.numeric.count == 1
+        assert mixed.distinct_count() == (4, True)
+        large = ColumnSketch.of([str(i) for i in range(ColumnSketch.EXACT_DISTINCT)])
+        large.merge(ColumnSketch.of([str(i) for i in range(5000)]))
+        distinct, exact = large.distinct_count()
+        assert not exact and abs(distinct - 5000) < 250
+
+
+class TestPartitions:
+    """Test cases for splitting files into byte ranges"""
+
+    def test_partitions_respect_quoted_newlines(self, tmp_path):
+        """Test ranges never cut a quoted field and cover every row once"""
+        path = write_dataset(tmp_path / "data.csv")
+        header, ranges = plan_partitions(str(path), "csv", 4096)
+        assert header == ["id", "amount", "user", "note"]
+        assert len(ranges) > 10
+        records = [r for start, end in ranges
+                   for chunk in read_partition(str(path), "csv", start, end, 100, header)
+                   for r in chunk]
+        expected = [r for chunk in read_chunks(str(path), "csv", 100) for r in chunk]
+        assert records == expected
+
+    def test_ndjson_partitions(self, tmp_path):
+        """Test NDJSON ranges start on line boundaries"""
+        path = tmp_path / "data.ndjson"
+        path.write_text("".join(json.dumps({"n": i, "s": "x" * (i % 13)}) + "\n" for i in range(500)))
+        header, ranges = plan_partitions(str(path), "ndjson", 1000)
+        assert header is None
+        values = [r["n"] for s, e in ranges for c in read_partition(str(path), "ndjson", s, e, 64) for r in c]
+        assert values == list(range(500))
+
+
+class TestProfile:
+    """Test cases for profiling files"""
+
+    def test_parallel_identical_to_sequential(self, tmp_path):
+        """Test profiling with several workers gives exactly the sequential report"""
+        path = str(write_dataset(tmp_path / "data.csv"))
+        sequential = report(path, profile(path, "csv", jobs=1, chunk_size=250, partition_bytes=8192))
+        parallel = report(path, profile(path, "csv", jobs=3, chunk_size=250, partition_bytes=8192))
+        assert json.dumps(parallel) == json.dumps(sequential)
+
+    def test_report_contents(self, tmp_path):
+        """Test the column statistics of a known dataset"""
+        path = str(write_dataset(tmp_path / "data.csv"))
+        data = report(path, profile(path, "csv", chunk_size=500), bins=5)
+        assert data["rows"] == 3000
+        columns = {c["name"]: c for c in data["columns"]}
+        assert columns["id"]["numeric"]["min"] == 0 and columns["id"]["numeric"]["max"] == 2999
+        assert columns["id"]["numeric"]["mean"] == 1499.5
+        assert columns["amount"]["nulls"] == 300
+        assert columns["amount"]["numeric"]["mean"] == pytest.approx(100, abs=1.5)
+        assert sum(columns["amount"]["numeric"]["histogram"]["counts"]) == 2700
+        assert columns["user"]["type"] == "string" and columns["user"]["distinct"] == 300
+        assert columns["note"]["distinct"] == 2 and columns["note"]["distinct_exact"]
+        assert "COLUMN amount (numeric): count=2700 nulls=300" in format_text(data)
+        assert columns["id"]["numeric"]["exact"]
+        assert columns["id"]["numeric"]["histogram"]["counts"] == [600] * 5
+        assert "  HISTOGRAM [0 .. 2999]: 600 600 600 600 600" in format_text(data)
+
+    def test_approximate_quantiles_are_labelled(self, tmp_path):
+        """Test columns past the exact limit are reported as approximate"""
+        path = str(write_dataset(tmp_path / "data.csv", rows=5000))
+        data = report(path, profile(path, "csv", chunk_size=1000))
+        numeric = {c["name"]: c for c in data["columns"]}["id"]["numeric"]
+        assert not numeric["exact"]
+        text = format_text(data)
+        assert "p50=~" in text and "HISTOGRAM (approximate) [0 .. 4999]" in text
+
+    def test_json_array_input(self, tmp_path):
+        """Test formats without byte ranges are profiled chunk by chunk"""
+        path = tmp_path / "data.json"
+        path.write_text(json.dumps([{"a": i, "b": None if i % 2 else "x"} for i in range(100)]))
+        sequential = report(str(path), profile(str(path), "json", jobs=1, chunk_size=9))
+        parallel = report(str(path), profile(str(path), "json", jobs=2, chunk_size=9))
+        assert sequential == parallel
+        assert sequential["columns"][1]["nulls"] == 50
+
+    def test_main_json(self, tmp_path, capsys):
+        """Test the command line prints a JSON report and the rate"""
+        path = write_dataset(tmp_path / "data.csv", rows=50)
+        assert main([str(path), "--format=json", "--jobs=2"]) == 0
+        captured = capsys.readouterr()
+        assert json.loads(captured.out)["rows"] == 50
+        assert "ANALYZE: 50 rows" in captured.err and "2 jobs" in captured.err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft data analyze` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DATA, craft_project / "data")
+        write_dataset(Path("data.csv"), rows=20)
+        assert CraftCLI().run_tool("data", "analyze", ["data.csv"], execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert context["result"]["stdout"].startswith("PROFILE: data.csv\nROWS: 20")
@@ -0,0 +1,193 @@
+"""
+Test suite for the deduplicating backup engine
+"""
+import json
+import os
+import random
+import shutil
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._chunkstore import BackupError, Repository, chunk_ends
+from craft_cli.engines.backup import BackupStats, backup, main, resolve_snapshot, restore
+
+BUILTIN_DEVOPS = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "devops"
+
+
+def random_bytes(seed, size):
+    return random.Random(seed).getrandbits(8 * size).to_bytes(size, "little")
+
+
+def make_tree(root):
+    """A small tree: random data, compressible text, an empty file and a symlink"""
+    rng = random.Random(7)
+    (root / "data" / "nested").mkdir(parents=True)
+    (root / "data" / "blob.bin").write_bytes(random_bytes(7, 600_000))
+    (root / "data" / "nested" / "notes.txt").write_text(
+        "".join(f"note {rng.randrange(10**6)} about the deployment\n" for _ in range(20000)))
+    (root / "empty").write_bytes(b"")
+    (root / "link").symlink_to("data/blob.bin")
+    return root
+
+
+def snapshot_files(repo, snapshot_id):
+    return {r["path"]: r for r in repo.read_manifest(snapshot_id) if r.get("type") == "file"}
+
+
+class TestChunker:
+    """Test cases for content-defined chunking"""
+
+    def test_chunks_tile_data_within_bounds(self):
+        """Test chunk ends cover the data and respect the size limits"""
+        data = random_bytes(1, 3_000_000)
+        ends = list(chunk_ends(data, 4096, 65536))
+        assert ends[-1] == len(data)
+        sizes = [b - a for a, b in zip([0] + ends, ends)]
+        assert all(4096 <= s <= 65536 for s in sizes[:-1]) and 0 < sizes[-1] <= 65536
+        assert list(chunk_ends(b"")) == [] and list(chunk_ends(b"abc")) == [3]
+
+    def test_boundaries_survive_an_insertion(self):
+        """Test inserting bytes at the start only changes the first chunks"""
+        data = random_bytes(2, 2_000_000)
+        before = {data[a:b] for a, b in zip([0] + list(chunk_ends(data)), chunk_ends(data))}
+        shifted = b"inserted" + data
+        ends = list(chunk_ends(shifted))
+        after = {shifted[a:b] for a, b in zip([0] + ends, ends)}
+        assert len(after - before) <= 2
+
+
+class TestRepository:
+    """Test cases for the chunk store"""
+
+    def test_put_deduplicates_and_get_verifies(self, tmp_path):
+        """Test a chunk is stored once, compressed, and corruption is detected"""
+        repo = Repository.open(str(tmp_path / "repo"), create=True)
+        data = b"hello backup " * 1000
+        digest = repo.digest(data)
+        assert 0 < repo.put(digest, data) < len(data)
+        assert repo.put(digest, data) == 0
+        assert repo.get(digest) == data
+        Path(repo.chunk_path(digest)).write_bytes(b"r" + b"tampered")
+        with pytest.raises(BackupError, match="corrupt"):
+            repo.get(digest)
+        with pytest.raises(BackupError, match="no backup repository"):
+            Repository.open(str(tmp_path / "missing"))
+
+    def test_encrypted_repository(self, tmp_path, monkeypatch):
+        """Test chunks and manifests are sealed and need the passphrase"""
+        pytest.importorskip("cryptography")
+        monkeypatch.setenv("CRAFT_BACKUP_PASSPHRASE", "correct horse")
+        source = make_tree(tmp_path / "src")
+        repo = Repository.open(str(tmp_path / "repo"), create=True, encrypt=True)
+        snapshot_id = backup(str(source), repo)
+        manifest = Path(repo.snapshot_path(snapshot_id)).read_bytes()
+        assert b"notes.txt" not in manifest
+        restore(Repository.open(str(tmp_path / "repo")), snapshot_id, str(tmp_path / "out"))
+        assert (tmp_path / "out" / "data" / "blob.bin").read_bytes() == \
+            (source / "data" / "blob.bin").read_bytes()
+        monkeypatch.setenv("CRAFT_BACKUP_PASSPHRASE", "wrong")
+        with pytest.raises(BackupError, match="wrong passphrase"):
+            Repository.open(str(tmp_path / "repo"))
+
+
+class TestBackup:
+    """Test cases for snapshots and restores"""
+
+    def test_round_trip(self, tmp_path):
+        """Test a restore reproduces contents, modes, mtimes and symlinks"""
+        source = make_tree(tmp_path / "src")
+        os.chmod(source / "data" / "blob.bin", 0o600)
+        repo = Repository.open(str(tmp_path / "repo"), create=True)
+        stats = BackupStats()
+        snapshot_id = backup(str(source), repo, stats=stats)
+        assert stats.files == 3 and stats.symlinks == 1 and stats.new_chunks == stats.chunks
+        out = tmp_path / "out"
+        restore(repo, snapshot_id, str(out), jobs=2)
+        for name in ("data/blob.bin", "data/nested/notes.txt", "empty"):
+            assert (out / name).read_bytes() == (source / name).read_bytes()
+            assert (out / name).stat().st_mtime_ns == (source / name).stat().st_mtime_ns
+        assert (out / "data" / "blob.bin").stat().st_mode & 0o777 == 0o600
+        assert os.readlink(out / "link") == "data/blob.bin"
+
+    def test_incremental_reuses_unchanged_files(self, tmp_path):
+        """Test unchanged files are not read and edits store few new chunks"""
+        source = make_tree(tmp_path / "src")
+        repo = Repository.open(str(tmp_path / "repo"), create=True)
+        first = backup(str(source), repo, jobs=2)
+        with open(source / "data" / "nested" / "notes.txt", "a") as f:
+            f.write("one more note\n")
+        stats = BackupStats()
+        second = backup(str(source), repo, stats=stats)
+        assert stats.unchanged == 2 and stats.read_bytes < stats.total_bytes
+        assert 1 <= stats.new_chunks <= 2
+        header = next(repo.read_manifest(second))
+        assert header["type"] == "incremental" and header["parent"] == first
+        assert snapshot_files(repo, first)["data/blob.bin"] == \
+            snapshot_files(repo, second)["data/blob.bin"]
+        full = BackupStats()
+        backup(str(source), repo, "full", stats=full)
+        assert full.unchanged == 0 and full.read_bytes == full.total_bytes
+        assert full.new_chunks == 0
+
+    def test_exclude_and_repository_inside_source(self, tmp_path):
+        """Test excluded paths and a repository under the source are skipped"""
+        source = make_tree(tmp_path / "src")
+        repo = Repository.open(str(source / "backups"), create=True)
+        snapshot_id = backup(str(source), repo, exclude=["*.txt"])
+        paths = {r.get("path") for r in repo.read_manifest(snapshot_id)}
+        assert "data/blob.bin" in paths and "data/nested/notes.txt" not in paths
+        assert not any(p and p.startswith("backups") for p in paths)
+
+    def test_restore_include_and_snapshot_names(self, tmp_path):
+        """Test --include restores one subtree and snapshots resolve by prefix"""
+        source = make_tree(tmp_path / "src")
+        repo = Repository.open(str(tmp_path / "repo"), create=True)
+        snapshot_id = backup(str(source), repo)
+        assert resolve_snapshot(repo, "latest") == snapshot_id
+        assert resolve_snapshot(repo, snapshot_id[:12]) == snapshot_id
+        with pytest.raises(BackupError, match="no snapshot"):
+            resolve_snapshot(repo, "1999")
+        restore(repo, snapshot_id, str(tmp_path / "out"), include="data/nested")
+        restored = sorted(p.relative_to(tmp_path / "out").as_posix()
+                          for p in (tmp_path / "out").rglob("*"))
+        assert restored == ["data", "data/nested", "data/nested/notes.txt"]
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_backup_list_restore(self, tmp_path, capsys):
+        """Test the three modes and their summaries"""
+        source = make_tree(tmp_path / "src")
+        repo = str(tmp_path / "repo")
+        assert main([str(source), f"--destination={repo}", "--jobs=1"]) == 0
+        out, err = capsys.readouterr()
+        snapshot_id = out.strip()
+        assert "BACKUP: saved snapshot" in err and "3 files" in err
+        assert main(["--list", "--destination", repo]) == 0
+        out, err = capsys.readouterr()
+        assert out.startswith(snapshot_id) and "BACKUP: 1 snapshots" in err
+        assert main(["--restore=latest", f"--destination={repo}", f"--to={tmp_path / 'out'}"]) == 0
+        assert "BACKUP: restored" in capsys.readouterr().err
+        assert (tmp_path / "out" / "empty").exists()
+
+    def test_errors(self, tmp_path, capsys):
+        """Test missing options, repositories and sources are reported"""
+        assert main([str(tmp_path)]) == 1
+        assert "--destination" in capsys.readouterr().err
+        assert main(["--restore=latest", f"--destination={tmp_path}"]) == 1
+        assert "needs --to" in capsys.readouterr().err
+        assert main(["--list", f"--destination={tmp_path / 'none'}"]) == 1
+        assert "no backup repository" in capsys.readouterr().err
+        assert main([str(tmp_path / "nope"), f"--destination={tmp_path / 'repo'}"]) == 1
+        assert "is not a directory" in capsys.readouterr().err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft devops backup` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DEVOPS, craft_project / "devops")
+        make_tree(Path("src").absolute())
+        argv = ["src", "--destination", "repo", "--exclude=*.bin"]
+        assert CraftCLI().run_tool("devops", "backup", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert "2 files" in context["result"]["stderr"]
+        assert len(os.listdir("repo/snapshots")) == 1
@@ -0,0 +1,207 @@
+"""
+Test suite for the citation engine
+"""
+import json
+import shutil
+import zipfile
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._citestyles import STYLES
+from craft_cli.engines._references import (
+    decode_latex, from_bibtex, from_csl, parse_name, read_entries, split_names
+)
+from craft_cli.engines.cite import CiteCache, CiteStats, main, parse_file, render
+
+BUILTIN_RESEARCH = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "research"
+
+BIBTEX = r"""
+@string{cj = "The Computer Journal"}
+
+@article{knuth84,
+  author = {Donald E. Knuth and M{\"u}ller, Hans},
+  title = {Literate {P}rogramming},
+  journal = cj,
+  year = 1984, volume = 27, number = {2}, pages = {97--111},
+  doi = {https://doi.org/10.1093/comjnl/27.2.97}
+}
+
+@book{sicp,
+  author = {Harold Abelson and Gerald Jay Sussman and Julie Sussman},
+  title = {Structure and Interpretation of Computer Programs},
+  edition = {2}, publisher = {MIT Press}, address = {Cambridge, MA}, year = {1996}
+}
+
+@online{who,
+  author = {{World Health Organization}},
+  title = {Coronavirus disease (COVID-19) pandemic},
+  url = {https://www.who.int/emergencies}, year = 2023
+}
+"""
+
+CSL = [{
+    "id": "vaswani2017", "type": "paper-conference", "title": "Attention is all you need",
+    "author": [{"family": "Vaswani", "given": "Ashish"}, {"family": "Shazeer", "given": "Noam"}],
+    "container-title": "Advances in Neural Information Processing Systems",
+    "page": "5998-6008", "issued": {"date-parts": [[2017]]}, "publisher": "Curran Associates",
+}]
+
+
+def text(runs):
+    return "".join(runs)
+
+
+class TestReferences:
+    """Test cases for parsing BibTeX and CSL-JSON"""
+
+    def test_bibtex_fields_names_and_latex(self, tmp_path):
+        """Test macros, concatenation, names and LaTeX decoding"""
+        path = tmp_path / "refs.bib"
+        path.write_text(BIBTEX)
+        kind, entries, macros = read_entries(str(path))
+        assert kind == "bibtex" and len(entries) == 3 and macros == {"cj": "The Computer Journal"}
+        ref = from_bibtex(entries[0][1], macros)
+        assert ref["authors"] == [["Knuth", "Donald E."], ["Müller", "Hans"]]
+        assert (ref["container"], ref["pages"], ref["doi"]) == (
+            "The Computer Journal", "97–111", "10.1093/comjnl/27.2.97")
+        assert from_bibtex(entries[2][1], macros)["type"] == "website"
+        assert split_names("A and {Barnes and Noble} and C") == ["A", "{Barnes and Noble}", "C"]
+        assert parse_name("Ludwig van Beethoven") == ["van Beethoven", "Ludwig"]
+        assert parse_name("King, Jr, Martin Luther") == ["King, Jr", "Martin Luther"]
+        latex = r"Erd\H{o}s -- G\"{o}del \& \c{C}a\u{g}r\i"
+        assert decode_latex(latex) == "Erdős – Gödel & Çağrı"
+        assert decode_latex(r"The {\TeX}book: \emph{Tips} on \LaTeX\ and \foo{x}") == (
+            "The TeXbook: Tips on LaTeX and foox")
+        csl = from_csl(CSL[0])
+        assert (csl["type"], csl["year"], csl["pages"]) == ("paper", 2017, "5998–6008")
+
+
+class TestStyles:
+    """Test cases for the citation styles"""
+
+    def test_article_in_each_style(self):
+        """Test a journal article against hand-formatted references"""
+        ref = from_bibtex(BIBTEX.split("\n\n")[1], {"cj": "The Computer Journal"})
+        assert STYLES["apa"](ref) == [
+            "Knuth, D. E., & Müller, H. (1984). Literate Programming. ", "The Computer Journal",
+            ", ", "27", "(2), 97–111. https://doi.org/10.1093/comjnl/27.2.97"]
+        assert text(STYLES["mla"](ref)) == (
+            "Knuth, Donald E., and Hans Müller. “Literate Programming.” The Computer Journal, "
+            "vol. 27, no. 2, 1984, pp. 97–111. https://doi.org/10.1093/comjnl/27.2.97.")
+        assert text(STYLES["chicago"](ref)) == (
+            "Knuth, Donald E., and Hans Müller. 1984. “Literate Programming.” The Computer "
+            "Journal 27 (2): 97–111. https://doi.org/10.1093/comjnl/27.2.97.")
+        assert text(STYLES["ieee"](ref)) == (
+            "D. E. Knuth and H. Müller, “Literate Programming,” The Computer Journal, vol. 27, "
+            "no. 2, pp. 97–111, 1984. doi: 10.1093/comjnl/27.2.97.")
+
+    def test_books_and_conference_papers(self):
+        """Test editions, publishers, editors and page ranges"""
+        book = from_bibtex(BIBTEX.split("\n\n")[2], {})
+        assert text(STYLES["apa"](book)) == (
+            "Abelson, H., Sussman, G. J., & Sussman, J. (1996). Structure and Interpretation "
+            "of Computer Programs (2nd ed.). MIT Press.")
+        assert text(STYLES["mla"](book)).startswith("Abelson, Harold, et al. ")
+        paper = from_csl(CSL[0])
+        assert text(STYLES["apa"](paper)) == (
+            "Vaswani, A., & Shazeer, N. (2017). Attention is all you need. In Advances in "
+            "Neural Information Processing Systems (pp. 5998–6008). Curran Associates.")
+
+
+class TestCache:
+    """Test cases for the parsed-reference cache"""
+
+    def test_only_changed_entries_are_parsed_and_rendered(self, tmp_path):
+        """Test cache hits, an edited entry, a new style and pruning"""
+        path = tmp_path / "refs.bib"
+        path.write_text(BIBTEX)
+
+        def run(style="apa"):
+            stats = CiteStats()
+            cache = CiteCache.load(str(path) + ".ccache")
+            entries = parse_file(str(path), cache, stats=stats)
+            runs = render(entries, style, stats=stats)
+            cache.save()
+            return stats, runs
+
+        stats, first = run()
+        assert (stats.parsed, stats.rendered, stats.cached) == (3, 3, 0)
+        stats, again = run()
+        assert (stats.parsed, stats.rendered, stats.cached) == (0, 0, 3) and again == first
+        path.write_text(BIBTEX.replace("Literate {P}rogramming", "Literate Programs"))
+        stats, edited = run()
+        assert (stats.parsed, stats.rendered) == (1, 1) and "Literate Programs" in edited[0][0]
+        stats, _ = run("ieee")
+        assert (stats.parsed, stats.rendered) == (0, 3)
+        cached = json.loads((tmp_path / "refs.bib.ccache").read_text())["entries"]
+        assert len(cached) == 3
+        assert all(set(styles) == {"apa", "ieee"} for _, styles in cached.values())
+        path.write_text(BIBTEX.replace("Cambridge, MA", "Boston"))
+        stats, _ = run()
+        assert (stats.parsed, stats.rendered) == (2, 2)  # knuth84 is back, sicp changed
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_bibliography_exports(self, tmp_path, capsys):
+        """Test sorted text, numbered LaTeX, filtered and Word output"""
+        bib = tmp_path / "refs.bib"
+        bib.write_text(BIBTEX)
+        csl = tmp_path / "library.json"
+        csl.write_text(json.dumps(CSL))
+        assert main([str(bib), str(csl), "--bibliography", "--jobs=1"]) == 0
+        out, err = capsys.readouterr()
+        lines = out.splitlines()
+        assert lines[0] == "References" and [line[:6] for line in lines[2:]] == [
+            "Abelso", "Knuth,", "Vaswan", "World "]
+        assert "CITE: 4 of 4 entries from 2 files" in err and "4 parsed" in err
+        assert main([str(bib), "--style=ieee", "--bibliography", "--export=latex"]) == 0
+        out = capsys.readouterr().out.splitlines()
+        assert out[0] == r"\begin{thebibliography}{3}"
+        assert out[1].startswith(r"\bibitem{knuth84}")
+        assert main([str(bib), "--type=book", "--style=mla"]) == 0
+        assert capsys.readouterr().out.startswith("Abelson, Harold, et al. Structure")
+        assert main([str(bib), "--keys=who,knuth84", "--style=ieee"]) == 0
+        assert capsys.readouterr().out.startswith("[1] World Health Organization")
+        output = tmp_path / "refs.docx"
+        assert main([str(bib), "--bibliography", "--export=docx", f"--output={output}"]) == 0
+        with zipfile.ZipFile(output) as docx:
+            assert "<w:i/>" in docx.read("word/document.xml").decode()
+        for argv, message in (([str(bib), "--keys=nope"], "no entry with key 'nope'"),
+                              ([str(bib), "--export=docx"], "--output"),
+                              ([str(bib), "--type=blog"], "unknown type"),
+                              (["https://example.com/article"], "cannot fetch")):
+            assert main(argv) == 1
+            assert message in capsys.readouterr().err
+
+    def test_malformed_entry_is_skipped(self, tmp_path, capsys):
+        """Test an entry with unbalanced braces is reported and the rest formatted"""
+        bib = tmp_path / "refs.bib"
+        bib.write_text(BIBTEX.replace("@book{", "@article{broken, title = {Unclosed\n\n@book{")
+                       + "@string{bad = {x\n")
+        for attempt in range(2):
+            assert main([str(bib), "--bibliography"]) == 0
+            out, err = capsys.readouterr()
+            assert [line[:6] for line in out.splitlines()[2:]] == ["Abelso", "Knuth,", "World "]
+            assert err.count("WARNING: skipping an entry of") == 2
+            assert "unbalanced braces in '@article{broken" in err
+            assert "CITE: 3 of 5 entries" in err and "2 skipped" in err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft research cite` runs the built-in engine"""
+        shutil.copytree(BUILTIN_RESEARCH, craft_project / "research")
+        Path("refs.bib").write_text(BIBTEX)
+        argv = ["refs.bib", "--style=apa", "--bibliography"]
+        assert CraftCLI().run_tool("research", "cite", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert context["result"]["stdout"].startswith("References")
+        assert Path("refs.bib.ccache").exists()
+
+
+@pytest.mark.parametrize("style", sorted(STYLES))
+def test_every_type_renders(style):
+    """Test every source type renders without empty punctuation"""
+    for kind in ("article", "book", "chapter", "paper", "thesis", "report", "website", "misc"):
+        rendered = text(STYLES[style]({"key": "k", "type": kind, "title": "T"}))
+        assert rendered and ",," not in rendered and ". ." not in rendered
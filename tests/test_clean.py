@@ -0,0 +1,118 @@
+"""
+Test suite for the out-of-core data cleaner
+"""
+import csv
+import json
+import random
+import shutil
+import statistics
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines.clean import clean, main, partition_count
+
+BUILTIN_DATA = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "data"
+
+
+def write_rows(path, count=2000, seed=3):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["key", "amount", "label"])
+        for _ in range(count):
+            key = rng.randrange(600)
+            writer.writerow([key, "" if key % 50 == 0 else f"{key * 2.5:.1f}", f"k{key}"])
+    return path
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestClean:
+    """Test cases for cleaning files"""
+
+    def test_dedupe_keeps_first_occurrence_in_order(self, tmp_path):
+        """Test duplicates are dropped across partitions and input order is kept"""
+        source = write_rows(tmp_path / "in.csv")
+        stats = clean(str(source), str(tmp_path / "out.csv"), dedupe=True, partitions=5, chunk_size=97)
+        expected, seen = [], set()
+        for row in read_csv(source):
+            key = tuple(row.items())
+            if key not in seen:
+                seen.add(key)
+                expected.append(row)
+        assert read_csv(tmp_path / "out.csv") == expected
+        assert stats.rows_in == 2000 and stats.duplicates == 2000 - len(expected)
+
+    def test_remove_nulls_by_column(self, tmp_path):
+        """Test --remove-nulls can be limited to some columns"""
+        source = tmp_path / "in.ndjson"
+        source.write_text('{"a": 1, "b": null}\n{"a": "", "b": 2}\n{"a": 3, "b": 4}\n')
+        stats = clean(str(source), str(tmp_path / "out.ndjson"), remove_nulls=True, columns=["a"])
+        lines = (tmp_path / "out.ndjson").read_text().splitlines()
+        assert [json.loads(line) for line in lines] == [{"a": 1, "b": None}, {"a": 3, "b": 4}]
+        assert stats.null_rows == 1
+
+    def test_normalize_after_dedupe(self, tmp_path):
+        """Test z-scores use the statistics of the deduplicated rows"""
+        source = write_rows(tmp_path / "in.csv")
+        clean(str(source), str(tmp_path / "out.csv"), dedupe=True, remove_nulls=True,
+              normalize="zscore", partitions=4)
+        rows = read_csv(tmp_path / "out.csv")
+        amounts = [float(r["amount"]) for r in rows]
+        assert statistics.fmean(amounts) == pytest.approx(0, abs=1e-9)
+        assert statistics.pstdev(amounts) == pytest.approx(1)
+        assert all(r["label"].startswith("k") for r in rows)
+
+    def test_minmax_skips_mixed_columns(self, tmp_path):
+        """Test only all-numeric columns are rescaled"""
+        source = tmp_path / "in.csv"
+        source.write_text("x,y\n10,a\n20,1\n30,2\n")
+        clean(str(source), str(tmp_path / "out.csv"), normalize="minmax")
+        assert read_csv(tmp_path / "out.csv") == [
+            {"x": "0.0", "y": "a"}, {"x": "0.5", "y": "1"}, {"x": "1.0", "y": "2"}
+        ]
+
+    def test_parallel_identical_to_sequential(self, tmp_path):
+        """Test worker count does not change the output"""
+        source = write_rows(tmp_path / "in.csv", count=3000)
+        for jobs in (1, 3):
+            clean(str(source), str(tmp_path / f"out{jobs}.csv"), dedupe=True,
+                  normalize="zscore", jobs=jobs, partitions=6, tmp_dir=str(tmp_path))
+        assert (tmp_path / "out1.csv").read_text() == (tmp_path / "out3.csv").read_text()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["in.csv", "out1.csv", "out3.csv"]
+
+    def test_partition_count_tracks_budget(self, tmp_path):
+        """Test bigger inputs and smaller budgets get more partitions"""
+        source = tmp_path / "in.csv"
+        source.write_bytes(b"x" * (10 << 20))
+        assert partition_count(str(source), 2, 1024) == 2
+        assert partition_count(str(source), 2, 8) > partition_count(str(source), 2, 32) > 2
+        assert partition_count("-", 2, 256) == 64
+
+    def test_main_reports_throughput_and_memory(self, tmp_path, capsys):
+        """Test the command line reports counts, rate and peak RSS"""
+        source = write_rows(tmp_path / "in.csv", count=100)
+        assert main([str(source), str(tmp_path / "out.csv"), "--dedupe", "--normalize"]) == 0
+        err = capsys.readouterr().err
+        assert "CLEAN: 100 rows in" in err and "rows/s" in err and "peak RSS" in err
+
+    @pytest.mark.parametrize("count", ["0", "-3"])
+    def test_main_rejects_bad_partition_counts(self, tmp_path, capsys, count):
+        """Test --partitions below 1 is an error, not a crash"""
+        source = write_rows(tmp_path / "in.csv")
+        assert main([str(source), str(tmp_path / "out.csv"), "--dedupe",
+                     f"--partitions={count}"]) == 1
+        assert "ERROR: --partitions must be at least 1" in capsys.readouterr().err
+        assert not (tmp_path / "out.csv").exists()
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft data clean` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DATA, craft_project / "data")
+        write_rows(Path("in.csv"), count=50)
+        assert CraftCLI().run_tool("data", "clean", ["in.csv", "out.csv", "--dedupe"],
+                                   execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert "CLEAN: 50 rows in" in context["result"]["stderr"]
@@ -0,0 +1,180 @@
+"""
+Test suite for in-process Python tools
+"""
+import json
+import os
+import resource
+import signal
+import sys
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.entrypoints import (
+    EntrypointError, load_entrypoint, parse_entrypoint, run_entrypoint, run_forked,
+    run_in_process
+)
+from craft_cli.runner import ResourcePolicy
+from conftest import write_tool
+
+
+def greet(argv):
+    print("hello", *argv)
+    print("warned", file=sys.stderr)
+    return len(argv)
+
+
+def fail(argv):
+    raise RuntimeError("boom")
+
+
+def exit_with_message(argv):
+    sys.exit("bad usage")
+
+
+def crash(argv):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def raw_write(argv):
+    os.write(1, b"from fd\n")
+
+
+def leak_env(argv):
+    os.environ["CRAFT_TEST_LEAK"] = "1"
+    print(os.environ.get("CRAFT_TEST_VALUE"))
+
+
+def allocate(argv):
+    block = b"x" * (int(argv[0]) << 20)
+    return len(block) & 0
+
+
+def sleep_forever(argv):
+    import time
+    time.sleep(60)
+
+
+def context_output(capsys) -> dict:
+    return json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+
+
+class TestEntrypointLoading:
+    """Test cases for parsing and importing entrypoints"""
+    
+    def test_parse(self):
+        """Test entrypoint references are validated"""
+        assert parse_entrypoint("pkg.mod:main") == "pkg.mod:main"
+        for value in ("pkg.mod", "pkg:", ":main", "a b:c", 3):
+            with pytest.raises(EntrypointError):
+                parse_entrypoint(value)
+    
+    def test_load(self):
+        """Test module and nested attribute lookup"""
+        assert load_entrypoint("test_entrypoints:greet") is greet
+        assert load_entrypoint("os.path:join") is os.path.join
+        with pytest.raises(EntrypointError, match="cannot load"):
+            load_entrypoint("test_entrypoints:missing")
+        with pytest.raises(EntrypointError, match="not callable"):
+            load_entrypoint("os:sep")
+
+
+class TestInProcess:
+    """Test cases for running tool functions in this process"""
+    
+    def test_output_and_exit_code(self, capsys):
+        """Test output is captured and the return value is the exit code"""
+        result = run_in_process(greet, ["a", "b"])
+        assert result.exit_code == 2
+        assert result.stdout == "hello a b\n"
+        assert result.stderr == "warned\n"
+        assert result.output_bytes == len("hello a b\nwarned\n")
+        assert capsys.readouterr().out == ""
+    
+    def test_exception_and_system_exit(self):
+        """Test failures become exit code 1 with the reason on stderr"""
+        result = run_in_process(fail, [])
+        assert result.exit_code == 1
+        assert "RuntimeError: boom" in result.stderr
+        result = run_in_process(exit_with_message, [])
+        assert (result.exit_code, result.stderr) == (1, "bad usage\n")
+    
+    def test_env_restored(self, monkeypatch):
+        """Test environment changes for the call are undone"""
+        monkeypatch.delenv("CRAFT_TEST_VALUE", raising=False)
+        result = run_in_process(leak_env, [], env={"CRAFT_TEST_VALUE": "x"})
+        assert result.stdout == "x\n"
+        assert "CRAFT_TEST_VALUE" not in os.environ
+        os.environ.pop("CRAFT_TEST_LEAK", None)
+    
+    def test_output_cap(self):
+        """Test max_output_bytes truncates captured output"""
+        result = run_in_process(greet, ["x" * 50], ResourcePolicy(max_output_bytes=10))
+        assert result.output_truncated
+        assert result.limit_exceeded == "output"
+        assert result.output_bytes == 10
+    
+    def test_rss_is_the_calls_own(self):
+        """Test peak RSS is how far the call raised craft's peak, not craft's peak"""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        assert run_in_process(greet, []).max_rss_kb < peak
+        grown = run_in_process(allocate, [str(peak // 1024 + 64)]).max_rss_kb
+        assert 32 * 1024 < grown < resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class TestForked:
+    """Test cases for isolated tool functions"""
+    
+    def test_crash_is_contained(self):
+        """Test a child killed by a signal does not affect craft"""
+        result = run_forked(crash, [])
+        assert result.signal == signal.SIGKILL
+        assert result.cli_exit_code == 128 + signal.SIGKILL
+    
+    def test_fd_output_and_state_isolated(self):
+        """Test fd-level output is captured and state changes stay in the child"""
+        assert run_forked(raw_write, []).stdout == "from fd\n"
+        run_forked(leak_env, [])
+        assert "CRAFT_TEST_LEAK" not in os.environ
+    
+    def test_limits_force_fork(self):
+        """Test a timeout is enforced by forking"""
+        result = run_entrypoint("test_entrypoints:sleep_forever", [],
+                                ResourcePolicy(timeout=0.2))
+        assert result.limit_exceeded == "timeout"
+        assert result.cli_exit_code == 124
+
+
+class TestEntrypointTools:
+    """Test cases for entrypoint tools run through craft"""
+    
+    def test_domain_helper_module(self, craft_project, capsys):
+        """Test a module next to the tool YAML is importable and run in-process"""
+        domain_dir = write_tool(craft_project, "py", "hello", entrypoint="py_hello_tool:main").parent
+        (domain_dir / "py_hello_tool.py").write_text(
+            "def main(argv):\n    print('hi', *argv)\n    return 0\n"
+        )
+        assert CraftCLI().run_tool("py", "hello", ["there"], execute=True) == 0
+        context = context_output(capsys)
+        assert context["resolved_command"] == "py_hello_tool:main there"
+        assert context["tool_config"]["entrypoint"] == "py_hello_tool:main"
+        assert context["result"]["stdout"] == "hi there\n"
+    
+    def test_entrypoint_shown_over_command(self, craft_project, capsys):
+        """Test the context shows the entrypoint that runs, not an unused command"""
+        write_tool(craft_project, "py", "greet", command="echo {args}",
+                   entrypoint="test_entrypoints:greet")
+        assert CraftCLI().run_tool("py", "greet", ["you"], execute=True) == 1
+        context = context_output(capsys)
+        assert context["resolved_command"] == "test_entrypoints:greet you"
+        assert context["result"]["stdout"] == "hello you\n"
+    
+    def test_isolated_failure(self, craft_project, capsys):
+        """Test isolate: true reports a crash through the normal result"""
+        write_tool(craft_project, "py", "crash", entrypoint="test_entrypoints:crash", isolate=True)
+        assert CraftCLI().run_tool("py", "crash", [], execute=True) == 128 + signal.SIGKILL
+        assert context_output(capsys)["result"]["signal"] == signal.SIGKILL
+    
+    def test_invalid_entrypoint(self, craft_project, capsys):
+        """Test a malformed entrypoint is reported by --validate"""
+        write_tool(craft_project, "py", "bad", entrypoint="no-colon")
+        assert not CraftCLI().validate_tools()
+        assert "Invalid entrypoint" in capsys.readouterr().out
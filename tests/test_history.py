@@ -0,0 +1,110 @@
+"""
+Test suite for the execution history store and --stats
+"""
+import sys
+import pytest
+from unittest.mock import patch
+from craft_cli.core import CraftCLI
+from craft_cli.history import (
+    HistoryRecord, HistoryStore, compute_stats, hash_args, percentile
+)
+from craft_cli.main import main
+from conftest import write_tool
+
+
+def make_record(tool="test", duration=1.0, exit_code=0, domain="coding"):
+    return HistoryRecord(
+        domain=domain, tool=tool, args_hash=hash_args([]), start=1000.0,
+        duration=duration, exit_code=exit_code, output_bytes=10
+    )
+
+
+class TestHistoryStore:
+    """Test cases for HistoryStore"""
+    
+    def test_round_trip(self, tmp_path):
+        """Test records are appended and read back"""
+        store = HistoryStore(tmp_path / "history.tsv")
+        store.append(make_record(duration=0.5))
+        store.append(make_record(tool="build", exit_code=2))
+        
+        records = list(store.records())
+        assert [r.tool for r in records] == ["test", "build"]
+        assert records[0].duration == 0.5
+        assert records[1].exit_code == 2
+        assert [r.tool for r in store.records("coding", "build")] == ["build"]
+    
+    def test_rotation(self, tmp_path):
+        """Test the store rotates by size and keeps a bounded number of backups"""
+        store = HistoryStore(tmp_path / "history.tsv", max_bytes=200, backups=2)
+        for i in range(30):
+            store.append(make_record(duration=float(i)))
+        
+        assert (tmp_path / "history.tsv.1").exists()
+        assert (tmp_path / "history.tsv.2").exists()
+        assert not (tmp_path / "history.tsv.3").exists()
+        records = list(store.records())
+        assert 0 < len(records) < 30
+        # Oldest surviving records come first, newest last
+        durations = [r.duration for r in records]
+        assert durations == sorted(durations)
+        assert durations[-1] == 29.0
+    
+    def test_corrupt_lines_skipped(self, tmp_path):
+        """Test unparseable lines are ignored"""
+        path = tmp_path / "history.tsv"
+        path.write_text("garbage\n" + make_record().to_line())
+        assert len(list(HistoryStore(path).records())) == 1
+
+
+class TestStats:
+    """Test cases for latency statistics"""
+    
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([], 50) == 0.0
+    
+    def test_compute_stats(self):
+        """Test grouping, failure rate and ordering by total time"""
+        records = [make_record("fast", 0.1) for _ in range(10)]
+        records += [make_record("slow", 5.0), make_record("slow", 7.0, exit_code=1)]
+        stats = compute_stats(iter(records))
+        
+        assert [s.tool for s in stats] == ["slow", "fast"]
+        assert stats[0].calls == 2
+        assert stats[0].failure_rate == 0.5
+        assert stats[0].p50 == 5.0
+        assert stats[0].p99 == 7.0
+
+
+class TestStatsCommand:
+    """Test cases for recording runs and craft --stats"""
+    
+    def test_exec_records_history(self, craft_project, capsys):
+        """Test executed runs show up in craft --stats"""
+        write_tool(craft_project, "coding", "test", command="exit {args}")
+        cli = CraftCLI()
+        cli.run_tool("coding", "test", ["0"], execute=True)
+        cli.run_tool("coding", "test", ["1"], execute=True)
+        capsys.readouterr()
+        
+        with patch.object(sys, 'argv', ['craft', '--stats', 'coding']):
+            assert main() == 0
+        output = capsys.readouterr().out
+        assert "EXECUTION STATS (coding):" in output
+        assert "coding/test: 2 calls, 50.0% failed" in output
+    
+    def test_resolve_only_not_recorded(self, craft_project, capsys):
+        """Test runs that are only resolved are not recorded"""
+        write_tool(craft_project, "coding", "test", command="true")
+        cli = CraftCLI()
+        cli.run_tool("coding", "test", [])
+        capsys.readouterr()
+        
+        assert cli.show_stats() is True
+        assert "No execution history for all tools" in capsys.readouterr().out
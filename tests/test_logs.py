@@ -0,0 +1,386 @@
+"""
+Test suite for the indexed log search engine
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._logindex import OTHER_TIME_RE, LogIndex, other_time, query_trigrams
+from craft_cli.engines._tail import Tailer, make_watcher, parse_entry
+from craft_cli.engines.logs import (
+    LogError, LogQuery, SearchStats, follow, index_path, main, parse_time, resolve_files,
+    search
+)
+
+BUILTIN_DEVOPS = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "devops"
+
+LEVELS = ["INFO", "DEBUG", "INFO", "WARN", "INFO", "ERROR"]
+
+
+def write_log(path, entries=600, start=0, mode="w"):
+    """One entry per minute from 2024-03-01T00:00Z; every ERROR has a traceback"""
+    lines = []
+    for n in range(start, start + entries):
+        level = LEVELS[n % len(LEVELS)]
+        stamp = f"2024-03-01T{n // 60 % 24:02d}:{n % 60:02d}:00Z"
+        message = "payment gateway timeout" if n % 997 == 0 else f"request {n} served"
+        lines.append(f"{stamp} {level} [svc] {message}\n")
+        if level == "ERROR":
+            lines.append(f"Traceback (most recent call last):\n  ValueError: bad row {n}\n")
+    with open(path, mode) as f:
+        f.write("".join(lines))
+    return path
+
+
+def run(files, block_bytes=2048, **query):
+    stats = SearchStats()
+    entries = list(search([str(f) for f in files], LogQuery(**query), block_bytes=block_bytes,
+                          stats=stats))
+    return entries, stats
+
+
+class TestLogIndex:
+    """Test cases for the sidecar index"""
+
+    def test_blocks_cover_file_and_end_at_entries(self, tmp_path):
+        """Test blocks tile the file and never split a multi-line entry"""
+        data = write_log(tmp_path / "app.log").read_bytes()
+        index = LogIndex(2048)
+        assert index.update(data) == len(data)
+        assert index.blocks[0].start == 0 and index.blocks[-1].end == len(data)
+        for before, after in zip(index.blocks, index.blocks[1:]):
+            assert before.end == after.start
+            assert data[after.start:after.start + 4] == b"2024"
+        assert all(b.first <= b.last for b in index.blocks)
+
+    def test_incremental_update_matches_rebuild(self, tmp_path):
+        """Test appending re-reads only the open block and equals a fresh index"""
+        path = write_log(tmp_path / "app.log")
+        index = LogIndex(2048)
+        index.update(path.read_bytes())
+        closed = index.blocks[-1].start
+        write_log(path, 50, start=600, mode="a")
+        data = path.read_bytes()
+        assert index.update(data) == len(data) - closed
+        fresh = LogIndex(2048)
+        fresh.update(data)
+        assert index.blocks == fresh.blocks and index.trigrams == fresh.trigrams
+
+    def test_rotation_and_partial_lines(self, tmp_path):
+        """Test a replaced file is re-indexed and an unfinished line waits"""
+        index = LogIndex(2048)
+        index.update(write_log(tmp_path / "app.log").read_bytes())
+        rotated = write_log(tmp_path / "app.log", 10, start=5000).read_bytes()
+        assert index.update(rotated + b"2024-03-02T00:00:00Z INFO half") == len(rotated)
+        assert index.size == len(rotated) and len(index.blocks) == 1
+
+    def test_save_and_load(self, tmp_path):
+        """Test an index survives a round trip through its sidecar file"""
+        index = LogIndex(2048)
+        index.update(write_log(tmp_path / "app.log").read_bytes())
+        index.save(str(tmp_path / "app.log.cidx"))
+        loaded = LogIndex.load(str(tmp_path / "app.log.cidx"))
+        assert loaded.blocks == index.blocks and loaded.trigrams == index.trigrams
+        (tmp_path / "bad.cidx").write_text("{")
+        assert LogIndex.load(str(tmp_path / "bad.cidx")) is None
+
+    def test_query_trigrams(self):
+        """Test only trigrams inside non-numeric words are required"""
+        assert query_trigrams("DB 12345 Conn") == {b"con", b"onn"}
+
+
+class TestSearch:
+    """Test cases for searching logs"""
+
+    def test_grep_prunes_blocks_and_matches_linear_scan(self, tmp_path):
+        """Test indexed results equal a linear scan while reading fewer bytes"""
+        path = write_log(tmp_path / "app.log", 3000)
+        entries, stats = run([path], grep="Gateway Timeout")
+        assert [e.offset for e in entries] == [
+            e.offset for e in run([path], grep="gateway timeout")[0]
+        ]
+        assert len(entries) == 4
+        assert stats.read_bytes < stats.total_bytes / 3
+        linear = list(search([str(path)], LogQuery(grep="Gateway Timeout"), use_index=False))
+        assert linear == entries
+
+    def test_entries_include_continuation_lines(self, tmp_path):
+        """Test a match in a traceback returns the whole entry"""
+        entries, _ = run([write_log(tmp_path / "app.log", 100)], grep="bad row 11")
+        assert [e.level for e in entries] == ["error"]
+        first_line = entries[0].message.splitlines()[0]
+        assert first_line == "2024-03-01T00:11:00Z ERROR [svc] request 11 served"
+        assert entries[0].message.endswith("ValueError: bad row 11")
+
+    def test_levels_and_time_range(self, tmp_path):
+        """Test level and time filters combine, and blocks outside the range are skipped"""
+        path = write_log(tmp_path / "app.log", 1440)
+        since = parse_time("2024-03-01T10:00:00Z")
+        until = parse_time("2024-03-01T10:59:59Z")
+        entries, stats = run([path], levels=["error", "warn"], since=since, until=until)
+        assert len(entries) == 20
+        assert {e.level for e in entries} == {"error", "warn"}
+        assert all(e.timestamp.startswith("2024-03-01T10:") for e in entries)
+        assert stats.blocks < stats.total_blocks / 4
+
+    def test_regex_and_naive_timestamps(self, tmp_path):
+        """Test --regex searches and entries without a timezone or in JSON lines"""
+        path = tmp_path / "app.log"
+        path.write_text('2024-03-01 08:00:00,120 INFO started\n'
+                        '{"ts": "2024-03-01T08:00:01Z", "level": "error", "msg": "disk 91% full"}\n'
+                        'untimestamped line\n')
+        entries, _ = run([path], grep=r"disk \d+%", regex=True)
+        assert [(e.timestamp, e.level) for e in entries] == [("2024-03-01T08:00:01Z", "error")]
+        entries, _ = run([path])
+        assert [e.timestamp for e in entries] == [
+            "2024-03-01 08:00:00,120", "2024-03-01T08:00:01Z"
+        ]
+        assert "untimestamped line" in entries[1].message
+
+    def test_parse_time(self):
+        """Test durations count back from now and timestamps are absolute"""
+        assert parse_time("2h", now=10000.0) == 2800.0
+        assert parse_time("2024-03-01T00:00:00Z") == 1709251200.0
+        with pytest.raises(LogError, match="invalid time"):
+            parse_time("yesterday")
+
+    @pytest.mark.parametrize("value,end,expected", [
+        ("2024-03-01T12:00", False, "2024-03-01T12:00:00"),
+        ("2024-03-01 12:00:30", False, "2024-03-01T12:00:30"),
+        ("2024-03-01", False, "2024-03-01T00:00:00"),
+        ("2024-03-01", True, "2024-03-01T23:59:59"),
+        ("2024-03-01T12:00", True, "2024-03-01T12:00:00"),
+    ])
+    def test_parse_time_local_forms(self, value, end, expected):
+        """Test seconds and the time of day may be left out; --until covers a whole date"""
+        assert parse_time(value, end=end) == parse_time(expected)
+
+    @pytest.mark.parametrize("value", [
+        "2024-03-01T00:00Z", "2024-03-01T00:00:00Z", "2024-03-01T00:00:00.250Z",
+        "2024-03-01T01:00:00+01:00", "2024-03-01T01:00+0100", "2024-03-01Z"
+    ])
+    def test_parse_time_zoned_forms(self, value):
+        """Test UTC and offset timestamps with or without seconds"""
+        assert parse_time(value) == 1709251200.0
+
+    def test_parse_time_rejects_trailing_text(self):
+        """Test a timestamp followed by other text is not half-read"""
+        with pytest.raises(LogError, match="2024-01-31T12:00"):
+            parse_time("2024-03-01T00:00:00Zjunk")
+
+    def test_access_log_and_syslog_times(self, tmp_path):
+        """Test web server and syslog lines are indexed and filtered by their own times"""
+        path = tmp_path / "web.log"
+        path.write_text(
+            '10.0.0.1 - - [01/Mar/2024:09:59:00 +0000] "GET / HTTP/1.1" 200 12\n'
+            '10.0.0.2 - ann [01/Mar/2024:11:00:00 +0100] "GET /a HTTP/1.1" 404 0\n'
+            '10.0.0.3 - - [01/Mar/2024:10:30:00 +0000] "POST /b HTTP/1.1" 500 0\n'
+        )
+        entries, _ = run([path], since=parse_time("2024-03-01T10:00Z"))
+        assert [e.message[:8] for e in entries] == ["10.0.0.2", "10.0.0.3"]
+        assert entries[0].timestamp == "01/Mar/2024:11:00:00 +0100"
+        entries, stats = run([path], until=parse_time("2024-02-29", end=True))
+        assert entries == [] and stats.blocks == 0
+        syslog = tmp_path / "sys.log"
+        syslog.write_text("Mar  1 10:00:00 host app[7]: started\n"
+                          "Mar  1 10:05:00 host app[7]: ready\n")
+        moment = other_time(OTHER_TIME_RE.match(b"Mar  1 10:05:00 h app: x"))
+        entries, _ = run([syslog], since=moment)
+        assert [e.timestamp for e in entries] == ["Mar  1 10:05:00"]
+
+    def test_syslog_year(self):
+        """Test a syslog date is placed in the latest year that is not in the future"""
+        now = parse_time("2024-03-01T12:00")
+        dec = OTHER_TIME_RE.match(b"Dec 31 23:00:00 host app: x")
+        mar = OTHER_TIME_RE.match(b"Mar  2 08:00:00 host app: x")
+        assert other_time(dec, now) == parse_time("2023-12-31T23:00")
+        assert other_time(mar, now) == parse_time("2024-03-02T08:00")
+        assert other_time(OTHER_TIME_RE.match(b"Feb 30 00:00:00 h app: x"), now) is None
+
+    def test_no_timestamps_warns_under_time_range(self, tmp_path, capsys):
+        """Test a file the time range cannot use is reported instead of silently dropped"""
+        path = tmp_path / "plain.log"
+        path.write_text("no times here\n")
+        assert run([path], since=0.0)[0] == []
+        assert "no timestamps found" in capsys.readouterr().err
+
+    def test_grep_ignores_case_beyond_ascii(self, tmp_path):
+        """Test a non-ASCII literal matches other cases of its letters"""
+        path = tmp_path / "app.log"
+        path.write_text("2024-03-01T00:00:00Z INFO CAFÉ opened\n"
+                        "2024-03-01T00:00:01Z INFO cafe opened\n"
+                        "2024-03-01T00:00:02Z INFO STRASSE closed\n", encoding="utf-8")
+        assert [e.offset for e in run([path], grep="café")[0]] == [0]
+        assert len(run([path], grep="Straße")[0]) == 1
+        assert LogQuery(grep="café").matches("Café".encode("utf-8"))
+
+    def test_resolve_files(self, tmp_path, monkeypatch):
+        """Test services resolve to log files in the log directory"""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "logs" / "worker").mkdir(parents=True)
+        for name in ("api.log", "api.log.1", "api.log.2.gz", "api.log.cidx", "web.log",
+                     "worker/a.log"):
+            (tmp_path / "logs" / name).write_text("")
+        assert resolve_files(["api"]) == ["logs/api.log", "logs/api.log.1"]
+        assert resolve_files(["worker"]) == ["logs/worker/a.log"]
+        assert resolve_files([]) == ["logs/api.log", "logs/api.log.1", "logs/web.log"]
+        with pytest.raises(LogError, match="no log files found for 'db'"):
+            resolve_files(["db"])
+        assert index_path("logs/api.log") == "logs/api.log.cidx"
+        assert index_path("logs/api.log", "idx").startswith("idx/api.log-")
+
+
+class TestFollow:
+    """Test cases for tailing logs"""
+
+    def test_tailer_assembles_entries(self, tmp_path):
+        """Test continuation lines wait for the next entry or an idle flush"""
+        path = tmp_path / "app.log"
+        path.write_text("2024-03-01T00:00:00Z INFO old\n")
+        tailer = Tailer(str(path))
+        with open(path, "a") as f:
+            f.write("2024-03-01T00:00:01Z ERROR boom\nTraceback:\n  x\nplain")
+        assert tailer.read() == []
+        with open(path, "a") as f:
+            f.write(" line\n2024-03-01T00:00:02Z INFO next\n")
+        [(offset, raw, kind)] = tailer.read()
+        assert raw == b"2024-03-01T00:00:01Z ERROR boom\nTraceback:\n  x\nplain line"
+        assert offset == 30 and kind == "iso"
+        assert tailer.flush() == [(88, b"2024-03-01T00:00:02Z INFO next", "iso")]
+        tailer.close()
+
+    def test_tailer_rotation_and_truncation(self, tmp_path):
+        """Test the old file is drained before following the new one"""
+        path = tmp_path / "app.log"
+        path.write_text("")
+        tailer = Tailer(str(path))
+        with open(path, "a") as f:
+            f.write("first\nlast of old\n")
+        os.rename(path, tmp_path / "app.log.1")
+        path.write_text("new\n")
+        assert [raw for _, raw, _ in tailer.read()] == [b"first", b"last of old"]
+        assert tailer.read() == [(0, b"new", None)] and tailer.rotations == 1
+        path.write_text("")
+        assert tailer.read() == [] and tailer.truncated == 1
+        with open(path, "a") as f:
+            f.write("again\n")
+        assert tailer.read() == [(0, b"again", None)]
+        tailer.close()
+
+    def test_tailer_memory_is_bounded(self, tmp_path):
+        """Test reads are capped per turn and oversized entries are cut"""
+        path = tmp_path / "app.log"
+        path.write_text("")
+        tailer = Tailer(str(path), max_entry_bytes=100)
+        with open(path, "a") as f:
+            f.write("2024-03-01T00:00:00Z ERROR x\n" + "  more\n" * 1000 + "y" * 500)
+        assert tailer.read(max_bytes=1000) == [] and tailer.position == 1000
+        while tailer.read(max_bytes=1000):
+            pass
+        [(_, raw, _)] = tailer.flush()
+        assert len(raw) <= 100
+        assert all(len(raw) <= 100 for _, raw, _ in tailer.read())
+        tailer.close()
+
+    def test_parse_entry_formats(self):
+        """Test JSON, web server, syslog, ISO and plain lines"""
+        stamp, level, message, fields = parse_entry(
+            b'{"time": "2024-03-01T00:00:00Z", "severity": "WARNING", "msg": "slow", "ms": 9}')
+        assert (stamp, level, message, fields["ms"]) == ("2024-03-01T00:00:00Z", "warn", "slow", 9)
+        stamp, level, _, fields = parse_entry(
+            b'10.0.0.1 - - [10/Oct/2000:13:55:36 -0700] "GET /a HTTP/1.1" 404 -')
+        assert stamp == "2000-10-10T13:55:36-07:00" and level == "warn"
+        assert fields == {"remote": "10.0.0.1", "user": None, "request": "GET /a HTTP/1.1",
+                          "status": 404, "bytes": None}
+        stamp, level, _, fields = parse_entry(b"Mar  1 10:00:00 db postgres[7]: FATAL: no disk")
+        assert (stamp, level, fields["program"], fields["pid"]) == (
+            "Mar  1 10:00:00", "error", "postgres", 7)
+        stamp, level, _, _ = parse_entry(b"2024-03-01 00:00:00,5 DEBUG x")
+        assert (stamp, level) == ("2024-03-01 00:00:00,5", "debug")
+        assert parse_entry(b"just text") == (None, None, "just text", None)
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+    def test_follow_streams_filtered_entries(self, tmp_path):
+        """Test entries appended while following are filtered and parsed"""
+        path = tmp_path / "app.log"
+        path.write_text("2024-03-01T00:00:00Z ERROR before start\n")
+        assert make_watcher([str(path)]).kind == "inotify"
+
+        def append():
+            time.sleep(0.2)
+            with open(path, "a") as f:
+                f.write("2024-03-01T00:00:01Z INFO fine\n"
+                        '{"level": "error", "msg": "disk full", "host": "db1"}\n'
+                        "2024-03-01T00:00:02Z ERROR disk timeout\n  at io.py\n")
+        writer = threading.Thread(target=append)
+        writer.start()
+        stats = SearchStats()
+        entries = list(follow([str(path)], LogQuery(["error"], grep="disk"), stop_after=1.0,
+                              stats=stats))
+        writer.join()
+        assert [(e.level, e.message) for e in entries] == [
+            ("error", "disk full"), ("error", "2024-03-01T00:00:02Z ERROR disk timeout\n  at io.py")
+        ]
+        assert entries[0].fields["host"] == "db1" and stats.matches == 2
+
+    def test_follow_polling_from_start(self, tmp_path):
+        """Test the polling watcher and --from-start"""
+        path = write_log(tmp_path / "app.log", 12)
+        entries = list(follow([str(path)], LogQuery(["error"]), stop_after=0.1,
+                              from_start=True, use_inotify=False))
+        assert [e.offset for e in entries] == [
+            e.offset for e in run([path], levels=["error"])[0]
+        ]
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_exports_and_sidecar(self, tmp_path, capsys):
+        """Test JSON and CSV exports, --limit and the saved index"""
+        path = write_log(tmp_path / "app.log")
+        assert main([str(path), "--level=error", "--limit=2", "--export=json"]) == 0
+        out, err = capsys.readouterr()
+        rows = [json.loads(line) for line in out.splitlines()]
+        assert [r["level"] for r in rows] == ["error", "error"] and rows[0]["offset"] > 0
+        assert "LOGS: 2 matches" in err and (tmp_path / "app.log.cidx").exists()
+        assert main([str(path), "--grep=gateway", "--export=csv"]) == 0
+        out, err = capsys.readouterr()
+        assert out.splitlines()[0] == "file,offset,timestamp,level,message"
+        assert "indexed 0.0 MB" in err
+
+    def test_errors(self, tmp_path, capsys):
+        """Test bad queries and missing logs are reported"""
+        assert main([str(tmp_path / "nope"), "--log-dir", str(tmp_path)]) == 1
+        assert "no log files found" in capsys.readouterr().err
+        path = write_log(tmp_path / "app.log", 5)
+        assert main([str(path), "--grep=(", "--regex"]) == 1
+        assert "invalid --grep pattern" in capsys.readouterr().err
+
+    def test_follow_command_line(self, tmp_path, capsys):
+        """Test --follow output and the options it cannot be combined with"""
+        path = write_log(tmp_path / "app.log", 12)
+        assert main([str(path), "--follow", "--from-start", "--stop-after=0.1s", "--level=warn",
+                     "--export=json"]) == 0
+        out, err = capsys.readouterr()
+        assert len(out.splitlines()) == 2 and "FOLLOW: 2 matches" in err
+        assert main([str(path), "--follow", "--since=1h"]) == 1
+        assert "cannot be combined with --follow" in capsys.readouterr().err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft devops logs` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DEVOPS, craft_project / "devops")
+        Path("logs").mkdir()
+        write_log(Path("logs/api.log"), 120)
+        argv = ["api", "--level=error", "--since", "2024-03-01T01:00:00Z"]
+        assert CraftCLI().run_tool("devops", "logs", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert context["result"]["stdout"].count(" ERROR ") == 10
+        assert CraftCLI().run_tool("devops", "logs", ["api", "--follow"], execute=True) == 1
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert "give --follow a --stop-after or --limit" in context["result"]["stderr"]
@@ -0,0 +1,121 @@
+"""
+Test suite for in-process metrics and batch mode
+"""
+import io
+import sys
+import urllib.request
+import pytest
+from unittest.mock import patch
+from craft_cli.core import CraftCLI
+from craft_cli.main import main
+from craft_cli.metrics import REGISTRY_CACHE, REQUESTS, MetricsRegistry
+from conftest import write_tool
+
+
+class TestMetricsRegistry:
+    """Test cases for metric types and exposition"""
+    
+    def test_counter_and_gauge(self):
+        """Test counters and gauges render with labels"""
+        registry = MetricsRegistry()
+        counter = registry.counter("c_total", "A counter", ["tool"])
+        counter.inc(tool="a")
+        counter.inc(2, tool='b"x')
+        gauge = registry.gauge("g", "A gauge")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        
+        text = registry.render()
+        assert "# TYPE c_total counter" in text
+        assert 'c_total{tool="a"} 1' in text
+        assert 'c_total{tool="b\\"x"} 2' in text
+        assert "g 1" in text.splitlines()
+    
+    def test_histogram(self):
+        """Test histogram buckets are cumulative with sum and count"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("h_seconds", "A histogram", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        
+        lines = registry.render().splitlines()
+        assert 'h_seconds_bucket{le="0.1"} 2' in lines
+        assert 'h_seconds_bucket{le="1"} 3' in lines
+        assert 'h_seconds_bucket{le="+Inf"} 4' in lines
+        assert "h_seconds_sum 3.65" in lines
+        assert "h_seconds_count 4" in lines
+    
+    def test_register_is_idempotent(self):
+        """Test registering the same name returns the existing metric"""
+        registry = MetricsRegistry()
+        assert registry.counter("x", "X") is registry.counter("x", "X")
+    
+    def test_serve(self):
+        """Test metrics are served over HTTP"""
+        registry = MetricsRegistry()
+        registry.counter("served_total", "Served").inc()
+        server = registry.serve(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert "served_total 1" in response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestCraftMetrics:
+    """Test cases for the counters hooked into craft"""
+    
+    def test_registry_cache_counters(self, craft_project):
+        """Test tool cache hits and misses are counted"""
+        write_tool(craft_project, "test", "echo", command="echo {args}")
+        cli = CraftCLI()
+        misses = REGISTRY_CACHE.value(cache="tools", result="miss")
+        hits = REGISTRY_CACHE.value(cache="tools", result="hit")
+        
+        cli.run_tool("test", "echo", [])
+        cli.run_tool("test", "echo", [])
+        assert REGISTRY_CACHE.value(cache="tools", result="miss") == misses + 1
+        assert REGISTRY_CACHE.value(cache="tools", result="hit") == hits + 1
+        assert REQUESTS.value(domain="test", tool="echo", status="ok") >= 2
+    
+    def test_metrics_flag(self, craft_project, capsys):
+        """Test --metrics dumps the exposition to stderr"""
+        with patch.object(sys, 'argv', ['craft', '--domains', '--metrics']):
+            assert main() == 0
+        captured = capsys.readouterr()
+        assert "AVAILABLE DOMAINS:" in captured.out
+        assert "# TYPE craft_requests_total counter" in captured.err
+    
+    def test_metrics_flag_left_to_tools(self, craft_project, capsys):
+        """Test --metrics after the tool name is passed to the tool"""
+        write_tool(craft_project, "test", "echo", command="echo {args}")
+        with patch.object(sys, 'argv', ['craft', '--metrics', 'test', 'echo', '--metrics', 'cpu']):
+            assert main() == 0
+        captured = capsys.readouterr()
+        assert '"resolved_command": "echo --metrics cpu"' in captured.out
+        assert "# TYPE craft_requests_total counter" in captured.err
+    
+    @pytest.mark.parametrize("port", ["http", "0", "70000", ""])
+    def test_batch_bad_metrics_port(self, port, capsys):
+        """Test a bad --metrics-port is reported, not raised"""
+        with patch.object(sys, 'argv', ['craft', '--batch', f'--metrics-port={port}']):
+            assert main() == 2
+        assert f"ERROR: Invalid --metrics-port '{port}'" in capsys.readouterr().out
+    
+    def test_batch_mode(self, craft_project, capsys):
+        """Test --batch runs one command per line and reports each status"""
+        write_tool(craft_project, "test", "echo", command="echo {args}")
+        stdin = io.StringIO("# comment\ntest echo one\n\ntest missing\ntest echo 'two words'\n")
+        
+        with patch.object(sys, 'argv', ['craft', '--batch', '--exec']), \
+                patch.object(sys, 'stdin', stdin):
+            assert main() == 1
+        
+        output = capsys.readouterr().out
+        assert "BATCH_STATUS: line=2 exit=0" in output
+        assert "BATCH_STATUS: line=4 exit=1" in output
+        assert "BATCH_STATUS: line=5 exit=0" in output
+        assert '"stdout": "two words\\n"' in output
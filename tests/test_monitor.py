@@ -0,0 +1,153 @@
+"""
+Test suite for the /proc health monitor
+"""
+import io
+import json
+import shutil
+from array import array
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._procfs import METRICS, Sampler, whole_disks
+from craft_cli.engines.monitor import (
+    AlertRules, History, MonitorError, MonitorStats, main, monitor, select_columns
+)
+
+BUILTIN_DEVOPS = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "devops"
+
+DISKSTATS = ("   7       0 loop0 5 0 80 0 0 0 0 0 0 0 0\n"
+             "   8       0 sda {r} 0 {rs} 0 {w} 0 {ws} 0 0 0 0\n"
+             "   8       1 sda1 {r} 0 {rs} 0 {w} 0 {ws} 0 0 0 0\n")
+NETDEV = ("Inter-|   Receive |  Transmit\n face |bytes packets|bytes packets\n"
+          "    lo: 999 1 0 0 0 0 0 0 999 1 0 0 0 0 0 0\n"
+          "  eth0: {rx} 10 0 0 0 0 0 0 {tx} 10 0 0 0 0 0 0\n")
+
+
+def write_proc(root, busy=0, idle=0, iowait=0, available=6000, sectors=0, net=0, ticks=0):
+    """A fake /proc with one watched process (pid 4242, `postgres: writer`)"""
+    (root / "net").mkdir(parents=True, exist_ok=True)
+    (root / "stat").write_text(f"cpu  {busy} 0 0 {idle} {iowait} 0 0 0 0 0\ncpu0 1 2 3\n")
+    (root / "meminfo").write_text(f"MemTotal:  8000 kB\nMemFree: 100 kB\n"
+                                  f"MemAvailable: {available} kB\nSwapTotal: 0 kB\n"
+                                  f"SwapFree: 0 kB\n")
+    (root / "loadavg").write_text("1.50 1.00 0.50 2/100 4242\n")
+    (root / "diskstats").write_text(DISKSTATS.format(r=1, rs=sectors, w=1, ws=sectors * 2))
+    (root / "net" / "dev").write_text(NETDEV.format(rx=net, tx=net // 2))
+    process = root / "4242"
+    process.mkdir(exist_ok=True)
+    (process / "cmdline").write_bytes(b"postgres: writer\0")
+    (process / "stat").write_text(f"4242 (postgres: writer) S 1 1 1 0 -1 0 0 0 0 0 {ticks} 0 "
+                                  "0 0 20 0 1 0 100 1000 256 0\n")
+    return root
+
+
+class TestSampler:
+    """Test cases for reading /proc"""
+
+    def test_rates_between_samples(self, tmp_path):
+        """Test CPU, memory, disk, network and process figures"""
+        root = write_proc(tmp_path)
+        sampler = Sampler(str(root), ["postgres"])
+        assert sampler.disks == {b"sda"} and set(sampler.processes) == {4242}
+        write_proc(root, busy=30, idle=60, iowait=10, available=2000, sectors=2048,
+                   net=4096, ticks=50)
+        sample = array("d", bytes(8 * len(METRICS)))
+        sampler.sample(sample, 2.0)
+        values = dict(zip(METRICS, sample))
+        assert values["cpu"] == 30 and values["iowait"] == 10 and values["load1"] == 1.5
+        assert values["memory"] == 75 and values["swap"] == 0
+        assert values["disk_read"] == 512 and values["disk_write"] == 1024
+        assert values["net_rx"] == 2 and values["net_tx"] == 1
+        assert values["proc_count"] == 1 and values["proc_cpu"] == pytest.approx(25.0)
+        assert values["proc_rss"] == pytest.approx(256 * 4096 / 2**20, rel=0.5)
+        assert next(sampler.process_rows())["name"] == "postgres: writer"
+        sampler.close()
+
+    def test_whole_disks_skip_partitions(self):
+        """Test partitions and virtual devices are not double counted"""
+        stats = b"".join(b"1 0 %s 0\n" % name for name in
+                         (b"loop0", b"nvme0n1", b"nvme0n1p1", b"sda", b"sda2", b"dm-0"))
+        assert whole_disks(stats) == [b"nvme0n1", b"sda", b"dm-0"]
+
+
+class TestHistoryAndAlerts:
+    """Test cases for ring buffers and alert rules"""
+
+    def test_rings_downsample_with_fixed_capacity(self):
+        """Test each resolution keeps the newest means and wraps around"""
+        history = History(1.0, capacity=4, factors=(1, 3))
+        sample = array("d", bytes(8 * len(METRICS)))
+        for n in range(12):
+            sample[0] = n
+            history.push(sample)
+        assert history.column(0, 0) == [8, 9, 10, 11]
+        assert history.column(1, 0) == [1, 4, 7, 10]
+        summaries = list(history.summaries([0]))
+        assert [s["resolution"] for s in summaries] == ["1s", "3s"]
+        assert summaries[1]["window"] == "12s" and summaries[1]["metrics"]["cpu"]["max"] == 10
+
+    def test_sustained_alerts_fire_and_resolve(self):
+        """Test a rule fires after its duration and resolves once"""
+        rules = AlertRules("cpu>90:3s, memory<=10", 1.0)
+        assert list(rules.needed) == [3, 1]
+        sample = array("d", bytes(8 * len(METRICS)))
+        sample[3] = 50
+        events = []
+        for cpu in (95, 95, 95, 95, 20):
+            sample[0] = cpu
+            events.extend((rules.names[rules.changed[n]], rules.firing[rules.changed[n]])
+                          for n in range(rules.check(sample)))
+        assert events == [("cpu>90:3s", 1), ("cpu>90:3s", 0)]
+        for spec in ("cpu>>90", "temperature>3", "cpu>90:soon"):
+            with pytest.raises(MonitorError, match="invalid alert rule"):
+                AlertRules(spec, 1.0)
+
+    def test_monitor_writes_ndjson(self, tmp_path):
+        """Test windows, alerts and summaries from a fake /proc"""
+        sampler = Sampler(str(write_proc(tmp_path, available=500)))
+        out, stats = io.StringIO(), MonitorStats()
+        monitor(sampler, select_columns(["memory"]), 0.01, emit_every=2,
+                rules=AlertRules("memory>90", 0.01), count=4, out=out, stats=stats)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["type"] for r in records] == ["alert", "sample", "sample", "summary"]
+        assert set(records[1]) == {"type", "time", "memory", "swap"}
+        assert records[1]["memory"] == pytest.approx(93.75)
+        assert stats.samples == 4 and stats.alerts == 1
+        with pytest.raises(MonitorError, match="unknown metrics gpu"):
+            select_columns(["cpu", "gpu"])
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_runs_against_proc(self, tmp_path, capsys):
+        """Test a short run on a fake /proc and its stderr summary"""
+        root = write_proc(tmp_path)
+        assert main(["postgres", "--interval=10ms", "--count=3", f"--proc={root}"]) == 0
+        out, err = capsys.readouterr()
+        samples = [json.loads(line) for line in out.splitlines()]
+        assert samples[0]["processes"][0]["pid"] == 4242
+        assert "MONITOR: 3 samples" in err and "% of a core" in err
+
+    def test_errors(self, tmp_path, capsys):
+        """Test bad options are reported"""
+        assert main(["--interval=soon", "--count=1"]) == 1
+        assert "--interval" in capsys.readouterr().err
+        assert main(["--count=1", f"--proc={tmp_path}"]) == 1
+        assert "no Linux /proc" in capsys.readouterr().err
+        assert main(["--count=1", "--alerts=cpu~1"]) == 1
+        assert "invalid alert rule" in capsys.readouterr().err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft devops monitor` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DEVOPS, craft_project / "devops")
+        if not Path("/proc/stat").exists():
+            pytest.skip("needs Linux /proc")
+        argv = ["--interval=10ms", "--count=2", "--metrics=cpu"]
+        assert CraftCLI().run_tool("devops", "monitor", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        lines = context["result"]["stdout"].splitlines()
+        assert [json.loads(line)["type"] for line in lines] == ["sample", "sample", "summary"]
+        assert CraftCLI().run_tool("devops", "monitor", [], execute=True) == 1
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert "give --count or --duration" in context["result"]["stderr"]
@@ -0,0 +1,125 @@
+"""
+Test suite for typed tool parameters
+"""
+import json
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.params import (
+    ParameterError, ToolParameter, load_parameters, parse_arguments, parse_duration
+)
+from conftest import write_tool
+
+
+@pytest.fixture
+def parameters():
+    """Parameter declarations similar to the built-in data/devops tools"""
+    return load_parameters({
+        "chunk-size": {"type": "int", "default": 1000},
+        "to": {"choices": ["csv", "json"]},
+        "since": {"type": "duration"},
+        "level": {"type": "list", "choices": ["error", "warn", "info"]},
+        "strict": {"type": "bool", "default": False}
+    })
+
+
+class TestParameters:
+    """Test cases for parameter parsing"""
+    
+    def test_defaults(self, parameters):
+        """Test defaults are applied for options not given"""
+        values = parse_arguments(parameters, ["data.csv"])
+        assert values == {
+            "chunk_size": 1000, "to": None, "since": None, "level": None, "strict": False
+        }
+    
+    def test_parse_forms(self, parameters):
+        """Test --name=value, --name value and bare bool flags"""
+        values = parse_arguments(
+            parameters,
+            ["in.csv", "--chunk-size=5000", "--to", "json", "--since=1h",
+             "--level=error,warn", "--strict", "--unknown=1"]
+        )
+        assert values["chunk_size"] == 5000
+        assert values["to"] == "json"
+        assert values["since"] == 3600
+        assert values["level"] == ["error", "warn"]
+        assert values["strict"] is True
+    
+    def test_stops_at_double_dash(self, parameters):
+        """Test arguments after -- are not parsed"""
+        values = parse_arguments(parameters, ["--", "--chunk-size=x"])
+        assert values["chunk_size"] == 1000
+    
+    @pytest.mark.parametrize("argv, message", [
+        (["--chunk-size=abc"], "expects int"),
+        (["--to=xml"], "must be one of"),
+        (["--level=error,fatal"], "must be one of"),
+        (["--since=soon"], "invalid duration"),
+        (["--strict=maybe"], "expects a boolean"),
+        (["--to"], "requires a value"),
+    ])
+    def test_invalid_values(self, parameters, argv, message):
+        """Test invalid values raise ParameterError"""
+        with pytest.raises(ParameterError, match=message):
+            parse_arguments(parameters, argv)
+    
+    def test_required(self):
+        """Test required options must be given"""
+        params = load_parameters({"schema": {"required": True}})
+        with pytest.raises(ParameterError, match="missing required option --schema"):
+            parse_arguments(params, [])
+    
+    def test_invalid_declarations(self):
+        """Test bad declarations are rejected at load time"""
+        with pytest.raises(ParameterError, match="unknown type"):
+            ToolParameter(name="x", type="complex")
+        with pytest.raises(ParameterError, match="must be one of"):
+            ToolParameter(name="x", choices=["a"], default="b")
+    
+    def test_parse_duration(self):
+        """Test duration units"""
+        assert parse_duration("30s") == 30
+        assert parse_duration("5m") == 300
+        assert parse_duration("7d") == 604800
+        assert parse_duration("250ms") == 0.25
+        assert parse_duration("15") == 15
+
+
+class TestToolParameters:
+    """Test cases for parameters in run_tool"""
+    
+    def test_parameters_in_template_and_context(self, craft_project, capsys):
+        """Test parsed values are template variables and in the JSON context"""
+        write_tool(
+            craft_project, "data", "transform",
+            command="convert --rows {chunk_size} {args}",
+            parameters={"chunk-size": {"type": "int", "default": 1000}}
+        )
+        assert CraftCLI().run_tool("data", "transform", ["in.csv", "--chunk-size=50"]) == 0
+        
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert context["resolved_command"] == "convert --rows 50 in.csv --chunk-size=50"
+        assert context["parameters"] == {"chunk_size": 50}
+        assert context["variables"]["chunk_size"] == "50"
+    
+    def test_invalid_arguments_fail_fast(self, craft_project, capsys):
+        """Test a bad invocation fails before the context is produced"""
+        write_tool(
+            craft_project, "data", "transform",
+            command="convert {args}",
+            parameters={"chunk-size": {"type": "int"}}
+        )
+        assert CraftCLI().run_tool("data", "transform", ["--chunk-size=lots"]) == 1
+        output = capsys.readouterr().out
+        assert "ERROR: Invalid arguments for 'data/transform'" in output
+        assert "EXECUTION_CONTEXT" not in output
+    
+    def test_invalid_declaration_reported(self, craft_project):
+        """Test broken parameter declarations are reported by validation"""
+        write_tool(
+            craft_project, "data", "bad",
+            command="x {args}", parameters={"args": {}}
+        )
+        checked, broken = CraftCLI().registry.validate()
+        assert [spec.tool for spec in broken] == ["bad"]
+        assert "shadows a built-in variable" in broken[0].error
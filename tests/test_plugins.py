@@ -0,0 +1,88 @@
+"""
+Test suite for domains registered through package entry points
+"""
+import os
+import sys
+import pytest
+from craft_cli import plugins
+from craft_cli.core import CraftCLI
+from craft_cli.plugins import entry_point_domains, path_fingerprint
+
+
+@pytest.fixture
+def domain_pack(tmp_path, monkeypatch):
+    """An installed-looking distribution exposing one domain package"""
+    site = tmp_path / "site"
+    package = site / "acme_pack" / "security"
+    package.mkdir(parents=True)
+    (site / "acme_pack" / "__init__.py").write_text("raise RuntimeError('must not be imported')\n")
+    (package / "__init__.py").write_text("")
+    (package / "audit.yaml").write_text("name: AUDIT\ndescription: Audit\ncommand: echo audit {args}\n")
+    
+    dist_info = site / "acme_pack-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: acme-pack\nVersion: 1.0\n")
+    (dist_info / "entry_points.txt").write_text(
+        "[craft_cli.domains]\nsecurity = acme_pack.security\nghost = acme_pack.missing\n"
+    )
+    monkeypatch.syspath_prepend(str(site))
+    return package
+
+
+class TestEntryPointDomains:
+    """Test cases for entry-point discovery and its cache"""
+    
+    def test_discovered_without_import(self, domain_pack):
+        """Test packaged domains are located from metadata only"""
+        domains = entry_point_domains()
+        assert domains["security"] == domain_pack
+        assert "ghost" not in domains
+        assert "acme_pack" not in sys.modules
+    
+    def test_disk_cache(self, domain_pack, tmp_path, monkeypatch):
+        """Test the cache is reused until sys.path changes"""
+        cache = tmp_path / "cache" / "entry-points.json"
+        assert "security" in entry_point_domains(cache)
+        
+        def fail():
+            raise AssertionError("distributions scanned despite a warm cache")
+        monkeypatch.setattr(plugins, "scan_entry_point_domains", fail)
+        assert entry_point_domains(cache)["security"] == domain_pack
+        
+        monkeypatch.syspath_prepend(str(tmp_path / "new-site"))
+        with pytest.raises(AssertionError):
+            entry_point_domains(cache)
+    
+    def test_fingerprint_tracks_mtimes(self, tmp_path):
+        """Test installing into a path entry changes the fingerprint"""
+        before = path_fingerprint([str(tmp_path)])
+        (tmp_path / "new-1.0.dist-info").mkdir()
+        os.utime(str(tmp_path), ns=(0, 1))
+        assert path_fingerprint([str(tmp_path)]) != before
+
+
+class TestPluginDomainsInCraft:
+    """Test cases for packaged domains in discovery and execution"""
+    
+    def test_listed_and_run(self, craft_project, domain_pack, capsys):
+        """Test packaged domains behave like directory domains"""
+        cli = CraftCLI()
+        cli.list_domains()
+        assert "security: 1 tools" in capsys.readouterr().out
+        assert cli.run_tool("security", "audit", ["now"]) == 0
+        assert "echo audit now" in capsys.readouterr().out
+    
+    def test_directory_domain_wins(self, craft_project, domain_pack, capsys):
+        """Test a domain_paths domain shadows a packaged one of the same name"""
+        local = craft_project / "security"
+        local.mkdir()
+        (local / "audit.yaml").write_text("command: echo local\n")
+        assert CraftCLI().run_tool("security", "audit", []) == 0
+        assert "echo local" in capsys.readouterr().out
+    
+    def test_disabled(self, craft_project, domain_pack, capsys):
+        """Test include_plugin_domains: false hides packaged domains"""
+        rc = craft_project.parent / ".craftrc"
+        rc.write_text(rc.read_text() + "include_plugin_domains: false\n")
+        CraftCLI().list_domains()
+        assert "security" not in capsys.readouterr().out
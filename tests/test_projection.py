@@ -0,0 +1,101 @@
+"""
+Test suite for execution context projection and help digests
+"""
+import json
+import sys
+import pytest
+from unittest.mock import patch
+from craft_cli.main import main
+from craft_cli.projection import ContextView, ProjectionError, help_digest, parse_fields
+from conftest import write_tool
+
+
+CONTEXT = {
+    "execution": {"domain": "d", "tool": "t", "command": "echo hi"},
+    "tool_config": {"name": "T", "help": "long help text"},
+    "resolved_command": "echo hi",
+    "parameters": {}
+}
+
+
+def run_main(*argv):
+    with patch.object(sys, 'argv', ['craft', *argv]):
+        return main()
+
+
+def read_context(output: str) -> dict:
+    return json.loads(output.split("EXECUTION_CONTEXT:\n", 1)[1])
+
+
+class TestContextView:
+    """Test cases for projecting the context"""
+    
+    def test_full_view_is_unchanged(self):
+        """Test the default view emits the whole context"""
+        assert ContextView().apply(CONTEXT) == CONTEXT
+    
+    def test_no_help(self):
+        """Test --no-help drops only the help text"""
+        projected = ContextView(help="none").apply(CONTEXT)
+        assert projected["tool_config"] == {"name": "T"}
+        assert CONTEXT["tool_config"]["help"] == "long help text"
+    
+    def test_help_digest(self):
+        """Test --help-digest replaces the help text with its hash"""
+        projected = ContextView(help="digest").apply(CONTEXT)
+        assert projected["tool_config"]["help_digest"] == help_digest("long help text")
+        assert "help" not in projected["tool_config"]
+    
+    def test_fields(self):
+        """Test dotted field selection; missing paths are skipped"""
+        view = ContextView(fields=["execution.command", "resolved_command", "result.exit_code"])
+        assert view.apply(CONTEXT) == {
+            "execution": {"command": "echo hi"},
+            "resolved_command": "echo hi"
+        }
+    
+    def test_parse_fields(self):
+        """Test field lists are split and their roots validated"""
+        assert parse_fields("execution.tool, result") == ["execution.tool", "result"]
+        with pytest.raises(ProjectionError, match="unknown field"):
+            parse_fields("help")
+        with pytest.raises(ProjectionError):
+            parse_fields(" , ")
+
+
+class TestContextOptions:
+    """Test cases for the command line context options"""
+    
+    def test_fields_option(self, craft_project, capsys):
+        """Test --fields before the domain projects the JSON context"""
+        write_tool(craft_project, "test", "echo", command="echo {args}", help="Help")
+        assert run_main("--fields=resolved_command", "test", "echo", "hi") == 0
+        assert read_context(capsys.readouterr().out) == {"resolved_command": "echo hi"}
+    
+    def test_fields_after_tool_are_tool_args(self, craft_project, capsys):
+        """Test --fields after the tool is passed through as a tool argument"""
+        write_tool(craft_project, "test", "echo", command="echo {args}")
+        assert run_main("test", "echo", "--fields=bio") == 0
+        assert read_context(capsys.readouterr().out)["resolved_command"] == "echo --fields=bio"
+    
+    def test_help_digest_round_trip(self, craft_project, capsys):
+        """Test an agent can skip re-reading unchanged help"""
+        write_tool(craft_project, "test", "echo", command="echo", help="Usage: craft test echo")
+        digest = help_digest("Usage: craft test echo")
+        
+        assert run_main("--help-digest", "test", "echo") == 0
+        context = read_context(capsys.readouterr().out)
+        assert context["tool_config"]["help_digest"] == digest
+        
+        assert run_main("test", "echo", "--help", f"--digest={digest}") == 0
+        assert capsys.readouterr().out == f"HELP_UNCHANGED: {digest}\n"
+        
+        assert run_main("test", "echo", "--help", "--digest=stale") == 0
+        output = capsys.readouterr().out
+        assert "Usage: craft test echo" in output
+        assert f"HELP_DIGEST: {digest}" in output
+    
+    def test_invalid_fields(self, craft_project, capsys):
+        """Test an unknown field is reported"""
+        assert run_main("--fields=nope", "test", "echo") == 2
+        assert "ERROR: unknown field 'nope'" in capsys.readouterr().out
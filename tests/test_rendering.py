@@ -0,0 +1,92 @@
+"""
+Test suite for incremental Rich rendering
+"""
+import io
+from rich.console import Console
+from craft_cli.rendering import StreamingTable, fit_to_screen
+from craft_cli.metrics import RENDER_FIRST_ROW
+
+
+def make_console(**kwargs) -> Console:
+    return Console(file=io.StringIO(), width=80, **kwargs)
+
+
+class TestStreamingTable:
+    """Test cases for page-by-page table rendering"""
+    
+    def test_pages_share_one_header(self):
+        """Test every row is printed under a single title and header"""
+        target = make_console()
+        table = StreamingTable("Things", [("Name", {}), ("Size", {"justify": "right"})],
+                               view="test", target=target, rows_per_page=2)
+        
+        count = table.render((f"item{i}", str(i)) for i in range(5))
+        output = target.file.getvalue()
+        assert count == 5
+        assert output.count("Things") == 1
+        assert output.count("Name") == 1
+        for i in range(5):
+            assert f"item{i}" in output
+    
+    def test_first_page_printed_before_rows_are_exhausted(self):
+        """Test rows are consumed lazily, one page at a time"""
+        target = make_console()
+        seen_when_produced = []
+        
+        def rows():
+            for i in range(4):
+                seen_when_produced.append(target.file.getvalue().count("row"))
+                yield (f"row{i}",)
+        
+        table = StreamingTable("Lazy", [("Row", {})], view="test",
+                               target=target, rows_per_page=2)
+        table.render(rows())
+        # Rows 3 and 4 are produced after the first page was printed
+        assert seen_when_produced == [0, 0, 2, 2]
+    
+    def test_time_to_first_row_recorded(self):
+        """Test the first page records time-to-first-row"""
+        before = RENDER_FIRST_ROW.count(view="measured")
+        table = StreamingTable("Timed", [("A", {})], view="measured",
+                               target=make_console(), rows_per_page=10)
+        table.render([("x",)])
+        assert table.first_row_seconds is not None
+        assert RENDER_FIRST_ROW.count(view="measured") == before + 1
+    
+    def test_wide_rows_fit_the_console(self):
+        """Test long cells are folded so every column stays on an 80-column screen"""
+        target = make_console()
+        table = StreamingTable("Tools", [("Tool", {}), ("Description", {}), ("Usage", {})],
+                               view="test", target=target)
+        table.render((f"tool{i}", "a long description " * 5,
+                      f"craft data tool{i} --format=[parquet] " + "--option " * 8)
+                     for i in range(3))
+        lines = target.file.getvalue().splitlines()
+        assert max(map(len, lines)) <= 80
+        assert "Tool" in lines[1] and "Usage" in lines[1]
+        assert all(any(line.startswith(f"tool{i}") for line in lines) for i in range(3))
+        assert "[parquet]" in target.file.getvalue()
+    
+    def test_empty_table_prints_header(self):
+        """Test an empty listing still shows its header"""
+        target = make_console()
+        table = StreamingTable("Empty", [("Column", {})], view="test", target=target)
+        assert table.render([]) == 0
+        assert "Column" in target.file.getvalue()
+
+
+class TestFitToScreen:
+    """Test cases for cropping text to the terminal"""
+    
+    def test_not_a_terminal(self):
+        """Test text is untouched when output is not a terminal"""
+        text = "\n".join(str(i) for i in range(100))
+        assert fit_to_screen(text, "more", make_console()) == text
+    
+    def test_cropped_on_terminal(self):
+        """Test long text is cropped with a hint on a terminal"""
+        target = make_console(force_terminal=True, height=20)
+        text = "\n".join(f"line{i}" for i in range(100))
+        cropped = fit_to_screen(text, "craft d t --help", target).split("\n")
+        assert len(cropped) == 15
+        assert cropped[-1] == "... 86 more lines, see: craft d t --help"
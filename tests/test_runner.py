@@ -0,0 +1,133 @@
+"""
+Test suite for tool execution and resource limits
+"""
+import json
+import sys
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from craft_cli.core import CraftCLI
+from craft_cli.main import main
+from craft_cli.registry import ToolSpec
+from craft_cli.runner import ResourcePolicy, run_command
+from conftest import write_tool
+
+BUILTIN_DOMAINS = Path(__file__).parent.parent / "src" / "craft_cli" / "domains"
+
+
+class TestResourcePolicy:
+    """Test cases for ResourcePolicy parsing"""
+    
+    def test_from_dict(self):
+        """Test limits are parsed with duration timeouts"""
+        policy = ResourcePolicy.from_dict({
+            "timeout": "2m", "cpu_seconds": 10, "max_rss_mb": 512, "max_output_bytes": 1024
+        })
+        assert policy.timeout == 120
+        assert policy.to_dict() == {
+            "timeout": 120, "cpu_seconds": 10, "max_rss_mb": 512, "max_output_bytes": 1024
+        }
+    
+    @pytest.mark.parametrize("data, message", [
+        ({"cpu_seconds": -1}, "positive integer"),
+        ({"max_rss": 10}, "unknown resource limit"),
+        ({"timeout": "soon"}, "invalid duration"),
+    ])
+    def test_invalid(self, data, message):
+        """Test invalid policies are rejected"""
+        with pytest.raises(ValueError, match=message):
+            ResourcePolicy.from_dict(data)
+    
+    @pytest.mark.parametrize("tool_file", sorted(BUILTIN_DOMAINS.glob("*/*.yaml")),
+                             ids=lambda path: f"{path.parent.name}/{path.stem}")
+    def test_builtin_resources(self, tool_file):
+        """Test every built-in tool's resources parse as a top-level mapping"""
+        spec = ToolSpec.from_file(tool_file.parent.name, tool_file)
+        assert spec.error is None
+        declared = "\nresources:" in tool_file.read_text()
+        assert isinstance(spec.config.get("resources"), dict) == declared
+        assert bool(spec.resources.to_dict()) == declared
+        assert not any(line.startswith("resources:") or line.lstrip().endswith("resources:")
+                       for value in spec.config.values() if isinstance(value, str)
+                       for line in value.splitlines())
+
+
+class TestRunCommand:
+    """Test cases for run_command"""
+    
+    def test_success_accounting(self):
+        """Test output and rusage accounting are collected"""
+        result = run_command("echo hello; echo oops >&2")
+        assert result.exit_code == 0
+        assert result.stdout == "hello\n"
+        assert result.stderr == "oops\n"
+        assert result.output_bytes == 11
+        assert result.max_rss_kb > 0
+        assert result.limit_exceeded is None
+    
+    def test_exit_code(self):
+        """Test non-zero exit codes are reported"""
+        result = run_command("exit 3")
+        assert result.exit_code == 3
+        assert result.cli_exit_code == 3
+    
+    def test_timeout(self):
+        """Test the wall timeout kills the process group"""
+        result = run_command("sleep 10", ResourcePolicy(timeout=0.2))
+        assert result.limit_exceeded == "timeout"
+        assert result.duration < 5
+        assert result.cli_exit_code == 124
+    
+    def test_output_limit(self):
+        """Test output beyond the byte limit is truncated and the child killed"""
+        result = run_command("yes", ResourcePolicy(max_output_bytes=1000, timeout=10))
+        assert result.limit_exceeded == "output"
+        assert result.output_truncated is True
+        assert len(result.stdout) == 1000
+    
+    @pytest.mark.slow
+    def test_cpu_limit(self):
+        """Test RLIMIT_CPU stops a busy loop"""
+        command = f"{sys.executable} -c 'while True: pass'"
+        result = run_command(command, ResourcePolicy(cpu_seconds=1, timeout=30))
+        assert result.limit_exceeded == "cpu"
+        assert result.cpu_user + result.cpu_system >= 0.5
+
+
+class TestToolExecution:
+    """Test cases for executing tools through craft"""
+    
+    def test_resolve_only_by_default(self, craft_project, capsys):
+        """Test tools are not executed unless requested"""
+        write_tool(craft_project, "test", "echo", command="echo {args}")
+        assert CraftCLI().run_tool("test", "echo", ["hi"]) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert "result" not in context
+    
+    def test_exec_flag(self, craft_project, capsys):
+        """Test --exec runs the tool and reports the result"""
+        write_tool(craft_project, "test", "fail", command="echo {args}; exit 2")
+        with patch.object(sys, 'argv', ['craft', 'test', 'fail', 'hi', '--exec']):
+            assert main() == 2
+        
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert context["execution"]["args"] == ["hi"]
+        assert context["result"]["exit_code"] == 2
+        assert context["result"]["stdout"] == "hi\n"
+        assert "cpu_seconds" in context["result"]
+    
+    def test_tool_resources_applied(self, craft_project, capsys):
+        """Test the tool's resource policy is enforced"""
+        write_tool(
+            craft_project, "test", "slow",
+            command="sleep 10", resources={"timeout": "200ms"}
+        )
+        assert CraftCLI().run_tool("test", "slow", [], execute=True) == 124
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert context["result"]["limit_exceeded"] == "timeout"
+    
+    def test_invalid_resources_reported(self, craft_project):
+        """Test broken resource policies are reported by validation"""
+        write_tool(craft_project, "test", "bad", command="x", resources={"cpu": 1})
+        checked, broken = CraftCLI().registry.validate()
+        assert "Invalid resources" in broken[0].error
@@ -0,0 +1,138 @@
+"""
+Test suite for the scaling policy simulator
+"""
+import json
+import shutil
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines.scale import (
+    Policy, ScaleError, Series, Simulator, load_series, main, moving_max, parse_sweep, sweep
+)
+
+BUILTIN_DEVOPS = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "devops"
+
+
+def write_metrics(path, loads, step=60):
+    """One row per `step` seconds from 2024-01-01T00:00Z"""
+    rows = ["timestamp,requests,cpu,replicas"]
+    for n, load in enumerate(loads):
+        minute = n * step // 60
+        rows.append(f"2024-01-01T{minute // 60:02d}:{minute % 60:02d}:00Z,{load},{load / 10},2")
+    path.write_text("\n".join(rows) + "\n")
+    return path
+
+
+def series_of(demand, step=60.0):
+    return Series([n * step for n in range(len(demand))], demand, demand)
+
+
+class TestWindows:
+    """Test cases for the whole-series window transforms"""
+
+    def test_moving_mean_and_max_match_brute_force(self):
+        """Test trailing windows against direct computation"""
+        demand = [1, 5, 2, 2, 8, 1, 1, 1, 3, 0]
+        series = series_of(demand)
+        starts = series.starts(180)
+        assert starts == [0, 0, 0, 1, 2, 3, 4, 5, 6, 7]
+        means = series.moving_mean(180)
+        assert means == [pytest.approx(sum(demand[s:i + 1]) / (i + 1 - s))
+                         for i, s in enumerate(starts)]
+        assert moving_max(demand, starts) == [max(demand[s:i + 1]) for i, s in enumerate(starts)]
+        assert series.starts(0) == list(range(10))
+        assert series.lagged(120)[:4] == [0, 0, 1, 2]
+
+
+class TestSimulator:
+    """Test cases for the scaling policy"""
+
+    def test_replicas_follow_demand_within_bounds(self):
+        """Test desired replicas, clamping, cooldown and warmup"""
+        series = series_of([1.0] * 5 + [4.0] * 5 + [1.0] * 10)
+        simulator = Simulator(series, min_replicas=1, max_replicas=4)
+        running, ready = simulator.replicas(Policy(50, 0, 0, 0))
+        assert running == [2] * 5 + [4] * 5 + [2] * 10  # 4.0 / 0.5 = 8, capped at 4
+        running, _ = simulator.replicas(Policy(50, 0, 300, 0))
+        assert running[9:15] == [4] * 5 + [2]  # until the last 4 leaves the 5 minute window
+        running, ready = simulator.replicas(Policy(50, 0, 0, 120))
+        assert ready[5:8] == [2, 2, 4] and ready == [min(r, e) for r, e in zip(
+            running, [2, 2] + running[:-2])]
+
+    def test_run_reports_cost_latency_and_saturation(self):
+        """Test the summary figures of an undersized and a generous policy"""
+        series = series_of([1.8] * 60)  # one hour
+        simulator = Simulator(series, 1, 10, service_time=0.05, slo=0.2, cost_per_hour=0.5)
+        tight = simulator.run(Policy(100, 0, 0, 0))
+        assert tight["replica_hours"] == 2 and tight["cost"] == 1.0
+        assert tight["p95_latency_ms"] == 500.0 and tight["slo_violation_pct"] == 100
+        roomy = simulator.run(Policy(50, 0, 0, 0))
+        assert roomy["peak_replicas"] == 4 and roomy["p50_latency_ms"] == pytest.approx(90.9)
+        assert roomy["slo_violation_pct"] == 0 and roomy["saturated_pct"] == 0
+        with pytest.raises(ScaleError, match="--min"):
+            Simulator(series, 5, 2)
+
+    def test_sweep_ranks_policies_and_runs_in_parallel(self):
+        """Test the grid, the ranking and identical results with workers"""
+        demand = [1.0 + (n % 30) / 10 for n in range(600)]
+        simulator = Simulator(series_of(demand), 1, 20, slo=0.15)
+        policies = parse_sweep(["threshold=40:90:10", "cooldown=0,5m"], Policy(70, 60, 0, 0))
+        assert len(policies) == 12 and {p.cooldown for p in policies} == {0, 300}
+        serial = sweep(simulator, policies, jobs=1)
+        assert sweep(simulator, policies, jobs=2) == serial
+        passing = [r for r in serial if r["slo_violation_pct"] <= 1.0]
+        assert serial[:len(passing)] == sorted(passing, key=lambda r: r["replica_hours"])
+        for spec in ("speed=1,2", "threshold=", "window=1m:5m:0m"):
+            with pytest.raises(ScaleError, match="invalid --sweep"):
+                parse_sweep([spec], Policy(70, 60, 0, 0))
+
+
+class TestLoad:
+    """Test cases for reading metric files"""
+
+    def test_rate_and_utilization_demand(self, tmp_path):
+        """Test demand from a rate with --capacity and from cpu x replicas"""
+        path = write_metrics(tmp_path / "m.csv", [100, 300, 200])
+        rates = load_series(str(path), "requests", capacity=100)
+        assert list(rates.demand) == [1, 3, 2] and rates.hours == pytest.approx(3 / 60)
+        cpu = load_series(str(path), "cpu")
+        assert list(cpu.demand) == [0.2, 0.6, 0.4]
+        with pytest.raises(ScaleError, match="no 'memory' column"):
+            load_series(str(path), "memory")
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_single_policy_and_timeline(self, tmp_path, capsys):
+        """Test the text summary and the timeline file"""
+        path = write_metrics(tmp_path / "m.csv", [100, 500, 500, 100])
+        timeline = tmp_path / "replicas.ndjson"
+        assert main([str(path), "--metric=requests", "--capacity=100", "--threshold=50",
+                     "--window=0", "--cooldown=0", f"--timeline={timeline}"]) == 0
+        out, err = capsys.readouterr()
+        assert out.splitlines()[0].split()[0] == "threshold" and "SCALE: 1 policy" in err
+        rows = [json.loads(line) for line in timeline.read_text().splitlines()]
+        assert [r["replicas"] for r in rows] == [2, 10, 10, 2]
+
+    def test_sweep_export_and_errors(self, tmp_path, capsys):
+        """Test JSON sweep output and reported mistakes"""
+        path = write_metrics(tmp_path / "m.csv", [100, 500, 500, 100] * 5)
+        assert main([str(path), "--metric=requests", "--capacity=100", "--export=json",
+                     "--sweep", "threshold=50,70", "--top=0", "--jobs=1"]) == 0
+        rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert sorted(r["threshold"] for r in rows) == [50, 70]
+        assert main([str(path), "--sweep=threshold=50,70", "--timeline=-"]) == 1
+        assert "single policy" in capsys.readouterr().err
+        assert main([str(tmp_path / "none.csv")]) == 1
+        assert "ERROR" in capsys.readouterr().err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft devops scale` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DEVOPS, craft_project / "devops")
+        write_metrics(Path("metrics.csv"), [100, 400, 400, 100])
+        argv = ["metrics.csv", "--metric", "requests", "--capacity=100", "--max=20",
+                "--export=json"]
+        assert CraftCLI().run_tool("devops", "scale", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert json.loads(context["result"]["stdout"])["peak_replicas"] == 5
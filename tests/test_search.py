@@ -0,0 +1,187 @@
+"""
+Test suite for the corpus search engine
+"""
+import json
+import math
+import random
+import shutil
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._corpus import parse_date, read_documents, tokenize
+from craft_cli.engines._invindex import Manifest, Segment
+from craft_cli.engines.search import (
+    MAX_SEGMENTS, SearchError, SearchStats, main, parse_bound, search, update_index
+)
+
+BUILTIN_RESEARCH = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "research"
+WORDS = [f"w{n}" for n in range(200)]
+
+
+def write_records(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    return path
+
+
+def random_records(seed, count, prefix="r"):
+    rng = random.Random(seed)
+    return [{"id": f"{prefix}{n}", "title": " ".join(rng.sample(WORDS, 2)),
+             "abstract": " ".join(rng.choices(WORDS, k=rng.randint(5, 80))),
+             "year": 2010 + n % 15} for n in range(count)]
+
+
+def brute_force(manifest, query, limit, since=0):
+    """Exhaustive BM25 over every live document, from the same stored weights"""
+    terms = sorted(set(tokenize(query)))
+    segments = [Segment(manifest.directory, entry) for entry in manifest.segments]
+    ranges = [[seg.lookup(term) for term in terms] for seg in segments]
+    idf = []
+    for n in range(len(terms)):
+        df = sum(r[n][1] - r[n][0] for r in ranges if r[n])
+        idf.append(math.log(1 + (manifest.docs - df + 0.5) / (df + 0.5)))
+    scores = []
+    for seg, seg_ranges in zip(segments, ranges):
+        for doc in set(range(seg.docs)) - manifest.deleted.get(seg.name, set()):
+            if seg.dates[doc] >= since:
+                score = sum(idf[n] * seg.weight(r[0], r[1], doc)
+                            for n, r in enumerate(seg_ranges) if r)
+                scores.append(round(score, 5))
+        seg.close()
+    return [s for s in sorted(scores, reverse=True) if s > 0][:limit]
+
+
+class TestCorpus:
+    """Test cases for reading corpus documents"""
+
+    def test_text_and_record_documents(self, tmp_path):
+        """Test titles, dates, sources and appended-record reads"""
+        note = tmp_path / "notes" / "2023-04-02-attention.md"
+        note.parent.mkdir()
+        note.write_text("# Attention notes\n\nTransformers use attention.\n")
+        doc, = read_documents(str(tmp_path), "notes/2023-04-02-attention.md", 0)
+        assert (doc.title, doc.date, doc.source) == ("Attention notes", 20230402, "notes")
+        path = write_records(tmp_path / "arxiv" / "a.jsonl", [
+            {"id": "x1", "title": "One", "abstract": "alpha", "published": "2021-07-09"},
+            {"title": "Two", "text": "beta", "year": 2019, "source": "pubmed",
+             "authors": "Ada Lovelace and Alan Turing"},
+        ])
+        first = len(path.read_bytes().split(b"\n")[0]) + 1
+        one, two = read_documents(str(tmp_path), "arxiv/a.jsonl", 0)
+        assert (one.key, one.date, one.source) == ("x1", 20210709, "arxiv")
+        assert (two.key, two.date, two.source, two.offset) == ("arxiv/a.jsonl:2", 20190101,
+                                                              "pubmed", first)
+        assert two.authors == ["Ada Lovelace", "Alan Turing"]
+        assert [d.line for d in read_documents(str(tmp_path), "arxiv/a.jsonl", 0, first)] == [2]
+        assert parse_date("March 2020") == 20200101 and parse_date(None) == 0
+        assert tokenize("The BM25 ranking, of a_b") == ["bm25", "ranking"]
+
+
+class TestIndex:
+    """Test cases for indexing and ranking"""
+
+    def test_threshold_algorithm_matches_exhaustive_bm25(self, tmp_path):
+        """Test top-k scores against scoring every document, with filters"""
+        write_records(tmp_path / "corpus" / "a.jsonl", random_records(1, 300))
+        write_records(tmp_path / "corpus" / "b.jsonl", random_records(2, 200, "s"))
+        manifest = Manifest(str(tmp_path / "index"))
+        update_index(manifest, str(tmp_path / "corpus"), flush_docs=120)
+        assert len(manifest.segments) == 5 and manifest.docs == 500
+        for query in ("w1", "w1 w2 w3", "w7 w100 w150 w3 w4"):
+            for since in (0, 20200101):
+                stats = SearchStats()
+                hits = search(manifest, query, 10, since=since, stats=stats)
+                assert [round(h.score, 5) for h in hits] == brute_force(manifest, query, 10, since)
+                assert all(h.date >= since for h in hits)
+                assert stats.candidates < manifest.docs
+
+    def test_incremental_updates(self, tmp_path):
+        """Test appended records, changed and removed files and merging"""
+        corpus = tmp_path / "corpus"
+        papers = write_records(corpus / "arxiv" / "papers.jsonl", random_records(3, 50))
+        (corpus / "notes").mkdir()
+        (corpus / "notes" / "a.md").write_text("# Quokka\n\nquokka sightings\n")
+        manifest = Manifest.load(str(corpus / ".craft-index"))
+        update_index(manifest, str(corpus))
+        write_records(papers, [{"id": "late", "title": "quokka census", "year": 2024}])
+        stats = SearchStats()
+        update_index(manifest, str(corpus), stats=stats)
+        assert (stats.indexed_docs, stats.deleted_docs, manifest.docs) == (1, 0, 52)
+        hits = search(manifest, "quokka", 5, sources=["arxiv"])
+        assert [h.meta["key"] for h in hits] == ["late"]
+        (corpus / "notes" / "a.md").write_text("# Wombat\n\nwombat burrows\n")
+        update_index(manifest, str(corpus))
+        assert [h.meta["title"] for h in search(manifest, "quokka wombat", 5)] == [
+            "Wombat", "quokka census"]
+        for n in range(MAX_SEGMENTS):
+            write_records(corpus / f"extra{n}.jsonl", random_records(n, 3, f"e{n}-"))
+            update_index(manifest, str(corpus))
+        assert len(manifest.segments) <= 3 and manifest.docs == 52 + 3 * MAX_SEGMENTS
+        assert sorted(p.name for p in (corpus / ".craft-index").iterdir()) == sorted(
+            ["manifest.json"] + [f"{s['name']}{ext}" for s in manifest.segments
+                                 for ext in (".idx", ".meta")])
+        papers.unlink()
+        update_index(manifest, str(corpus))
+        assert not search(manifest, "census", 5)
+        reloaded = Manifest.load(manifest.directory)
+        assert reloaded.segments == manifest.segments and reloaded.docs == manifest.docs
+
+    def test_merge_rereads_whole_json_files(self, tmp_path):
+        """Test a .json file split across segments is re-read once when merged"""
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        (corpus / "papers.json").write_text(json.dumps(random_records(4, 5)))
+        manifest = Manifest.load(str(corpus / ".craft-index"))
+        update_index(manifest, str(corpus), flush_docs=3)
+        assert len(manifest.files["papers.json"]["parts"]) == 2
+        for n in range(MAX_SEGMENTS):
+            (corpus / f"note{n}.md").write_text(f"# Note {n}\n\nw1 w2\n")
+            update_index(manifest, str(corpus), flush_docs=3)
+        assert len(manifest.segments) < MAX_SEGMENTS and manifest.docs == 5 + MAX_SEGMENTS
+        keys = [h.meta["key"] for h in search(manifest, " ".join(WORDS), 50)]
+        assert sorted(keys) == sorted(set(keys)) and len(keys) == 5 + MAX_SEGMENTS
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_query_exports_and_errors(self, tmp_path, capsys):
+        """Test text, JSON, BibTeX and RIS output and reported mistakes"""
+        corpus = tmp_path / "corpus"
+        write_records(corpus / "arxiv" / "a.jsonl", [
+            {"id": "vaswani2017", "title": "Attention is all you need", "year": 2017,
+             "abstract": "transformer attention", "authors": ["Ashish Vaswani"]},
+            {"id": "old", "title": "Attention in RNNs", "year": 2014, "abstract": "attention"},
+        ])
+        assert main(["attention", f"--corpus={corpus}", "--since=2015"]) == 0
+        out, err = capsys.readouterr()
+        assert "Attention is all you need" in out and "RNNs" not in out
+        assert "INDEX: indexed 2 documents" in err and "SEARCH: 1 results" in err
+        assert main(["attention", f"--corpus={corpus}", "--export=json", "--no-update"]) == 0
+        rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [r["key"] for r in rows] == ["old", "vaswani2017"]  # the shorter one first
+        assert main(["transformer", f"--corpus={corpus}", "--export=bib"]) == 0
+        out = capsys.readouterr().out
+        assert out.startswith("@misc{vaswani2017,") and "author = {Ashish Vaswani}" in out
+        assert main(["transformer", f"--corpus={corpus}", "--export=ris"]) == 0
+        assert "PY  - 2017" in capsys.readouterr().out
+        assert main(["attention", f"--corpus={corpus}", "--until=2016"]) == 0
+        assert "RNNs" in capsys.readouterr().out
+        assert parse_bound("2023-05", end=True) == 20230531
+        with pytest.raises(SearchError, match="invalid date"):
+            parse_bound("last year")
+        assert main(["xyz", f"--corpus={tmp_path / 'none'}"]) == 1
+        assert "no corpus directory" in capsys.readouterr().err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft research search` runs the built-in engine"""
+        shutil.copytree(BUILTIN_RESEARCH, craft_project / "research")
+        write_records(Path("corpus") / "papers.jsonl", [
+            {"id": "p1", "title": "Graph neural networks", "year": 2020},
+            {"id": "p2", "title": "Protein folding", "year": 2021},
+        ])
+        argv = ["protein", "--export=json"]
+        assert CraftCLI().run_tool("research", "search", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert json.loads(context["result"]["stdout"])["key"] == "p2"
@@ -0,0 +1,177 @@
+"""
+Test suite for remote domain sources and the local content-addressed store
+"""
+import hashlib
+import io
+import shutil
+import subprocess
+import tarfile
+import pytest
+import yaml
+from pathlib import Path
+from craft_cli.config import ConfigManager
+from craft_cli.core import CraftCLI
+from craft_cli.sources import DomainSource, SourceError, SourceStore
+
+
+def make_archive(path: Path, files: dict) -> Path:
+    """Write a .tar.gz archive holding {relpath: text}"""
+    with tarfile.open(str(path), "w:gz") as tar:
+        for name, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.email=t@example.com", "-c", "user.name=t", *args],
+        cwd=str(cwd), check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def bare_repo(tmp_path):
+    """A local bare git repository with two commits of a domains tree"""
+    if shutil.which("git") is None:
+        pytest.skip("git not available")
+    work = tmp_path / "work"
+    (work / "domains" / "shared").mkdir(parents=True)
+    git(tmp_path, "init", "-q", str(work))
+    (work / "domains" / "shared" / "hello.yaml").write_text("command: echo v1 {args}\n")
+    git(work, "add", "-A")
+    git(work, "commit", "-qm", "v1")
+    first = git(work, "rev-parse", "HEAD")
+    (work / "domains" / "shared" / "hello.yaml").write_text("command: echo v2 {args}\n")
+    git(work, "commit", "-qam", "v2")
+    git(work, "tag", "v2")
+    bare = tmp_path / "bare.git"
+    git(tmp_path, "clone", "-q", "--bare", str(work), str(bare))
+    return bare, first
+
+
+class TestDomainSource:
+    """Test cases for parsing domain_sources entries"""
+    
+    def test_git_source(self):
+        """Test a git source with ref and path"""
+        source = DomainSource.from_dict({"name": "team", "git": "file:///srv/d.git",
+                                         "ref": "v1", "path": "domains"})
+        assert (source.kind, source.url, source.ref, source.path) == \
+            ("git", "file:///srv/d.git", "v1", "domains")
+        assert source.version == "git:file:///srv/d.git@v1"
+    
+    @pytest.mark.parametrize("data", [
+        {"git": "x"},
+        {"name": "a b", "git": "x"},
+        {"name": "a"},
+        {"name": "a", "git": "x", "archive": "y"},
+        {"name": "a", "git": "x", "branch": "main"},
+        {"name": "a", "git": "x", "path": "../up"}
+    ])
+    def test_invalid_sources(self, data):
+        """Test malformed entries are rejected"""
+        with pytest.raises(SourceError):
+            DomainSource.from_dict(data)
+
+
+class TestSourceStore:
+    """Test cases for syncing into the content-addressed store"""
+    
+    def test_archive_sync_and_dedup(self, tmp_path):
+        """Test archive versions share unchanged file objects"""
+        store = SourceStore(tmp_path / "store")
+        common = "command: echo common\n"
+        v1 = make_archive(tmp_path / "v1.tar.gz", {"d/a.yaml": common, "d/b.yaml": "command: b1\n"})
+        v2 = make_archive(tmp_path / "v2.tar.gz", {"d/a.yaml": common, "d/b.yaml": "command: b2\n"})
+        
+        first = store.sync(DomainSource.from_dict({"name": "s", "archive": v1.as_uri()}))
+        second = store.sync(DomainSource.from_dict({"name": "s", "archive": str(v2)}))
+        assert first.tree != second.tree
+        assert second.changed
+        
+        objects = [p for p in (store.objects).rglob("*") if p.is_file()]
+        assert len(objects) == 3
+        active = store.domain_path(DomainSource.from_dict({"name": "s", "archive": str(v2)}))
+        assert (active / "d" / "b.yaml").read_text() == "command: b2\n"
+        assert (active / "d" / "a.yaml").stat().st_nlink >= 3
+    
+    def test_checksum_mismatch(self, tmp_path):
+        """Test a pinned archive with the wrong sha256 is refused"""
+        archive = make_archive(tmp_path / "a.tar.gz", {"d/a.yaml": "x"})
+        source = DomainSource.from_dict({"name": "s", "archive": str(archive), "sha256": "00"})
+        with pytest.raises(SourceError, match="Checksum mismatch"):
+            SourceStore(tmp_path / "store").sync(source)
+    
+    def test_pinned_archive_reused_from_store(self, tmp_path):
+        """Test a pinned version already in the store is not downloaded again"""
+        archive = make_archive(tmp_path / "a.tar.gz", {"d/a.yaml": "x"})
+        digest = hashlib.sha256(archive.read_bytes()).hexdigest()
+        source = DomainSource.from_dict({"name": "s", "archive": str(archive), "sha256": digest})
+        store = SourceStore(tmp_path / "store")
+        
+        assert not store.sync(source).cached
+        archive.unlink()
+        result = store.sync(source)
+        assert result.cached and not result.changed
+    
+    def test_unsafe_archive_member(self, tmp_path):
+        """Test archives cannot write outside the checkout"""
+        archive = make_archive(tmp_path / "evil.tar.gz", {"../escape.yaml": "x"})
+        with pytest.raises(SourceError, match="unsafe"):
+            SourceStore(tmp_path / "store").sync(
+                DomainSource.from_dict({"name": "s", "archive": str(archive)})
+            )
+        assert not (tmp_path / "store" / "escape.yaml").exists()
+    
+    def test_git_sync_and_offline_switch(self, tmp_path, bare_repo):
+        """Test git refs are synced and cached versions can be activated offline"""
+        bare, first = bare_repo
+        store = SourceStore(tmp_path / "store")
+        url = bare.as_uri()
+        old = DomainSource.from_dict({"name": "g", "git": url, "ref": first, "path": "domains"})
+        new = DomainSource.from_dict({"name": "g", "git": url, "ref": "v2", "path": "domains"})
+        
+        assert store.sync(old).revision == first
+        store.sync(new)
+        assert "v2" in (store.domain_path(new) / "shared" / "hello.yaml").read_text()
+        assert not (store.domain_path(new) / ".git").exists()
+        
+        shutil.rmtree(str(bare))
+        result = store.sync(old, offline=True)
+        assert result.cached and result.changed
+        assert "v1" in (store.domain_path(old) / "shared" / "hello.yaml").read_text()
+        
+        with pytest.raises(SourceError, match="not in the local store"):
+            store.sync(DomainSource.from_dict({"name": "g", "git": url, "ref": "main"}),
+                       offline=True)
+
+
+class TestSyncCommand:
+    """Test cases for craft --sync and discovery from synced sources"""
+    
+    def test_sync_then_discover(self, craft_project, tmp_path, capsys):
+        """Test synced domains are listed and unsynced sources only warn"""
+        archive = make_archive(tmp_path / "lib.tar.gz", {"remote/ping.yaml": "command: echo pong\n"})
+        rc = Path.cwd() / ".craftrc"
+        config = yaml.safe_load(rc.read_text())
+        config["domain_sources"] = [{"name": "lib", "archive": archive.as_uri()}]
+        rc.write_text(yaml.dump(config))
+        
+        ConfigManager().get_domain_paths()
+        assert "Domain source 'lib' is not synced" in capsys.readouterr().out
+        
+        cli = CraftCLI()
+        assert cli.sync_sources()
+        assert "SYNCED: lib tree=" in capsys.readouterr().out
+        
+        cli.list_domains()
+        assert "remote: 1 tools" in capsys.readouterr().out
+        assert cli.run_tool("remote", "ping", []) == 0
+    
+    def test_sync_without_sources(self, craft_project, capsys):
+        """Test --sync without configured sources is an error"""
+        assert not CraftCLI().sync_sources()
+        assert "ERROR: No domain_sources configured" in capsys.readouterr().out
@@ -0,0 +1,117 @@
+"""
+Test suite for command template compilation and validation
+"""
+import json
+import sys
+import pytest
+from unittest.mock import patch
+from craft_cli.core import CraftCLI
+from craft_cli.main import main
+from craft_cli.templates import CommandTemplate, TemplateError
+from conftest import write_tool
+
+
+class TestCommandTemplate:
+    """Test cases for CommandTemplate"""
+    
+    def test_resolve_joins_segments(self):
+        """Test literal and variable segments are joined"""
+        template = CommandTemplate("cd {base_path} && pytest {args}")
+        result = template.resolve({"base_path": "/tmp", "args": "-q"})
+        assert result == "cd /tmp && pytest -q"
+        assert template.placeholders == ["base_path", "args"]
+    
+    def test_escaped_braces(self):
+        """Test doubled braces stay literal"""
+        template = CommandTemplate("jq '{{.a}}' {args}")
+        assert template.resolve({"args": "f.json"}) == "jq '{.a}' f.json"
+    
+    def test_format_spec_and_conversion(self):
+        """Test format specs and conversions are applied"""
+        template = CommandTemplate("{tool!r} {domain:>5}")
+        assert template.resolve({"tool": "x", "domain": "ab"}) == "'x'    ab"
+    
+    def test_unknown_placeholder(self):
+        """Test typo'd placeholders are rejected at compile time"""
+        with pytest.raises(TemplateError, match=r"\{arg\}"):
+            CommandTemplate("ruff {arg}")
+    
+    def test_indexed_placeholder(self):
+        """Test index access into a named variable, as str.format allows"""
+        template = CommandTemplate("echo {tool_config[name]} {tool_config[missing]}.")
+        assert template.resolve({"tool_config": {"name": "LINT"}}) == "echo LINT ."
+        assert template.placeholders == ["tool_config"]
+        with pytest.raises(TemplateError, match=r"Unknown placeholder\(s\) \{tool\[name\]\}"):
+            CommandTemplate("echo {tool[name]}", ["args"])
+    
+    def test_positional_placeholder_rejected(self):
+        """Test unnamed and positional fields are rejected"""
+        for source in ("echo {}", "echo {0}", "echo {[0]}"):
+            with pytest.raises(TemplateError, match="Unsupported placeholder"):
+                CommandTemplate(source)
+    
+    def test_malformed_template(self):
+        """Test unbalanced braces are rejected"""
+        with pytest.raises(TemplateError, match="Malformed"):
+            CommandTemplate("echo {args")
+    
+    def test_extra_variables(self):
+        """Test additional variables can be allowed"""
+        template = CommandTemplate("x {level}", ["level"])
+        assert template.resolve({"level": "error"}) == "x error"
+
+
+class TestTemplateRegistry:
+    """Test cases for template handling in the tool registry"""
+    
+    def test_run_tool_resolves_template(self, craft_project, capsys):
+        """Test run_tool resolves the compiled template"""
+        write_tool(craft_project, "test", "echo", command="echo {domain}/{tool} {args}")
+        cli = CraftCLI()
+        assert cli.run_tool("test", "echo", ["a", "b"]) == 0
+        
+        output = capsys.readouterr().out
+        context = json.loads(output.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert context["resolved_command"] == "echo test/echo a b"
+    
+    def test_run_tool_tool_config_variable(self, craft_project, capsys):
+        """Test {tool_config[...]} reads the tool's own YAML, as before templates were compiled"""
+        write_tool(craft_project, "test", "echo", name="ECHO", command="echo {tool_config[name]}")
+        assert CraftCLI().run_tool("test", "echo", []) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert context["resolved_command"] == "echo ECHO"
+    
+    def test_run_tool_broken_template(self, craft_project, capsys):
+        """Test a broken template fails cleanly instead of raising KeyError"""
+        write_tool(craft_project, "test", "bad", command="echo {argz}")
+        cli = CraftCLI()
+        assert cli.run_tool("test", "bad", []) == 1
+        assert "ERROR: Invalid tool 'test/bad'" in capsys.readouterr().out
+    
+    def test_tool_parsed_once(self, craft_project):
+        """Test the registry caches parsed tool specs"""
+        write_tool(craft_project, "test", "echo", command="echo {args}")
+        cli = CraftCLI()
+        assert cli.registry.get_tool("test", "echo") is cli.registry.get_tool("test", "echo")
+    
+    def test_validate_reports_all_broken(self, craft_project, capsys):
+        """Test --validate reports every broken template in one pass"""
+        write_tool(craft_project, "one", "good", command="echo {args}")
+        write_tool(craft_project, "one", "bad", command="echo {argz}")
+        write_tool(craft_project, "two", "worse", command="echo {args")
+        (craft_project / "two" / "yaml.yaml").write_text("invalid: yaml: [[[")
+        
+        with patch.object(sys, 'argv', ['craft', '--validate']):
+            result = main()
+        
+        output = capsys.readouterr().out
+        assert result == 1
+        assert "VALIDATION: 4 tools checked, 3 broken" in output
+        assert "one/bad:" in output
+        assert "two/worse:" in output
+        assert "two/yaml:" in output
+    
+    def test_validate_builtin_domains(self, craft_project):
+        """Test all built-in tool templates compile"""
+        (craft_project.parent / ".craftrc").write_text("config:\n  show_startup_checklist: false\n")
+        assert CraftCLI().validate_tools() is True
@@ -0,0 +1,130 @@
+"""
+Test suite for OTLP-JSON span export
+"""
+import json
+import sys
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+from craft_cli.main import main
+from craft_cli.tracing import Tracer, parse_traceparent, tracer
+from conftest import write_tool
+
+
+PARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def read_spans(path):
+    """Flatten every exported span in an OTLP-JSON lines file"""
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return spans
+
+
+@pytest.fixture(autouse=True)
+def reset_tracer():
+    """Leave the global tracer disabled after each test"""
+    yield
+    tracer.flush()
+    tracer.configure()
+
+
+class TestTracer:
+    """Test cases for the Tracer"""
+    
+    def test_parse_traceparent(self):
+        """Test W3C traceparent parsing"""
+        parsed = parse_traceparent(PARENT)
+        assert parsed["trace_id"] == "0af7651916cd43dd8448eb211c80319c"
+        assert parsed["span_id"] == "b7ad6b7169203331"
+        assert parse_traceparent("garbage") is None
+        assert parse_traceparent("00-" + "0" * 32 + "-b7ad6b7169203331-01") is None
+    
+    def test_disabled_is_noop(self, tmp_path):
+        """Test spans are not recorded unless an exporter is configured"""
+        t = Tracer()
+        with t.span("x") as span:
+            span.set_attribute("a", 1)
+            assert span.traceparent is None
+        assert t._worker is None
+    
+    def test_nesting_and_file_export(self, tmp_path):
+        """Test child spans inherit the trace and parent from the context"""
+        t = Tracer()
+        t.configure(file=str(tmp_path / "spans.jsonl"), traceparent=PARENT)
+        with t.span("outer", kind="test") as outer:
+            with t.span("inner"):
+                pass
+        with pytest.raises(ValueError):
+            with t.span("failing"):
+                raise ValueError("boom")
+        t.flush()
+        
+        spans = {s["name"]: s for s in read_spans(tmp_path / "spans.jsonl")}
+        assert spans["outer"]["traceId"] == "0af7651916cd43dd8448eb211c80319c"
+        assert spans["outer"]["parentSpanId"] == "b7ad6b7169203331"
+        assert spans["inner"]["parentSpanId"] == outer.span_id
+        assert spans["outer"]["attributes"] == [{"key": "kind", "value": {"stringValue": "test"}}]
+        assert spans["failing"]["status"] == {"code": 2, "message": "ValueError: boom"}
+    
+    def test_endpoint_export(self):
+        """Test spans are POSTed to a collector endpoint"""
+        received = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(200)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.handle_request, daemon=True)
+        thread.start()
+        
+        t = Tracer()
+        t.configure(endpoint=f"http://127.0.0.1:{server.server_port}/v1/traces")
+        with t.span("posted"):
+            pass
+        t.flush()
+        thread.join(5)
+        server.server_close()
+        
+        spans = received[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert spans[0]["name"] == "posted"
+
+
+class TestCraftSpans:
+    """Test cases for spans emitted by craft commands"""
+    
+    def test_run_tool_spans(self, craft_project, tmp_path, monkeypatch, capsys):
+        """Test main, discovery, resolve and execute spans share one trace"""
+        spans_file = tmp_path / "spans.jsonl"
+        monkeypatch.setenv("CRAFT_TRACE_FILE", str(spans_file))
+        monkeypatch.setenv("TRACEPARENT", PARENT)
+        write_tool(craft_project, "test", "env", command="echo $TRACEPARENT")
+        
+        with patch.object(sys, 'argv', ['craft', 'test', 'env', '--exec']):
+            assert main() == 0
+        tracer.flush()
+        
+        spans = {s["name"]: s for s in read_spans(spans_file)}
+        assert set(spans) == {"craft.main", "craft.discovery", "craft.resolve", "craft.execute"}
+        main_span = spans["craft.main"]
+        assert main_span["parentSpanId"] == "b7ad6b7169203331"
+        for name in ("craft.discovery", "craft.resolve", "craft.execute"):
+            assert spans[name]["parentSpanId"] == main_span["spanId"]
+            assert spans[name]["traceId"] == main_span["traceId"]
+        attributes = {a["key"]: a["value"] for a in main_span["attributes"]}
+        assert attributes["craft.command"] == {"stringValue": "run_tool"}
+        
+        # The executed tool inherits the execute span as its parent context
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:\n", 1)[1])
+        assert spans["craft.execute"]["spanId"] in context["result"]["stdout"]
@@ -0,0 +1,170 @@
+"""
+Test suite for the streaming data transform engine
+"""
+import csv
+import gzip
+import json
+import shutil
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines import _io
+from craft_cli.engines._io import DataError, RecordWriter, detect_format, read_chunks
+from craft_cli.engines.transform import main, transform
+
+BUILTIN_DATA = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "data"
+
+ROWS = [{"id": str(i), "name": f"item {i}", "note": "a,b" if i % 2 else 'say "hi"'} for i in range(25)]
+
+
+def write_csv(path, rows=ROWS):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def records(path, fmt, chunk_size=1000):
+    return [record for chunk in read_chunks(str(path), fmt, chunk_size) for record in chunk]
+
+
+class TestChunkedIO:
+    """Test cases for the chunked readers and writers"""
+
+    def test_detect_format(self):
+        """Test formats come from extensions, gzip suffix included"""
+        assert detect_format("a.csv") == "csv"
+        assert detect_format("a.JSONL") == "ndjson"
+        assert detect_format("a.ndjson.gz") == "ndjson"
+        assert detect_format("a.txt", "tsv") == "tsv"
+        with pytest.raises(DataError):
+            detect_format("a.txt")
+
+    def test_csv_chunks_are_bounded(self, tmp_path):
+        """Test the reader never yields more than chunk_size records"""
+        path = write_csv(tmp_path / "in.csv")
+        sizes = [len(chunk) for chunk in read_chunks(str(path), "csv", 10)]
+        assert sizes == [10, 10, 5]
+        assert records(path, "csv") == ROWS
+
+    def test_json_array_across_blocks(self, tmp_path, monkeypatch):
+        """Test a JSON array is decoded element by element across read blocks"""
+        monkeypatch.setattr(_io, "_BLOCK_SIZE", 7)
+        values = [{"n": 12345, "s": "x" * 20}, [1, 2], 987654321, {"nested": {"k": None}}]
+        path = tmp_path / "in.json"
+        path.write_text(json.dumps(values, indent=2))
+        assert records(path, "json", 3) == values
+
+    def test_json_reads_ndjson(self, tmp_path, monkeypatch):
+        """Test JSON input that is not an array is read as one document per line"""
+        monkeypatch.setattr(_io, "_BLOCK_SIZE", 5)
+        path = tmp_path / "in.json"
+        path.write_text('{"a": 1}\n\n{"a": 2}\n{"a": 3}')
+        assert records(path, "json") == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+    def test_invalid_ndjson_line(self, tmp_path):
+        """Test a bad line is reported with its line number"""
+        path = tmp_path / "in.ndjson"
+        path.write_text('{"a": 1}\nnot json\n')
+        with pytest.raises(DataError, match="line 2"):
+            records(path, "ndjson")
+
+    def test_xml_records(self, tmp_path):
+        """Test each child of the root becomes a record"""
+        path = tmp_path / "in.xml"
+        path.write_text('<rows><row id="1"><name>a</name></row><row id="2"><name>b</name></row></rows>')
+        assert records(path, "xml") == [{"id": "1", "name": "a"}, {"id": "2", "name": "b"}]
+
+    def test_csv_writer_flattens_nested_values(self, tmp_path, capsys):
+        """Test nested values are written as JSON and columns come from the first chunk"""
+        path = tmp_path / "out.csv"
+        with RecordWriter(str(path), "csv") as writer:
+            writer.write([{"a": 1, "b": {"x": 1}}, {"a": 2, "c": None}])
+            writer.write([{"a": 3, "d": "dropped"}])
+            writer.write([{"a": 4, "d": "dropped"}])
+        assert path.read_text().splitlines() == ["a,b,c", '1,"{""x"": 1}",', "2,,", "3,,", "4,,"]
+        err = capsys.readouterr().err
+        assert err.count("WARNING: dropping field 'd'") == 1 and "after row 2" in err
+
+    def test_aborted_write_leaves_no_file(self, tmp_path):
+        """Test a failed conversion does not leave output that looks complete"""
+        for name in ("out.json", "out.ndjson"):
+            with pytest.raises(RuntimeError):
+                with RecordWriter(str(tmp_path / name), name.split(".")[1]) as writer:
+                    writer.write([{"a": 1}])
+                    raise RuntimeError("read failed")
+            assert not (tmp_path / name).exists()
+
+    def test_parquet_without_pyarrow(self, tmp_path, monkeypatch):
+        """Test Parquet output explains the missing optional dependency"""
+        monkeypatch.setattr(_io, "pyarrow", None)
+        with pytest.raises(DataError, match="pyarrow"):
+            RecordWriter(str(tmp_path / "out.parquet"), "parquet")
+
+
+class TestTransform:
+    """Test cases for format conversion"""
+
+    def test_csv_ndjson_round_trip(self, tmp_path):
+        """Test CSV -> NDJSON -> CSV preserves every record"""
+        source = write_csv(tmp_path / "in.csv")
+        assert transform(str(source), str(tmp_path / "mid.ndjson"), chunk_size=4) == len(ROWS)
+        assert transform(str(tmp_path / "mid.ndjson"), str(tmp_path / "out.csv"), chunk_size=7) == len(ROWS)
+        assert (tmp_path / "out.csv").read_text() == source.read_text().replace("\r\n", "\n")
+
+    def test_json_array_output(self, tmp_path):
+        """Test JSON output is a single valid array"""
+        source = write_csv(tmp_path / "in.csv")
+        transform(str(source), str(tmp_path / "out.json"), chunk_size=6)
+        assert json.loads((tmp_path / "out.json").read_text()) == ROWS
+
+    def test_output_may_be_the_input(self, tmp_path, capsys):
+        """Test converting a file onto itself reads it whole before replacing it"""
+        source = write_csv(tmp_path / "in.csv")
+        expected = source.read_text().replace("\r\n", "\n")
+        assert main([str(source), str(source), "--chunk-size=2"]) == 0
+        assert source.read_text() == expected
+        assert [p.name for p in tmp_path.iterdir()] == ["in.csv"]
+        (tmp_path / "bad.ndjson").write_text('{"a": 1}\n{"a": 2}\nnot json\n')
+        assert main([str(tmp_path / "bad.ndjson"), str(source), "--chunk-size=1"]) == 1
+        assert source.read_text() == expected and len(list(tmp_path.iterdir())) == 2
+
+    def test_empty_input(self, tmp_path):
+        """Test an empty input still produces a valid JSON document"""
+        (tmp_path / "in.ndjson").write_text("")
+        assert transform(str(tmp_path / "in.ndjson"), str(tmp_path / "out.json")) == 0
+        assert json.loads((tmp_path / "out.json").read_text()) == []
+
+    def test_gzip_and_tsv(self, tmp_path):
+        """Test compressed input and explicit formats"""
+        source = tmp_path / "in.ndjson.gz"
+        with gzip.open(source, "wt") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in ROWS))
+        transform(str(source), str(tmp_path / "out.txt"), to_format="tsv")
+        assert (tmp_path / "out.txt").read_text().splitlines()[0] == "id\tname\tnote"
+
+    def test_main_reports_rate(self, tmp_path, capsys):
+        """Test the command line reports rows per second on stderr"""
+        source = write_csv(tmp_path / "in.csv")
+        assert main([str(source), str(tmp_path / "out.ndjson"), "--chunk-size=5"]) == 0
+        assert f"TRANSFORM: {len(ROWS)} rows in" in capsys.readouterr().err
+
+    def test_main_errors(self, tmp_path, capsys):
+        """Test missing files and unknown extensions are reported, not raised"""
+        assert main([str(tmp_path / "missing.csv"), str(tmp_path / "out.json")]) == 1
+        assert not (tmp_path / "out.json").exists()
+        assert main([str(write_csv(tmp_path / "in.csv")), str(tmp_path / "out.bin")]) == 1
+        err = capsys.readouterr().err
+        assert "No such file" in err and "--from/--to" in err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft data transform` runs the engine in-process"""
+        shutil.copytree(BUILTIN_DATA, craft_project / "data")
+        write_csv(Path("in.csv"))
+        assert CraftCLI().run_tool("data", "transform", ["in.csv", "out.ndjson", "--chunk-size=3"],
+                                   execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert context["tool_config"]["entrypoint"] == "craft_cli.engines.transform:main"
+        assert "rows/s" in context["result"]["stderr"]
+        assert records("out.ndjson", "ndjson") == ROWS
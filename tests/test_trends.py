@@ -0,0 +1,225 @@
+"""
+Test suite for the research trends engine
+"""
+import json
+import random
+import shutil
+import xml.dom.minidom
+from collections import Counter
+from pathlib import Path
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.engines._corpus import tokenize
+from craft_cli.engines._termtables import TermTables, read_tables, write_tables
+from craft_cli.engines.trends import (
+    TrendsError, TrendStats, analyze, choose_interval, main, parse_timeframe, update_tables
+)
+
+BUILTIN_RESEARCH = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "research"
+WORDS = [f"w{n}" for n in range(60)]
+
+
+def write_records(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    return path
+
+
+def monthly_records(seed, first=0, months=120, per_month=20, prefix="r"):
+    """Ten years from 2015-01: 'diffusion' takes off in 2023, 'svm' fades"""
+    rng = random.Random(seed)
+    records = []
+    for month in range(first, first + months):
+        for n in range(per_month):
+            words = rng.choices(WORDS, k=rng.randint(5, 30))
+            if month >= 96 and rng.random() < (month - 90) / 40:
+                words.append("diffusion")
+            if rng.random() < 0.3 * (1 - month / 120):
+                words.append("svm")
+            records.append({"id": f"{prefix}{month}-{n}", "title": "paper",
+                            "abstract": " ".join(words),
+                            "date": f"{2015 + month // 12}-{month % 12 + 1:02d}-10",
+                            "source": ("arxiv", "pubmed")[n % 2]})
+    return records
+
+
+def snapshot(directory):
+    """{(month, source): (documents, {term: count})} of a table directory"""
+    tables = TermTables.load(str(directory))
+    result = {}
+    for month in tables.months:
+        for source, (docs, ids, counts) in tables.month_tables(month).items():
+            result[month, source] = (docs, {tables.terms[i]: c for i, c in zip(ids, counts)})
+    return result
+
+
+def counted(corpus, directory, rebuild=False):
+    tables = TermTables.load(str(directory))
+    stats = TrendStats()
+    update_tables(tables, str(corpus), flush_docs=500, rebuild=rebuild, stats=stats)
+    tables.save()
+    tables.remove_stale()
+    return tables, stats
+
+
+class TestTables:
+    """Test cases for the term table files and period cache"""
+
+    def test_tables_round_trip_and_period_cache(self, tmp_path):
+        """Test table files, cached period sums and their invalidation"""
+        write_tables(str(tmp_path / "t.tt"), {"a": (3, {0: 2, 5: 1}), "b": (0, {})})
+        assert {name: (docs, list(ids), list(counts)) for name, (docs, ids, counts)
+                in read_tables(str(tmp_path / "t.tt")).items()} == {
+            "a": (3, [0, 5], [2, 1]), "b": (0, [], [])}
+        corpus = tmp_path / "corpus"
+        write_records(corpus / "papers.jsonl", monthly_records(1, months=24))
+        tables, _ = counted(corpus, tmp_path / "tables")
+        months = [201501, 201502, 201503]
+        docs, first, cached = tables.period_table("q", months, lambda s: s == "arxiv", True)
+        assert (docs, cached) == (30, False)
+        docs, again, cached = tables.period_table("q", months, lambda s: s == "arxiv", True)
+        assert (docs, cached) == (30, True) and again == first
+        ids = tables.ids
+        expected = Counter()
+        for record in monthly_records(1, months=3):
+            if record["source"] == "arxiv":
+                expected.update({ids[t] for t in tokenize(f"paper\n{record['abstract']}")})
+        assert first == dict(expected)
+        tables.add_counts({(201502, "arxiv"): Counter({"w1": 1})}, {(201502, "arxiv"): 1})
+        docs, _, cached = tables.period_table("q", months, lambda s: s == "arxiv", True)
+        assert (docs, cached) == (31, False)
+
+
+class TestUpdate:
+    """Test cases for incremental table updates"""
+
+    def test_incremental_updates_match_a_full_count(self, tmp_path):
+        """Test appended, edited, removed and new files against recounting"""
+        corpus = tmp_path / "corpus"
+        papers = write_records(corpus / "arxiv" / "papers.jsonl", monthly_records(1, months=60))
+        write_records(corpus / "other.jsonl", monthly_records(2, months=12, prefix="o"))
+        (corpus / "notes").mkdir()
+        (corpus / "notes" / "2016-03-02-idea.md").write_text("# Idea\nsvm kernels\n")
+
+        def check():
+            assert snapshot(tmp_path / "tables") == snapshot(counted(
+                corpus, tmp_path / "full", rebuild=True)[0].directory)
+
+        _, stats = counted(corpus, tmp_path / "tables")
+        assert (stats.counted_docs, stats.counted_files) == (1441, 3)
+        check()
+        write_records(papers, monthly_records(3, first=60, months=2, prefix="n"))
+        _, stats = counted(corpus, tmp_path / "tables")
+        assert (stats.counted_docs, stats.recounted_months) == (40, 0)
+        check()
+        lines = (corpus / "other.jsonl").read_text().splitlines(True)
+        (corpus / "other.jsonl").write_text("".join(lines[:30] + lines[50:]))
+        _, stats = counted(corpus, tmp_path / "tables")
+        assert stats.recounted_months == 12 and stats.counted_docs == 12 * 20 * 2 - 20
+        check()
+        (corpus / "notes" / "2016-03-02-idea.md").unlink()
+        _, stats = counted(corpus, tmp_path / "tables")
+        assert (stats.recounted_months, stats.counted_docs, stats.removed_files) == (1, 20, 1)
+        check()
+        _, stats = counted(corpus, tmp_path / "tables")
+        assert stats.counted_docs == stats.counted_files == 0
+        names = {p.name for p in (tmp_path / "tables").iterdir()}
+        tables = TermTables.load(str(tmp_path / "tables"))
+        assert names == {"manifest.json", "terms.txt"} | {
+            tables.month_file(month) for month in tables.months}
+
+
+class TestAnalyze:
+    """Test cases for trend scoring"""
+
+    @pytest.fixture
+    def tables(self, tmp_path):
+        write_records(tmp_path / "corpus" / "papers.jsonl", monthly_records(7))
+        return counted(tmp_path / "corpus", tmp_path / "tables")[0]
+
+    def test_emerging_terms_and_topics(self, tables):
+        """Test the planted burst ranks first and topic series are exact counts"""
+        assert [parse_timeframe(v) for v in ("1y", "5y", "18m")] == [12, 60, 18]
+        assert [choose_interval(m) for m in (12, 60, 120)] == ["month", "quarter", "year"]
+        stats = TrendStats()
+        report = analyze(tables, 60, "quarter", limit=5, stats=stats)
+        top = report.terms[0]
+        assert (top.term, top.since, len(report.labels)) == ("diffusion", "2023-Q1", 20)
+        assert top.burst > 10 and top.growth > 100 and report.labels[-1] == "2024-Q4"
+        assert stats.cached_periods == 0
+        again = TrendStats()
+        assert analyze(tables, 60, "quarter", limit=5, stats=again) == report
+        assert again.cached_periods == 19
+        report = analyze(tables, 120, "year", topics=["diffusion, svm"], fields=["arxiv"])
+        records = [r for r in monthly_records(7) if r["source"] == "arxiv"]
+        for trend in report.terms:
+            assert trend.counts == [
+                sum(trend.term in r["abstract"].split() for r in records if r["date"][:4] == year)
+                for year in report.labels]
+        assert report.docs == [120] * 10
+        diffusion, svm = report.terms
+        assert diffusion.bursts[-2:] == [True, True] and svm.growth < 0 < diffusion.growth
+
+    def test_network_and_errors(self, tables, tmp_path):
+        """Test correlated terms are linked, and bad selections are reported"""
+        report = analyze(tables, 120, "year", topics=["diffusion"], limit=3, related=True)
+        assert report.terms[0].term == "diffusion" and len(report.terms) == 4
+        report = analyze(tables, 120, "year", topics=["diffusion", "svm"], related=True, limit=1)
+        assert all(r < 0.7 for a, b, r in report.links if {a, b} == {0, 1})
+        with pytest.raises(TrendsError, match="does not occur"):
+            analyze(tables, 60, "quarter", topics=["blockchain"])
+        with pytest.raises(TrendsError, match="no dated documents from acl"):
+            analyze(tables, 60, "quarter", fields=["acl"])
+        write_records(tmp_path / "recent" / "papers.jsonl", monthly_records(1, 118, 2))
+        with pytest.raises(TrendsError, match="no documents before 2024-10: use a longer"):
+            analyze(counted(tmp_path / "recent", tmp_path / "recent-tables")[0], 12, "month")
+        with pytest.raises(TrendsError, match="invalid timeframe"):
+            parse_timeframe("5 decades")
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_exports(self, tmp_path, capsys):
+        """Test text, JSON, CSV, SVG and HTML output and the stats lines"""
+        corpus = tmp_path / "corpus"
+        write_records(corpus / "papers.jsonl", monthly_records(7))
+        assert main([f"--corpus={corpus}", "--limit=3"]) == 0
+        out, err = capsys.readouterr()
+        lines = out.splitlines()
+        assert lines[0].startswith("Emerging terms, 2020-Q1 to 2024-Q4: 20 quarters")
+        assert lines[2].split()[:2] == ["1", "diffusion"]
+        assert "TABLES: counted 2,400 documents from 1 files" in err
+        assert "TRENDS: scored" in err and "0 periods from cache" in err
+        assert main([f"--corpus={corpus}", "diffusion", "--timeframe=10y", "--export=json",
+                     "--no-update"]) == 0
+        out, err = capsys.readouterr()
+        data = json.loads(out)
+        assert data["interval"] == "year" and data["terms"][0]["bursts"] == ["2023", "2024"]
+        assert "TABLES" not in err
+        assert main([f"--corpus={corpus}", "--export=csv", "--visualization=network"]) == 0
+        assert capsys.readouterr().out.startswith("source,target,r\n")
+        for visualization in ("chart", "network"):
+            output = tmp_path / f"{visualization}.svg"
+            assert main([f"--corpus={corpus}", "--export=svg", f"--output={output}",
+                         f"--visualization={visualization}"]) == 0
+            assert xml.dom.minidom.parse(str(output)).documentElement.tagName == "svg"
+        assert main([f"--corpus={corpus}", "svm", "--export=html"]) == 0
+        assert "<td>svm</td>" in capsys.readouterr().out
+        for argv, message in ((["--timeframe=soon"], "invalid timeframe"),
+                              (["--fields=acl"], "no dated documents"),
+                              ([f"--cache-dir={tmp_path / 'none'}", "--no-update"],
+                               "no term tables")):
+            assert main([f"--corpus={corpus}"] + argv) == 1
+            assert message in capsys.readouterr().err
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft research trends` runs the built-in engine"""
+        shutil.copytree(BUILTIN_RESEARCH, craft_project / "research")
+        write_records(Path("corpus") / "papers.jsonl", monthly_records(7))
+        argv = ["diffusion", "--timeframe=10y", "--visualization=chart"]
+        assert CraftCLI().run_tool("research", "trends", argv, execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert context["result"]["stdout"].startswith("diffusion, 2015 to 2024")
+        assert Path("corpus", ".craft-trends", "manifest.json").exists()
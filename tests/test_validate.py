@@ -0,0 +1,187 @@
+"""
+Test suite for the streaming schema validator
+"""
+import json
+import shutil
+from pathlib import Path
+import pytest
+import yaml
+from craft_cli.core import CraftCLI
+from craft_cli.engines.validate import (
+    CompiledSchema, SchemaError, main, merge_rules, validate
+)
+
+BUILTIN_DATA = Path(__file__).parent.parent / "src" / "craft_cli" / "domains" / "data"
+
+SCHEMA = {
+    "required": ["id"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 1},
+        "score": {"type": "number", "maximum": 100},
+        "code": {"type": "string", "pattern": "^[A-Z]{3}$"},
+        "status": {"enum": ["new", "done"]},
+        "day": {"format": "date"}
+    }
+}
+
+
+def write_csv(path, bad_every=0, rows=400):
+    lines = ["id,score,code,status,day"]
+    for i in range(1, rows + 1):
+        bad = bad_every and i % bad_every == 0
+        lines.append(f"{i},{'150' if bad else i % 100},{'ab' if bad else 'ABC'},done,2024-01-02")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def failures(schema, records):
+    return sorted((c, k, i) for c, k, i, _ in CompiledSchema(schema).validate(records))
+
+
+class TestCompiledSchema:
+    """Test cases for compiled checks"""
+
+    def test_valid_batch(self):
+        """Test valid CSV strings and JSON values both pass"""
+        records = [{"id": "1", "score": "9.5", "code": "ABC", "status": "new", "day": "2024-02-29"},
+                   {"id": 2, "score": 100, "code": "XYZ", "status": "done", "day": ""}]
+        assert failures(SCHEMA, records) == []
+
+    def test_each_keyword_reports_its_rows(self):
+        """Test failures name the column, keyword and row"""
+        records = [
+            {"id": "0", "score": "x", "code": "ABC", "status": "new", "day": "2024-13-01"},
+            {"id": "", "score": "101", "code": "abc", "status": "old", "day": "2024-01-01"},
+            {"id": 1.5, "score": True, "code": 5, "status": "done"}
+        ]
+        assert failures(SCHEMA, records) == [
+            ("code", "pattern", 1), ("code", "type", 2), ("day", "format", 0),
+            ("id", "minimum", 0), ("id", "required", 1), ("id", "type", 2),
+            ("score", "maximum", 1), ("score", "type", 0), ("score", "type", 2),
+            ("status", "enum", 1)
+        ]
+
+    def test_type_error_masks_bounds(self):
+        """Test a value that is not a number is reported once, by type"""
+        schema = {"properties": {"n": {"type": "integer", "minimum": 0, "maximum": 5}}}
+        assert failures(schema, [{"n": "-1"}, {"n": "nope"}, {"n": "9"}]) == [
+            ("n", "maximum", 2), ("n", "minimum", 0), ("n", "type", 1)
+        ]
+
+    def test_lengths_const_and_closed_schema(self):
+        """Test length limits, const and additionalProperties: false"""
+        schema = {"additionalProperties": False, "properties": {
+            "name": {"minLength": 2, "maxLength": 3}, "kind": {"const": 1}
+        }}
+        records = [{"name": "a", "kind": "1"}, {"name": "abcd", "kind": 2, "extra": "x"}]
+        assert failures(schema, records) == [
+            ("extra", "additionalProperties", 1), ("kind", "const", 1),
+            ("name", "maxLength", 1), ("name", "minLength", 0)
+        ]
+
+    def test_enum_string_members_match_only_themselves(self):
+        """Test a JSON-quoted cell does not pass a string enum, while numbers match their text"""
+        schema = {"properties": {"color": {"enum": ["red", 2, {"a": 1}]}}}
+        records = [{"color": '"red"'}, {"color": "red"}, {"color": "2"}, {"color": 2},
+                   {"color": {"a": 1}}, {"color": '"2"'}]
+        assert failures(schema, records) == [("color", "enum", 0), ("color", "enum", 5)]
+        assert failures(schema, [{"color": '"red"'}, {"color": "red"}][::-1] * 300) == [
+            ("color", "enum", n) for n in range(1, 600, 2)]
+
+    def test_strict_returns_first_row(self):
+        """Test strict mode keeps only the earliest failure"""
+        records = [{"id": "1", "score": "1"}, {"id": "x", "score": "500"}, {"id": ""}]
+        assert CompiledSchema(SCHEMA).validate(records, strict=True) == [("id", "type", 1, "x")]
+
+    @pytest.mark.parametrize("schema, message", [
+        ({"properties": {"a": {"type": "text"}}}, "unknown type"),
+        ({"properties": {"a": {"pattern": "("}}}, "invalid pattern"),
+        ({"properties": {"a": {"minimum": "1"}}}, "must be a number"),
+        ({"properties": {"a": {"format": "ipv9"}}}, "unsupported format"),
+        ({"properties": {"a": {"items": {}}}}, "unsupported keyword"),
+    ])
+    def test_bad_schemas(self, schema, message):
+        """Test schema mistakes are reported when compiling"""
+        with pytest.raises(SchemaError, match=message):
+            CompiledSchema(schema)
+
+    def test_merge_rules(self):
+        """Test plain column rules override schema keywords"""
+        merged = merge_rules(SCHEMA, {"score": {"maximum": 10}, "extra": {"type": "string"}})
+        assert merged["properties"]["score"] == {"type": "number", "maximum": 10}
+        assert merged["properties"]["extra"] == {"type": "string"}
+        assert merge_rules({}, {"required": ["a"]})["required"] == ["a"]
+
+
+class TestValidate:
+    """Test cases for validating files"""
+
+    def test_counts_and_samples(self, tmp_path):
+        """Test errors are aggregated with a limited number of sample rows"""
+        path = write_csv(tmp_path / "data.csv", bad_every=7)
+        report = validate(str(path), "csv", SCHEMA, chunk_size=50, samples=3).to_dict(str(path))
+        assert report["rows"] == 400 and not report["valid"]
+        by_rule = {(f["column"], f["keyword"]): f for f in report["failures"]}
+        assert by_rule[("score", "maximum")]["count"] == 57
+        assert [s["row"] for s in by_rule[("code", "pattern")]["samples"]] == [7, 14, 21]
+
+    def test_parallel_identical_to_sequential(self, tmp_path):
+        """Test partitioned parallel runs report the same rows as a sequential run"""
+        path = str(write_csv(tmp_path / "data.csv", bad_every=11, rows=3000))
+        sequential = validate(path, "csv", SCHEMA, jobs=1, chunk_size=100, partition_bytes=4096)
+        parallel = validate(path, "csv", SCHEMA, jobs=3, chunk_size=100, partition_bytes=4096)
+        assert parallel.to_dict(path) == sequential.to_dict(path)
+        single = validate(path, "csv", SCHEMA, chunk_size=100)
+        assert single.to_dict(path) == sequential.to_dict(path)
+
+    def test_strict_stops_early(self, tmp_path):
+        """Test strict mode stops reading after the first failing batch"""
+        path = write_csv(tmp_path / "data.csv", bad_every=30, rows=3000)
+        report = validate(str(path), "csv", SCHEMA, strict=True, chunk_size=100, partition_bytes=2048, jobs=2)
+        assert report.error_count == 1 and report.rows < 3000 and report.stopped
+        assert report.examples == {("code", "pattern"): [(30, "ab")]}
+
+    def test_json_input(self, tmp_path):
+        """Test non-splittable formats are validated chunk by chunk"""
+        path = tmp_path / "data.json"
+        path.write_text(json.dumps([{"id": i, "status": "new" if i % 4 else "bad"} for i in range(1, 41)]))
+        report = validate(str(path), "json", SCHEMA, jobs=2, chunk_size=6)
+        assert report.errors == {("status", "enum"): 10}
+        assert report.examples[("status", "enum")][0] == (4, "bad")
+
+
+class TestMain:
+    """Test cases for the command line"""
+
+    def test_exit_codes_and_output(self, tmp_path, capsys):
+        """Test valid, invalid and unusable inputs map to exit codes 0, 1 and 2"""
+        schema = tmp_path / "schema.yaml"
+        schema.write_text(yaml.dump(SCHEMA))
+        good = write_csv(tmp_path / "good.csv")
+        bad = write_csv(tmp_path / "bad.csv", bad_every=100)
+        assert main([str(good), str(schema)]) == 0
+        assert capsys.readouterr().out.startswith("VALID:")
+        assert main([str(bad), f"--schema={schema}", "--strict"]) == 1
+        assert "(stopped at first error)" in capsys.readouterr().out
+        assert main([str(good)]) == 2
+        assert "nothing to validate against" in capsys.readouterr().err
+
+    def test_rules_only_json_report(self, tmp_path, capsys):
+        """Test a rules file alone is enough and JSON output is parseable"""
+        rules = tmp_path / "rules.yaml"
+        rules.write_text("score:\n  maximum: 50\n")
+        path = write_csv(tmp_path / "data.csv", rows=60)
+        assert main([str(path), f"--rules={rules}", "--format=json"]) == 1
+        report = json.loads(capsys.readouterr().out)
+        assert [(f["column"], f["keyword"], f["count"]) for f in report["failures"]] == [
+            ("score", "maximum", 10)
+        ]
+
+    def test_builtin_tool(self, craft_project, capsys):
+        """Test `craft data validate` runs the built-in engine"""
+        shutil.copytree(BUILTIN_DATA, craft_project / "data")
+        Path("schema.json").write_text(json.dumps(SCHEMA))
+        write_csv(Path("data.csv"))
+        assert CraftCLI().run_tool("data", "validate", ["data.csv", "schema.json"], execute=True) == 0
+        context = json.loads(capsys.readouterr().out.split("EXECUTION_CONTEXT:", 1)[1])
+        assert context["result"]["stdout"].startswith("VALID: data.csv rows=400")
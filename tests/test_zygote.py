@@ -0,0 +1,113 @@
+"""
+Test suite for the pre-forked zygote pool
+"""
+import pytest
+from craft_cli.core import CraftCLI
+from craft_cli.runner import ResourcePolicy
+from craft_cli.zygote import PreforkPolicy, parse_python_command, run_prefork, zygote_socket
+from conftest import write_tool
+
+
+def write_modules(directory):
+    """A preloadable module that logs its imports and a tool module using it"""
+    (directory / "zwarm_marker.py").write_text(
+        "import os\n"
+        "with open(os.path.join(os.path.dirname(__file__), 'imports.log'), 'a') as f:\n"
+        "    f.write('imported\\n')\n"
+    )
+    (directory / "ztool.py").write_text(
+        "import os, sys, time\n"
+        "import zwarm_marker\n"
+        "if sys.argv[1:] == ['sleep']:\n"
+        "    time.sleep(30)\n"
+        "print('args', sys.argv[1:], os.environ.get('ZTEST', ''))\n"
+        "print('to stderr', file=sys.stderr)\n"
+        "sys.exit(len(sys.argv) - 1)\n"
+    )
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A working directory holding test modules; zygotes exit after one idle second"""
+    monkeypatch.chdir(tmp_path)
+    write_modules(tmp_path)
+    return tmp_path
+
+
+def prefork(workdir, command, **kwargs):
+    return run_prefork(command, preload=["zwarm_marker"], cwd=str(workdir),
+                       state_dir=workdir / "state", idle_timeout=1, **kwargs)
+
+
+class TestParsing:
+    """Test cases for recognising Python commands and prefork settings"""
+    
+    @pytest.mark.parametrize("command,expected", [
+        ("python -m tool --a=1 b", ("module", "tool", ["--a=1", "b"])),
+        ("python3 script.py 'two words'", ("script", "script.py", ["two words"])),
+        ("/usr/bin/python3.11 -m pkg.mod", ("module", "pkg.mod", [])),
+        ("python -m tool | head", None),
+        ("python -m tool > out.txt", None),
+        ("python -m tool $HOME", None),
+        ("python -c 'print(1)'", None),
+        ("node script.js", None),
+        ("python -m", None)
+    ])
+    def test_parse_python_command(self, command, expected):
+        """Test only plain Python invocations are routed to a zygote"""
+        assert parse_python_command(command) == expected
+    
+    def test_prefork_policy(self):
+        """Test prefork YAML values"""
+        assert PreforkPolicy.from_value(None) is None
+        assert PreforkPolicy.from_value(True).preload == []
+        policy = PreforkPolicy.from_value({"preload": ["json", "xml.etree"], "idle_timeout": "2m"})
+        assert (policy.preload, policy.idle_timeout) == (["json", "xml.etree"], 120)
+        for value in ("yes", {"preload": "json"}, {"preload": ["a b"]}, {"warm": True}):
+            with pytest.raises(ValueError):
+                PreforkPolicy.from_value(value)
+    
+    def test_socket_per_preload_set(self, tmp_path):
+        """Test each preload set gets its own zygote"""
+        assert zygote_socket(tmp_path, ["a", "b"]) == zygote_socket(tmp_path, ["b", "a"])
+        assert zygote_socket(tmp_path, ["a"]) != zygote_socket(tmp_path, ["b"])
+
+
+class TestZygote:
+    """Test cases for running commands through a zygote"""
+    
+    def test_runs_warm_children(self, workdir):
+        """Test output, exit status and env pass through; preloads import once"""
+        first = prefork(workdir, "python -m ztool a b", env={"ZTEST": "set"})
+        second = prefork(workdir, "python ztool.py c")
+        
+        assert first.exit_code == 2
+        assert first.stdout == "args ['a', 'b'] set\n"
+        assert first.stderr == "to stderr\n"
+        assert first.output_bytes == len(first.stdout) + len(first.stderr)
+        assert second.exit_code == 1
+        assert second.stdout == "args ['c'] \n"
+        assert (workdir / "imports.log").read_text() == "imported\n"
+        assert (workdir / "state" / "zygotes").is_dir()
+    
+    def test_timeout_kills_child(self, workdir):
+        """Test the wall timeout is enforced on the zygote's child"""
+        result = prefork(workdir, "python -m ztool sleep", policy=ResourcePolicy(timeout=0.5))
+        assert result.limit_exceeded == "timeout"
+        assert result.cli_exit_code == 124
+    
+    def test_shell_commands_fall_back(self, workdir):
+        """Test commands that need a shell run as a normal subprocess"""
+        result = prefork(workdir, "echo piped | tr a-z A-Z")
+        assert result.stdout == "PIPED\n"
+        assert not (workdir / "state").exists()
+    
+    def test_prefork_tool(self, craft_project, capsys):
+        """Test a tool with prefork: runs through the zygote when executed"""
+        workdir = craft_project.parent
+        write_modules(workdir)
+        write_tool(craft_project, "py", "warm", command="python -m ztool {args}",
+                   prefork={"preload": ["zwarm_marker"], "idle_timeout": "1s"})
+        assert CraftCLI().run_tool("py", "warm", ["x"], execute=True) == 1
+        assert "args ['x']" in capsys.readouterr().out
+        assert (workdir / "imports.log").read_text() == "imported\n"